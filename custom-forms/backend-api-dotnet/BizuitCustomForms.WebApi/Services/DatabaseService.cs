@@ -1,4 +1,6 @@
 using System.Data;
+using System.IO.Compression;
+using System.Text;
 using Microsoft.Data.SqlClient;
 using Dapper;
 using BizuitCustomForms.WebApi.Models;
@@ -385,9 +387,12 @@ public class DatabaseService : IDatabaseService
                         cfv.CompiledCode,
                         cfv.Version,
                         cfv.PublishedAt,
-                        cfv.SizeBytes
+                        cfv.SizeBytes,
+                        ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) AS CompiledCodeBinary,
+                        cfv.CodeEncoding
                     FROM CustomFormVersions cfv
                     INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+                    LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
                     WHERE cf.FormName = @FormName AND cfv.Version = @Version";
                 parameters = new { FormName = formName, Version = version };
             }
@@ -399,9 +404,12 @@ public class DatabaseService : IDatabaseService
                         cfv.CompiledCode,
                         cfv.Version,
                         cfv.PublishedAt,
-                        cfv.SizeBytes
+                        cfv.SizeBytes,
+                        ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) AS CompiledCodeBinary,
+                        cfv.CodeEncoding
                     FROM CustomFormVersions cfv
                     INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+                    LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
                     WHERE cf.FormName = @FormName AND cfv.IsCurrent = 1";
                 parameters = new { FormName = formName };
             }
@@ -416,7 +424,10 @@ public class DatabaseService : IDatabaseService
             }
 
             return new FormCodeResponse(
-                CompiledCode: result.CompiledCode,
+                CompiledCode: DecodeCompiledCode(
+                    (string?)result.CompiledCode,
+                    (byte[]?)result.CompiledCodeBinary,
+                    (string?)result.CodeEncoding),
                 Version: result.Version,
                 PublishedAt: ((DateTime)result.PublishedAt).ToString("o"),
                 SizeBytes: result.SizeBytes
@@ -794,6 +805,32 @@ public class DatabaseService : IDatabaseService
     // Validation Helpers
     // ======================================================================
 
+    /// <summary>
+    /// Decodes compiled code from its storage format (see migration 006):
+    /// NULL encoding = NVARCHAR text, 'gzip-utf8' / 'gzip-utf16le' = compressed CompiledCodeBinary
+    /// </summary>
+    private static string DecodeCompiledCode(string? compiledCode, byte[]? compiledCodeBinary, string? codeEncoding)
+    {
+        if (codeEncoding == null)
+            return compiledCode ?? string.Empty;
+
+        var encoding = codeEncoding switch
+        {
+            "gzip-utf8" => Encoding.UTF8,
+            "gzip-utf16le" => Encoding.Unicode,
+            _ => throw new InvalidOperationException($"Unknown code encoding: {codeEncoding}")
+        };
+
+        // Blob storage rows (StorageBackend, migration 008) have no payload in the table
+        if (compiledCodeBinary == null)
+            throw new InvalidOperationException("Compiled code is stored outside the database (blob storage)");
+
+        using var input = new MemoryStream(compiledCodeBinary);
+        using var gzip = new GZipStream(input, CompressionMode.Decompress);
+        using var reader = new StreamReader(gzip, encoding);
+        return reader.ReadToEnd();
+    }
+
     private bool IsValidProcessName(string processName)
     {
         if (string.IsNullOrWhiteSpace(processName) || processName.Length > 255)
@@ -0,0 +1,225 @@
+"""
+Blob Storage
+
+Almacenamiento del código compilado fuera de SQL Server, direccionado por
+contenido (migración 008):
+
+- CustomFormVersions guarda la metadata, el ContentHash (sha256 del código en
+  UTF-8) y el StorageBackend donde está el payload.
+- El payload es el gzip del código en UTF-8 (mismo formato que 'gzip-utf8'),
+  inmutable: la misma key siempre tiene los mismos bytes.
+
+Backends (FORM_CODE_STORAGE):
+- "sql":        el código queda en SQL Server: en CustomFormBlobs, compartido
+                entre versiones (FORM_CODE_DEDUP, migración 009), o en
+                CustomFormVersions (FORM_CODE_DEDUP=false)
+- "filesystem": archivos bajo FORM_BLOB_PATH, servidos con sendfile
+- "object":     object store HTTP (PUT/GET/HEAD/DELETE de
+                {FORM_BLOB_OBJECT_URL}/{key}), ej: un bucket S3-compatible
+                con acceso por red privada o un stand-in local (MinIO, nginx
+                con WebDAV). FORM_BLOB_OBJECT_TOKEN se envía como Bearer.
+
+Cada payload se guarda una sola vez por ContentHash; CustomFormBlobs registra
+dónde está y cuántas versiones lo referencian (RefCount).
+"""
+
+import hashlib
+import os
+import uuid
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+import requests
+from dotenv import load_dotenv
+
+from validators import validate_sha256
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_CODE_STORAGE = os.getenv("FORM_CODE_STORAGE", "sql").lower()
+# La migración 009 es obligatoria con cualquier valor (las lecturas hacen JOIN
+# con CustomFormBlobs); los backends filesystem/object siempre deduplican
+FORM_CODE_DEDUP = os.getenv("FORM_CODE_DEDUP", "true").lower() == "true"
+FORM_BLOB_PATH = os.getenv("FORM_BLOB_PATH", "./form-blobs")
+FORM_BLOB_OBJECT_URL = os.getenv("FORM_BLOB_OBJECT_URL", "")
+FORM_BLOB_OBJECT_TOKEN = os.getenv("FORM_BLOB_OBJECT_TOKEN", "")
+FORM_BLOB_OBJECT_TIMEOUT = int(os.getenv("FORM_BLOB_OBJECT_TIMEOUT", "30"))
+
+STORAGE_SQL = "sql"
+STORAGE_FILESYSTEM = "filesystem"
+STORAGE_OBJECT = "object"
+BLOB_BACKENDS = (STORAGE_FILESYSTEM, STORAGE_OBJECT)
+
+
+class BlobNotFoundError(LookupError):
+    """El blob referenciado por una versión no existe en el backend"""
+
+
+def content_hash(code: str) -> str:
+    """sha256 (hex) del código en UTF-8: la key del blob"""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def blob_key(digest: str) -> str:
+    """
+    Key relativa del blob (dos niveles de directorios para no tener miles de
+    archivos en una misma carpeta)
+
+    Raises:
+        ValueError: Si digest no es un sha256 hex
+    """
+    if not validate_sha256(digest):
+        raise ValueError("Invalid content hash")
+    digest = digest.lower()
+    return f"sha256/{digest[:2]}/{digest[2:4]}/{digest}.js.gz"
+
+
+class BlobStore(ABC):
+    """Interfaz de los backends de blobs"""
+
+    name = ""
+
+    @abstractmethod
+    def put(self, digest: str, data: bytes) -> None:
+        """Guarda un blob (idempotente: si ya existe no se reescribe)"""
+
+    @abstractmethod
+    def get(self, digest: str) -> bytes:
+        """
+        Raises:
+            BlobNotFoundError: Si el blob no existe
+        """
+
+    @abstractmethod
+    def exists(self, digest: str) -> bool:
+        ...
+
+    @abstractmethod
+    def delete(self, digest: str) -> bool:
+        ...
+
+    def local_path(self, digest: str) -> Optional[Path]:
+        """Ruta en disco del blob, para servirlo con sendfile (None si no es local)"""
+        return None
+
+
+class FilesystemBlobStore(BlobStore):
+    """Blobs como archivos en disco, escritos de forma atómica"""
+
+    name = STORAGE_FILESYSTEM
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _path(self, digest: str) -> Path:
+        return self.root / blob_key(digest)
+
+    def put(self, digest: str, data: bytes) -> None:
+        path = self._path(digest)
+        if path.exists():
+            return
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def get(self, digest: str) -> bytes:
+        try:
+            return self._path(digest).read_bytes()
+        except FileNotFoundError:
+            raise BlobNotFoundError(f"Blob {digest} not found in {self.root}")
+
+    def exists(self, digest: str) -> bool:
+        return self._path(digest).exists()
+
+    def delete(self, digest: str) -> bool:
+        try:
+            self._path(digest).unlink()
+            return True
+        except FileNotFoundError:
+            return False
+
+    def local_path(self, digest: str) -> Optional[Path]:
+        path = self._path(digest)
+        return path if path.exists() else None
+
+
+class ObjectBlobStore(BlobStore):
+    """Blobs en un object store HTTP"""
+
+    name = STORAGE_OBJECT
+
+    def __init__(self, base_url: str, token: str = "", timeout: int = 30):
+        if not base_url:
+            raise ValueError("FORM_BLOB_OBJECT_URL is required for object storage")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        if token:
+            self.session.headers["Authorization"] = f"Bearer {token}"
+
+    def _url(self, digest: str) -> str:
+        return f"{self.base_url}/{blob_key(digest)}"
+
+    def put(self, digest: str, data: bytes) -> None:
+        if self.exists(digest):
+            return
+        response = self.session.put(
+            self._url(digest),
+            data=data,
+            headers={"Content-Type": "application/gzip"},
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def get(self, digest: str) -> bytes:
+        response = self.session.get(self._url(digest), timeout=self.timeout)
+        if response.status_code == 404:
+            raise BlobNotFoundError(f"Blob {digest} not found in object store")
+        response.raise_for_status()
+        return response.content
+
+    def exists(self, digest: str) -> bool:
+        response = self.session.head(self._url(digest), timeout=self.timeout)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+    def delete(self, digest: str) -> bool:
+        response = self.session.delete(self._url(digest), timeout=self.timeout)
+        if response.status_code == 404:
+            return False
+        response.raise_for_status()
+        return True
+
+
+_stores = {}
+
+
+def get_blob_store(backend: str) -> BlobStore:
+    """
+    Backend de blobs por nombre (el StorageBackend guardado en cada versión)
+
+    Las versiones se leen del backend donde fueron escritas, aunque
+    FORM_CODE_STORAGE haya cambiado después.
+
+    Raises:
+        ValueError: Si el backend no existe o no está configurado
+    """
+    if backend not in _stores:
+        if backend == STORAGE_FILESYSTEM:
+            _stores[backend] = FilesystemBlobStore(FORM_BLOB_PATH)
+        elif backend == STORAGE_OBJECT:
+            _stores[backend] = ObjectBlobStore(FORM_BLOB_OBJECT_URL, FORM_BLOB_OBJECT_TOKEN, FORM_BLOB_OBJECT_TIMEOUT)
+        else:
+            raise ValueError(f"Unknown blob storage backend: {backend}")
+    return _stores[backend]
@@ -0,0 +1,306 @@
+"""
+Chunked Uploads
+
+Upload reanudable de deployment packages por chunks (POST/PUT/GET bajo
+/api/deployment/uploads).
+
+Protocolo:
+1. Initiate: el cliente declara fileName, totalSize y el SHA-256 del package
+   completo, y recibe un uploadId y el chunkSize a usar.
+2. Upload chunk N: PUT del chunk N con su offset (N * chunkSize) y el SHA-256
+   del chunk. Cada chunk se escribe en su posición del archivo en disco, por
+   lo que pueden llegar en cualquier orden y re-enviarse sin problemas.
+3. Query: GET del estado con los rangos recibidos y los chunks faltantes.
+   Tras un corte de conexión el cliente solo re-envía los faltantes.
+4. Finalize: verifica que estén todos los chunks y el SHA-256 del package
+   completo, y lo entrega a la cola de deployment jobs.
+
+Los uploads incompletos se eliminan después de DEPLOYMENT_UPLOAD_TTL_HOURS.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from models import ChunkedUploadStatus
+from validators import validate_upload_id, validate_sha256
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+TEMP_UPLOAD_PATH = os.getenv("TEMP_UPLOAD_PATH", "./temp-uploads")
+DEPLOYMENT_UPLOADS_PATH = os.getenv("DEPLOYMENT_UPLOADS_PATH", os.path.join(TEMP_UPLOAD_PATH, "uploads"))
+DEPLOYMENT_UPLOAD_CHUNK_SIZE_MB = int(os.getenv("DEPLOYMENT_UPLOAD_CHUNK_SIZE_MB", "5"))
+DEPLOYMENT_UPLOAD_TTL_HOURS = int(os.getenv("DEPLOYMENT_UPLOAD_TTL_HOURS", "24"))
+MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
+
+DEFAULT_CHUNK_SIZE = DEPLOYMENT_UPLOAD_CHUNK_SIZE_MB * 1024 * 1024
+MIN_CHUNK_SIZE = 256 * 1024
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+MAX_TOTAL_SIZE = MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+PARTIAL_FILENAME = "package.part"
+STATUS_FILENAME = "upload.json"
+HASH_READ_SIZE = 1024 * 1024
+
+
+class UploadIncompleteError(ValueError):
+    """Finalize llamado con chunks faltantes"""
+
+
+class ChunkedUploadStore:
+    """
+    Persistencia de uploads por chunks en disco
+
+    Layout:
+        <root>/<uploadId>/upload.json   Estado serializado (ChunkedUploadStatus)
+        <root>/<uploadId>/package.part  Package pre-alocado; cada chunk se escribe en su offset
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def upload_dir(self, upload_id: str) -> Path:
+        # SECURITY: upload_id se usa como nombre de directorio
+        if not validate_upload_id(upload_id):
+            raise ValueError(f"Invalid upload_id format: {upload_id[:50]}")
+        return self.root / upload_id
+
+    def partial_path(self, upload_id: str) -> Path:
+        return self.upload_dir(upload_id) / PARTIAL_FILENAME
+
+    def _lock(self, upload_id: str) -> threading.Lock:
+        """Lock por upload: serializa las actualizaciones de upload.json entre chunks concurrentes"""
+        with self._locks_guard:
+            return self._locks.setdefault(upload_id, threading.Lock())
+
+    def create(
+        self,
+        file_name: str,
+        total_size: int,
+        sha256: str,
+        chunk_size: Optional[int] = None,
+        created_by: Optional[str] = None
+    ) -> ChunkedUploadStatus:
+        """
+        Inicia un upload nuevo y pre-aloca el archivo del package
+
+        Raises:
+            ValueError: Si el nombre, tamaño, chunk size o digest son inválidos
+        """
+        if not file_name or not file_name.endswith('.zip'):
+            raise ValueError("Only .zip files are allowed")
+
+        if total_size <= 0:
+            raise ValueError("totalSize must be greater than zero")
+
+        if total_size > MAX_TOTAL_SIZE:
+            raise ValueError(f"File size exceeds maximum allowed size of {MAX_UPLOAD_SIZE_MB} MB")
+
+        if not validate_sha256(sha256):
+            raise ValueError("sha256 must be a 64-character hex digest")
+
+        chunk_size = chunk_size or DEFAULT_CHUNK_SIZE
+        if chunk_size < MIN_CHUNK_SIZE or chunk_size > MAX_CHUNK_SIZE:
+            raise ValueError(
+                f"chunkSize must be between {MIN_CHUNK_SIZE} and {MAX_CHUNK_SIZE} bytes"
+            )
+
+        upload_id = uuid.uuid4().hex
+        upload_dir = self.upload_dir(upload_id)
+        upload_dir.mkdir(parents=True, exist_ok=False)
+
+        with open(upload_dir / PARTIAL_FILENAME, "wb") as f:
+            f.truncate(total_size)
+
+        now = datetime.utcnow()
+        upload = ChunkedUploadStatus(
+            uploadId=upload_id,
+            fileName=file_name,
+            totalSize=total_size,
+            chunkSize=chunk_size,
+            totalChunks=(total_size + chunk_size - 1) // chunk_size,
+            sha256=sha256.lower(),
+            createdBy=created_by,
+            createdAt=now,
+            updatedAt=now
+        )
+        self._refresh_progress(upload)
+        self.save(upload)
+        return upload
+
+    def save(self, upload: ChunkedUploadStatus) -> None:
+        """Escribe upload.json de forma atómica (tmp + rename)"""
+        upload_dir = self.upload_dir(upload.uploadId)
+        tmp_path = upload_dir / f"{STATUS_FILENAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(upload.model_dump_json())
+        os.replace(tmp_path, upload_dir / STATUS_FILENAME)
+
+    def load(self, upload_id: str) -> Optional[ChunkedUploadStatus]:
+        """Lee un upload desde disco, o None si no existe"""
+        status_path = self.upload_dir(upload_id) / STATUS_FILENAME
+        if not status_path.exists():
+            return None
+        with open(status_path, "r", encoding="utf-8") as f:
+            return ChunkedUploadStatus(**json.load(f))
+
+    def write_chunk(
+        self,
+        upload_id: str,
+        index: int,
+        offset: int,
+        data: bytes,
+        checksum: str
+    ) -> Optional[ChunkedUploadStatus]:
+        """
+        Verifica y escribe un chunk en su posición del package
+
+        Re-enviar un chunk ya recibido es válido (lo sobrescribe).
+
+        Args:
+            upload_id: ID del upload
+            index: Número de chunk (desde 0)
+            offset: Offset en bytes del chunk; debe ser index * chunkSize
+            data: Contenido del chunk
+            checksum: SHA-256 (hex) del chunk
+
+        Returns:
+            Estado actualizado, o None si el upload no existe
+
+        Raises:
+            ValueError: Si el chunk no corresponde al upload o el checksum no coincide
+        """
+        with self._lock(upload_id):
+            upload = self.load(upload_id)
+            if not upload:
+                return None
+
+            if index < 0 or index >= upload.totalChunks:
+                raise ValueError(f"Chunk index out of range: {index} (total chunks: {upload.totalChunks})")
+
+            if offset != index * upload.chunkSize:
+                raise ValueError(f"Offset {offset} does not match chunk {index} (expected {index * upload.chunkSize})")
+
+            expected_size = min(upload.chunkSize, upload.totalSize - offset)
+            if len(data) != expected_size:
+                raise ValueError(f"Chunk {index} must be {expected_size} bytes, received {len(data)}")
+
+            if not checksum or hashlib.sha256(data).hexdigest() != checksum.lower():
+                raise ValueError(f"Checksum mismatch for chunk {index}")
+
+            with open(self.partial_path(upload_id), "r+b") as f:
+                f.seek(offset)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+            if index not in upload.receivedChunks:
+                upload.receivedChunks.append(index)
+                upload.receivedChunks.sort()
+            upload.updatedAt = datetime.utcnow()
+            self._refresh_progress(upload)
+            self.save(upload)
+            return upload
+
+    def verify(self, upload_id: str) -> Optional[ChunkedUploadStatus]:
+        """
+        Verifica que el package esté completo y coincida con el SHA-256 declarado
+
+        Returns:
+            Estado del upload, o None si no existe
+
+        Raises:
+            UploadIncompleteError: Si faltan chunks
+            ValueError: Si el SHA-256 del package ensamblado no coincide
+        """
+        with self._lock(upload_id):
+            upload = self.load(upload_id)
+            if not upload:
+                return None
+
+            if upload.missingChunks:
+                raise UploadIncompleteError(
+                    f"Upload incomplete: {len(upload.missingChunks)} chunk(s) missing"
+                )
+
+            digest = hashlib.sha256()
+            with open(self.partial_path(upload_id), "rb") as f:
+                for block in iter(lambda: f.read(HASH_READ_SIZE), b""):
+                    digest.update(block)
+
+            if digest.hexdigest() != upload.sha256:
+                raise ValueError("Checksum mismatch: assembled package does not match sha256")
+
+            return upload
+
+    def discard(self, upload_id: str) -> bool:
+        """Elimina un upload (abortado o ya entregado a la cola de jobs)"""
+        upload_dir = self.upload_dir(upload_id)
+        if not upload_dir.exists():
+            return False
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        with self._locks_guard:
+            self._locks.pop(upload_id, None)
+        return True
+
+    def purge_expired(self, ttl_hours: int) -> int:
+        """Elimina uploads sin actividad en las últimas ttl_hours"""
+        cutoff = datetime.utcnow() - timedelta(hours=ttl_hours)
+        purged = 0
+        for entry in self.root.iterdir():
+            if not entry.is_dir() or not validate_upload_id(entry.name):
+                continue
+            try:
+                upload = self.load(entry.name)
+            except Exception as e:
+                print(f"[Chunked Uploads] Warning: Cannot read upload '{entry.name}': {e}")
+                continue
+            if upload is None or upload.updatedAt < cutoff:
+                self.discard(entry.name)
+                purged += 1
+        return purged
+
+    @staticmethod
+    def _refresh_progress(upload: ChunkedUploadStatus) -> None:
+        """Recalcula receivedRanges, missingChunks y receivedBytes a partir de receivedChunks"""
+        received = set(upload.receivedChunks)
+        upload.missingChunks = [i for i in range(upload.totalChunks) if i not in received]
+        upload.receivedRanges = received_ranges(upload.receivedChunks, upload.chunkSize, upload.totalSize)
+        upload.receivedBytes = sum(end - start for start, end in upload.receivedRanges)
+
+
+def received_ranges(chunks: List[int], chunk_size: int, total_size: int) -> List[List[int]]:
+    """
+    Convierte una lista ordenada de chunks recibidos en rangos de bytes [start, end)
+
+    Examples:
+        >>> received_ranges([0, 1, 3], 10, 35)
+        [[0, 20], [30, 35]]
+    """
+    ranges: List[List[int]] = []
+    for index in chunks:
+        start = index * chunk_size
+        end = min(start + chunk_size, total_size)
+        if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+        else:
+            ranges.append([start, end])
+    return ranges
+
+
+# Singleton usado por main.py
+upload_store = ChunkedUploadStore(DEPLOYMENT_UPLOADS_PATH)
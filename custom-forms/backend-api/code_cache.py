@@ -0,0 +1,163 @@
+"""
+Code Cache
+
+Cache en disco (local al nodo) de los bundles de los forms, direccionado por
+ContentHash (migración 008):
+
+- Cada entrada es el gzip del código en UTF-8 en FORM_CODE_CACHE_PATH, escrita
+  de forma atómica al desplegar o en el primer fetch.
+- El endpoint /code la envía con FileResponse (sendfile): el payload no pasa
+  por objetos Python y todos los workers del nodo comparten una sola copia
+  a través del page cache del sistema operativo.
+- Como el contenido es inmutable para un hash dado, una entrada nunca se
+  invalida; solo se desaloja la menos usada (mtime) al superar FORM_CODE_CACHE_MB.
+  Las entradas usadas en los últimos CACHE_EVICT_GRACE_SECONDS no se desalojan:
+  otro worker puede haber devuelto su ruta y todavía no haberla abierto.
+- Cada worker verifica el hash de una entrada la primera vez que la sirve;
+  una entrada corrupta se descarta y se vuelve a traer de la BD.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Set
+
+from dotenv import load_dotenv
+
+from code_storage import encode_compiled_code
+from validators import validate_sha256
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_CODE_CACHE_ENABLED = os.getenv("FORM_CODE_CACHE_ENABLED", "false").lower() == "true"
+FORM_CODE_CACHE_PATH = os.getenv("FORM_CODE_CACHE_PATH", "./form-code-cache")
+FORM_CODE_CACHE_MB = int(os.getenv("FORM_CODE_CACHE_MB", "256"))
+
+CACHE_SUFFIX = ".js.gz"
+# Tiempo mínimo desde el último uso antes de poder desalojar una entrada (s)
+CACHE_EVICT_GRACE_SECONDS = 60
+
+
+def gzip_content_hash(data: bytes) -> str:
+    """sha256 (hex) del código contenido en un gzip (el ContentHash de la versión)"""
+    return hashlib.sha256(gzip.decompress(data)).hexdigest()
+
+
+class DiskCodeCache:
+    """Cache de bundles gzip en disco, acotado por tamaño"""
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._verified: Set[str] = set()
+        self._evict_lock = threading.Lock()
+
+    def path(self, digest: str) -> Path:
+        """
+        Raises:
+            ValueError: Si digest no es un sha256 hex
+        """
+        if not validate_sha256(digest):
+            raise ValueError("Invalid content hash")
+        digest = digest.lower()
+        return self.root / digest[:2] / f"{digest}{CACHE_SUFFIX}"
+
+    def get(self, digest: str) -> Optional[Path]:
+        """
+        Ruta de la entrada lista para enviar, o None si no está en cache
+
+        La primera vez que este proceso la usa se verifica el hash.
+        """
+        path = self.path(digest)
+        try:
+            if digest not in self._verified:
+                if gzip_content_hash(path.read_bytes()) != digest.lower():
+                    print(f"[Code Cache] Corrupt entry {digest}, discarding")
+                    path.unlink()
+                    return None
+                self._verified.add(digest)
+            # mtime = último uso (orden de desalojo)
+            os.utime(path)
+            return path
+        except (FileNotFoundError, OSError, EOFError):
+            self._verified.discard(digest)
+            return None
+
+    def put(self, digest: str, data: bytes) -> Path:
+        """
+        Guarda el gzip de una versión y desaloja entradas si se supera el límite
+
+        Raises:
+            ValueError: Si data no corresponde a digest
+        """
+        if gzip_content_hash(data) != digest.lower():
+            raise ValueError(f"Content does not match hash {digest}")
+
+        path = self.path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self._verified.add(digest)
+
+        self.evict()
+        return path
+
+    def warm(self, code: str) -> None:
+        """Agrega el código de una versión recién desplegada (nunca lanza excepciones)"""
+        try:
+            data, _ = encode_compiled_code(code)
+            self.put(hashlib.sha256(code.encode("utf-8")).hexdigest(), data)
+        except Exception as e:
+            print(f"[Code Cache] Warning: Failed to cache deployed code: {e}")
+
+    def evict(self) -> int:
+        """
+        Borra las entradas menos usadas hasta quedar dentro de max_bytes
+
+        Varios workers pueden desalojar a la vez: las entradas ya borradas se ignoran.
+        Las usadas hace menos de CACHE_EVICT_GRACE_SECONDS se conservan aunque se
+        supere max_bytes (get() devolvió su ruta y el envío aún no la abrió).
+
+        Returns:
+            Cantidad de entradas borradas
+        """
+        with self._evict_lock:
+            grace_cutoff = time.time() - CACHE_EVICT_GRACE_SECONDS
+            entries = []
+            total = 0
+            for path in self.root.glob(f"*/*{CACHE_SUFFIX}"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+            removed = 0
+            for mtime, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes or mtime > grace_cutoff:
+                    break
+                try:
+                    path.unlink()
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+                total -= size
+                self._verified.discard(path.name[:-len(CACHE_SUFFIX)])
+
+            if removed:
+                print(f"[Code Cache] Evicted {removed} entr{'y' if removed == 1 else 'ies'}")
+            return removed
+
+
+# Singleton usado por main.py y deployment_service.py
+code_cache = DiskCodeCache(FORM_CODE_CACHE_PATH, FORM_CODE_CACHE_MB * 1024 * 1024)
@@ -0,0 +1,227 @@
+"""
+Code Storage
+
+Formato de almacenamiento del código compilado de los forms
+(CustomFormVersions, migración 006):
+
+- CodeEncoding NULL:            código en CompiledCode (NVARCHAR, filas legacy)
+- CodeEncoding 'gzip-utf8':     CompiledCodeBinary = gzip del código en UTF-8
+                                (lo escribe este backend)
+- CodeEncoding 'gzip-utf16le':  CompiledCodeBinary = COMPRESS(CompiledCode) de
+                                SQL Server (filas convertidas por la migración)
+- CodeEncoding 'delta-gzip':    CompiledCodeBinary = delta contra DeltaBaseVersionId
+                                (migración 007, ver form_delta.py). database.py
+                                reconstruye estas filas antes de crear el StoredCode.
+
+Con StorageBackend (migración 008) el payload 'gzip-utf8' está en un blob
+store (ver blob_storage.py) y se lee solo cuando se necesita.
+
+El código se descomprime solo cuando hace falta: las filas 'gzip-utf8' se
+envían tal cual a los clientes que aceptan gzip.
+
+Los payloads de más de FORM_CODE_STREAM_THRESHOLD_KB no se leen en la query
+del código: database.py los lee de a FORM_CODE_STREAM_CHUNK_KB (SUBSTRING) y
+el endpoint los envía por partes, descomprimiendo de forma incremental.
+"""
+
+import codecs
+import gzip
+import os
+import zlib
+from typing import Callable, Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+# La migración 006 es obligatoria con cualquier valor (las lecturas usan
+# CompiledCodeBinary/CodeEncoding); en "false" se escribe NVARCHAR salvo que
+# FORM_CODE_DEDUP o FORM_CODE_STORAGE guarden el código como blob (siempre gzip)
+FORM_CODE_COMPRESSION = os.getenv("FORM_CODE_COMPRESSION", "true").lower() == "true"
+FORM_CODE_COMPRESSION_LEVEL = int(os.getenv("FORM_CODE_COMPRESSION_LEVEL", "6"))
+# 0 = leer siempre el payload completo
+FORM_CODE_STREAM_THRESHOLD_KB = int(os.getenv("FORM_CODE_STREAM_THRESHOLD_KB", "1024"))
+FORM_CODE_STREAM_CHUNK_KB = int(os.getenv("FORM_CODE_STREAM_CHUNK_KB", "256"))
+
+CODE_ENCODING_GZIP_UTF8 = "gzip-utf8"
+CODE_ENCODING_GZIP_UTF16LE = "gzip-utf16le"
+CODE_ENCODING_DELTA = "delta-gzip"
+
+
+def encode_compiled_code(code: str) -> Tuple[bytes, str]:
+    """
+    Comprime el código de un form para CompiledCodeBinary
+
+    mtime=0 hace que el mismo código produzca siempre los mismos bytes.
+
+    Returns:
+        (bytes comprimidos, CodeEncoding)
+    """
+    data = gzip.compress(code.encode("utf-8"), compresslevel=FORM_CODE_COMPRESSION_LEVEL, mtime=0)
+    return data, CODE_ENCODING_GZIP_UTF8
+
+
+def _inflate(chunks: Iterator[bytes], max_length: int) -> Iterator[bytes]:
+    """Descomprime un gzip que llega por partes, sin generar más de max_length bytes por vez"""
+    decompressor = zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        while True:
+            out = decompressor.decompress(chunk, max_length)
+            if out:
+                yield out
+            chunk = decompressor.unconsumed_tail
+            if not chunk and not out:
+                break
+    out = decompressor.flush()
+    if out:
+        yield out
+
+
+class StoredCode:
+    """
+    Código de un form tal como se leyó de la BD
+
+    Descomprime/decodifica solo cuando se pide el texto, y una sola vez.
+    Con loader, los bytes comprimidos se obtienen (del blob store) en el
+    primer acceso.
+    Con chunks, el payload no se leyó: chunks() lo devuelve por partes tal
+    como está almacenado (el gzip, o el CompiledCode en UTF-16LE en las filas
+    legacy) para enviarlo con iter_utf8()/iter_stored().
+    """
+
+    def __init__(
+        self,
+        text: Optional[str] = None,
+        data: Optional[bytes] = None,
+        encoding: Optional[str] = None,
+        loader: Optional[Callable[[], bytes]] = None,
+        chunks: Optional[Callable[[], Iterator[bytes]]] = None
+    ):
+        if encoding and encoding not in (CODE_ENCODING_GZIP_UTF8, CODE_ENCODING_GZIP_UTF16LE):
+            raise ValueError(f"Unknown code encoding: {encoding}")
+        if encoding and data is None and loader is None and chunks is None:
+            raise ValueError(f"Missing compressed code for encoding {encoding}")
+        if not encoding and text is None and chunks is None:
+            raise ValueError("Missing compiled code")
+
+        self.encoding = encoding
+        self._data = bytes(data) if data is not None else None
+        self._loader = loader
+        self._chunks = chunks
+        self._text = text
+
+    @property
+    def data(self) -> Optional[bytes]:
+        """Bytes comprimidos tal como están almacenados"""
+        if self._data is None and self._loader is not None:
+            self._data = self._loader()
+        if self._data is None and self._chunks is not None and self.encoding:
+            self._data = b"".join(self._chunks())
+        return self._data
+
+    @property
+    def is_compressed(self) -> bool:
+        return self.encoding is not None
+
+    @property
+    def is_streamed(self) -> bool:
+        """El payload se lee por partes (código de más de FORM_CODE_STREAM_THRESHOLD_KB)"""
+        return self._chunks is not None and self._data is None and self._text is None
+
+    @property
+    def text(self) -> str:
+        """Código como str (descomprime en el primer acceso)"""
+        if self._text is None:
+            if not self.encoding:
+                self._text = b"".join(self._chunks()).decode("utf-16-le")
+            else:
+                raw = gzip.decompress(self.data)
+                codec = "utf-16-le" if self.encoding == CODE_ENCODING_GZIP_UTF16LE else "utf-8"
+                self._text = raw.decode(codec)
+        return self._text
+
+    def iter_stored(self) -> Iterator[bytes]:
+        """Payload 'gzip-utf8' por partes, sin descomprimir (Content-Encoding: gzip)"""
+        if self.encoding != CODE_ENCODING_GZIP_UTF8:
+            raise ValueError(f"Code encoding {self.encoding} can't be sent as gzip")
+        if not self.is_streamed:
+            yield self.data
+            return
+        yield from self._chunks()
+
+    def iter_utf8(self) -> Iterator[bytes]:
+        """
+        Código en UTF-8 por partes
+
+        La memoria usada depende de FORM_CODE_STREAM_CHUNK_KB y no del tamaño
+        del código.
+        """
+        if not self.is_streamed:
+            yield self.utf8_bytes()
+            return
+
+        max_length = FORM_CODE_STREAM_CHUNK_KB * 1024
+        if self.encoding == CODE_ENCODING_GZIP_UTF8:
+            yield from _inflate(self._chunks(), max_length)
+            return
+
+        raw = self._chunks() if not self.encoding else _inflate(self._chunks(), max_length)
+        decoder = codecs.getincrementaldecoder("utf-16-le")()
+        for chunk in raw:
+            text = decoder.decode(chunk)
+            if text:
+                yield text.encode("utf-8")
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text.encode("utf-8")
+
+    def utf8_bytes(self) -> bytes:
+        """Código en UTF-8 (para responder sin compresión)"""
+        if self.encoding == CODE_ENCODING_GZIP_UTF8 and self._text is None:
+            return gzip.decompress(self.data)
+        return self.text.encode("utf-8")
+
+    def gzip_utf8(self) -> Optional[bytes]:
+        """
+        Bytes gzip del código en UTF-8 listos para enviar con Content-Encoding: gzip
+
+        Returns:
+            Los bytes almacenados (sin descomprimir) si la fila es 'gzip-utf8';
+            None para otros formatos.
+        """
+        if self.encoding == CODE_ENCODING_GZIP_UTF8:
+            return self.data
+        return None
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """
+    Indica si un header Accept-Encoding acepta gzip
+
+    Examples:
+        >>> accepts_gzip("gzip, deflate, br")
+        True
+        >>> accepts_gzip("gzip;q=0, br")
+        False
+        >>> accepts_gzip(None)
+        False
+    """
+    if not accept_encoding:
+        return False
+
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if token.strip().lower() not in ("gzip", "*"):
+            continue
+        params = params.replace(" ", "").lower()
+        if params.startswith("q="):
+            try:
+                return float(params[2:]) > 0
+            except ValueError:
+                return False
+        return True
+
+    return False
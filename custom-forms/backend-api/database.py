@@ -1,9 +1,28 @@
 import pyodbc
 import os
 from datetime import datetime
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Iterator
 from dotenv import load_dotenv
 from crypto import decrypt_triple_des
+from code_storage import (
+    StoredCode,
+    encode_compiled_code,
+    FORM_CODE_COMPRESSION,
+    FORM_CODE_STREAM_THRESHOLD_KB,
+    FORM_CODE_STREAM_CHUNK_KB,
+    CODE_ENCODING_GZIP_UTF8,
+    CODE_ENCODING_DELTA
+)
+from form_delta import create_delta, apply_delta, reconstruct_cache, DeltaError, DELTA_MAX_RATIO
+from form_retention import FORM_RETENTION_LOCK_TIMEOUT_MS
+from blob_storage import (
+    get_blob_store,
+    content_hash,
+    FORM_CODE_STORAGE,
+    FORM_CODE_DEDUP,
+    BLOB_BACKENDS,
+    STORAGE_SQL
+)
 from validators import (
     validate_form_name,
     validate_username,
@@ -11,6 +30,7 @@ from validators import (
     validate_process_name,
     validate_token_id,
     validate_commit_hash,
+    validate_sha256,
     sanitize_for_logging
 )
 
@@ -63,6 +83,22 @@ def get_db_connection(database_type="dashboard"):
     return pyodbc.connect(conn_str)
 
 
+# Opciones requeridas por los índices filtrados/columnas computadas (un solo batch)
+SESSION_OPTIONS_SQL = """
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+"""
+
+
+def _set_session_options(cursor) -> None:
+    """Fija las SET options de la sesión en un solo round trip"""
+    cursor.execute(SESSION_OPTIONS_SQL)
+
+
 def upsert_custom_form(
     form_name: str,
     process_name: str,
@@ -122,12 +158,7 @@ def upsert_custom_form(
         cursor = conn.cursor()
 
         # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
-        cursor.execute("SET QUOTED_IDENTIFIER ON")
-        cursor.execute("SET ANSI_NULLS ON")
-        cursor.execute("SET ANSI_WARNINGS ON")
-        cursor.execute("SET ARITHABORT ON")
-        cursor.execute("SET CONCAT_NULL_YIELDS_NULL ON")
-        cursor.execute("SET NUMERIC_ROUNDABORT OFF")
+        _set_session_options(cursor)
 
         # DEBUG: Log parameters
         print(f"[DB] Executing sp_UpsertCustomForm with parameters:")
@@ -143,6 +174,49 @@ def upsert_custom_form(
         print(f"  BuildDate: {build_date} (type: {type(build_date).__name__})")
         print(f"  ReleaseNotes: {release_notes[:100] if release_notes else 'None'}...")
 
+        # Si la versión ya existe y es base de deltas, materializarlos antes de
+        # que el SP reemplace su código (misma transacción)
+        cursor.execute("""
+            SELECT cfv.FormId, cfv.VersionId, cfv.ContentHash, cfv.StorageBackend
+            FROM CustomFormVersions cfv
+            INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            WHERE cf.FormName = ? AND cfv.Version = ?
+        """, (form_name, version))
+        existing = cursor.fetchone()
+        if existing:
+            _materialize_dependents(cursor, existing[0], existing[1])
+
+        # Código como blob compartido (migraciones 008/009), comprimido en
+        # CompiledCodeBinary (migración 006) o como texto. El blob externo se
+        # escribe antes del SP: si el SP falla queda un blob huérfano, nunca
+        # una versión sin payload.
+        code_hash = content_hash(compiled_code)
+        code_text = compiled_code
+        code_binary = None
+        code_encoding = None
+        storage_backend = None
+        if FORM_CODE_DEDUP or FORM_CODE_STORAGE in BLOB_BACKENDS:
+            code_text = None
+            code_encoding = CODE_ENCODING_GZIP_UTF8
+            _lock_blob(cursor, code_hash)
+            storage_backend = _find_shared_blob(cursor, code_hash)
+            if storage_backend:
+                # Mismo código ya desplegado: la versión solo agrega metadata
+                print(f"  Shared blob: {code_hash} (already stored, {storage_backend})")
+            else:
+                blob, code_encoding = encode_compiled_code(compiled_code)
+                if FORM_CODE_STORAGE in BLOB_BACKENDS:
+                    storage_backend = FORM_CODE_STORAGE
+                    get_blob_store(storage_backend).put(code_hash, blob)
+                else:
+                    storage_backend = STORAGE_SQL
+                    code_binary = blob
+                print(f"  Shared blob: {code_hash} ({len(blob)} bytes, {storage_backend})")
+        elif FORM_CODE_COMPRESSION:
+            code_binary, code_encoding = encode_compiled_code(compiled_code)
+            code_text = None
+            print(f"  CompiledCodeBinary: {len(code_binary)} bytes ({code_encoding})")
+
         # Ejecutar stored procedure
         # NOTA: El SP debe retornar un resultado indicando si fue INSERT o UPDATE
         cursor.execute("""
@@ -157,19 +231,27 @@ def upsert_custom_form(
                 @PackageVersion = ?,
                 @CommitHash = ?,
                 @BuildDate = ?,
-                @ReleaseNotes = ?
+                @ReleaseNotes = ?,
+                @CompiledCodeBinary = ?,
+                @CodeEncoding = ?,
+                @ContentHash = ?,
+                @StorageBackend = ?
         """, (
             form_name,
             process_name,
             version,
             description,
             author,
-            compiled_code,
+            code_text,
             size_bytes,
             package_version,
             commit_hash,
             build_date,
-            release_notes
+            release_notes,
+            code_binary,
+            code_encoding,
+            code_hash,
+            storage_backend
         ))
 
         print(f"[DB] Stored procedure executed, fetching result...")
@@ -179,9 +261,16 @@ def upsert_custom_form(
         print(f"[DB] Result row: {row}")
         action = row[0] if row else "unknown"  # 'inserted' o 'updated'
 
+        # Re-deploy de una versión con otro código: liberar el blob anterior
+        released = []
+        if existing and existing[3] and existing[2] != code_hash:
+            released = _release_blobs(cursor, [existing[2]])
+
         conn.commit()
         print(f"[DB] Transaction committed, action: {action}")
 
+        _delete_external_blobs(released)
+
         return {
             "success": True,
             "action": action
@@ -226,58 +315,139 @@ def test_connection():
         }
 
 
-def get_all_custom_forms():
+# Columnas de cada campo del listado de forms (proyección con fields=)
+FORM_LIST_FIELDS = {
+    "id": "cf.FormId",
+    "formName": "cf.FormName",
+    "processName": "cf.ProcessName",
+    "status": "cf.Status",
+    "currentVersion": "cf.CurrentVersion",
+    "description": "cf.Description",
+    "author": "cf.Author",
+    "sizeBytes": "cfv.SizeBytes",
+    "publishedAt": "cf.CreatedAt",
+    "updatedAt": "cf.UpdatedAt"
+}
+
+FORM_STATUSES = ("active", "inactive", "deprecated")
+
+
+def get_all_custom_forms(
+    process_name: Optional[str] = None,
+    status: Optional[str] = "active",
+    updated_since: Optional[datetime] = None,
+    fields: Optional[List[str]] = None
+):
     """
     Get all custom forms from SQL Server
 
     Returns list of forms with their most recent version info
+    (filters and fields: see get_custom_forms_page)
+    """
+    forms, _ = get_custom_forms_page(process_name, status, updated_since, fields)
+    return forms
+
+
+def get_custom_forms_page(
+    process_name: Optional[str] = None,
+    status: Optional[str] = "active",
+    updated_since: Optional[datetime] = None,
+    fields: Optional[List[str]] = None,
+    after: Optional[str] = None,
+    limit: Optional[int] = None
+):
+    """
+    Página del listado de forms, ordenado por FormName (keyset pagination)
+
+    Los filtros se resuelven en la query (IX_CustomForms_ProcessName,
+    IX_CustomForms_Status) y la página sigue después de `after` sin OFFSET,
+    así el costo de una página no depende de su posición en el catálogo. El
+    JOIN con CustomFormVersions solo se hace si se pide sizeBytes.
+
+    Args:
+        process_name: Solo forms de este proceso
+        status: Solo forms con este status (None = todos)
+        updated_since: Solo forms con UpdatedAt >= updated_since
+        fields: Campos a devolver (FORM_LIST_FIELDS; None = todos)
+        after: FormName del último form de la página anterior
+        limit: Máximo de forms (None = sin límite)
+
+    Returns:
+        (forms, FormName para pedir la página siguiente o None si es la última)
+
+    Raises:
+        ValueError: Si algún filtro o campo es inválido
     """
+    if fields is None:
+        fields = list(FORM_LIST_FIELDS)
+    unknown = [field for field in fields if field not in FORM_LIST_FIELDS]
+    if unknown or not fields:
+        raise ValueError(f"Invalid fields: {sanitize_for_logging(','.join(unknown))}")
+    if process_name is not None and not validate_process_name(process_name):
+        raise ValueError(f"Invalid process_name format: {sanitize_for_logging(process_name)}")
+    if status is not None and status not in FORM_STATUSES:
+        raise ValueError(f"Invalid status: {sanitize_for_logging(status)}")
+    if after is not None and not validate_form_name(after):
+        raise ValueError("Invalid cursor")
+
+    # FormName siempre se lee: es la clave del cursor
+    columns = ["cf.FormName"] + [FORM_LIST_FIELDS[field] for field in fields]
+    conditions = []
+    params = []
+    if status is not None:
+        conditions.append("cf.Status = ?")
+        params.append(status)
+    if process_name is not None:
+        conditions.append("cf.ProcessName = ?")
+        params.append(process_name)
+    if updated_since is not None:
+        conditions.append("cf.UpdatedAt >= ?")
+        params.append(updated_since)
+    if after is not None:
+        conditions.append("cf.FormName > ?")
+        params.append(after)
+
+    top = ""
+    if limit is not None:
+        # Una fila de más indica si hay página siguiente
+        top = "TOP (?) "
+        params.insert(0, limit + 1)
+
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # Query to get all forms with their current version
+        # Query to get the forms with their current version
         # CustomForms already has CurrentVersion, so we join with CustomFormVersions where IsCurrent = 1
-        query = """
-        SELECT
-            cf.FormId,
-            cf.FormName,
-            cf.ProcessName,
-            cf.Status,
-            cf.CurrentVersion,
-            cf.Description,
-            cf.Author,
-            cfv.SizeBytes,
-            cf.CreatedAt,
-            cf.UpdatedAt
+        query = f"""
+        SELECT {top}{', '.join(columns)}
         FROM CustomForms cf
-        LEFT JOIN CustomFormVersions cfv ON cf.FormId = cfv.FormId AND cfv.IsCurrent = 1
-        WHERE cf.Status = 'active'
+        {"LEFT JOIN CustomFormVersions cfv ON cf.FormId = cfv.FormId AND cfv.IsCurrent = 1" if "sizeBytes" in fields else ""}
+        {"WHERE " + " AND ".join(conditions) if conditions else ""}
         ORDER BY cf.FormName
         """
 
-        cursor.execute(query)
+        cursor.execute(query, params)
         rows = cursor.fetchall()
 
+        next_after = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_after = rows[-1][0]
+
         forms = []
         for row in rows:
-            forms.append({
-                "id": row[0],
-                "formName": row[1],
-                "processName": row[2],
-                "status": row[3],
-                "currentVersion": row[4],
-                "description": row[5],
-                "author": row[6],
-                "sizeBytes": row[7],
-                "publishedAt": row[8].isoformat() if row[8] else None,
-                "updatedAt": row[9].isoformat() if row[9] else None
-            })
+            form = {}
+            for field, value in zip(fields, row[1:]):
+                if field in ("publishedAt", "updatedAt"):
+                    value = value.isoformat() if value else None
+                form[field] = value
+            forms.append(form)
 
         print(f"[Database] Retrieved {len(forms)} forms from SQL Server")
-        return forms
+        return forms, next_after
 
     except Exception as e:
         print(f"[Database] Error fetching forms: {str(e)}")
@@ -299,8 +469,13 @@ def get_form_compiled_code(form_name: str, version: str = None):
         version: Optional specific version (defaults to current/latest)
 
     Returns:
-        dict with 'compiled_code', 'version', 'published_at', 'size_bytes'
-        or None if form not found
+        dict with 'code' (StoredCode, decompressed on demand), 'version',
+        'published_at', 'size_bytes', 'version_id', 'content_hash',
+        'storage_backend', 'has_source_map' or None if form not found.
+        Versions stored as deltas are reconstructed (and cached) here; blob
+        payloads are only fetched when the code is read, and payloads larger
+        than FORM_CODE_STREAM_THRESHOLD_KB are read in chunks while sending
+        them (StoredCode.is_streamed).
 
     Raises:
         ValueError: If form_name or version have invalid format
@@ -312,6 +487,9 @@ def get_form_compiled_code(form_name: str, version: str = None):
     if version and not validate_version(version):
         raise ValueError(f"Invalid version format: {sanitize_for_logging(version)}")
 
+    # Los payloads más grandes no se traen en esta query (ver _streamed_code)
+    read_limit = FORM_CODE_STREAM_THRESHOLD_KB * 1024 if FORM_CODE_STREAM_THRESHOLD_KB > 0 else 2 ** 62
+
     conn = None
     cursor = None
     try:
@@ -322,39 +500,68 @@ def get_form_compiled_code(form_name: str, version: str = None):
             # Get specific version
             query = """
             SELECT
-                cfv.CompiledCode,
+                CASE WHEN DATALENGTH(cfv.CompiledCode) <= ? THEN cfv.CompiledCode END,
                 cfv.Version,
                 cfv.PublishedAt,
-                cfv.SizeBytes
+                cfv.SizeBytes,
+                CASE WHEN DATALENGTH(ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary)) <= ?
+                     THEN ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+                cfv.CodeEncoding,
+                cfv.VersionId,
+                cfv.ContentHash,
+                cfv.StorageBackend,
+                CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END
             FROM CustomFormVersions cfv
             INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
             WHERE cf.FormName = ? AND cfv.Version = ?
             """
-            cursor.execute(query, (form_name, version))
+            cursor.execute(query, (read_limit, read_limit, form_name, version))
         else:
             # Get current version
             query = """
             SELECT
-                cfv.CompiledCode,
+                CASE WHEN DATALENGTH(cfv.CompiledCode) <= ? THEN cfv.CompiledCode END,
                 cfv.Version,
                 cfv.PublishedAt,
-                cfv.SizeBytes
+                cfv.SizeBytes,
+                CASE WHEN DATALENGTH(ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary)) <= ?
+                     THEN ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+                cfv.CodeEncoding,
+                cfv.VersionId,
+                cfv.ContentHash,
+                cfv.StorageBackend,
+                CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END
             FROM CustomFormVersions cfv
             INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
             WHERE cf.FormName = ? AND cfv.IsCurrent = 1
             """
-            cursor.execute(query, (form_name,))
+            cursor.execute(query, (read_limit, read_limit, form_name))
 
         row = cursor.fetchone()
 
         if not row:
             return None
 
+        if row[5] == CODE_ENCODING_DELTA:
+            # Versión no-current guardada como delta (migración 007)
+            code = StoredCode(text=_read_version_code(cursor, row[6]).decode("utf-8"))
+        elif row[0] is None and row[4] is None and row[8] not in BLOB_BACKENDS:
+            # Payload de más de FORM_CODE_STREAM_THRESHOLD_KB: se lee por partes al enviarlo
+            code = _streamed_code(row[5], row[6], row[2], row[7], row[8])
+        else:
+            code = _stored_code(row[0], row[4], row[5], row[7], row[8])
+
         return {
-            'compiled_code': row[0],
+            'code': code,
             'version': row[1],
             'published_at': row[2].isoformat() if row[2] else None,
-            'size_bytes': row[3] or 0
+            'size_bytes': row[3] or 0,
+            'version_id': row[6],
+            'content_hash': row[7],
+            'storage_backend': row[8],
+            'has_source_map': bool(row[9])
         }
 
     except Exception as e:
@@ -368,6 +575,254 @@ def get_form_compiled_code(form_name: str, version: str = None):
             conn.close()
 
 
+def get_forms_compiled_code(requests: List[tuple]) -> List[Optional[dict]]:
+    """
+    Get the compiled code of several forms with a single query
+
+    Args:
+        requests: List of (form_name, version or None for current,
+            known content hash or None). A version whose ContentHash equals
+            the known hash is returned without its code.
+
+    Returns:
+        One item per request, in order: None if the form/version doesn't
+        exist, otherwise a dict like get_form_compiled_code() with
+        'not_modified' (True means 'code' is None).
+
+    Raises:
+        ValueError: If a form_name, version or hash has invalid format
+    """
+    if not requests:
+        return []
+
+    params = []
+    for index, (form_name, version, known_hash) in enumerate(requests):
+        # SECURITY: Validate inputs to prevent SQL injection
+        if not validate_form_name(form_name):
+            raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+        if version and not validate_version(version):
+            raise ValueError(f"Invalid version format: {sanitize_for_logging(version)}")
+        if known_hash and not validate_sha256(known_hash):
+            raise ValueError("Invalid content hash")
+        params.extend([index, form_name, version or None, known_hash.lower() if known_hash else None])
+
+    values = ", ".join(
+        "(?, CAST(? AS NVARCHAR(255)), CAST(? AS NVARCHAR(50)), CAST(? AS CHAR(64)))" for _ in requests
+    )
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # Las versiones que el cliente ya tiene no transfieren el payload
+        query = f"""
+        SELECT
+            r.Idx,
+            CASE WHEN cfv.ContentHash = r.KnownHash THEN NULL ELSE cfv.CompiledCode END,
+            cfv.Version,
+            cfv.PublishedAt,
+            cfv.SizeBytes,
+            CASE WHEN cfv.ContentHash = r.KnownHash THEN NULL
+                 ELSE ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+            cfv.CodeEncoding,
+            cfv.VersionId,
+            cfv.ContentHash,
+            cfv.StorageBackend,
+            CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END,
+            CASE WHEN cfv.ContentHash = r.KnownHash THEN 1 ELSE 0 END
+        FROM (VALUES {values}) AS r(Idx, FormName, Version, KnownHash)
+        INNER JOIN CustomForms cf ON cf.FormName = r.FormName
+        INNER JOIN CustomFormVersions cfv ON cfv.FormId = cf.FormId
+            AND ((r.Version IS NULL AND cfv.IsCurrent = 1) OR cfv.Version = r.Version)
+        LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
+        """
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+
+        results: List[Optional[dict]] = [None] * len(requests)
+        for row in rows:
+            not_modified = bool(row[11])
+            if not_modified:
+                code = None
+            elif row[6] == CODE_ENCODING_DELTA:
+                code = StoredCode(text=_read_version_code(cursor, row[7]).decode("utf-8"))
+            else:
+                code = _stored_code(row[1], row[5], row[6], row[8], row[9])
+
+            results[row[0]] = {
+                'code': code,
+                'not_modified': not_modified,
+                'version': row[2],
+                'published_at': row[3].isoformat() if row[3] else None,
+                'size_bytes': row[4] or 0,
+                'version_id': row[7],
+                'content_hash': row[8],
+                'storage_backend': row[9],
+                'has_source_map': bool(row[10])
+            }
+
+        return results
+
+    except Exception as e:
+        print(f"[Database] Error fetching form code batch: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def get_form_code_metadata(form_name: str, version: str = None):
+    """
+    Get the metadata of a form version without reading its code
+
+    Used by the code endpoint to serve cached bundles by content hash
+    without transferring the payload from SQL Server, and by the metadata
+    endpoint. Only in-row columns are selected: the CompiledCode and
+    CompiledCodeBinary LOB pages are never read.
+
+    Args:
+        form_name: Name of the form
+        version: Optional specific version (defaults to current)
+
+    Returns:
+        dict with 'version', 'published_at', 'size_bytes', 'version_id',
+        'content_hash' (None for versions deployed before migration 008)
+        'storage_backend', 'has_source_map', 'code_encoding' and
+        'process_name', or None if form not found
+
+    Raises:
+        ValueError: If form_name or version have invalid format
+    """
+    # SECURITY: Validate inputs to prevent SQL injection
+    if not validate_form_name(form_name):
+        raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    if version and not validate_version(version):
+        raise ValueError(f"Invalid version format: {sanitize_for_logging(version)}")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        query = """
+        SELECT
+            cfv.Version,
+            cfv.PublishedAt,
+            cfv.SizeBytes,
+            cfv.VersionId,
+            cfv.ContentHash,
+            cfv.StorageBackend,
+            CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END,
+            cfv.CodeEncoding,
+            cf.ProcessName
+        FROM CustomFormVersions cfv
+        INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+        """
+        if version:
+            cursor.execute(query + "WHERE cf.FormName = ? AND cfv.Version = ?", (form_name, version))
+        else:
+            cursor.execute(query + "WHERE cf.FormName = ? AND cfv.IsCurrent = 1", (form_name,))
+
+        row = cursor.fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'version': row[0],
+            'published_at': row[1].isoformat() if row[1] else None,
+            'size_bytes': row[2] or 0,
+            'version_id': row[3],
+            'content_hash': row[4],
+            'storage_backend': row[5],
+            'has_source_map': bool(row[6]),
+            'code_encoding': row[7],
+            'process_name': row[8]
+        }
+
+    except Exception as e:
+        print(f"[Database] Error fetching form code metadata: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def set_version_content_hash(version_id: int, digest: str) -> None:
+    """
+    Completa el ContentHash de una versión desplegada antes de la migración 008
+
+    Raises:
+        ValueError: If digest is not a sha256 hex digest
+    """
+    if not validate_sha256(digest):
+        raise ValueError("Invalid content hash")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE CustomFormVersions
+            SET ContentHash = ?
+            WHERE VersionId = ? AND ContentHash IS NULL
+        """, (digest, version_id))
+        conn.commit()
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def get_form_version_numbers(form_name: str) -> List[tuple]:
+    """
+    Números de versión de un form, para el índice de rangos (version_ranges.py)
+
+    Solo lee Version e IsCurrent (seek cubierto por IX_CustomFormVersions_FormId_Version, migración 015).
+
+    Returns:
+        Lista de (version, is_current); vacía si el form no existe
+
+    Raises:
+        ValueError: If form_name has invalid format
+    """
+    # SECURITY: Validate input to prevent SQL injection
+    if not validate_form_name(form_name):
+        raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT cfv.Version, cfv.IsCurrent
+            FROM CustomFormVersions cfv
+            INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            WHERE cf.FormName = ?
+        """, (form_name,))
+        return [(row[0], bool(row[1])) for row in cursor.fetchall()]
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 def get_form_versions(form_name: str):
     """
     Get all versions for a specific form
@@ -378,6 +833,36 @@ def get_form_versions(form_name: str):
     Returns:
         list of dicts with version history
 
+    Raises:
+        ValueError: If form_name has invalid format
+    """
+    versions, _ = get_form_versions_page(form_name, include_release_notes=True)
+    return versions
+
+
+def get_form_versions_page(
+    form_name: str,
+    include_release_notes: bool = False,
+    before: Optional[tuple] = None,
+    limit: Optional[int] = None
+):
+    """
+    Página del historial de versiones de un form, de la más nueva a la más vieja
+
+    Keyset pagination sobre (PublishedAt, VersionId): la página sigue después
+    de `before` sin OFFSET y con IX_CustomFormVersions_History (migración 012)
+    es un seek, sin importar el largo del historial. ReleaseNotes
+    (NVARCHAR(MAX)) solo se lee si se pide.
+
+    Args:
+        form_name: Nombre del form
+        include_release_notes: Incluir releaseNotes
+        before: (PublishedAt, VersionId) de la última versión de la página anterior
+        limit: Máximo de versiones (None = sin límite)
+
+    Returns:
+        (versiones, (PublishedAt, VersionId) para pedir la página siguiente o None si es la última)
+
     Raises:
         ValueError: If form_name has invalid format
     """
@@ -385,40 +870,63 @@ def get_form_versions(form_name: str):
     if not validate_form_name(form_name):
         raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
 
+    params = [form_name]
+    keyset = ""
+    if before is not None:
+        published_at, version_id = before
+        # CAST: comparar contra DATETIME con su misma precisión (el parámetro llega como datetime2)
+        keyset = """
+          AND (cfv.PublishedAt < CAST(? AS DATETIME)
+               OR (cfv.PublishedAt = CAST(? AS DATETIME) AND cfv.VersionId < ?))"""
+        params += [published_at, published_at, version_id]
+
+    top = ""
+    if limit is not None:
+        # Una fila de más indica si hay página siguiente
+        top = "TOP (?) "
+        params.insert(0, limit + 1)
+
     conn = None
     cursor = None
     try:
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        query = """
-        SELECT
+        query = f"""
+        SELECT {top}
             cfv.Version,
             cfv.PublishedAt,
             cfv.SizeBytes,
             cfv.IsCurrent,
-            cfv.ReleaseNotes,
+            {"cfv.ReleaseNotes" if include_release_notes else "NULL"},
             cfv.PackageVersion,
             cfv.CommitHash,
-            cfv.BuildDate
+            cfv.BuildDate,
+            cfv.VersionId
         FROM CustomFormVersions cfv
         INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
-        WHERE cf.FormName = ?
-        ORDER BY cfv.PublishedAt DESC
+        WHERE cf.FormName = ?{keyset}
+        ORDER BY cfv.PublishedAt DESC, cfv.VersionId DESC
         """
 
-        cursor.execute(query, (form_name,))
+        cursor.execute(query, params)
         rows = cursor.fetchall()
 
+        next_before = None
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_before = (rows[-1][1], rows[-1][8])
+
         versions = []
         for row in rows:
             version_data = {
                 "version": row[0],
                 "publishedAt": row[1].isoformat() if row[1] else None,
                 "sizeBytes": row[2] or 0,
-                "isCurrent": bool(row[3]),
-                "releaseNotes": row[4] or ""
+                "isCurrent": bool(row[3])
             }
+            if include_release_notes:
+                version_data["releaseNotes"] = row[4] or ""
 
             # Add git traceability fields if available
             if row[5]:  # PackageVersion
@@ -431,7 +939,7 @@ def get_form_versions(form_name: str):
             versions.append(version_data)
 
         print(f"[Database] Retrieved {len(versions)} versions for form '{form_name}'")
-        return versions
+        return versions, next_before
 
     except Exception as e:
         print(f"[Database] Error fetching form versions: {str(e)}")
@@ -448,15 +956,20 @@ def set_current_form_version(form_name: str, version: str):
     """
     Set a specific version as the current version for a form
 
+    Uses sp_SetCurrentFormVersion (migration 013): validation, the IsCurrent
+    flip and CustomForms.CurrentVersion are one call and one transaction.
+    A version stored as a delta is materialized first (second call).
+
     Args:
         form_name: Name of the form
         version: Version to set as current
 
     Returns:
-        dict with 'success' and 'message'
+        dict with 'success', 'message' and the new state: 'previous_version',
+        'version', 'version_id', 'content_hash', 'published_at', 'size_bytes'
 
     Raises:
-        ValueError: If form_name or version have invalid format
+        ValueError: If form_name or version have invalid format, or the version doesn't exist
     """
     # SECURITY: Validate inputs to prevent SQL injection
     if not validate_form_name(form_name):
@@ -471,62 +984,31 @@ def set_current_form_version(form_name: str, version: str):
         conn = get_db_connection()
         cursor = conn.cursor()
 
-        # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
-        cursor.execute("SET QUOTED_IDENTIFIER ON")
-        cursor.execute("SET ANSI_NULLS ON")
-        cursor.execute("SET ANSI_WARNINGS ON")
-        cursor.execute("SET ARITHABORT ON")
-        cursor.execute("SET CONCAT_NULL_YIELDS_NULL ON")
-        cursor.execute("SET NUMERIC_ROUNDABORT OFF")
-
-        # First, verify the version exists
-        check_query = """
-        SELECT COUNT(*)
-        FROM CustomFormVersions cfv
-        INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
-        WHERE cf.FormName = ? AND cfv.Version = ?
-        """
-        cursor.execute(check_query, (form_name, version))
-        exists = cursor.fetchone()[0] > 0
-
-        if not exists:
-            raise ValueError(f"Version '{version}' not found for form '{form_name}'")
-
-        # Update: Set all versions of this form to IsCurrent = 0
-        update_query1 = """
-        UPDATE cfv
-        SET cfv.IsCurrent = 0
-        FROM CustomFormVersions cfv
-        INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
-        WHERE cf.FormName = ?
-        """
-        cursor.execute(update_query1, (form_name,))
+        promote_query = "EXEC sp_SetCurrentFormVersion @FormName = ?, @Version = ?"
+        cursor.execute(promote_query, (form_name, version))
+        row = cursor.fetchone()
 
-        # Update: Set the specific version to IsCurrent = 1
-        update_query2 = """
-        UPDATE cfv
-        SET cfv.IsCurrent = 1
-        FROM CustomFormVersions cfv
-        INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
-        WHERE cf.FormName = ? AND cfv.Version = ?
-        """
-        cursor.execute(update_query2, (form_name, version))
+        # La versión current nunca es un delta (CK_CustomFormVersions_CodeStorage)
+        if row and row[0] == 'delta':
+            _materialize_version(cursor, row[2])
+            cursor.execute(promote_query, (form_name, version))
+            row = cursor.fetchone()
 
-        # Update: Set CurrentVersion in CustomForms table
-        update_query3 = """
-        UPDATE cf
-        SET cf.CurrentVersion = ?
-        FROM CustomForms cf
-        WHERE cf.FormName = ?
-        """
-        cursor.execute(update_query3, (version, form_name))
+        if not row or row[0] != 'ok':
+            raise ValueError(f"Version '{version}' not found for form '{form_name}'")
 
         conn.commit()
 
         print(f"[Database] Set version '{version}' as current for form '{form_name}'")
         return {
             "success": True,
-            "message": f"Version {version} set as current"
+            "message": f"Version {version} set as current",
+            "previous_version": row[3],
+            "version": row[4],
+            "version_id": row[2],
+            "content_hash": row[5],
+            "published_at": row[6].isoformat() if row[6] else None,
+            "size_bytes": row[7]
         }
 
     except Exception as e:
@@ -566,12 +1048,7 @@ def delete_form(form_name: str):
         cursor = conn.cursor()
 
         # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
-        cursor.execute("SET QUOTED_IDENTIFIER ON")
-        cursor.execute("SET ANSI_NULLS ON")
-        cursor.execute("SET ANSI_WARNINGS ON")
-        cursor.execute("SET ARITHABORT ON")
-        cursor.execute("SET CONCAT_NULL_YIELDS_NULL ON")
-        cursor.execute("SET NUMERIC_ROUNDABORT OFF")
+        _set_session_options(cursor)
 
         # First, verify the form exists and get FormId
         check_query = """
@@ -596,6 +1073,14 @@ def delete_form(form_name: str):
         cursor.execute(count_query, (form_id,))
         versions_count = cursor.fetchone()[0]
 
+        # Shared blobs referenced by this form (released below if unreferenced)
+        cursor.execute("""
+            SELECT DISTINCT ContentHash
+            FROM CustomFormVersions
+            WHERE FormId = ? AND StorageBackend IS NOT NULL
+        """, (form_id,))
+        blob_hashes = [row[0] for row in cursor.fetchall()]
+
         # Delete all versions first (foreign key constraint)
         delete_versions_query = """
         DELETE FROM CustomFormVersions
@@ -610,9 +1095,13 @@ def delete_form(form_name: str):
         """
         cursor.execute(delete_form_query, (form_id,))
 
+        released = _release_blobs(cursor, blob_hashes)
+
         conn.commit()
 
-        print(f"[Database] Deleted form '{form_name}' and {versions_count} version(s)")
+        _delete_external_blobs(released)
+
+        print(f"[Database] Deleted form '{form_name}' and {versions_count} version(s), {len(released)} blob(s) released")
         return {
             "success": True,
             "message": f"Form '{form_name}' and {versions_count} version(s) deleted successfully",
@@ -659,12 +1148,7 @@ def delete_form_version(form_name: str, version: str):
         cursor = conn.cursor()
 
         # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
-        cursor.execute("SET QUOTED_IDENTIFIER ON")
-        cursor.execute("SET ANSI_NULLS ON")
-        cursor.execute("SET ANSI_WARNINGS ON")
-        cursor.execute("SET ARITHABORT ON")
-        cursor.execute("SET CONCAT_NULL_YIELDS_NULL ON")
-        cursor.execute("SET NUMERIC_ROUNDABORT OFF")
+        _set_session_options(cursor)
 
         # First, verify the form exists and get FormId
         check_query = """
@@ -687,7 +1171,7 @@ def delete_form_version(form_name: str, version: str):
 
         # Verify the version exists
         version_check_query = """
-        SELECT VersionId
+        SELECT VersionId, ContentHash, StorageBackend
         FROM CustomFormVersions
         WHERE FormId = ? AND Version = ?
         """
@@ -697,6 +1181,9 @@ def delete_form_version(form_name: str, version: str):
         if not version_result:
             raise ValueError(f"Version '{version}' not found for form '{form_name}'")
 
+        # Las versiones guardadas como delta contra esta dejarían de poder reconstruirse
+        _materialize_dependents(cursor, form_id, version_result[0])
+
         # Delete the version
         delete_version_query = """
         DELETE FROM CustomFormVersions
@@ -704,8 +1191,12 @@ def delete_form_version(form_name: str, version: str):
         """
         cursor.execute(delete_version_query, (form_id, version))
 
+        released = _release_blobs(cursor, [version_result[1]]) if version_result[2] else []
+
         conn.commit()
 
+        _delete_external_blobs(released)
+
         print(f"[Database] Deleted version '{version}' of form '{form_name}'")
         return {
             "success": True,
@@ -725,6 +1216,1070 @@ def delete_form_version(form_name: str, version: str):
             conn.close()
 
 
+def save_form_source_map(form_name: str, version: str, source_map: Optional[str]) -> bool:
+    """
+    Guarda el source map de una versión (migración 010), reemplazando el anterior
+
+    Con source_map None se borra: una versión re-desplegada sin source map no
+    conserva el de la build anterior.
+
+    Returns:
+        True si la versión tiene source map
+
+    Raises:
+        ValueError: Si form_name/version son inválidos o la versión no existe
+    """
+    if not validate_form_name(form_name):
+        raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    if not validate_version(version):
+        raise ValueError(f"Invalid version format: {sanitize_for_logging(version)}")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            SELECT cfv.VersionId
+            FROM CustomFormVersions cfv
+            INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            WHERE cf.FormName = ? AND cfv.Version = ?
+        """, (form_name, version))
+        row = cursor.fetchone()
+        if not row:
+            raise ValueError(f"Version '{version}' not found for form '{form_name}'")
+        version_id = row[0]
+
+        cursor.execute("DELETE FROM CustomFormSourceMaps WHERE VersionId = ?", (version_id,))
+        if source_map is not None:
+            data, _ = encode_compiled_code(source_map)
+            cursor.execute("""
+                INSERT INTO CustomFormSourceMaps (VersionId, SourceMapBinary, SizeBytes)
+                VALUES (?, ?, ?)
+            """, (version_id, data, len(source_map.encode("utf-8"))))
+
+        conn.commit()
+        return source_map is not None
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"[Database] Error saving source map: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def get_form_source_map(form_name: str, version: str = None):
+    """
+    Get the source map of a form version
+
+    Args:
+        form_name: Name of the form
+        version: Optional specific version (defaults to current)
+
+    Returns:
+        dict with 'data' (gzip of the source map JSON), 'version' and
+        'size_bytes', or None if the version has no source map
+
+    Raises:
+        ValueError: If form_name or version have invalid format
+    """
+    # SECURITY: Validate inputs to prevent SQL injection
+    if not validate_form_name(form_name):
+        raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    if version and not validate_version(version):
+        raise ValueError(f"Invalid version format: {sanitize_for_logging(version)}")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        query = """
+        SELECT sm.SourceMapBinary, cfv.Version, sm.SizeBytes
+        FROM CustomFormSourceMaps sm
+        INNER JOIN CustomFormVersions cfv ON sm.VersionId = cfv.VersionId
+        INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+        """
+        if version:
+            cursor.execute(query + "WHERE cf.FormName = ? AND cfv.Version = ?", (form_name, version))
+        else:
+            cursor.execute(query + "WHERE cf.FormName = ? AND cfv.IsCurrent = 1", (form_name,))
+
+        row = cursor.fetchone()
+
+        if not row:
+            return None
+
+        return {
+            'data': bytes(row[0]),
+            'version': row[1],
+            'size_bytes': row[2]
+        }
+
+    except Exception as e:
+        print(f"[Database] Error fetching source map: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ==============================================================================
+# Deployment Ledger (migración 014)
+# ==============================================================================
+
+def get_current_form_versions(form_names: List[str]) -> Dict[str, str]:
+    """
+    Versión current de cada form (una query), para registrar el estado previo a un deployment
+
+    Returns:
+        {form_name: version}; los forms que no existen no aparecen
+
+    Raises:
+        ValueError: If a form_name has invalid format
+    """
+    if not form_names:
+        return {}
+    for form_name in form_names:
+        # SECURITY: Validate input to prevent SQL injection
+        if not validate_form_name(form_name):
+            raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT FormName, CurrentVersion
+            FROM CustomForms
+            WHERE FormName IN ({", ".join("?" for _ in form_names)})
+        """, list(form_names))
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def record_form_deployment(
+    package_version: Optional[str],
+    commit_hash: Optional[str],
+    deployed_by: Optional[str],
+    forms: List[tuple]
+) -> Optional[int]:
+    """
+    Registra un deployment package en el ledger (un solo batch)
+
+    Args:
+        forms: Lista de (form_name, version desplegada, versión current anterior o None)
+
+    Returns:
+        DeploymentId, o None si no hay forms para registrar
+    """
+    if not forms:
+        return None
+
+    params = [package_version, commit_hash, deployed_by]
+    for form_name, version, previous_version in forms:
+        params.extend([form_name, version, previous_version])
+    values = ", ".join(
+        "(CAST(? AS NVARCHAR(255)), CAST(? AS NVARCHAR(50)), CAST(? AS NVARCHAR(50)))" for _ in forms
+    )
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @Inserted TABLE (DeploymentId INT);
+
+            INSERT INTO CustomFormDeployments (PackageVersion, CommitHash, DeployedBy)
+            OUTPUT INSERTED.DeploymentId INTO @Inserted
+            VALUES (?, ?, ?);
+
+            INSERT INTO CustomFormDeploymentForms (DeploymentId, FormId, Version, PreviousVersion)
+            SELECT (SELECT DeploymentId FROM @Inserted), cf.FormId, r.Version, r.PreviousVersion
+            FROM (VALUES {values}) AS r(FormName, Version, PreviousVersion)
+            INNER JOIN CustomForms cf ON cf.FormName = r.FormName;
+
+            SELECT DeploymentId FROM @Inserted;
+        """, params)
+        deployment_id = cursor.fetchone()[0]
+        conn.commit()
+
+        print(f"[Database] Recorded deployment {deployment_id} ({len(forms)} forms)")
+        return deployment_id
+
+    except Exception:
+        if conn:
+            conn.rollback()
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def get_form_deployments(limit: int = 50, deployment_id: Optional[int] = None) -> List[dict]:
+    """
+    Deployments del ledger, del más nuevo al más viejo, con sus forms
+
+    Args:
+        limit: Máximo de deployments
+        deployment_id: Solo este deployment
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT d.DeploymentId, d.PackageVersion, d.CommitHash, d.DeployedBy, d.DeployedAt,
+                   d.LastAction, d.LastActionBy, d.LastActionAt,
+                   cf.FormName, df.Version, df.PreviousVersion
+            FROM (
+                SELECT TOP (?) *
+                FROM CustomFormDeployments
+                {"WHERE DeploymentId = ?" if deployment_id is not None else ""}
+                ORDER BY DeploymentId DESC
+            ) d
+            LEFT JOIN CustomFormDeploymentForms df ON df.DeploymentId = d.DeploymentId
+            LEFT JOIN CustomForms cf ON cf.FormId = df.FormId
+            ORDER BY d.DeploymentId DESC, cf.FormName
+        """, [limit] + ([deployment_id] if deployment_id is not None else []))
+
+        deployments = []
+        for row in cursor.fetchall():
+            if not deployments or deployments[-1]["deploymentId"] != row[0]:
+                deployments.append({
+                    "deploymentId": row[0],
+                    "packageVersion": row[1],
+                    "commitHash": row[2],
+                    "deployedBy": row[3],
+                    "deployedAt": row[4].isoformat() if row[4] else None,
+                    "lastAction": row[5],
+                    "lastActionBy": row[6],
+                    "lastActionAt": row[7].isoformat() if row[7] else None,
+                    "forms": []
+                })
+            if row[8]:
+                deployments[-1]["forms"].append({
+                    "formName": row[8],
+                    "version": row[9],
+                    "previousVersion": row[10]
+                })
+        return deployments
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def apply_form_deployment(deployment_id: int, rollback: bool = False, applied_by: Optional[str] = None) -> dict:
+    """
+    Promueve (o revierte) todos los forms de un deployment en una transacción
+
+    Usa sp_ApplyFormDeployment (migración 014): todos los forms cambian de
+    versión current juntos o ninguno. Las versiones guardadas como delta se
+    materializan antes (segunda llamada).
+
+    Args:
+        deployment_id: Deployment del ledger
+        rollback: False = versiones del deployment, True = versiones current anteriores
+        applied_by: Usuario que ejecuta la acción
+
+    Returns:
+        dict con 'deployment_id', 'action' y 'forms' (status, formName, version,
+        previousVersion, contentHash por form)
+
+    Raises:
+        ValueError: Si el deployment no existe o alguna versión ya no existe
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        apply_query = "EXEC sp_ApplyFormDeployment @DeploymentId = ?, @Target = ?, @AppliedBy = ?"
+        params = (deployment_id, "previous" if rollback else "deployed", applied_by)
+        cursor.execute(apply_query, params)
+        rows = cursor.fetchall()
+
+        # La versión current nunca es un delta (CK_CustomFormVersions_CodeStorage)
+        deltas = [row[3] for row in rows if row[0] == "delta"]
+        if deltas:
+            for version_id in deltas:
+                _materialize_version(cursor, version_id)
+            cursor.execute(apply_query, params)
+            rows = cursor.fetchall()
+
+        if not rows:
+            raise ValueError(f"Deployment {deployment_id} not found")
+
+        missing = [f"{row[1]}@{row[4]}" for row in rows if row[0] == "missing"]
+        if missing:
+            raise ValueError(f"Versions no longer exist: {', '.join(missing)}")
+
+        conn.commit()
+
+        action = "rolled_back" if rollback else "promoted"
+        print(f"[Database] Deployment {deployment_id} {action} ({len(rows)} forms)")
+        return {
+            "deployment_id": deployment_id,
+            "action": action,
+            "forms": [
+                {
+                    "status": row[0],
+                    "formName": row[1],
+                    "version": row[4],
+                    "previousVersion": row[5],
+                    "contentHash": row[6]
+                }
+                for row in rows
+            ]
+        }
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"[Database] Error applying deployment {deployment_id}: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ==============================================================================
+# Change Feed (migración 011)
+# ==============================================================================
+
+def get_form_changes(since: int, limit: int = 1000) -> List[dict]:
+    """
+    Cambios del catálogo de forms posteriores a un cursor (ChangeId)
+
+    La lectura usa READCOMMITTEDLOCK: un cambio todavía sin commit (ChangeId
+    menor que otro ya commiteado) bloquea la lectura hasta su commit en vez de
+    quedar salteado, aunque la base use READ_COMMITTED_SNAPSHOT.
+
+    Returns:
+        Lista de cambios ordenada por changeId
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT TOP (?) ChangeId, FormName, ChangeType, OldVersion, NewVersion, ContentHash, PublishedAt, ChangedAt
+            FROM CustomFormChanges WITH (READCOMMITTEDLOCK)
+            WHERE ChangeId > ?
+            ORDER BY ChangeId
+        """, (limit, since))
+
+        return [
+            {
+                "changeId": row[0],
+                "formName": row[1],
+                "changeType": row[2],
+                "oldVersion": row[3],
+                "newVersion": row[4],
+                "contentHash": row[5],
+                "publishedAt": row[6].isoformat() if row[6] else None,
+                "changedAt": row[7].isoformat() if row[7] else None
+            }
+            for row in cursor.fetchall()
+        ]
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def get_latest_form_change_id() -> int:
+    """Cursor del último cambio registrado (0 si no hay cambios)"""
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT ISNULL(MAX(ChangeId), 0) FROM CustomFormChanges WITH (READCOMMITTEDLOCK)")
+        return cursor.fetchone()[0]
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ==============================================================================
+# Shared Blobs (migración 009)
+# ==============================================================================
+
+def _find_shared_blob(cursor, code_hash: str) -> Optional[str]:
+    """StorageBackend del blob con este ContentHash, o None si todavía no existe"""
+    cursor.execute("SELECT StorageBackend FROM CustomFormBlobs WHERE ContentHash = ?", (code_hash,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def _lock_blob(cursor, code_hash: str) -> None:
+    """
+    Serializa por ContentHash el registro y la liberación de un blob (sp_getapplock)
+
+    El lock es de la transacción: un deployment lo toma antes de buscar el blob
+    y lo conserva hasta el commit del SP, y la liberación y el borrado del
+    payload también. Así un payload no se borra mientras otra versión lo vuelve
+    a registrar.
+
+    Raises:
+        TimeoutError: Si no se obtuvo el lock (LOCK_TIMEOUT de la sesión)
+    """
+    cursor.execute("""
+        SET NOCOUNT ON;
+        IF @@TRANCOUNT = 0 BEGIN TRANSACTION;
+        DECLARE @Result INT;
+        EXEC @Result = sp_getapplock @Resource = ?, @LockMode = 'Exclusive', @LockOwner = 'Transaction';
+        SELECT @Result;
+    """, (f"CustomFormBlob:{code_hash}",))
+    if cursor.fetchone()[0] < 0:
+        raise TimeoutError(f"Could not lock blob {code_hash}")
+
+
+def _release_blobs(cursor, code_hashes: List[str]) -> List[tuple]:
+    """
+    Borra de CustomFormBlobs los blobs que quedaron sin referencias
+
+    RefCount lo mantiene el trigger TR_CustomFormVersions_BlobRefCount, por lo
+    que se llama después de borrar o reemplazar las versiones, en la misma
+    transacción. Cada hash se bloquea (_lock_blob) en orden, para que un
+    deployment concurrente no lo registre sin payload.
+
+    Returns:
+        Lista de (ContentHash, StorageBackend) borrados
+    """
+    released = []
+    for code_hash in sorted(set(code_hashes)):
+        _lock_blob(cursor, code_hash)
+        cursor.execute("""
+            DELETE FROM CustomFormBlobs
+            OUTPUT deleted.StorageBackend
+            WHERE ContentHash = ? AND RefCount <= 0
+        """, (code_hash,))
+        row = cursor.fetchone()
+        if row:
+            released.append((code_hash, row[0]))
+    return released
+
+
+def _delete_external_blobs(released: List[tuple]) -> None:
+    """
+    Borra del blob store los payloads liberados (después del commit)
+
+    Cada payload se borra con el lock de su ContentHash (_lock_blob): si un
+    deployment concurrente volvió a registrarlo, se conserva, y un deployment
+    que llega después ya no lo encuentra y lo vuelve a escribir. Un error solo
+    deja un blob huérfano, que no afecta a ninguna versión.
+    """
+    external = [(code_hash, backend) for code_hash, backend in released if backend in BLOB_BACKENDS]
+    if not external:
+        return
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        for code_hash, backend in external:
+            _lock_blob(cursor, code_hash)
+            if not _find_shared_blob(cursor, code_hash):
+                get_blob_store(backend).delete(code_hash)
+                print(f"[Database] Deleted unreferenced blob {code_hash} ({backend})")
+            conn.commit()
+    except Exception as e:
+        print(f"[Database] Warning: Failed to delete unreferenced blobs: {str(e)}")
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ==============================================================================
+# Streaming del código compilado
+# ==============================================================================
+
+def _streamed_code(code_encoding, version_id: int, published_at, code_hash, storage_backend) -> StoredCode:
+    """StoredCode de una fila cuyo payload se lee por partes al enviarlo"""
+    def chunks() -> Iterator[bytes]:
+        return _iter_code_chunks(version_id, published_at, code_hash, storage_backend, code_encoding)
+    return StoredCode(encoding=code_encoding, chunks=chunks)
+
+
+def _iter_code_chunks(version_id: int, published_at, code_hash, storage_backend, code_encoding) -> Iterator[bytes]:
+    """
+    Lee el payload de una versión de a FORM_CODE_STREAM_CHUNK_KB con SUBSTRING
+
+    Usa su propia conexión, abierta mientras dure el envío. Los blobs
+    compartidos se leen por ContentHash (inmutables); las filas con el payload
+    propio se leen solo mientras PublishedAt no cambie, para no mezclar partes
+    de dos deployments de la misma versión.
+
+    Yields:
+        El gzip almacenado o, en filas legacy (CodeEncoding NULL), el
+        CompiledCode en UTF-16LE
+
+    Raises:
+        ValueError: Si el payload cambió o se borró durante la lectura
+    """
+    chunk_bytes = FORM_CODE_STREAM_CHUNK_KB * 1024
+    chunk_size = chunk_bytes
+    if storage_backend == STORAGE_SQL:
+        query = "SELECT SUBSTRING(CompiledCodeBinary, ?, ?) FROM CustomFormBlobs WHERE ContentHash = ?"
+        key = (code_hash,)
+    elif code_encoding:
+        query = """
+            SELECT SUBSTRING(CompiledCodeBinary, ?, ?)
+            FROM CustomFormVersions WHERE VersionId = ? AND PublishedAt = ?
+        """
+        key = (version_id, published_at)
+    else:
+        # SUBSTRING de NVARCHAR cuenta caracteres; se envían como bytes UTF-16LE
+        chunk_size = chunk_bytes // 2
+        chunk_bytes = chunk_size * 2
+        query = """
+            SELECT CAST(SUBSTRING(CompiledCode, ?, ?) AS VARBINARY(MAX))
+            FROM CustomFormVersions WHERE VersionId = ? AND PublishedAt = ? AND CodeEncoding IS NULL
+        """
+        key = (version_id, published_at)
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        offset = 1
+        while True:
+            cursor.execute(query, (offset, chunk_size) + key)
+            row = cursor.fetchone()
+            if not row or row[0] is None:
+                raise ValueError(f"Compiled code of version {version_id} changed while streaming")
+            chunk = bytes(row[0])
+            if chunk:
+                yield chunk
+            if len(chunk) < chunk_bytes:
+                break
+            offset += chunk_size
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+# ==============================================================================
+# Delta Storage (migración 007)
+# ==============================================================================
+
+def _stored_code(code_text, code_binary, code_encoding, code_hash=None, storage_backend=None) -> StoredCode:
+    """StoredCode de una fila no-delta (payload en la tabla o en el blob store)"""
+    if storage_backend in BLOB_BACKENDS:
+        store = get_blob_store(storage_backend)
+        return StoredCode(encoding=code_encoding, loader=lambda: store.get(code_hash))
+    return StoredCode(text=code_text, data=code_binary, encoding=code_encoding)
+
+
+def _fetch_version_storage(cursor, version_id: int):
+    cursor.execute("""
+        SELECT
+            cfv.CompiledCode,
+            ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary),
+            cfv.CodeEncoding,
+            cfv.ContentHash,
+            cfv.StorageBackend
+        FROM CustomFormVersions cfv
+        LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = 'sql'
+        WHERE cfv.VersionId = ?
+    """, (version_id,))
+    row = cursor.fetchone()
+    if not row:
+        raise ValueError(f"Version id {version_id} not found")
+    return row
+
+
+def _read_version_code(cursor, version_id: int) -> bytes:
+    """
+    Código de una versión en UTF-8, reconstruyendo los deltas
+
+    Las versiones reconstruidas quedan en reconstruct_cache. Requiere las
+    migraciones 006 a 009 (DeltaBaseVersionId, ContentHash/StorageBackend y
+    CustomFormBlobs), igual que el resto de las lecturas de código.
+
+    Raises:
+        DeltaError: Si el delta no corresponde a su base
+    """
+    row = _fetch_version_storage(cursor, version_id)
+    code_binary, code_encoding = row[1], row[2]
+    if code_encoding != CODE_ENCODING_DELTA:
+        return _stored_code(*row).utf8_bytes()
+
+    delta = bytes(code_binary)
+    cache_key = reconstruct_cache.key(version_id, delta)
+    cached = reconstruct_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    cursor.execute("SELECT DeltaBaseVersionId FROM CustomFormVersions WHERE VersionId = ?", (version_id,))
+    base_version_id = cursor.fetchone()[0]
+    base_row = _fetch_version_storage(cursor, base_version_id)
+    if base_row[2] == CODE_ENCODING_DELTA:
+        raise DeltaError(f"Delta base {base_version_id} of version {version_id} is itself a delta")
+
+    base = _stored_code(*base_row).utf8_bytes()
+    code = apply_delta(base, delta)
+    reconstruct_cache.put(cache_key, code)
+    return code
+
+
+def _write_full_version(cursor, version_id: int, code: bytes) -> None:
+    code_binary, code_encoding = encode_compiled_code(code.decode("utf-8"))
+    cursor.execute("""
+        UPDATE CustomFormVersions
+        SET CompiledCode = NULL,
+            CompiledCodeBinary = ?,
+            CodeEncoding = ?,
+            DeltaBaseVersionId = NULL
+        WHERE VersionId = ?
+    """, (code_binary, code_encoding, version_id))
+
+
+def _materialize_version(cursor, version_id: int) -> None:
+    """Reemplaza el delta de una versión por su código completo (gzip-utf8)"""
+    _write_full_version(cursor, version_id, _read_version_code(cursor, version_id))
+    print(f"[Database] Materialized delta version {version_id}")
+
+
+def _materialize_dependents(cursor, form_id: int, base_version_id: int) -> int:
+    """
+    Materializa las versiones guardadas como delta contra base_version_id
+
+    Se llama antes de reemplazar o borrar una versión base, dentro de la
+    misma transacción.
+
+    Returns:
+        Cantidad de versiones materializadas
+    """
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM CustomFormVersions
+        WHERE FormId = ? AND CodeEncoding = ?
+    """, (form_id, CODE_ENCODING_DELTA))
+    if not cursor.fetchone()[0]:
+        return 0
+
+    cursor.execute("""
+        SELECT VersionId
+        FROM CustomFormVersions
+        WHERE DeltaBaseVersionId = ?
+    """, (base_version_id,))
+    dependents = [row[0] for row in cursor.fetchall()]
+    for version_id in dependents:
+        _materialize_version(cursor, version_id)
+    return len(dependents)
+
+
+def rebase_form_deltas(form_name: str) -> dict:
+    """
+    Re-codifica las versiones no-current de un form como deltas contra la versión current
+
+    - Los deltas contra otra base se procesan primero: al terminar, ninguna
+      versión no-current es base de otra (cadenas de profundidad 1).
+    - Un delta se guarda solo si ocupa menos de DELTA_MAX_RATIO de la versión
+      completa comprimida; si no, la versión queda (o vuelve a quedar) completa.
+    - Las versiones en blob storage (migración 008) quedan como están.
+    - Todo el form se procesa en una transacción con las filas bloqueadas, un
+      deployment concurrente del mismo form espera a que termine.
+
+    Returns:
+        dict con 'form', 'deltas', 'materialized', 'unchanged',
+        'bytes_before' y 'bytes_after'
+
+    Raises:
+        ValueError: If form_name has invalid format
+    """
+    # SECURITY: Validate input to prevent SQL injection
+    if not validate_form_name(form_name):
+        raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+
+    stats = {
+        "form": form_name,
+        "deltas": 0,
+        "materialized": 0,
+        "unchanged": 0,
+        "bytes_before": 0,
+        "bytes_after": 0
+    }
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
+        _set_session_options(cursor)
+
+        cursor.execute("""
+            SELECT
+                cfv.VersionId,
+                cfv.IsCurrent,
+                cfv.CodeEncoding,
+                cfv.DeltaBaseVersionId,
+                ISNULL(DATALENGTH(cfv.CompiledCodeBinary), DATALENGTH(cfv.CompiledCode)),
+                cfv.StorageBackend
+            FROM CustomFormVersions cfv WITH (UPDLOCK, HOLDLOCK)
+            INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+            WHERE cf.FormName = ?
+        """, (form_name,))
+        rows = cursor.fetchall()
+
+        current = next((row for row in rows if row[1]), None)
+        if current is None:
+            conn.commit()
+            return stats
+
+        base_version_id = current[0]
+        base = _read_version_code(cursor, base_version_id)
+
+        # Las versiones en blob storage no se convierten (el delta volvería a la tabla)
+        candidates = [
+            row for row in rows
+            if not row[1] and not row[5] and not (row[2] == CODE_ENCODING_DELTA and row[3] == base_version_id)
+        ]
+        stats["unchanged"] = len(rows) - 1 - len(candidates)
+        candidates.sort(key=lambda row: row[2] != CODE_ENCODING_DELTA)
+
+        for version_id, _, code_encoding, _, stored_bytes, _ in candidates:
+            target = _read_version_code(cursor, version_id)
+            full_binary, _ = encode_compiled_code(target.decode("utf-8"))
+            delta = create_delta(base, target)
+            stats["bytes_before"] += stored_bytes or 0
+
+            if delta is not None and len(delta) < DELTA_MAX_RATIO * len(full_binary):
+                cursor.execute("""
+                    UPDATE CustomFormVersions
+                    SET CompiledCode = NULL,
+                        CompiledCodeBinary = ?,
+                        CodeEncoding = ?,
+                        DeltaBaseVersionId = ?
+                    WHERE VersionId = ?
+                """, (delta, CODE_ENCODING_DELTA, base_version_id, version_id))
+                stats["deltas"] += 1
+                stats["bytes_after"] += len(delta)
+            elif code_encoding == CODE_ENCODING_DELTA:
+                _write_full_version(cursor, version_id, target)
+                stats["materialized"] += 1
+                stats["bytes_after"] += len(full_binary)
+            else:
+                stats["unchanged"] += 1
+                stats["bytes_after"] += stored_bytes or 0
+
+        conn.commit()
+
+        print(
+            f"[Database] Rebased '{form_name}' on version {base_version_id}: "
+            f"{stats['deltas']} delta(s), {stats['materialized']} materialized, "
+            f"{stats['bytes_before']} -> {stats['bytes_after']} bytes"
+        )
+        return stats
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"[Database] Error rebasing form deltas: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def rebase_all_form_deltas() -> List[dict]:
+    """
+    Ejecuta rebase_form_deltas para todos los forms (job periódico)
+
+    Un error en un form no detiene el resto.
+    """
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+        cursor.execute("SELECT FormName FROM CustomForms")
+        form_names = [row[0] for row in cursor.fetchall()]
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+    results = []
+    for form_name in form_names:
+        try:
+            results.append(rebase_form_deltas(form_name))
+        except Exception as e:
+            print(f"[Database] Delta rebase skipped for '{sanitize_for_logging(form_name)}': {str(e)}")
+    return results
+
+
+# ==============================================================================
+# Retención de versiones (job de retención)
+# ==============================================================================
+
+def _retention_conditions(keep_versions: int, keep_days: int, keep_deployments: int, version_rank: str) -> tuple:
+    """
+    Condiciones (sobre v = CustomFormVersions y cf = CustomForms) de una versión
+    que la política de retención permite borrar
+
+    version_rank es la expresión SQL de la posición de v entre las versiones de
+    su form (1 = la más reciente).
+
+    Returns:
+        (lista de condiciones, parámetros en el mismo orden)
+    """
+    conditions = ["v.IsCurrent = 0", "(cf.CurrentVersion IS NULL OR v.Version <> cf.CurrentVersion)"]
+    params = []
+    if keep_versions > 0:
+        conditions.append(f"{version_rank} > ?")
+        params.append(keep_versions)
+    if keep_days > 0:
+        conditions.append("v.PublishedAt < DATEADD(DAY, -?, GETDATE())")
+        params.append(keep_days)
+    if keep_deployments > 0:
+        # Versiones que un promote/rollback de los últimos deployments necesita (migración 014)
+        conditions.append("""NOT EXISTS (
+                SELECT 1
+                FROM CustomFormDeploymentForms dfv
+                WHERE dfv.FormId = v.FormId
+                  AND (dfv.Version = v.Version OR dfv.PreviousVersion = v.Version)
+                  AND dfv.DeploymentId IN (
+                      SELECT TOP (?) DeploymentId FROM CustomFormDeployments ORDER BY DeploymentId DESC
+                  )
+            )""")
+        params.append(keep_deployments)
+    return conditions, params
+
+
+def get_prune_candidates(keep_versions: int, keep_days: int, keep_deployments: int, limit: int) -> List[int]:
+    """
+    VersionIds fuera de la política de retención, las más viejas primero
+
+    Se calcula una vez por pasada del job (ROW_NUMBER sobre toda la tabla);
+    prune_form_versions vuelve a verificar cada lote.
+
+    Raises:
+        ValueError: Si ninguna regla está activa
+    """
+    if keep_versions <= 0 and keep_days <= 0:
+        raise ValueError("Retention policy needs keep_versions or keep_days")
+
+    conditions, params = _retention_conditions(keep_versions, keep_days, keep_deployments, "v.VersionRank")
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # IX_CustomFormVersions_History (migración 012) da el orden del ranking sin sort
+        cursor.execute(f"""
+            SELECT TOP (?) v.VersionId
+            FROM (
+                SELECT VersionId, FormId, Version, IsCurrent, PublishedAt,
+                       ROW_NUMBER() OVER (PARTITION BY FormId ORDER BY PublishedAt DESC, VersionId DESC) AS VersionRank
+                FROM CustomFormVersions
+            ) v
+            INNER JOIN CustomForms cf ON cf.FormId = v.FormId
+            WHERE {" AND ".join(conditions)}
+            ORDER BY v.PublishedAt, v.VersionId
+        """, [limit] + params)
+        return [row[0] for row in cursor.fetchall()]
+
+    except Exception as e:
+        print(f"[Database] Error selecting versions to prune: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
+def prune_form_versions(version_ids: List[int], keep_versions: int, keep_days: int, keep_deployments: int) -> dict:
+    """
+    Borra un lote de versiones candidatas (get_prune_candidates) que sigan
+    fuera de la política de retención
+
+    Una versión se borra si no es la current y ninguna regla activa la conserva:
+    - keep_versions: últimas N versiones publicadas de cada form (0 = regla desactivada)
+    - keep_days: versiones publicadas en los últimos D días (0 = regla desactivada)
+    - keep_deployments: versiones de los últimos N deployments del ledger (0 = sin protección)
+
+    La política se vuelve a verificar solo para las versiones del lote (el
+    ranking es un seek por versión en IX_CustomFormVersions_History), en una
+    transacción corta. Las versiones guardadas como delta contra una versión
+    borrada se materializan antes. Un solo worker poda a la vez
+    (sp_getapplock); el lote cede ante deployments y promociones
+    (DEADLOCK_PRIORITY LOW, LOCK_TIMEOUT).
+
+    Returns:
+        dict con 'deleted', 'materialized', 'bytes' y 'forms' (forms afectados)
+
+    Raises:
+        ValueError: Si ninguna regla está activa
+    """
+    if keep_versions <= 0 and keep_days <= 0:
+        raise ValueError("Retention policy needs keep_versions or keep_days")
+
+    stats = {"deleted": 0, "materialized": 0, "bytes": 0, "forms": []}
+    if not version_ids:
+        return stats
+
+    version_rank = """(1 + (
+                SELECT COUNT(*)
+                FROM CustomFormVersions n
+                WHERE n.FormId = v.FormId
+                  AND (n.PublishedAt > v.PublishedAt OR (n.PublishedAt = v.PublishedAt AND n.VersionId > v.VersionId))
+            ))"""
+    conditions, params = _retention_conditions(keep_versions, keep_days, keep_deployments, version_rank)
+    placeholders = ", ".join("?" for _ in version_ids)
+
+    conn = None
+    cursor = None
+    try:
+        conn = get_db_connection()
+        cursor = conn.cursor()
+
+        # IMPORTANT: Set QUOTED_IDENTIFIER ON to avoid issues with indexed views/computed columns
+        _set_session_options(cursor)
+        cursor.execute(f"SET DEADLOCK_PRIORITY LOW; SET LOCK_TIMEOUT {int(FORM_RETENTION_LOCK_TIMEOUT_MS)};")
+
+        cursor.execute("""
+            SET NOCOUNT ON;
+            IF @@TRANCOUNT = 0 BEGIN TRANSACTION;
+            DECLARE @Result INT;
+            EXEC @Result = sp_getapplock @Resource = 'CustomFormRetention', @LockMode = 'Exclusive',
+                                         @LockOwner = 'Transaction', @LockTimeout = 0;
+            SELECT @Result;
+        """)
+        if cursor.fetchone()[0] < 0:
+            conn.rollback()
+            print("[Database] Retention pruning already running in another worker")
+            return stats
+
+        cursor.execute(f"""
+            SELECT v.VersionId, cf.FormName, v.ContentHash, v.StorageBackend, v.SizeBytes
+            FROM CustomFormVersions v
+            INNER JOIN CustomForms cf ON cf.FormId = v.FormId
+            WHERE v.VersionId IN ({placeholders})
+              AND {" AND ".join(conditions)}
+        """, list(version_ids) + params)
+        candidates = {row[0]: row for row in cursor.fetchall()}
+        if not candidates:
+            conn.commit()
+            return stats
+
+        version_ids = list(candidates)
+        placeholders = ", ".join("?" for _ in version_ids)
+
+        # Los deltas contra una versión borrada dejarían de poder reconstruirse
+        cursor.execute(f"""
+            SELECT VersionId
+            FROM CustomFormVersions
+            WHERE DeltaBaseVersionId IN ({placeholders})
+              AND VersionId NOT IN ({placeholders})
+        """, version_ids + version_ids)
+        for (version_id,) in cursor.fetchall():
+            _materialize_version(cursor, version_id)
+            stats["materialized"] += 1
+
+        # Se vuelve a verificar que no sea la current (pudo promoverse desde la selección)
+        cursor.execute(f"""
+            SET NOCOUNT ON;
+            DECLARE @Deleted TABLE (VersionId INT);
+
+            DELETE v
+            OUTPUT deleted.VersionId INTO @Deleted
+            FROM CustomFormVersions v
+            INNER JOIN CustomForms cf ON cf.FormId = v.FormId
+            WHERE v.VersionId IN ({placeholders})
+              AND v.IsCurrent = 0
+              AND (cf.CurrentVersion IS NULL OR v.Version <> cf.CurrentVersion);
+
+            SELECT VersionId FROM @Deleted;
+        """, version_ids)
+        deleted = [candidates[row[0]] for row in cursor.fetchall()]
+
+        released = _release_blobs(cursor, [row[2] for row in deleted if row[3]])
+
+        conn.commit()
+
+        _delete_external_blobs(released)
+
+        stats["deleted"] = len(deleted)
+        stats["bytes"] = sum(row[4] or 0 for row in deleted)
+        stats["forms"] = sorted({row[1] for row in deleted})
+        print(
+            f"[Database] Pruned {stats['deleted']} version(s) of {len(stats['forms'])} form(s), "
+            f"{stats['materialized']} delta(s) materialized"
+        )
+        return stats
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"[Database] Error pruning form versions: {str(e)}")
+        raise
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            conn.close()
+
+
 # ==============================================================================
 # Admin Authentication Functions
 # ==============================================================================
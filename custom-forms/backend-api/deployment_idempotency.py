@@ -0,0 +1,225 @@
+"""
+Deployment Idempotency
+
+Evita re-procesar deployment packages idénticos (reintentos de CI, dos
+pipelines subiendo el mismo artifact).
+
+Cada deployment se identifica por una key:
+- El header `Idempotency-Key` enviado por el cliente, o
+- "sha256:<digest>" del package si no se envía el header.
+
+Para cada key se registra el UploadDeploymentResponse exitoso (o el jobId que
+lo está procesando). Un request repetido con la misma key recibe el resultado
+registrado sin extraer el .zip ni tocar SQL Server.
+
+Solo se registran deployments exitosos: un deployment fallido (ej: SQL Server
+caído) se vuelve a procesar en el próximo intento.
+
+Los registros expiran después de DEPLOYMENT_IDEMPOTENCY_RETENTION_HOURS.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from models import DeploymentIdempotencyRecord, DeploymentJobStatus, UploadDeploymentResponse
+from deployment_jobs import job_queue, JOB_COMPLETED, FINISHED_STATES
+from validators import validate_idempotency_key
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+TEMP_UPLOAD_PATH = os.getenv("TEMP_UPLOAD_PATH", "./temp-uploads")
+DEPLOYMENT_IDEMPOTENCY_PATH = os.getenv(
+    "DEPLOYMENT_IDEMPOTENCY_PATH", os.path.join(TEMP_UPLOAD_PATH, "idempotency")
+)
+DEPLOYMENT_IDEMPOTENCY_RETENTION_HOURS = int(os.getenv("DEPLOYMENT_IDEMPOTENCY_RETENTION_HOURS", "24"))
+
+
+class IdempotencyConflictError(ValueError):
+    """El mismo Idempotency-Key se reutilizó con un package distinto"""
+
+
+def package_digest(content: bytes) -> str:
+    """SHA-256 (hex) del contenido de un deployment package"""
+    return hashlib.sha256(content).hexdigest()
+
+
+def resolve_idempotency_key(idempotency_key: Optional[str], digest: str) -> str:
+    """
+    Determina la key de idempotencia de un deployment
+
+    Args:
+        idempotency_key: Valor del header Idempotency-Key (opcional)
+        digest: SHA-256 del package
+
+    Returns:
+        El header si se envió, o "sha256:<digest>"
+
+    Raises:
+        ValueError: Si el header tiene un formato inválido
+    """
+    if idempotency_key is None:
+        return f"sha256:{digest}"
+
+    if not validate_idempotency_key(idempotency_key):
+        raise ValueError("Invalid Idempotency-Key format")
+
+    return idempotency_key
+
+
+class DeploymentResultStore:
+    """
+    Persistencia de registros de idempotencia en disco
+
+    Layout:
+        <root>/<sha256(key)>.json   DeploymentIdempotencyRecord
+
+    El nombre de archivo es el hash de la key, por lo que cualquier key
+    válida es un nombre de archivo seguro.
+    """
+
+    def __init__(self, root: str, retention_hours: int = DEPLOYMENT_IDEMPOTENCY_RETENTION_HOURS):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.retention_hours = retention_hours
+        self._locks: Dict[str, Tuple[asyncio.Lock, int]] = {}
+
+    def _path(self, key: str) -> Path:
+        return self.root / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.json"
+
+    def get(self, key: str, digest: str) -> Optional[DeploymentIdempotencyRecord]:
+        """
+        Lee el registro de una key, o None si no existe o expiró
+
+        Raises:
+            IdempotencyConflictError: Si la key se registró para un package distinto
+        """
+        path = self._path(key)
+        if not path.exists():
+            return None
+
+        with open(path, "r", encoding="utf-8") as f:
+            record = DeploymentIdempotencyRecord(**json.load(f))
+
+        if record.createdAt < datetime.utcnow() - timedelta(hours=self.retention_hours):
+            path.unlink(missing_ok=True)
+            return None
+
+        if record.packageSha256 != digest:
+            raise IdempotencyConflictError(
+                "Idempotency-Key was already used for a different deployment package"
+            )
+
+        return record
+
+    def save(
+        self,
+        key: str,
+        digest: str,
+        response: Optional[UploadDeploymentResponse] = None,
+        job_id: Optional[str] = None
+    ) -> DeploymentIdempotencyRecord:
+        """Registra el resultado (o el job) de una key, de forma atómica (tmp + rename)"""
+        record = DeploymentIdempotencyRecord(
+            key=key,
+            packageSha256=digest,
+            jobId=job_id,
+            response=response,
+            createdAt=datetime.utcnow()
+        )
+        self._write(record)
+        return record
+
+    def _write(self, record: DeploymentIdempotencyRecord) -> None:
+        path = self._path(record.key)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(record.model_dump_json())
+        os.replace(tmp_path, path)
+
+    def purge_expired(self) -> int:
+        """Elimina registros más viejos que la ventana de retención"""
+        cutoff = datetime.utcnow() - timedelta(hours=self.retention_hours)
+        purged = 0
+        for path in self.root.glob("*.json"):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    created_at = DeploymentIdempotencyRecord(**json.load(f)).createdAt
+            except Exception as e:
+                print(f"[Deployment Idempotency] Warning: Cannot read record '{path.name}': {e}")
+                continue
+            if created_at < cutoff:
+                path.unlink(missing_ok=True)
+                purged += 1
+        return purged
+
+    @asynccontextmanager
+    async def lock(self, key: str) -> AsyncIterator[None]:
+        """
+        Serializa requests concurrentes con la misma key (por proceso)
+
+        El segundo request espera al primero y luego recibe su resultado
+        registrado en lugar de procesar el package otra vez.
+        """
+        lock, users = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, users + 1)
+        try:
+            async with lock:
+                yield
+        finally:
+            lock, users = self._locks[key]
+            if users <= 1:
+                self._locks.pop(key, None)
+            else:
+                self._locks[key] = (lock, users - 1)
+
+    def find_previous(
+        self,
+        key: str,
+        digest: str
+    ) -> Tuple[Optional[UploadDeploymentResponse], Optional[DeploymentJobStatus]]:
+        """
+        Busca un deployment previo para la key
+
+        Returns:
+            (response, job):
+            - response: resultado exitoso registrado (o del job completado), si existe
+            - job: job que procesó o está procesando el package, si sigue disponible
+            Ambos None si hay que procesar el package (sin registro o job fallido).
+
+        Raises:
+            IdempotencyConflictError: Si la key se registró para un package distinto
+        """
+        record = self.get(key, digest)
+        if not record:
+            return None, None
+
+        job = job_queue.get(record.jobId) if record.jobId else None
+
+        if record.response:
+            return record.response, job
+
+        if job and job.status == JOB_COMPLETED and job.result and job.result.success:
+            # Registrar el resultado del job: sobrevive a la retención de jobs
+            record.response = job.result
+            self._write(record)
+            return job.result, job
+
+        if job and job.status not in FINISHED_STATES:
+            return None, job
+
+        return None, None
+
+
+# Singleton usado por main.py
+result_store = DeploymentResultStore(DEPLOYMENT_IDEMPOTENCY_PATH)
@@ -0,0 +1,461 @@
+"""
+Deployment Jobs
+
+Cola de deployment jobs en background para POST /api/deployment/jobs.
+
+El upload se acepta inmediatamente (202 + jobId) y el procesamiento
+(extracción, manifest, upsert de cada form) corre en workers async, sin
+mantener abierto el request HTTP (evita timeouts de IIS/ARR con packages grandes).
+
+El estado de cada job se persiste en disco (un directorio por job con
+job.json + package.zip), por lo que los jobs pendientes sobreviven a un
+reinicio del worker y se re-encolan en el startup (ver recover()).
+
+El progreso de cada job (zip validado, manifest leído, cada form procesado y
+el resumen final) se registra en events.jsonl y se puede seguir en vivo por
+Server-Sent Events (ver stream_events()).
+
+NOTE: La cola es por proceso. PM2 corre el backend con una sola instancia,
+que es quien acepta y recupera los jobs.
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Dict, List, Optional, Set
+
+from dotenv import load_dotenv
+
+from models import DeploymentJobStatus, DeploymentProgressEvent, UploadDeploymentResponse
+from deployment_service import run_deployment, ProgressCallback
+from validators import validate_job_id
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+TEMP_UPLOAD_PATH = os.getenv("TEMP_UPLOAD_PATH", "./temp-uploads")
+DEPLOYMENT_JOBS_PATH = os.getenv("DEPLOYMENT_JOBS_PATH", os.path.join(TEMP_UPLOAD_PATH, "jobs"))
+DEPLOYMENT_MAX_CONCURRENT_JOBS = int(os.getenv("DEPLOYMENT_MAX_CONCURRENT_JOBS", "2"))
+DEPLOYMENT_JOB_RETENTION_HOURS = int(os.getenv("DEPLOYMENT_JOB_RETENTION_HOURS", "72"))
+DEPLOYMENT_EVENTS_HEARTBEAT_SECONDS = int(os.getenv("DEPLOYMENT_EVENTS_HEARTBEAT_SECONDS", "15"))
+
+PACKAGE_FILENAME = "package.zip"
+STATUS_FILENAME = "job.json"
+EVENTS_FILENAME = "events.jsonl"
+WORK_DIRNAME = "work"
+
+# Job states
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+FINISHED_STATES = (JOB_COMPLETED, JOB_FAILED)
+
+
+class DeploymentJobStore:
+    """
+    Persistencia de jobs en disco
+
+    Layout:
+        <root>/<jobId>/job.json      Estado serializado (DeploymentJobStatus)
+        <root>/<jobId>/events.jsonl  Eventos de progreso (DeploymentProgressEvent por línea)
+        <root>/<jobId>/package.zip   Package subido (se elimina al terminar)
+        <root>/<jobId>/work/         Staging de extracción (se elimina al terminar)
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def job_dir(self, job_id: str) -> Path:
+        # SECURITY: job_id se usa como nombre de directorio
+        if not validate_job_id(job_id):
+            raise ValueError(f"Invalid job_id format: {job_id[:50]}")
+        return self.root / job_id
+
+    def package_path(self, job_id: str) -> Path:
+        return self.job_dir(job_id) / PACKAGE_FILENAME
+
+    def work_dir(self, job_id: str) -> Path:
+        return self.job_dir(job_id) / WORK_DIRNAME
+
+    def create(self, file_name: str, content: bytes, submitted_by: Optional[str] = None) -> DeploymentJobStatus:
+        """Crea un job nuevo en estado 'queued' y guarda el package en disco"""
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        job_dir.mkdir(parents=True, exist_ok=False)
+
+        with open(job_dir / PACKAGE_FILENAME, "wb") as f:
+            f.write(content)
+
+        return self._new_job(job_id, file_name, len(content), submitted_by)
+
+    def create_from_file(self, file_name: str, source_path: Path, submitted_by: Optional[str] = None) -> DeploymentJobStatus:
+        """
+        Crea un job nuevo moviendo un package que ya está en disco
+
+        Usado por los uploads por chunks: evita volver a cargar el package en memoria.
+        """
+        job_id = uuid.uuid4().hex
+        job_dir = self.job_dir(job_id)
+        job_dir.mkdir(parents=True, exist_ok=False)
+
+        package_path = job_dir / PACKAGE_FILENAME
+        shutil.move(str(source_path), str(package_path))
+
+        return self._new_job(job_id, file_name, package_path.stat().st_size, submitted_by)
+
+    def create_completed(
+        self,
+        file_name: str,
+        size_bytes: int,
+        result: UploadDeploymentResponse,
+        submitted_by: Optional[str] = None
+    ) -> DeploymentJobStatus:
+        """Crea un job ya completado con un resultado previo (deployment idempotente, sin package)"""
+        job_id = uuid.uuid4().hex
+        self.job_dir(job_id).mkdir(parents=True, exist_ok=False)
+
+        now = datetime.utcnow()
+        job = DeploymentJobStatus(
+            jobId=job_id,
+            status=JOB_COMPLETED,
+            fileName=file_name,
+            sizeBytes=size_bytes,
+            submittedBy=submitted_by,
+            createdAt=now,
+            startedAt=now,
+            finishedAt=now,
+            result=result
+        )
+        self.save(job)
+        return job
+
+    def _new_job(self, job_id: str, file_name: str, size_bytes: int, submitted_by: Optional[str]) -> DeploymentJobStatus:
+        job = DeploymentJobStatus(
+            jobId=job_id,
+            status=JOB_QUEUED,
+            fileName=file_name,
+            sizeBytes=size_bytes,
+            submittedBy=submitted_by,
+            createdAt=datetime.utcnow()
+        )
+        self.save(job)
+        return job
+
+    def save(self, job: DeploymentJobStatus) -> None:
+        """Escribe job.json de forma atómica (tmp + rename)"""
+        job_dir = self.job_dir(job.jobId)
+        tmp_path = job_dir / f"{STATUS_FILENAME}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(job.model_dump_json())
+        os.replace(tmp_path, job_dir / STATUS_FILENAME)
+
+    def load(self, job_id: str) -> Optional[DeploymentJobStatus]:
+        """Lee un job desde disco, o None si no existe"""
+        status_path = self.job_dir(job_id) / STATUS_FILENAME
+        if not status_path.exists():
+            return None
+        with open(status_path, "r", encoding="utf-8") as f:
+            return DeploymentJobStatus(**json.load(f))
+
+    def append_event(self, event: DeploymentProgressEvent) -> None:
+        """Agrega un evento de progreso al log del job"""
+        with open(self.job_dir(event.jobId) / EVENTS_FILENAME, "a", encoding="utf-8") as f:
+            f.write(event.model_dump_json() + "\n")
+
+    def read_events(self, job_id: str, after_sequence: int = 0) -> List[DeploymentProgressEvent]:
+        """Lee los eventos de progreso con sequence > after_sequence"""
+        events_path = self.job_dir(job_id) / EVENTS_FILENAME
+        if not events_path.exists():
+            return []
+
+        events = []
+        with open(events_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                event = DeploymentProgressEvent(**json.loads(line))
+                if event.sequence > after_sequence:
+                    events.append(event)
+        return events
+
+    def list_jobs(self) -> List[DeploymentJobStatus]:
+        """Lista todos los jobs persistidos (ignora directorios corruptos)"""
+        jobs = []
+        for entry in self.root.iterdir():
+            if not entry.is_dir() or not validate_job_id(entry.name):
+                continue
+            try:
+                job = self.load(entry.name)
+                if job:
+                    jobs.append(job)
+            except Exception as e:
+                print(f"[Deployment Jobs] Warning: Cannot read job '{entry.name}': {e}")
+        return jobs
+
+    def release_files(self, job_id: str) -> None:
+        """Elimina package.zip y el staging de un job terminado (conserva job.json)"""
+        shutil.rmtree(self.work_dir(job_id), ignore_errors=True)
+        try:
+            self.package_path(job_id).unlink()
+        except FileNotFoundError:
+            pass
+
+    def purge_expired(self, retention_hours: int) -> int:
+        """Elimina jobs terminados más viejos que retention_hours"""
+        cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+        purged = 0
+        for job in self.list_jobs():
+            if job.status in FINISHED_STATES and (job.finishedAt or job.createdAt) < cutoff:
+                shutil.rmtree(self.job_dir(job.jobId), ignore_errors=True)
+                purged += 1
+        return purged
+
+
+class DeploymentJobQueue:
+    """
+    Cola async de deployment jobs con concurrencia configurable
+
+    Los workers se crean de forma lazy en el event loop actual (primer submit
+    o recover), y el procesamiento bloqueante (zip + pyodbc) corre en threads.
+    """
+
+    def __init__(self, store: DeploymentJobStore, max_concurrent: int = 2):
+        self.store = store
+        self.max_concurrent = max(1, max_concurrent)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._loop = None
+        self._listeners: Dict[str, Set[asyncio.Event]] = {}
+
+    def _ensure_workers(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._workers:
+            return
+
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._workers = [
+            loop.create_task(self._worker(n)) for n in range(self.max_concurrent)
+        ]
+
+    async def submit(self, file_name: str, content: bytes, submitted_by: Optional[str] = None) -> DeploymentJobStatus:
+        """Persiste el package y encola el job. Retorna inmediatamente."""
+        job = await asyncio.to_thread(self.store.create, file_name, content, submitted_by)
+        return self._enqueue(job)
+
+    async def submit_file(self, file_name: str, source_path: Path, submitted_by: Optional[str] = None) -> DeploymentJobStatus:
+        """Encola un package ya ensamblado en disco (se mueve al job store)"""
+        job = await asyncio.to_thread(self.store.create_from_file, file_name, source_path, submitted_by)
+        return self._enqueue(job)
+
+    async def submit_replayed(
+        self,
+        file_name: str,
+        size_bytes: int,
+        result: UploadDeploymentResponse,
+        submitted_by: Optional[str] = None
+    ) -> DeploymentJobStatus:
+        """
+        Registra un job ya completado con el resultado de un deployment previo
+
+        Usado cuando un package idéntico ya fue deployado: no se encola nada,
+        pero el cliente recibe un jobId que puede consultar igual que cualquier otro.
+        """
+        job = await asyncio.to_thread(self.store.create_completed, file_name, size_bytes, result, submitted_by)
+        emit = self._emitter(job.jobId)
+        emit("upload_received", details={
+            "fileName": file_name,
+            "sizeBytes": size_bytes,
+            "replayed": True
+        })
+        emit("summary", summary=result)
+        print(f"[Deployment Jobs] Job {job.jobId} replayed previous result ({file_name})")
+        return job
+
+    def _enqueue(self, job: DeploymentJobStatus) -> DeploymentJobStatus:
+        self._emitter(job.jobId)("upload_received", details={
+            "fileName": job.fileName,
+            "sizeBytes": job.sizeBytes
+        })
+        self._ensure_workers()
+        self._queue.put_nowait(job.jobId)
+        print(f"[Deployment Jobs] Job {job.jobId} queued ({job.fileName}, {job.sizeBytes} bytes)")
+        return job
+
+    def get(self, job_id: str) -> Optional[DeploymentJobStatus]:
+        return self.store.load(job_id)
+
+    async def recover(self) -> int:
+        """
+        Re-encola jobs que quedaron 'queued' o 'running' tras un reinicio
+
+        Los jobs cuyo package ya no existe se marcan como 'failed'.
+        Returns: cantidad de jobs re-encolados
+        """
+        purged = await asyncio.to_thread(self.store.purge_expired, DEPLOYMENT_JOB_RETENTION_HOURS)
+        if purged:
+            print(f"[Deployment Jobs] Purged {purged} expired job(s)")
+
+        pending = [
+            job for job in await asyncio.to_thread(self.store.list_jobs)
+            if job.status not in FINISHED_STATES
+        ]
+        pending.sort(key=lambda job: job.createdAt)
+
+        requeued = 0
+        for job in pending:
+            if not self.store.package_path(job.jobId).exists():
+                job.status = JOB_FAILED
+                job.error = "Package file missing after worker restart"
+                job.finishedAt = datetime.utcnow()
+                self.store.save(job)
+                continue
+
+            job.status = JOB_QUEUED
+            job.startedAt = None
+            self.store.save(job)
+            self._ensure_workers()
+            self._queue.put_nowait(job.jobId)
+            requeued += 1
+
+        if requeued:
+            print(f"[Deployment Jobs] Recovered {requeued} pending job(s)")
+        return requeued
+
+    async def shutdown(self) -> None:
+        """Cancela los workers (los jobs en curso se recuperan en el próximo startup)"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _emitter(self, job_id: str) -> ProgressCallback:
+        """
+        Crea el callback de progreso de un job
+
+        Persiste cada evento y despierta a los streams SSE suscriptos. Puede
+        invocarse desde el thread del deployment (usa call_soon_threadsafe).
+        """
+        loop = asyncio.get_running_loop()
+        sequence = len(self.store.read_events(job_id))
+
+        def emit(event: str, details: Optional[dict] = None, form=None, summary=None) -> None:
+            nonlocal sequence
+            sequence += 1
+            self.store.append_event(DeploymentProgressEvent(
+                jobId=job_id,
+                sequence=sequence,
+                event=event,
+                timestamp=datetime.utcnow(),
+                details=details or {},
+                form=form,
+                summary=summary
+            ))
+            loop.call_soon_threadsafe(self._notify, job_id)
+
+        return emit
+
+    def _notify(self, job_id: str) -> None:
+        for listener in self._listeners.get(job_id, ()):
+            listener.set()
+
+    async def stream_events(self, job_id: str, after_sequence: int = 0) -> AsyncIterator[str]:
+        """
+        Stream de eventos de progreso de un job en formato Server-Sent Events
+
+        Primero re-envía los eventos ya registrados (sequence > after_sequence,
+        para soportar reconexión con Last-Event-ID) y luego sigue el job en vivo
+        hasta que termina. Envía un comentario keep-alive si no hay actividad.
+        """
+        listener = asyncio.Event()
+        self._listeners.setdefault(job_id, set()).add(listener)
+        try:
+            while True:
+                listener.clear()
+                # Leer el estado ANTES que los eventos: si el job ya terminó,
+                # todos sus eventos (incluido el summary) ya están en disco
+                job = await asyncio.to_thread(self.store.load, job_id)
+                events = await asyncio.to_thread(self.store.read_events, job_id, after_sequence)
+
+                for event in events:
+                    after_sequence = event.sequence
+                    yield format_sse(event)
+
+                if job is None or job.status in FINISHED_STATES:
+                    break
+
+                try:
+                    await asyncio.wait_for(listener.wait(), timeout=DEPLOYMENT_EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            listeners = self._listeners.get(job_id)
+            if listeners is not None:
+                listeners.discard(listener)
+                if not listeners:
+                    self._listeners.pop(job_id, None)
+
+    async def _worker(self, worker_number: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run_job(job_id)
+            except Exception as e:
+                print(f"[Deployment Jobs] Worker {worker_number} error on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run_job(self, job_id: str) -> None:
+        job = self.store.load(job_id)
+        if not job or job.status in FINISHED_STATES:
+            return
+
+        job.status = JOB_RUNNING
+        job.startedAt = datetime.utcnow()
+        self.store.save(job)
+        print(f"[Deployment Jobs] Job {job_id} started")
+
+        try:
+            work_dir = self.store.work_dir(job_id)
+            work_dir.mkdir(parents=True, exist_ok=True)
+            result = await asyncio.to_thread(
+                run_deployment,
+                self.store.package_path(job_id),
+                work_dir,
+                self._emitter(job_id),
+                job.submittedBy
+            )
+            job.result = result
+            job.status = JOB_COMPLETED if result.success else JOB_FAILED
+            job.error = None if result.success else result.message
+        except Exception as e:
+            print(f"[Deployment Jobs] Job {job_id} failed: {e}")
+            job.status = JOB_FAILED
+            job.error = str(e)
+        finally:
+            job.finishedAt = datetime.utcnow()
+            self.store.save(job)
+            self._notify(job_id)
+            await asyncio.to_thread(self.store.release_files, job_id)
+
+        print(f"[Deployment Jobs] Job {job_id} {job.status}")
+
+
+def format_sse(event: DeploymentProgressEvent) -> str:
+    """Serializa un evento de progreso como mensaje Server-Sent Events"""
+    return f"id: {event.sequence}\nevent: {event.event}\ndata: {event.model_dump_json()}\n\n"
+
+
+# Singleton usado por main.py
+job_queue = DeploymentJobQueue(
+    DeploymentJobStore(DEPLOYMENT_JOBS_PATH),
+    DEPLOYMENT_MAX_CONCURRENT_JOBS
+)
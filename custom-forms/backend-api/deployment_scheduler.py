@@ -0,0 +1,106 @@
+"""
+Deployment Scheduler
+
+Coordina deployments concurrentes (POST /api/deployment/upload y los workers
+de deployment jobs):
+
+- Cada deployment recibe un directorio de staging único (create_staging_dir),
+  por lo que dos uploads en el mismo segundo ya no comparten archivos.
+- Los deployments que tocan los mismos forms se serializan en orden de
+  llegada (FormLockManager); los que tocan forms distintos corren en paralelo.
+
+NOTE: Los locks son por proceso. PM2 corre el backend con una sola
+instancia, que es quien ejecuta todos los deployments.
+"""
+
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Iterator, List, Set
+
+
+def create_staging_dir(root: str) -> Path:
+    """
+    Crea un directorio de staging exclusivo para un deployment
+
+    El nombre conserva el timestamp (útil en logs) más un sufijo aleatorio
+    generado por mkdtemp, que garantiza que no colisione con otro deployment.
+    """
+    Path(root).mkdir(parents=True, exist_ok=True)
+    prefix = f"deployment_{datetime.now().strftime('%Y%m%d_%H%M%S')}_"
+    return Path(tempfile.mkdtemp(prefix=prefix, dir=root))
+
+
+class _Waiter:
+    def __init__(self, names: Set[str]):
+        self.names = names
+
+
+class FormLockManager:
+    """
+    Locks por form name para deployments concurrentes
+
+    Un deployment adquiere todos sus forms de una vez (todo o nada), por lo
+    que no hay deadlocks. Los pedidos que comparten forms se atienden en orden
+    de llegada: un deployment no pasa adelante de otro anterior que espera
+    alguno de sus forms.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._held: Set[str] = set()
+        self._waiting: List[_Waiter] = []
+
+    @staticmethod
+    def _normalize(names: Iterable[str]) -> Set[str]:
+        # FormName es case-insensitive en SQL Server (collation por defecto)
+        return {name.lower() for name in names}
+
+    def _can_run(self, waiter: _Waiter) -> bool:
+        if self._held & waiter.names:
+            return False
+        for earlier in self._waiting:
+            if earlier is waiter:
+                return True
+            if earlier.names & waiter.names:
+                return False
+        return True
+
+    @contextmanager
+    def hold(self, form_names: Iterable[str]) -> Iterator[float]:
+        """
+        Bloquea hasta obtener todos los forms y los retiene durante el bloque
+
+        Yields:
+            Milisegundos que se esperó por los locks
+        """
+        waiter = _Waiter(self._normalize(form_names))
+        start = time.perf_counter()
+
+        with self._condition:
+            self._waiting.append(waiter)
+            try:
+                while not self._can_run(waiter):
+                    self._condition.wait()
+            finally:
+                self._waiting.remove(waiter)
+            self._held |= waiter.names
+
+        try:
+            yield round((time.perf_counter() - start) * 1000, 2)
+        finally:
+            with self._condition:
+                self._held -= waiter.names
+                self._condition.notify_all()
+
+    def held_forms(self) -> Set[str]:
+        """Forms actualmente en deployment (para diagnóstico)"""
+        with self._condition:
+            return set(self._held)
+
+
+# Singleton compartido por todos los deployments del proceso
+form_locks = FormLockManager()
@@ -0,0 +1,375 @@
+"""
+Deployment Service
+
+Procesa deployment packages (.zip) generados por GitHub Actions:
+- Extracción segura del .zip (Zip Slip, límites de tamaño y extensiones)
+- Lectura y validación de manifest.json
+- Upsert de cada form en SQL Server (serializado por form, ver deployment_scheduler.py)
+- Carga del código desplegado en el cache en disco (code_cache.py)
+- Source maps guardados aparte del código (source_maps.py)
+- Aviso al feed de cambios para publicar el deploy en el stream (form_changes.py)
+- Registro del deployment en el ledger (versiones desplegadas y las current
+  anteriores), para promover o revertir el package completo
+
+Usado tanto por el endpoint sincrónico POST /api/deployment/upload como por
+la cola de deployment jobs en background (deployment_jobs.py).
+"""
+
+import json
+import time
+import zipfile
+from pathlib import Path
+from typing import Callable, List, Optional
+
+from models import (
+    UploadDeploymentResponse,
+    FormDeploymentResult,
+    DeploymentManifest
+)
+from database import (
+    upsert_custom_form,
+    save_form_source_map,
+    get_current_form_versions,
+    record_form_deployment
+)
+from deployment_scheduler import form_locks
+from code_cache import code_cache, FORM_CODE_CACHE_ENABLED
+from source_maps import read_source_map_file, split_source_map, is_valid_source_map
+from form_changes import change_feed
+
+
+# Configuration constants
+MAX_ZIP_FILES = 100
+MAX_ZIP_SIZE_MB = 50
+ALLOWED_EXTENSIONS = {'.json', '.js', '.map', '.txt', '.md'}
+
+# Callback de progreso: on_event(event_type, details=..., form=..., summary=...)
+# Ver DeploymentProgressEvent para los tipos de evento.
+ProgressCallback = Callable[..., None]
+
+
+def _elapsed_ms(start: float) -> float:
+    """Milisegundos transcurridos desde start (time.perf_counter)"""
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _emit(on_event: Optional[ProgressCallback], event: str, **payload) -> None:
+    """Notifica un evento de progreso sin dejar que un error del listener corte el deployment"""
+    if not on_event:
+        return
+    try:
+        on_event(event, **payload)
+    except Exception as e:
+        print(f"[Deployment API] Warning: progress listener failed on '{event}': {e}")
+
+
+def safe_extract(zip_file: zipfile.ZipFile, extract_dir: Path) -> List[str]:
+    """
+    SECURITY: Extrae ZIP validando que no hay path traversal (Zip Slip)
+
+    Validates:
+    - No path traversal attempts (../, ..\\)
+    - File count limit (max MAX_ZIP_FILES files)
+    - Total size limit (max MAX_ZIP_SIZE_MB MB)
+    - Allowed file extensions only
+    - No dangerous characters in filenames
+
+    Args:
+        zip_file: ZipFile object to extract
+        extract_dir: Destination directory (must be absolute path)
+
+    Returns:
+        List of extracted file paths (relative to extract_dir)
+
+    Raises:
+        ValueError: If validation fails (path traversal, too many files, etc.)
+    """
+    extract_dir = extract_dir.resolve()
+    members = zip_file.namelist()
+
+    # SECURITY: Validar número de archivos
+    if len(members) > MAX_ZIP_FILES:
+        raise ValueError(
+            f"Zip contains too many files. Max: {MAX_ZIP_FILES}, Found: {len(members)}"
+        )
+
+    # SECURITY: Validar tamaño total
+    total_size = sum(zinfo.file_size for zinfo in zip_file.filelist)
+    max_size_bytes = MAX_ZIP_SIZE_MB * 1024 * 1024
+    if total_size > max_size_bytes:
+        raise ValueError(
+            f"Zip too large. Max: {MAX_ZIP_SIZE_MB}MB, "
+            f"Found: {total_size / 1024 / 1024:.2f}MB"
+        )
+
+    extracted_files = []
+
+    for member in members:
+        # SECURITY: Validar que el path no sale del directorio (Zip Slip prevention)
+        member_path = (extract_dir / member).resolve()
+
+        if not str(member_path).startswith(str(extract_dir)):
+            raise ValueError(f"Zip Slip attempt detected: {member}")
+
+        # SECURITY: Validar extensiones permitidas
+        file_ext = Path(member).suffix.lower()
+        if file_ext and file_ext not in ALLOWED_EXTENSIONS:
+            raise ValueError(
+                f"Invalid file type in zip: {member} (extension: {file_ext}). "
+                f"Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
+            )
+
+        # SECURITY: Validar nombres de archivo (no caracteres peligrosos)
+        if any(char in member for char in ['..', '~', '\\']):
+            raise ValueError(f"Invalid characters in filename: {member}")
+
+        # SECURITY: Prevenir null bytes en nombres de archivo
+        if '\x00' in member:
+            raise ValueError(f"Null byte in filename: {member}")
+
+        extracted_files.append(member)
+
+    # Si todas las validaciones pasaron, extraer
+    zip_file.extractall(extract_dir)
+
+    return extracted_files
+
+
+def load_manifest(extract_dir: Path) -> DeploymentManifest:
+    """
+    Lee y valida manifest.json desde el directorio extraído
+
+    Raises:
+        Exception: Si manifest.json no existe o es inválido
+    """
+    manifest_path = extract_dir / "manifest.json"
+    print(f"[Deployment API] Looking for manifest at: {manifest_path}")
+    if not manifest_path.exists():
+        raise Exception("manifest.json not found in deployment package")
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest_data = json.load(f)
+        return DeploymentManifest(**manifest_data)
+
+
+def process_form(form_info, extract_dir: Path, manifest: DeploymentManifest) -> FormDeploymentResult:
+    """
+    Procesa un form individual del deployment package
+    """
+    start = time.perf_counter()
+    result = FormDeploymentResult(
+        formName=form_info.formName,
+        success=False,
+        action="failed",
+        error=None
+    )
+
+    try:
+        # Leer código compilado
+        form_code_path = extract_dir / form_info.path
+        if not form_code_path.exists():
+            raise Exception(f"Form file not found: {form_info.path}")
+
+        with open(form_code_path, 'r', encoding='utf-8') as f:
+            compiled_code = f.read()
+
+        # El source map no viaja con el código: se guarda aparte y se sirve a pedido
+        compiled_code, source_map = split_source_map(
+            compiled_code,
+            read_source_map_file(extract_dir, form_info.path, form_info.sourceMapPath)
+        )
+        if source_map is not None and not is_valid_source_map(source_map):
+            print(f"[Deployment API] Warning: Ignoring invalid source map for {form_info.formName}")
+            source_map = None
+
+        print(f"[Deployment API] Processing form: {form_info.formName} ({len(compiled_code)} bytes)")
+
+        # Guardar en BD usando stored procedure
+        db_result = upsert_custom_form(
+            form_name=form_info.formName,
+            process_name=form_info.processName,
+            version=form_info.version,
+            description=form_info.description,
+            author=form_info.author,
+            compiled_code=compiled_code,
+            size_bytes=len(compiled_code),
+            package_version=manifest.packageVersion,
+            commit_hash=manifest.commitHash,
+            build_date=manifest.buildDate,  # Pass datetime object directly
+            release_notes=form_info.releaseNotes or ""
+        )
+
+        result.success = db_result["success"]
+        result.action = db_result["action"]
+        change_feed.notify()
+
+        # Sin source map también se guarda: borra el de una build anterior de la misma versión
+        try:
+            save_form_source_map(form_info.formName, form_info.version, source_map)
+        except Exception as e:
+            print(f"[Deployment API] Warning: Failed to save source map for {form_info.formName}: {str(e)}")
+
+        # El primer request de la versión nueva ya sale del cache en disco
+        if FORM_CODE_CACHE_ENABLED:
+            code_cache.warm(compiled_code)
+
+        print(f"[Deployment API] Form {form_info.formName} {result.action} successfully")
+
+    except Exception as e:
+        print(f"[Deployment API] Error processing form {form_info.formName}: {str(e)}")
+        result.success = False
+        result.action = "failed"
+        result.error = str(e)
+
+    result.durationMs = _elapsed_ms(start)
+    return result
+
+
+def _record_deployment(
+    manifest: DeploymentManifest,
+    response: UploadDeploymentResponse,
+    previous_versions: dict,
+    deployed_by: Optional[str]
+) -> Optional[int]:
+    """Registra los forms desplegados en el ledger; un error no falla el deployment"""
+    deployed = [
+        (form_info.formName, form_info.version, previous_versions.get(form_info.formName))
+        for form_info, result in zip(manifest.forms, response.results)
+        if result.success
+    ]
+    try:
+        return record_form_deployment(manifest.packageVersion, manifest.commitHash, deployed_by, deployed)
+    except Exception as e:
+        print(f"[Deployment API] Warning: Failed to record deployment: {str(e)}")
+        return None
+
+
+def run_deployment(
+    zip_path: Path,
+    work_dir: Path,
+    on_event: Optional[ProgressCallback] = None,
+    deployed_by: Optional[str] = None
+) -> UploadDeploymentResponse:
+    """
+    Ejecuta el deployment completo de un package ya guardado en disco
+
+    Esta función es sincrónica (pyodbc es bloqueante): los callers async deben
+    ejecutarla en un thread (run_in_threadpool / asyncio.to_thread).
+
+    Args:
+        zip_path: Path al .zip del deployment package
+        work_dir: Directorio de staging exclusivo para este deployment.
+                  El caller es responsable de eliminarlo.
+        on_event: Callback opcional de progreso (zip_validated, manifest_parsed,
+                  forms_locked, form_processed, summary). Se invoca desde el thread del deployment.
+        deployed_by: Usuario que hizo el deployment (ledger)
+
+    Returns:
+        UploadDeploymentResponse con resultados por form y stageTimings (ms)
+    """
+    total_start = time.perf_counter()
+    timings = {}
+
+    response = UploadDeploymentResponse(
+        success=False,
+        message="",
+        formsProcessed=0,
+        formsInserted=0,
+        formsUpdated=0,
+        errors=[],
+        results=[]
+    )
+
+    try:
+        # SECURITY: Extraer .zip con validaciones de seguridad
+        stage_start = time.perf_counter()
+        extract_dir = work_dir / "extracted"
+        extract_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+                extracted_files = safe_extract(zip_ref, extract_dir)
+                print(f"[Deployment API] Safely extracted {len(extracted_files)} files to: {extract_dir}")
+        except (ValueError, zipfile.BadZipFile) as e:
+            # Validación de seguridad falló
+            raise Exception(f"Security validation failed: {str(e)}")
+
+        timings["extract"] = _elapsed_ms(stage_start)
+        _emit(on_event, "zip_validated", details={
+            "files": len(extracted_files),
+            "durationMs": timings["extract"]
+        })
+
+        # Leer manifest.json
+        stage_start = time.perf_counter()
+        manifest = load_manifest(extract_dir)
+        timings["manifest"] = _elapsed_ms(stage_start)
+        _emit(on_event, "manifest_parsed", details={
+            "packageVersion": manifest.packageVersion,
+            "commitHash": manifest.commitHash,
+            "forms": len(manifest.forms),
+            "durationMs": timings["manifest"]
+        })
+
+        print(f"[Deployment API] Package version: {manifest.packageVersion}")
+        print(f"[Deployment API] Forms to process: {len(manifest.forms)}")
+
+        response.formsProcessed = len(manifest.forms)
+
+        # Esperar a que otros deployments de los mismos forms terminen
+        # (forms distintos se procesan en paralelo)
+        with form_locks.hold(form_info.formName for form_info in manifest.forms) as wait_ms:
+            timings["lockWait"] = wait_ms
+            _emit(on_event, "forms_locked", details={
+                "forms": len(manifest.forms),
+                "waitMs": wait_ms
+            })
+            if wait_ms >= 1000:
+                print(f"[Deployment API] Waited {wait_ms} ms for concurrent deployments of the same forms")
+
+            # Versiones current antes del package (para poder revertirlo)
+            try:
+                previous_versions = get_current_form_versions([form_info.formName for form_info in manifest.forms])
+            except Exception as e:
+                print(f"[Deployment API] Warning: Failed to read current versions: {str(e)}")
+                previous_versions = None
+
+            # Procesar cada form
+            stage_start = time.perf_counter()
+            for form_info in manifest.forms:
+                result = process_form(form_info, extract_dir, manifest)
+                response.results.append(result)
+                _emit(on_event, "form_processed", form=result)
+
+                if result.success:
+                    if result.action == "inserted":
+                        response.formsInserted += 1
+                    elif result.action == "updated":
+                        response.formsUpdated += 1
+                else:
+                    response.errors.append(f"{form_info.formName}: {result.error}")
+            timings["forms"] = _elapsed_ms(stage_start)
+
+            if previous_versions is not None:
+                response.deploymentId = _record_deployment(manifest, response, previous_versions, deployed_by)
+
+        # Resultado final
+        response.success = len(response.errors) == 0
+        response.message = (
+            f"Deployment successful: {response.formsInserted} inserted, {response.formsUpdated} updated"
+            if response.success
+            else f"Deployment completed with errors: {len(response.errors)} failed"
+        )
+
+        print(f"[Deployment API] {response.message}")
+
+    except Exception as e:
+        print(f"[Deployment API] Error: {str(e)}")
+        response.success = False
+        response.message = f"Deployment failed: {str(e)}"
+        response.errors.append(str(e))
+
+    timings["total"] = _elapsed_ms(total_start)
+    response.stageTimings = timings
+    _emit(on_event, "summary", summary=response)
+    return response
@@ -0,0 +1,243 @@
+"""
+Form Changes
+
+Feed de cambios del catálogo de forms (tabla CustomFormChanges, migración 011)
+para GET /api/custom-forms/changes:
+
+- Cada cambio de la versión current de un form (deploy, cambio de versión,
+  borrado) tiene un changeId creciente que los clientes usan como cursor.
+- Cada worker tiene un solo poller que consulta la tabla cada
+  FORM_CHANGES_POLL_INTERVAL_MS y guarda los últimos cambios en memoria: los
+  requests en long-poll esperan en memoria y no consultan la BD.
+- Un cursor más viejo que el buffer en memoria se resuelve con una query.
+- Stream SSE (GET /api/custom-forms/changes/stream): el poller reparte cada
+  cambio, formateado una sola vez, a una cola acotada por cliente. Un cliente
+  que no consume su cola se desconecta y al reconectar (Last-Event-ID) sigue
+  desde su cursor, así un cliente lento no acumula memoria.
+- Los cambios hechos por este worker piden un poll inmediato (notify), así se
+  publican apenas se commitean; los de otros workers o del backend .NET llegan
+  en el siguiente poll.
+"""
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import AsyncIterator, Callable, Deque, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from fastapi.concurrency import run_in_threadpool
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_CHANGES_POLL_INTERVAL_MS = int(os.getenv("FORM_CHANGES_POLL_INTERVAL_MS", "1000"))
+FORM_CHANGES_MAX_WAIT_SECONDS = int(os.getenv("FORM_CHANGES_MAX_WAIT_SECONDS", "30"))
+FORM_CHANGES_BUFFER_SIZE = int(os.getenv("FORM_CHANGES_BUFFER_SIZE", "1000"))
+FORM_CHANGES_STREAM_MAX_CLIENTS = int(os.getenv("FORM_CHANGES_STREAM_MAX_CLIENTS", "5000"))
+FORM_CHANGES_STREAM_QUEUE_SIZE = int(os.getenv("FORM_CHANGES_STREAM_QUEUE_SIZE", "100"))
+FORM_CHANGES_STREAM_HEARTBEAT_SECONDS = 15
+FORM_CHANGES_STREAM_RETRY_MS = 2000
+
+
+def format_change_event(change: dict) -> str:
+    """Cambio en formato Server-Sent Events (id = changeId, para Last-Event-ID)"""
+    return f"id: {change['changeId']}\nevent: form_changed\ndata: {json.dumps(change)}\n\n"
+
+
+class _Subscriber:
+    """Cola de eventos pendientes de un cliente del stream"""
+
+    def __init__(self):
+        self.messages: Deque[Tuple[int, str]] = deque()
+        self.ready = asyncio.Event()
+        self.overflowed = False
+
+
+class FormChangeFeed:
+    """Cambios recientes del catálogo y espera de cambios nuevos (uno por worker)"""
+
+    def __init__(self, poll_interval_ms: int, buffer_size: int):
+        self.poll_interval = poll_interval_ms / 1000
+        self.buffer_size = buffer_size
+        self.latest_id: Optional[int] = None  # None hasta el primer poll
+        self._changes: Deque[dict] = deque(maxlen=buffer_size)
+        self._changed = asyncio.Event()
+        self._subscribers: Set[_Subscriber] = set()
+        self._poll_now: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listeners: List[Callable[[List[dict]], None]] = []
+
+    def add_listener(self, listener: Callable[[List[dict]], None]) -> None:
+        """Registra una función que recibe los cambios nuevos de cada poll (ej: invalidar caches)"""
+        self._listeners.append(listener)
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def poll(self) -> List[dict]:
+        """
+        Trae los cambios nuevos de la BD y despierta a los requests en espera
+
+        Returns:
+            Cambios nuevos
+        """
+        from database import get_form_changes, get_latest_form_change_id
+
+        if self.latest_id is None:
+            self.latest_id = await run_in_threadpool(get_latest_form_change_id)
+            return []
+
+        changes = await run_in_threadpool(get_form_changes, self.latest_id, self.buffer_size)
+        if changes:
+            self._changes.extend(changes)
+            self.latest_id = changes[-1]["changeId"]
+            # Se reemplaza el evento: los que esperaban se despiertan y los nuevos esperan el siguiente
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+            self._broadcast(changes)
+            for listener in self._listeners:
+                try:
+                    listener(changes)
+                except Exception as e:
+                    print(f"[Form Changes] Warning: Listener failed: {e}")
+        return changes
+
+    def _broadcast(self, changes: List[dict]) -> None:
+        """Encola los cambios en cada cliente del stream; desconecta a los que no consumen"""
+        messages = [(change["changeId"], format_change_event(change)) for change in changes]
+        for subscriber in list(self._subscribers):
+            if len(subscriber.messages) + len(messages) > FORM_CHANGES_STREAM_QUEUE_SIZE:
+                subscriber.overflowed = True
+                subscriber.messages.clear()
+                self._subscribers.discard(subscriber)
+            else:
+                subscriber.messages.extend(messages)
+            subscriber.ready.set()
+
+    def notify(self) -> None:
+        """
+        Pide un poll inmediato. Llamar después del commit de un cambio del
+        catálogo; se puede llamar desde cualquier thread.
+        """
+        if self._loop is None or self._poll_now is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._poll_now.set)
+        except RuntimeError:
+            pass  # Loop cerrado (shutdown)
+
+    async def run(self) -> None:
+        """Poller (tarea de background, ver main.py). Si la BD falla espera cada vez más, hasta 1 minuto."""
+        self._loop = asyncio.get_running_loop()
+        self._poll_now = asyncio.Event()
+        failures = 0
+        while True:
+            self._poll_now.clear()
+            try:
+                await self.poll()
+                failures = 0
+            except Exception as e:
+                if not failures:
+                    print(f"[Form Changes] Warning: Poll failed: {e}")
+                failures += 1
+            try:
+                await asyncio.wait_for(
+                    self._poll_now.wait(),
+                    min(self.poll_interval * 2 ** min(failures, 10), 60)
+                )
+            except asyncio.TimeoutError:
+                pass
+
+    async def changes_since(self, since: int, limit: int) -> Tuple[List[dict], int]:
+        """
+        Cambios posteriores a un cursor
+
+        Returns:
+            (cambios, cursor para el próximo request)
+        """
+        from database import get_form_changes
+
+        if self.latest_id is not None and since >= self.latest_id:
+            return [], since
+
+        # Los ChangeId pueden tener huecos: el buffer alcanza solo si empieza justo después del cursor
+        if self._changes and self._changes[0]["changeId"] <= since + 1:
+            changes = [change for change in self._changes if change["changeId"] > since][:limit]
+        else:
+            changes = await run_in_threadpool(get_form_changes, since, limit)
+
+        return changes, changes[-1]["changeId"] if changes else since
+
+    async def wait(self, since: int, timeout: float, limit: int = 1000) -> Tuple[List[dict], int]:
+        """
+        Long-poll: espera hasta que haya cambios posteriores al cursor o venza el timeout
+
+        Returns:
+            (cambios, cursor); sin cambios si venció el timeout
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            changed = self._changed
+            changes, cursor = await self.changes_since(since, limit)
+            remaining = deadline - loop.time()
+            if changes or remaining <= 0:
+                return changes, cursor
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def stream(self, since: Optional[int] = None) -> AsyncIterator[str]:
+        """
+        Stream de cambios en formato Server-Sent Events
+
+        Re-envía los cambios posteriores a `since` (Last-Event-ID) y sigue en
+        vivo. Envía un comentario keep-alive si no hay actividad y termina si el
+        cliente se atrasa más de FORM_CHANGES_STREAM_QUEUE_SIZE eventos (el
+        EventSource reconecta y sigue desde su último id).
+        """
+        from database import get_latest_form_change_id
+
+        # Suscribir antes de leer el cursor: ningún cambio queda entre la lectura y el stream en vivo
+        subscriber = _Subscriber()
+        self._subscribers.add(subscriber)
+        try:
+            yield f"retry: {FORM_CHANGES_STREAM_RETRY_MS}\n\n"
+
+            if since is None:
+                since = self.latest_id
+                if since is None:
+                    since = await run_in_threadpool(get_latest_form_change_id)
+
+            while True:
+                changes, since = await self.changes_since(since, self.buffer_size)
+                for change in changes:
+                    yield format_change_event(change)
+                if len(changes) < self.buffer_size:
+                    break
+
+            while not subscriber.overflowed:
+                try:
+                    await asyncio.wait_for(subscriber.ready.wait(), FORM_CHANGES_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                subscriber.ready.clear()
+                while subscriber.messages:
+                    change_id, message = subscriber.messages.popleft()
+                    # Los cambios ya re-enviados desde el cursor también llegan por la cola
+                    if change_id > since:
+                        since = change_id
+                        yield message
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+# Singleton usado por main.py
+change_feed = FormChangeFeed(FORM_CHANGES_POLL_INTERVAL_MS, FORM_CHANGES_BUFFER_SIZE)
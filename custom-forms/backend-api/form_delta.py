@@ -0,0 +1,205 @@
+"""
+Form Delta Storage
+
+Almacenamiento opcional de versiones no-current como deltas binarios contra
+una versión base (CodeEncoding 'delta-gzip', migración 007).
+
+Reglas (garantizan cadenas de profundidad 1):
+- La versión current nunca es un delta: se lee a velocidad completa.
+- Una versión base siempre está completa (nunca es a su vez un delta).
+- El job de re-basing (database.rebase_form_deltas) re-codifica los deltas
+  contra la versión current de cada form.
+
+Formato del delta (antes de gzip):
+    b"FDL1" | sha256(target) (32 bytes) | varint(len(target)) | ops...
+    op copy:   b"C" varint(offset en base) varint(length)
+    op insert: b"I" varint(length) bytes
+
+Los bundles suelen estar minificados (pocas líneas muy largas), por lo que
+el diff se calcula sobre tokens cortados después de ';', '}' y saltos de línea.
+"""
+
+import difflib
+import gzip
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_DELTA_STORAGE = os.getenv("FORM_DELTA_STORAGE", "false").lower() == "true"
+FORM_DELTA_CACHE_MB = int(os.getenv("FORM_DELTA_CACHE_MB", "32"))
+FORM_DELTA_REBASE_INTERVAL_MINUTES = int(os.getenv("FORM_DELTA_REBASE_INTERVAL_MINUTES", "60"))
+
+# Un delta se guarda solo si ocupa menos que esta fracción de la versión completa comprimida
+DELTA_MAX_RATIO = 0.8
+# Bundles con más tokens se guardan completos (el diff sería demasiado costoso)
+MAX_DELTA_TOKENS = 200_000
+
+DELTA_MAGIC = b"FDL1"
+_OP_COPY = b"C"
+_OP_INSERT = b"I"
+_TOKEN_SPLIT = re.compile(rb"(?<=[;}\n])")
+
+
+class DeltaError(ValueError):
+    """Delta inválido o aplicado sobre una base distinta"""
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        if pos >= len(data):
+            raise DeltaError("Truncated delta")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _tokens(data: bytes) -> List[bytes]:
+    return [token for token in _TOKEN_SPLIT.split(data) if token]
+
+
+def create_delta(base: bytes, target: bytes) -> Optional[bytes]:
+    """
+    Calcula el delta comprimido que reconstruye target a partir de base
+
+    Returns:
+        Delta (gzip) o None si los bundles son demasiado grandes para diferenciarlos
+    """
+    base_tokens = _tokens(base)
+    target_tokens = _tokens(target)
+    if len(base_tokens) > MAX_DELTA_TOKENS or len(target_tokens) > MAX_DELTA_TOKENS:
+        return None
+
+    offsets = [0]
+    for token in base_tokens:
+        offsets.append(offsets[-1] + len(token))
+
+    out = bytearray(DELTA_MAGIC)
+    out += hashlib.sha256(target).digest()
+    _write_varint(out, len(target))
+
+    # autojunk: tokens muy frecuentes (ej: ";") no se indexan, evita un diff cuadrático
+    matcher = difflib.SequenceMatcher(None, base_tokens, target_tokens)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            out += _OP_COPY
+            _write_varint(out, offsets[i1])
+            _write_varint(out, offsets[i2] - offsets[i1])
+        elif j2 > j1:  # replace / insert
+            inserted = b"".join(target_tokens[j1:j2])
+            out += _OP_INSERT
+            _write_varint(out, len(inserted))
+            out += inserted
+
+    return gzip.compress(bytes(out), mtime=0)
+
+
+def apply_delta(base: bytes, delta: bytes) -> bytes:
+    """
+    Reconstruye una versión a partir de su base y su delta
+
+    Raises:
+        DeltaError: Si el delta es inválido o el resultado no coincide con el
+                    sha256 registrado (base distinta a la usada al crearlo)
+    """
+    data = gzip.decompress(delta)
+    if not data.startswith(DELTA_MAGIC):
+        raise DeltaError("Invalid delta header")
+
+    pos = len(DELTA_MAGIC)
+    expected_hash = data[pos:pos + 32]
+    pos += 32
+    expected_length, pos = _read_varint(data, pos)
+
+    parts = []
+    while pos < len(data):
+        op = data[pos:pos + 1]
+        pos += 1
+        if op == _OP_COPY:
+            offset, pos = _read_varint(data, pos)
+            length, pos = _read_varint(data, pos)
+            if offset + length > len(base):
+                raise DeltaError("Delta copies beyond the end of the base version")
+            parts.append(base[offset:offset + length])
+        elif op == _OP_INSERT:
+            length, pos = _read_varint(data, pos)
+            parts.append(data[pos:pos + length])
+            pos += length
+        else:
+            raise DeltaError(f"Unknown delta op: {op!r}")
+
+    target = b"".join(parts)
+    if len(target) != expected_length or hashlib.sha256(target).digest() != expected_hash:
+        raise DeltaError("Reconstructed version does not match its checksum")
+    return target
+
+
+class ReconstructedCodeCache:
+    """
+    Cache LRU (acotado por bytes) de versiones reconstruidas desde deltas
+
+    La key incluye el hash del delta: si el job de re-basing re-codifica la
+    versión, la entrada vieja simplemente deja de usarse.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[int, bytes], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(version_id: int, delta: bytes) -> Tuple[int, bytes]:
+        return version_id, hashlib.sha256(delta).digest()
+
+    def get(self, key: Tuple[int, bytes]) -> Optional[bytes]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Tuple[int, bytes], value: bytes) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton usado por database.py
+reconstruct_cache = ReconstructedCodeCache(FORM_DELTA_CACHE_MB * 1024 * 1024)
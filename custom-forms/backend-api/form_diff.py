@@ -0,0 +1,157 @@
+"""
+Form Diff
+
+Diff unificado entre dos versiones de un form para
+GET /api/custom-forms/{form_name}/diff:
+
+- Se calcula en el servidor (difflib) en un thread del pool, con tope de
+  tamaño de cada bundle (FORM_DIFF_MAX_CODE_KB) y del diff resultante
+  (FORM_DIFF_MAX_OUTPUT_KB), y como mucho FORM_DIFF_MAX_CONCURRENT a la vez.
+- El resultado se guarda comprimido (gzip) en un cache en memoria, acotado por
+  FORM_DIFF_CACHE_MB y direccionado por el par de ContentHash más los labels
+  (form@versión) de los headers del diff: el contenido de un hash nunca
+  cambia, así que una entrada nunca se invalida.
+- El endpoint envía el gzip tal cual a los clientes que aceptan gzip y lo
+  descomprime por partes para el resto.
+"""
+
+import asyncio
+import difflib
+import gzip
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Iterator, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_DIFF_MAX_CODE_KB = int(os.getenv("FORM_DIFF_MAX_CODE_KB", "5120"))
+FORM_DIFF_MAX_OUTPUT_KB = int(os.getenv("FORM_DIFF_MAX_OUTPUT_KB", "10240"))
+FORM_DIFF_MAX_CONCURRENT = int(os.getenv("FORM_DIFF_MAX_CONCURRENT", "2"))
+FORM_DIFF_CACHE_MB = int(os.getenv("FORM_DIFF_CACHE_MB", "64"))
+FORM_DIFF_CONTEXT_LINES = 3
+
+DIFF_CHUNK_SIZE = 64 * 1024
+
+# Diffs calculándose a la vez (CPU del worker)
+diff_slots = asyncio.Semaphore(FORM_DIFF_MAX_CONCURRENT)
+
+
+class DiffTooLargeError(ValueError):
+    """Un bundle o el diff superan el tope configurado"""
+
+
+def unified_diff(
+    from_code: str,
+    to_code: str,
+    from_label: str,
+    to_label: str,
+    max_output_bytes: int
+) -> bytes:
+    """
+    Diff unificado en UTF-8
+
+    Raises:
+        DiffTooLargeError: Si el diff supera max_output_bytes
+    """
+    output = []
+    size = 0
+    lines = difflib.unified_diff(
+        from_code.splitlines(keepends=True),
+        to_code.splitlines(keepends=True),
+        fromfile=from_label,
+        tofile=to_label,
+        n=FORM_DIFF_CONTEXT_LINES
+    )
+    for line in lines:
+        if not line.endswith("\n"):
+            line += "\n\\ No newline at end of file\n"
+        encoded = line.encode("utf-8")
+        size += len(encoded)
+        if size > max_output_bytes:
+            raise DiffTooLargeError(f"Diff exceeds {max_output_bytes // 1024} KB")
+        output.append(encoded)
+    return b"".join(output)
+
+
+def iter_gunzip(data: bytes) -> Iterator[bytes]:
+    """Descomprime un gzip por partes de DIFF_CHUNK_SIZE"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for start in range(0, len(data), DIFF_CHUNK_SIZE):
+        chunk = decompressor.decompress(data[start:start + DIFF_CHUNK_SIZE])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def iter_diff_chunks(data: bytes) -> Iterator[bytes]:
+    for start in range(0, len(data), DIFF_CHUNK_SIZE):
+        yield data[start:start + DIFF_CHUNK_SIZE]
+
+
+class DiffCache:
+    """Diffs comprimidos en memoria por (ContentHash desde, ContentHash hasta, label desde, label hasta), LRU acotado por tamaño"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Tuple[str, ...], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, ...]) -> Optional[bytes]:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def put(self, key: Tuple[str, ...], data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def check_code_sizes(*sizes: int) -> None:
+    """
+    Raises:
+        DiffTooLargeError: Si algún bundle supera FORM_DIFF_MAX_CODE_KB
+    """
+    if any(size > FORM_DIFF_MAX_CODE_KB * 1024 for size in sizes):
+        raise DiffTooLargeError(f"Bundles larger than {FORM_DIFF_MAX_CODE_KB} KB can't be diffed")
+
+
+def compute_diff_gzip(
+    from_code: str,
+    to_code: str,
+    from_label: str,
+    to_label: str
+) -> bytes:
+    """
+    Diff unificado comprimido con gzip (se llama desde un thread del pool)
+
+    Raises:
+        DiffTooLargeError: Si algún bundle o el diff superan los topes
+    """
+    check_code_sizes(len(from_code), len(to_code))
+    diff = unified_diff(from_code, to_code, from_label, to_label, FORM_DIFF_MAX_OUTPUT_KB * 1024)
+    return gzip.compress(diff, compresslevel=6)
+
+
+# Singleton usado por main.py
+diff_cache = DiffCache(FORM_DIFF_CACHE_MB * 1024 * 1024)
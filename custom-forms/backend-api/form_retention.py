@@ -0,0 +1,124 @@
+"""
+Form Version Retention
+
+Política de retención de versiones, aplicada por un job en segundo plano
+(database.prune_form_versions):
+
+- FORM_RETENTION_KEEP_VERSIONS: se conservan las últimas N versiones de cada form.
+- FORM_RETENTION_KEEP_DAYS: se conservan las versiones publicadas en los últimos D días.
+- Una versión se borra solo si ninguna regla activa la conserva, y nunca la current.
+  Con ambas reglas en 0 el job está desactivado.
+- FORM_RETENTION_KEEP_DEPLOYMENTS: tampoco se borran las versiones (Version o
+  PreviousVersion) de los últimos N deployments del ledger (migración 014), así
+  su promoción o rollback no falla con 'missing'. 0 = sin esta protección.
+
+Para no afectar a los deployments ni al log de transacciones:
+- Las candidatas se calculan una sola vez por pasada (un ranking sobre toda la
+  tabla); cada lote vuelve a verificar la política solo para sus versiones.
+- Se borra de a FORM_RETENTION_BATCH_SIZE versiones por transacción (muy por
+  debajo del umbral de escalamiento de locks), con FORM_RETENTION_BATCH_DELAY_MS
+  entre lotes y como mucho FORM_RETENTION_MAX_BATCHES lotes por pasada.
+- Cada lote corre con DEADLOCK_PRIORITY LOW y LOCK_TIMEOUT: ante un conflicto
+  el que cede es el job.
+- FORM_RETENTION_WINDOW (default "22-6") limita el job a una franja horaria
+  (hora local del servidor), fuera del horario de los deployments; vacío = a
+  cualquier hora.
+"""
+
+import asyncio
+import os
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_RETENTION_KEEP_VERSIONS = int(os.getenv("FORM_RETENTION_KEEP_VERSIONS", "0"))
+FORM_RETENTION_KEEP_DAYS = int(os.getenv("FORM_RETENTION_KEEP_DAYS", "0"))
+FORM_RETENTION_KEEP_DEPLOYMENTS = int(os.getenv("FORM_RETENTION_KEEP_DEPLOYMENTS", "20"))
+FORM_RETENTION_INTERVAL_MINUTES = int(os.getenv("FORM_RETENTION_INTERVAL_MINUTES", "60"))
+FORM_RETENTION_BATCH_SIZE = int(os.getenv("FORM_RETENTION_BATCH_SIZE", "50"))
+FORM_RETENTION_BATCH_DELAY_MS = int(os.getenv("FORM_RETENTION_BATCH_DELAY_MS", "500"))
+FORM_RETENTION_MAX_BATCHES = int(os.getenv("FORM_RETENTION_MAX_BATCHES", "200"))
+FORM_RETENTION_WINDOW = os.getenv("FORM_RETENTION_WINDOW", "22-6")
+
+FORM_RETENTION_ENABLED = FORM_RETENTION_KEEP_VERSIONS > 0 or FORM_RETENTION_KEEP_DAYS > 0
+
+# Espera máxima de un lote por locks de deployments/promociones (ms)
+FORM_RETENTION_LOCK_TIMEOUT_MS = 5000
+
+
+def parse_window(value: str) -> Optional[Tuple[int, int]]:
+    """
+    Franja horaria "HH-HH" (ej. "22-6" cruza la medianoche)
+
+    Returns:
+        (hora de inicio, hora de fin), o None si no hay franja
+
+    Raises:
+        ValueError: Si el formato es inválido
+    """
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        start, end = (int(part) for part in value.split("-"))
+    except ValueError:
+        raise ValueError(f"Invalid retention window '{value}' (expected HH-HH)")
+    if not (0 <= start <= 23 and 0 <= end <= 23):
+        raise ValueError(f"Invalid retention window '{value}' (hours must be 0-23)")
+    return start, end
+
+
+def in_window(window: Optional[Tuple[int, int]], now: datetime) -> bool:
+    if window is None:
+        return True
+    start, end = window
+    if start == end:
+        return True
+    if start < end:
+        return start <= now.hour < end
+    return now.hour >= start or now.hour < end
+
+
+retention_window = parse_window(FORM_RETENTION_WINDOW)
+
+
+async def prune_in_batches(
+    find_candidates: Callable[[int], List[int]],
+    prune_batch: Callable[[List[int]], dict],
+    on_batch: Optional[Callable[[dict], None]] = None
+) -> dict:
+    """
+    Calcula las candidatas de la pasada y ejecuta prune_batch lote por lote
+
+    find_candidates(limit) y prune_batch(version_ids) son sincrónicas y corren
+    en un thread. Termina al agotar las candidatas (como mucho
+    FORM_RETENTION_MAX_BATCHES lotes), al salir de la franja horaria o cuando
+    un lote no borra nada (otro worker está podando o las versiones dejaron de
+    estar fuera de la política; la próxima pasada recalcula).
+
+    Returns:
+        dict con 'batches', 'deleted', 'materialized' y 'bytes' de la pasada
+    """
+    totals = {"batches": 0, "deleted": 0, "materialized": 0, "bytes": 0}
+    candidates = await asyncio.to_thread(find_candidates, FORM_RETENTION_BATCH_SIZE * FORM_RETENTION_MAX_BATCHES)
+    for batch, start in enumerate(range(0, len(candidates), FORM_RETENTION_BATCH_SIZE)):
+        if batch:
+            await asyncio.sleep(FORM_RETENTION_BATCH_DELAY_MS / 1000)
+        if not in_window(retention_window, datetime.now()):
+            break
+
+        result = await asyncio.to_thread(prune_batch, candidates[start:start + FORM_RETENTION_BATCH_SIZE])
+        totals["batches"] += 1
+        for key in ("deleted", "materialized", "bytes"):
+            totals[key] += result[key]
+        if not result["deleted"]:
+            break
+        if on_batch:
+            on_batch(result)
+    return totals
@@ -1,12 +1,17 @@
-import os
+import asyncio
+import base64
+import gzip
+import hashlib
 import json
-import zipfile
+import os
 import shutil
 from datetime import datetime
 from pathlib import Path
-from typing import List
-from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Depends
+from typing import Awaitable, Callable, List, Optional, Tuple
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Response, Depends, Header, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import HTTPBearer
 from fastapi.openapi.utils import get_openapi
 from dotenv import load_dotenv
@@ -16,8 +21,9 @@ from slowapi.errors import RateLimitExceeded
 
 from models import (
     UploadDeploymentResponse,
-    FormDeploymentResult,
-    DeploymentManifest,
+    DeploymentJobStatus,
+    ChunkedUploadInitRequest,
+    ChunkedUploadStatus,
     AdminLoginRequest,
     AdminLoginResponse,
     ValidateSessionRequest,
@@ -27,10 +33,12 @@ from models import (
     ValidateDashboardTokenRequest,
     ValidateDashboardTokenResponse,
     DashboardParameters,
-    SecurityToken
+    SecurityToken,
+    FormCodeBatchRequest,
+    FormCodeBatchResult,
+    FormCodeBatchResponse
 )
 from database import (
-    upsert_custom_form,
     test_connection,
     validate_security_token,
     delete_security_token,
@@ -45,6 +53,49 @@ from auth_service import (
 )
 from middleware import AuthMiddleware
 from dependencies import get_current_admin_user
+from deployment_service import run_deployment
+from code_storage import accepts_gzip, encode_compiled_code, CODE_ENCODING_GZIP_UTF8
+from code_cache import code_cache, FORM_CODE_CACHE_ENABLED
+from form_delta import FORM_DELTA_STORAGE, FORM_DELTA_REBASE_INTERVAL_MINUTES
+from form_retention import (
+    FORM_RETENTION_ENABLED,
+    FORM_RETENTION_KEEP_VERSIONS,
+    FORM_RETENTION_KEEP_DAYS,
+    FORM_RETENTION_KEEP_DEPLOYMENTS,
+    FORM_RETENTION_INTERVAL_MINUTES,
+    FORM_RETENTION_WINDOW,
+    retention_window,
+    in_window,
+    prune_in_batches
+)
+from blob_storage import get_blob_store, BLOB_BACKENDS
+from source_maps import FORM_SOURCE_MAPS_ENABLED
+from version_ranges import form_version_index, is_version_range
+from form_diff import (
+    diff_cache,
+    diff_slots,
+    check_code_sizes,
+    compute_diff_gzip,
+    iter_diff_chunks,
+    iter_gunzip,
+    DiffTooLargeError
+)
+from form_changes import change_feed, FORM_CHANGES_MAX_WAIT_SECONDS, FORM_CHANGES_STREAM_MAX_CLIENTS
+from deployment_scheduler import create_staging_dir
+from deployment_jobs import job_queue
+from chunked_uploads import (
+    upload_store,
+    UploadIncompleteError,
+    MAX_CHUNK_SIZE,
+    DEPLOYMENT_UPLOAD_TTL_HOURS
+)
+from deployment_idempotency import (
+    result_store,
+    package_digest,
+    resolve_idempotency_key,
+    IdempotencyConflictError
+)
+from validators import validate_job_id, validate_upload_id, validate_sha256
 
 # Load environment variables from .env.local (if exists) or .env
 # .env.local takes precedence (Next.js convention)
@@ -67,6 +118,10 @@ app = FastAPI(
     - Upload .zip packages generated by GitHub Actions
     - Automatic form versioning
     - SQL Server storage
+    - Background deployment jobs with status polling
+    - Live deployment progress over Server-Sent Events
+    - Chunked, resumable uploads for large packages
+    - Idempotent deployments (`Idempotency-Key` header or package digest)
 
     ### 🎫 Form Token Validation
     - Security token validation (SecurityTokens)
@@ -189,6 +244,9 @@ app.openapi = custom_openapi
 MAX_UPLOAD_SIZE_MB = int(os.getenv("MAX_UPLOAD_SIZE_MB", "50"))
 MAX_UPLOAD_SIZE_BYTES = MAX_UPLOAD_SIZE_MB * 1024 * 1024
 TEMP_UPLOAD_PATH = os.getenv("TEMP_UPLOAD_PATH", "./temp-uploads")
+FORM_CODE_BATCH_MAX_FORMS = int(os.getenv("FORM_CODE_BATCH_MAX_FORMS", "50"))
+FORM_LIST_MAX_PAGE_SIZE = int(os.getenv("FORM_LIST_MAX_PAGE_SIZE", "500"))
+FORM_VERSIONS_MAX_PAGE_SIZE = int(os.getenv("FORM_VERSIONS_MAX_PAGE_SIZE", "100"))
 
 # Ensure temp directory exists
 Path(TEMP_UPLOAD_PATH).mkdir(parents=True, exist_ok=True)
@@ -654,83 +712,828 @@ async def validate_dashboard_token_endpoint(request: Request, data: ValidateDash
 # Custom Forms Endpoints
 # ==============================================================================
 
+def _encode_page_cursor(values: list) -> str:
+    """Cursor opaco de keyset pagination (valores de la última fila de la página)"""
+    return base64.urlsafe_b64encode(json.dumps(values).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_page_cursor(cursor: str) -> list:
+    """
+    Valores de un cursor de _encode_page_cursor
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list):
+        raise ValueError("Invalid cursor")
+    return values
+
+
 @app.get("/api/custom-forms", tags=["Custom Forms"])
-def get_custom_forms():
+def get_custom_forms(
+    processName: Optional[str] = None,
+    status: str = "active",
+    updatedSince: Optional[datetime] = None,
+    fields: Optional[str] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None
+):
     """
     Get list of all custom forms
 
     Returns information about all active forms with their current version.
     Includes: name, associated process, version, description, author, size, dates.
+
+    **Filters** (applied in the query): `processName`, `status` (`active`,
+    `inactive`, `deprecated` or `all`; default `active`) and `updatedSince`
+    (ISO date). `fields` is a comma-separated list of the fields to return,
+    e.g. `fields=formName,currentVersion`.
+
+    **Pagination:** with `limit` (1-FORM_LIST_MAX_PAGE_SIZE) the response is
+    `{"items": [...], "nextCursor": "..."}`; send `nextCursor` as `cursor` to
+    get the next page (`null` on the last page). Without `limit` or `cursor`
+    the response is the full array, as before.
     """
-    from database import get_all_custom_forms
+    from database import get_custom_forms_page
+
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        limit = limit if limit is not None else FORM_LIST_MAX_PAGE_SIZE
+        if not 1 <= limit <= FORM_LIST_MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"Invalid limit (1-{FORM_LIST_MAX_PAGE_SIZE})")
 
     try:
-        forms = get_all_custom_forms()
+        after = None
+        if cursor is not None:
+            values = _decode_page_cursor(cursor)
+            if len(values) != 1 or not isinstance(values[0], str):
+                raise ValueError("Invalid cursor")
+            after = values[0]
+
+        forms, next_after = get_custom_forms_page(
+            process_name=processName,
+            status=None if status == "all" else status,
+            updated_since=updatedSince,
+            fields=[field.strip() for field in fields.split(",")] if fields else None,
+            after=after,
+            limit=limit if paginated else None
+        )
         print(f"[Forms API] Returning {len(forms)} forms")
-        return forms
+
+        if not paginated:
+            return forms
+        return {
+            "items": forms,
+            "nextCursor": _encode_page_cursor([next_after]) if next_after else None
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[Forms API] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch forms: {str(e)}")
 
 
-@app.get("/api/custom-forms/{form_name}/code", tags=["Custom Forms"])
-def get_form_compiled_code_endpoint(form_name: str, version: str = None):
+def _form_code_headers(form_name: str, info: dict) -> dict:
+    """Headers de las respuestas de /code (info: metadata o código de la versión)"""
+    headers = {
+        'Cache-Control': 'no-cache, no-store, must-revalidate',
+        'X-Form-Version': info['version'],
+        'X-Published-At': info['published_at'],
+        'X-Size-Bytes': str(info['size_bytes']),
+        'Vary': 'Accept-Encoding',
+    }
+    if FORM_SOURCE_MAPS_ENABLED and info.get('has_source_map'):
+        # Las devtools lo piden solo cuando están abiertas; fijado a la versión servida
+        headers['SourceMap'] = f"/api/custom-forms/{form_name}/sourcemap?version={info['version']}"
+    return headers
+
+
+JS_MEDIA_TYPE = 'application/javascript; charset=utf-8'
+
+
+def _resolve_version(form_name: str, version: Optional[str]) -> Optional[str]:
+    """
+    Versión exacta de ?version=: resuelve rangos semver con el índice en memoria (version_ranges.py)
+
+    Raises:
+        HTTPException: 404 si ninguna versión del form está en el rango
+        ValueError: Si el rango es inválido
+    """
+    if not version or not is_version_range(version):
+        return version  # Versión exacta (o inválida: la valida la capa de BD)
+
+    resolved = form_version_index.resolve(form_name, version)
+    if not resolved:
+        raise HTTPException(status_code=404, detail=f"No version of form '{form_name}' matches '{version}'")
+    return resolved
+
+
+def _form_code_etag(info: dict, gzip_encoded: bool) -> Optional[str]:
+    """
+    ETag fuerte de la respuesta de /code: el ContentHash de la versión
+
+    La representación gzip lleva otro ETag (las dos tienen bytes distintos,
+    y Range/If-Range se aplican sobre los bytes enviados). Las versiones sin
+    ContentHash (anteriores a la migración 008) no tienen ETag.
+    """
+    digest = info.get('content_hash')
+    if not digest:
+        return None
+    return f'"{digest}-gzip"' if gzip_encoded else f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: Optional[str]) -> bool:
+    """Compara If-None-Match con el ETag (comparación débil, RFC 9110 13.1.2)"""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return etag in [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+
+
+def _parse_byte_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Rango de un header Range con un solo rango de bytes
+
+    Returns:
+        (start, end) inclusive, o None si el header se ignora (varios rangos,
+        otra unidad o sintaxis inválida) y se envía la respuesta completa
+
+    Raises:
+        ValueError: Si el rango no se puede satisfacer (416)
+    """
+    unit, _, spec = range_header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return None
+    first, sep, last = spec.strip().partition('-')
+    if not sep or not (first or last) or not all(part.isdigit() for part in (first, last) if part):
+        return None
+
+    if not first:
+        # bytes=-N: los últimos N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - int(last), 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError("Unsatisfiable range")
+    if start > end:
+        return None
+    return start, end
+
+
+def _iter_file_range(path: Path, start: int, end: int, chunk_size: int = 64 * 1024):
+    """Bytes start..end (inclusive) de un archivo, por partes"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _ranged_response(
+    request: Request,
+    headers: dict,
+    content: Optional[bytes] = None,
+    path: Optional[Path] = None
+) -> Response:
+    """
+    Respuesta completa o 206 para un Range de un solo rango
+
+    El Range se aplica solo si If-Range (cuando viene) coincide con el ETag de
+    la respuesta; si no, se envía el bundle completo.
+    """
+    size = len(content) if content is not None else path.stat().st_size
+    headers['Accept-Ranges'] = 'bytes'
+
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and (if_range is None or if_range == headers.get('ETag')):
+        try:
+            byte_range = _parse_byte_range(range_header, size)
+        except ValueError:
+            return Response(status_code=416, headers={'Content-Range': f'bytes */{size}'})
+
+        if byte_range:
+            start, end = byte_range
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            if content is not None:
+                return Response(content=content[start:end + 1], status_code=206, media_type=JS_MEDIA_TYPE, headers=headers)
+            headers['Content-Length'] = str(end - start + 1)
+            return StreamingResponse(_iter_file_range(path, start, end), status_code=206, media_type=JS_MEDIA_TYPE, headers=headers)
+
+    if content is not None:
+        return Response(content=content, media_type=JS_MEDIA_TYPE, headers=headers)
+    return FileResponse(path, media_type=JS_MEDIA_TYPE, headers=headers)
+
+
+def _gzip_file_response(request: Request, path: Path, info: dict, headers: dict) -> Response:
+    """Envía un bundle gzip desde disco con sendfile (o el rango pedido)"""
+    headers['Content-Encoding'] = 'gzip'
+    etag = _form_code_etag(info, True)
+    if etag:
+        headers['ETag'] = etag
+    return _ranged_response(request, headers, path=path)
+
+
+def _sends_gzip(info: dict, wants_gzip: bool) -> bool:
+    """
+    Indica si el GET de /code envía esta versión con Content-Encoding: gzip
+
+    Lo usan HEAD e If-None-Match para anunciar el mismo ETag sin leer el código.
+    """
+    if not wants_gzip:
+        return False
+    if info.get('code_encoding') == CODE_ENCODING_GZIP_UTF8 or info['storage_backend'] in BLOB_BACKENDS:
+        return True
+    return _local_form_code_path(info) is not None
+
+
+def _local_form_code_path(info: dict) -> Optional[Path]:
+    """Archivo gzip local con el código de la versión: blob del backend filesystem o entrada del cache en disco"""
+    digest = info['content_hash']
+    if not digest:
+        return None
+    if info['storage_backend'] in BLOB_BACKENDS:
+        blob_path = get_blob_store(info['storage_backend']).local_path(digest)
+        if blob_path:
+            return blob_path
+    if FORM_CODE_CACHE_ENABLED:
+        return code_cache.get(digest)
+    return None
+
+
+def _cache_form_code(result: dict) -> Optional[Path]:
+    """
+    Guarda en el cache en disco el código leído de la BD (primer fetch)
+
+    Las versiones desplegadas antes de la migración 008 reciben su ContentHash acá.
+    """
+    from database import set_version_content_hash
+
+    code = result['code']
+    try:
+        data = code.gzip_utf8()
+        if data is None:
+            data, _ = encode_compiled_code(code.text)
+        digest = result['content_hash']
+        if not digest:
+            digest = hashlib.sha256(code.utf8_bytes()).hexdigest()
+            set_version_content_hash(result['version_id'], digest)
+        return code_cache.put(digest, data)
+    except Exception as e:
+        print(f"[Code Cache] Warning: Failed to cache {result['version']}: {e}")
+        return None
+
+
+@app.api_route("/api/custom-forms/{form_name}/code", methods=["GET", "HEAD"], tags=["Custom Forms"])
+def get_form_compiled_code_endpoint(form_name: str, request: Request, version: str = None):
     """
     Get compiled code for a specific form
 
     Returns the compiled JavaScript for the form.
     If version not specified, returns current (most recent) version.
 
+    Clients sending `Accept-Encoding: gzip` receive the compressed bundle as
+    stored (`Content-Encoding: gzip`), without decompressing it. Bundles in the
+    filesystem blob store (FORM_CODE_STORAGE=filesystem) or in the node-local
+    disk cache (FORM_CODE_CACHE_ENABLED) are sent with sendfile; on a cache hit
+    only the version metadata is read from the database.
+
+    Older versions requested with `?version=` may be stored as deltas against
+    another version (FORM_DELTA_STORAGE); they are reconstructed and cached
+    transparently.
+
+    Bundles larger than FORM_CODE_STREAM_THRESHOLD_KB are read from the
+    database in chunks and streamed, so memory per request doesn't grow with
+    the bundle size.
+
+    Versions deployed with a source map reference it with a `SourceMap`
+    header instead of embedding it in the bundle (see /sourcemap).
+
+    `version` also accepts a semver range (`^1.2`, `~1.4.0`, `>=2.0.0 <3`,
+    `1.x`, `^1 || ^2`): the current version if it is in the range, otherwise
+    the highest version in the range. `X-Form-Version` has the resolved version.
+
+    Responses carry a strong `ETag` derived from the version's content hash
+    (a different one for the gzip representation). `HEAD` returns the
+    version, size and ETag headers from the version metadata without reading
+    the code, `If-None-Match` returns 304 when the bundle didn't change, and a
+    single `Range` (optionally with `If-Range`) returns 206 with those bytes
+    of the response, so interrupted downloads can resume. Streamed bundles
+    are always sent in full.
+
     Args:
         form_name: Name of the form (path parameter)
-        version: Optional version string (query parameter, e.g., ?version=1.1.5)
+        version: Optional version or semver range (query parameter, e.g., ?version=1.1.5)
     """
-    from database import get_form_compiled_code
-    from fastapi.responses import Response
+    from database import get_form_compiled_code, get_form_code_metadata
 
     try:
-        print(f"[Form Code API] Request for '{form_name}' version: {version or 'current'}")
+        print(f"[Form Code API] {request.method} '{form_name}' version: {version or 'current'}")
+        requested_version = version
+        version = _resolve_version(form_name, version)
+        wants_gzip = accepts_gzip(request.headers.get('accept-encoding'))
+        if_none_match = request.headers.get('if-none-match')
+
+        if request.method == 'HEAD' or if_none_match or (wants_gzip and FORM_CODE_CACHE_ENABLED):
+            # Solo metadata: no se lee el código
+            metadata = get_form_code_metadata(form_name, version)
+            if not metadata:
+                if version != requested_version:
+                    form_version_index.invalidate(form_name)  # Versión borrada
+                raise HTTPException(status_code=404, detail=f"Form '{form_name}' not found")
+
+            headers = _form_code_headers(form_name, metadata)
+            gzip_encoded = _sends_gzip(metadata, wants_gzip)
+            etag = _form_code_etag(metadata, gzip_encoded)
+            if etag:
+                headers['ETag'] = etag
+
+            if _etag_matches(if_none_match, etag):
+                return Response(status_code=304, headers=headers)
+
+            if request.method == 'HEAD':
+                headers['Accept-Ranges'] = 'bytes'
+                if gzip_encoded:
+                    headers['Content-Encoding'] = 'gzip'
+                response = Response(media_type=JS_MEDIA_TYPE, headers=headers)
+                # El largo del body no se conoce sin leer el código
+                del response.headers['content-length']
+                return response
+
+            cached_path = _local_form_code_path(metadata) if wants_gzip else None
+            if cached_path:
+                print(f"[Form Code API] Serving {form_name}@{metadata['version']} from {cached_path.name}")
+                return _gzip_file_response(request, cached_path, metadata, headers)
+
         result = get_form_compiled_code(form_name, version)
 
         if not result:
+            if version != requested_version:
+                form_version_index.invalidate(form_name)  # Versión borrada
             raise HTTPException(status_code=404, detail=f"Form '{form_name}' not found")
 
         print(f"[Form Code API] Serving {form_name}@{result['version']} ({result['size_bytes']} bytes)")
 
-        return Response(
-            content=result['compiled_code'],
-            media_type='application/javascript; charset=utf-8',
-            headers={
-                'Cache-Control': 'no-cache, no-store, must-revalidate',
-                'X-Form-Version': result['version'],
-                'X-Published-At': result['published_at'],
-                'X-Size-Bytes': str(result['size_bytes']),
-            }
-        )
+        headers = _form_code_headers(form_name, result)
+        code = result['code']
+
+        if wants_gzip:
+            local_path = _local_form_code_path(result)
+            if not local_path and FORM_CODE_CACHE_ENABLED and not code.is_streamed:
+                local_path = _cache_form_code(result)
+            if local_path:
+                return _gzip_file_response(request, local_path, result, headers)
+
+        if code.is_streamed:
+            # Se lee de la BD por partes: los primeros bytes salen antes de leer todo el código
+            gzip_encoded = wants_gzip and code.encoding == CODE_ENCODING_GZIP_UTF8
+            if gzip_encoded:
+                headers['Content-Encoding'] = 'gzip'
+                body = code.iter_stored()
+            else:
+                body = code.iter_utf8()
+            etag = _form_code_etag(result, gzip_encoded)
+            if etag:
+                headers['ETag'] = etag
+            return StreamingResponse(body, media_type=JS_MEDIA_TYPE, headers=headers)
+
+        compressed = code.gzip_utf8()
+        gzip_encoded = compressed is not None and wants_gzip
+        if gzip_encoded:
+            headers['Content-Encoding'] = 'gzip'
+            content = compressed
+        else:
+            content = code.utf8_bytes()
+
+        etag = _form_code_etag(result, gzip_encoded)
+        if etag:
+            headers['ETag'] = etag
+        return _ranged_response(request, headers, content=content)
     except HTTPException:
         raise
+    except ValueError as e:
+        # Invalid form name, version or version range
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         print(f"[Form Code API] Error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to fetch form code: {str(e)}")
 
 
+def _etag_content_hash(etag: Optional[str]) -> Optional[str]:
+    """ContentHash de un ETag de /code (o un ContentHash suelto); None si no corresponde"""
+    if not etag:
+        return None
+    digest = etag.strip().removeprefix('W/').strip('"').removesuffix('-gzip')
+    return digest.lower() if validate_sha256(digest) else None
+
+
+@app.post("/api/custom-forms/code-batch", response_model=FormCodeBatchResponse, tags=["Custom Forms"])
+def get_forms_code_batch(request: Request, batch: FormCodeBatchRequest):
+    """
+    Get the compiled code of several forms in one request
+
+    For pages that render several forms (subforms, dashboards). All forms are
+    resolved with a single query. Each item may carry the `etag` (or content
+    hash) the client already has; if it still matches, the item comes back
+    with status `not_modified` and no code, and its code is not read from the
+    database.
+
+    Items are returned in request order with status `ok`, `not_modified`,
+    `not_found` or `error`. At most FORM_CODE_BATCH_MAX_FORMS forms per request.
+    The response is gzip-compressed for clients sending `Accept-Encoding: gzip`.
+    """
+    from database import get_forms_compiled_code
+
+    if not batch.forms:
+        raise HTTPException(status_code=400, detail="No forms requested")
+    if len(batch.forms) > FORM_CODE_BATCH_MAX_FORMS:
+        raise HTTPException(status_code=400, detail=f"Too many forms (max {FORM_CODE_BATCH_MAX_FORMS})")
+
+    try:
+        results = get_forms_compiled_code([
+            (item.formName, item.version, _etag_content_hash(item.etag)) for item in batch.forms
+        ])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Form Code API] Batch error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch form code: {str(e)}")
+
+    items = []
+    for item, result in zip(batch.forms, results):
+        entry = FormCodeBatchResult(formName=item.formName, requestedVersion=item.version, status="not_found")
+        if result:
+            entry.version = result['version']
+            entry.contentHash = result['content_hash']
+            entry.etag = _form_code_etag(result, False)
+            entry.sizeBytes = result['size_bytes']
+            entry.publishedAt = result['published_at']
+            if FORM_SOURCE_MAPS_ENABLED and result['has_source_map']:
+                entry.sourceMap = f"/api/custom-forms/{item.formName}/sourcemap?version={result['version']}"
+            if result['not_modified']:
+                entry.status = "not_modified"
+            else:
+                try:
+                    entry.code = result['code'].text
+                    entry.status = "ok"
+                except Exception as e:
+                    print(f"[Form Code API] Batch error reading {item.formName}@{result['version']}: {str(e)}")
+                    entry.status = "error"
+                    entry.error = "Failed to read form code"
+        items.append(entry)
+
+    print(f"[Form Code API] Batch of {len(items)} forms: "
+          f"{sum(1 for entry in items if entry.status == 'ok')} sent, "
+          f"{sum(1 for entry in items if entry.status == 'not_modified')} not modified")
+
+    content = FormCodeBatchResponse(forms=items).model_dump_json().encode('utf-8')
+    headers = {'Cache-Control': 'no-cache, no-store, must-revalidate', 'Vary': 'Accept-Encoding'}
+    if accepts_gzip(request.headers.get('accept-encoding')):
+        headers['Content-Encoding'] = 'gzip'
+        content = gzip.compress(content, compresslevel=6)
+    return Response(content=content, media_type='application/json', headers=headers)
+
+
+@app.get("/api/custom-forms/changes", tags=["Custom Forms"])
+async def get_form_changes_endpoint(since: Optional[int] = None, wait: int = 0, limit: int = 500):
+    """
+    Get catalog changes after a cursor (change feed)
+
+    Each change has the form, its previous and new current version and the
+    content hash of the new bundle (`changeType` is `updated` or `deleted`).
+    Clients keep the returned `cursor` and send it as `?since=` on the next
+    request.
+
+    Without `since`, returns the current cursor and no changes (starting
+    point for a new client). With `wait` (seconds, up to
+    FORM_CHANGES_MAX_WAIT_SECONDS) the request is held until a change happens
+    or the time expires (long-poll), so idle clients keep one cheap request
+    open instead of polling the form list.
+
+    Args:
+        since: Cursor returned by the previous request
+        wait: Seconds to wait for changes (0 = return immediately)
+        limit: Maximum changes per response (1-1000)
+    """
+    if wait < 0 or not 1 <= limit <= 1000:
+        raise HTTPException(status_code=400, detail="Invalid wait or limit")
+
+    try:
+        if since is None:
+            from database import get_latest_form_change_id
+            cursor = change_feed.latest_id
+            if cursor is None:
+                cursor = await run_in_threadpool(get_latest_form_change_id)
+            return {"cursor": cursor, "changes": []}
+
+        if since < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
+        changes, cursor = await change_feed.wait(since, min(wait, FORM_CHANGES_MAX_WAIT_SECONDS), limit)
+        return {"cursor": cursor, "changes": changes}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[Form Changes API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch form changes: {str(e)}")
+
+
+@app.get("/api/custom-forms/changes/stream", tags=["Custom Forms"])
+async def stream_form_changes(request: Request, since: Optional[int] = None):
+    """
+    Stream catalog changes as they happen (Server-Sent Events)
+
+    Each `form_changed` event has the same `data` as an item of
+    `GET /api/custom-forms/changes` and its `changeId` as event `id`, so
+    browsers can preload the new bundle of a form as soon as it is deployed,
+    promoted or deleted.
+
+    Changes made through this API are pushed right after their commit;
+    changes made by other workers or the .NET backend within
+    FORM_CHANGES_POLL_INTERVAL_MS.
+
+    Reconnects send `Last-Event-ID` (or `?since=`) to resume after the last
+    received change. Clients that fall too far behind are disconnected and
+    resume the same way.
+
+    **Example (browser):**
+    ```
+    const source = new EventSource('/api/custom-forms/changes/stream');
+    source.addEventListener('form_changed', e => preload(JSON.parse(e.data)));
+    ```
+    """
+    last_event_id = request.headers.get("Last-Event-ID", "")
+    if last_event_id.isdigit():
+        since = int(last_event_id)
+    if since is not None and since < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    if change_feed.subscriber_count >= FORM_CHANGES_STREAM_MAX_CLIENTS:
+        raise HTTPException(status_code=503, detail="Too many change stream clients", headers={"Retry-After": "30"})
+
+    return StreamingResponse(
+        change_feed.stream(since),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@app.get("/api/custom-forms/{form_name}/metadata", tags=["Custom Forms"])
+def get_form_metadata_endpoint(form_name: str, version: str = None):
+    """
+    Get the metadata of a form version without its code
+
+    Returns version, content hash, size, publish date and process name of the
+    current version (or `?version=`). Never reads the compiled code, so it is
+    cheap enough for runtime routes that only need to know which version is
+    published.
+
+    `version` also accepts a semver range, resolved like in /code.
+
+    Args:
+        form_name: Name of the form (path parameter)
+        version: Optional version or semver range (query parameter, defaults to current)
+    """
+    from database import get_form_code_metadata
+
+    try:
+        resolved_version = _resolve_version(form_name, version)
+        metadata = get_form_code_metadata(form_name, resolved_version)
+
+        if not metadata:
+            if resolved_version != version:
+                form_version_index.invalidate(form_name)  # Versión borrada
+            raise HTTPException(status_code=404, detail=f"Form '{form_name}' not found")
+
+        return {
+            "formName": form_name,
+            "processName": metadata['process_name'],
+            "version": metadata['version'],
+            "contentHash": metadata['content_hash'],
+            "sizeBytes": metadata['size_bytes'],
+            "publishedAt": metadata['published_at'],
+            "hasSourceMap": metadata['has_source_map']
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Form Metadata API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch form metadata: {str(e)}")
+
+
+@app.get("/api/custom-forms/{form_name}/sourcemap", tags=["Custom Forms"])
+def get_form_source_map_endpoint(form_name: str, request: Request, version: str = None):
+    """
+    Get the source map of a form version
+
+    Referenced by the `SourceMap` header of the code endpoint, so browsers
+    only download it when devtools are open. Disabled with
+    FORM_SOURCE_MAPS_ENABLED=false.
+
+    Args:
+        form_name: Name of the form (path parameter)
+        version: Optional version string (query parameter, defaults to current)
+    """
+    from database import get_form_source_map
+
+    if not FORM_SOURCE_MAPS_ENABLED:
+        raise HTTPException(status_code=404, detail="Source maps are disabled")
+
+    try:
+        result = get_form_source_map(form_name, version)
+
+        if not result:
+            raise HTTPException(status_code=404, detail=f"Source map for '{form_name}' not found")
+
+        print(f"[Form Code API] Serving source map {form_name}@{result['version']} ({result['size_bytes']} bytes)")
+
+        headers = {
+            'Cache-Control': 'no-cache',
+            'X-Form-Version': result['version'],
+            'Vary': 'Accept-Encoding',
+        }
+        if accepts_gzip(request.headers.get('accept-encoding')):
+            headers['Content-Encoding'] = 'gzip'
+            content = result['data']
+        else:
+            content = gzip.decompress(result['data'])
+
+        return Response(content=content, media_type='application/json; charset=utf-8', headers=headers)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Form Code API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch source map: {str(e)}")
+
+
+@app.get("/api/custom-forms/{form_name}/diff", tags=["Custom Forms"])
+async def get_form_diff(
+    form_name: str,
+    request: Request,
+    from_version: str = Query(..., alias="from"),
+    to_version: str = Query(..., alias="to"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Unified diff between two versions of a form
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    Computed on the server, so reviewing a release doesn't require
+    downloading both bundles. `from` and `to` are versions (or semver
+    ranges, resolved like in /code). The response is `text/x-diff`, streamed,
+    gzip-compressed for clients sending `Accept-Encoding: gzip`; headers carry
+    the resolved versions, their sizes and `X-Size-Delta` (to - from, bytes).
+
+    Diffs are cached per pair of versions and bundle content hashes. Bundles larger than
+    FORM_DIFF_MAX_CODE_KB or diffs larger than FORM_DIFF_MAX_OUTPUT_KB return
+    413.
+
+    **Example:**
+    ```
+    GET /api/custom-forms/my-form/diff?from=1.2.0&to=1.3.0
+    ```
+    """
+    from database import get_form_code_metadata, get_form_compiled_code
+
+    try:
+        from_version = await run_in_threadpool(_resolve_version, form_name, from_version)
+        to_version = await run_in_threadpool(_resolve_version, form_name, to_version)
+
+        from_info = await run_in_threadpool(get_form_code_metadata, form_name, from_version)
+        to_info = await run_in_threadpool(get_form_code_metadata, form_name, to_version)
+        if not from_info or not to_info:
+            missing = from_version if not from_info else to_version
+            raise HTTPException(status_code=404, detail=f"Version '{missing}' of form '{form_name}' not found")
+
+        cache_key = None
+        if from_info['content_hash'] and to_info['content_hash']:
+            # Los labels del diff nombran form y versiones: van en la clave
+            cache_key = (
+                from_info['content_hash'], to_info['content_hash'],
+                f"{form_name}@{from_version}", f"{form_name}@{to_version}"
+            )
+        diff = diff_cache.get(cache_key) if cache_key else None
+
+        if diff is None:
+            # Antes de leer el código de la BD
+            check_code_sizes(from_info['size_bytes'], to_info['size_bytes'])
+            async with diff_slots:
+                from_result = await run_in_threadpool(get_form_compiled_code, form_name, from_version)
+                to_result = await run_in_threadpool(get_form_compiled_code, form_name, to_version)
+                if not from_result or not to_result:
+                    raise HTTPException(status_code=404, detail=f"Form '{form_name}' not found")
+                diff = await run_in_threadpool(
+                    lambda: compute_diff_gzip(
+                        from_result['code'].text,
+                        to_result['code'].text,
+                        f"{form_name}@{from_version}",
+                        f"{form_name}@{to_version}"
+                    )
+                )
+            if cache_key:
+                diff_cache.put(cache_key, diff)
+
+        print(f"[Form Diff API] {form_name} {from_info['version']} -> {to_info['version']} ({len(diff)} bytes gzip)")
+
+        headers = {
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            'X-From-Version': from_info['version'],
+            'X-To-Version': to_info['version'],
+            'X-From-Size-Bytes': str(from_info['size_bytes']),
+            'X-To-Size-Bytes': str(to_info['size_bytes']),
+            'X-Size-Delta': str(to_info['size_bytes'] - from_info['size_bytes']),
+        }
+        if accepts_gzip(request.headers.get('accept-encoding')):
+            headers['Content-Encoding'] = 'gzip'
+            body = iter_diff_chunks(diff)
+        else:
+            body = iter_gunzip(diff)
+        return StreamingResponse(body, media_type='text/x-diff; charset=utf-8', headers=headers)
+    except HTTPException:
+        raise
+    except DiffTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"[Form Diff API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to diff form versions: {str(e)}")
+
+
 @app.get("/api/custom-forms/{form_name}/versions", tags=["Custom Forms"])
-def get_form_versions_api(form_name: str):
+def get_form_versions_api(
+    form_name: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    includeReleaseNotes: Optional[bool] = None
+):
     """
     Get all versions for a specific form
 
     Returns list of all versions with metadata (size, date, isCurrent, etc.)
+
+    **Pagination:** with `limit` (1-FORM_VERSIONS_MAX_PAGE_SIZE) the response is
+    `{"items": [...], "nextCursor": "..."}`, newest first; send `nextCursor` as
+    `cursor` to get the next page (`null` on the last page). Paginated
+    responses don't include `releaseNotes` unless `includeReleaseNotes=true`.
+    Without `limit` or `cursor` the response is the full array, as before.
     """
-    from database import get_form_versions
+    from database import get_form_versions_page
+
+    paginated = limit is not None or cursor is not None
+    if paginated:
+        limit = limit if limit is not None else FORM_VERSIONS_MAX_PAGE_SIZE
+        if not 1 <= limit <= FORM_VERSIONS_MAX_PAGE_SIZE:
+            raise HTTPException(status_code=400, detail=f"Invalid limit (1-{FORM_VERSIONS_MAX_PAGE_SIZE})")
+    if includeReleaseNotes is None:
+        includeReleaseNotes = not paginated
 
     try:
-        versions = get_form_versions(form_name)
+        before = None
+        if cursor is not None:
+            values = _decode_page_cursor(cursor)
+            if len(values) != 2 or not isinstance(values[0], str) or not isinstance(values[1], int):
+                raise ValueError("Invalid cursor")
+            before = (datetime.fromisoformat(values[0]), values[1])
+
+        versions, next_before = get_form_versions_page(
+            form_name,
+            include_release_notes=includeReleaseNotes,
+            before=before,
+            limit=limit if paginated else None
+        )
 
-        if not versions:
+        if not versions and before is None:
             raise HTTPException(status_code=404, detail=f"Form '{form_name}' not found or has no versions")
 
         print(f"[Form Versions API] Returning {len(versions)} versions for '{form_name}'")
-        return versions
+        if not paginated:
+            return versions
+        return {
+            "items": versions,
+            "nextCursor": _encode_page_cursor([next_before[0].isoformat(), next_before[1]]) if next_before else None
+        }
     except ValueError as e:
         # Invalid format
         raise HTTPException(status_code=400, detail=str(e))
@@ -746,17 +1549,23 @@ def set_form_version_api(form_name: str, version: str):
     """
     Set a specific version as the current/active version
 
+    Promotion is a single stored procedure call (validation, current flag
+    and CurrentVersion change atomically).
+
     Args:
         form_name: Name of the form
         version: Version to set as current (query parameter)
 
     Returns:
-        Success message
+        Success message with the new state (`previous_version`, `version`,
+        `content_hash`, `published_at`, `size_bytes`)
     """
     from database import set_current_form_version
 
     try:
         result = set_current_form_version(form_name, version)
+        change_feed.notify()
+        form_version_index.invalidate(form_name)
         print(f"[Set Version API] Set '{form_name}' to version '{version}'")
         return result
     except ValueError as e:
@@ -787,6 +1596,7 @@ def delete_form_api(
 
     try:
         result = delete_form(form_name)
+        change_feed.notify()
         print(f"[Delete Form API] Deleted form '{form_name}' - {result['versions_deleted']} version(s)")
         return result
     except ValueError as e:
@@ -819,6 +1629,8 @@ def delete_form_version_api(
 
     try:
         result = delete_form_version(form_name, version)
+        change_feed.notify()
+        form_version_index.invalidate(form_name)
         print(f"[Delete Version API] Deleted version '{version}' of form '{form_name}'")
         return result
     except ValueError as e:
@@ -830,89 +1642,14 @@ def delete_form_version_api(
 
 
 # ==============================================================================
-# Security Functions for File Upload
+# Deployment Endpoints
 # ==============================================================================
 
-# Configuration constants
-MAX_ZIP_FILES = 100
-MAX_ZIP_SIZE_MB = 50
-ALLOWED_EXTENSIONS = {'.json', '.js', '.map', '.txt', '.md'}
-
-def safe_extract(zip_file: zipfile.ZipFile, extract_dir: Path) -> List[str]:
-    """
-    SECURITY: Extrae ZIP validando que no hay path traversal (Zip Slip)
-
-    Validates:
-    - No path traversal attempts (../, ..\\)
-    - File count limit (max MAX_ZIP_FILES files)
-    - Total size limit (max MAX_ZIP_SIZE_MB MB)
-    - Allowed file extensions only
-    - No dangerous characters in filenames
-
-    Args:
-        zip_file: ZipFile object to extract
-        extract_dir: Destination directory (must be absolute path)
-
-    Returns:
-        List of extracted file paths (relative to extract_dir)
-
-    Raises:
-        ValueError: If validation fails (path traversal, too many files, etc.)
-    """
-    extract_dir = extract_dir.resolve()
-    members = zip_file.namelist()
-
-    # SECURITY: Validar número de archivos
-    if len(members) > MAX_ZIP_FILES:
-        raise ValueError(
-            f"Zip contains too many files. Max: {MAX_ZIP_FILES}, Found: {len(members)}"
-        )
-
-    # SECURITY: Validar tamaño total
-    total_size = sum(zinfo.file_size for zinfo in zip_file.filelist)
-    max_size_bytes = MAX_ZIP_SIZE_MB * 1024 * 1024
-    if total_size > max_size_bytes:
-        raise ValueError(
-            f"Zip too large. Max: {MAX_ZIP_SIZE_MB}MB, "
-            f"Found: {total_size / 1024 / 1024:.2f}MB"
-        )
-
-    extracted_files = []
-
-    for member in members:
-        # SECURITY: Validar que el path no sale del directorio (Zip Slip prevention)
-        member_path = (extract_dir / member).resolve()
-
-        if not str(member_path).startswith(str(extract_dir)):
-            raise ValueError(f"Zip Slip attempt detected: {member}")
-
-        # SECURITY: Validar extensiones permitidas
-        file_ext = Path(member).suffix.lower()
-        if file_ext and file_ext not in ALLOWED_EXTENSIONS:
-            raise ValueError(
-                f"Invalid file type in zip: {member} (extension: {file_ext}). "
-                f"Allowed: {', '.join(ALLOWED_EXTENSIONS)}"
-            )
-
-        # SECURITY: Validar nombres de archivo (no caracteres peligrosos)
-        if any(char in member for char in ['..', '~', '\\']):
-            raise ValueError(f"Invalid characters in filename: {member}")
-
-        # SECURITY: Prevenir null bytes en nombres de archivo
-        if '\x00' in member:
-            raise ValueError(f"Null byte in filename: {member}")
-
-        extracted_files.append(member)
-
-    # Si todas las validaciones pasaron, extraer
-    zip_file.extractall(extract_dir)
-
-    return extracted_files
-
-
 @app.post("/api/deployment/upload", response_model=UploadDeploymentResponse, tags=["Deployment"])
 async def upload_deployment_package(
+    http_response: Response,
     file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: dict = Depends(get_current_admin_user)
 ):
     """
@@ -931,15 +1668,137 @@ async def upload_deployment_package(
     4. Inserts or updates in SQL Server
     5. Returns summary with statistics
 
+    For large packages prefer `POST /api/deployment/jobs`, which returns
+    immediately and processes the package in background.
+
+    **Idempotency:** repeating a successful deployment with the same
+    `Idempotency-Key` header (or, without the header, the identical package)
+    returns the stored result without processing it again
+    (response header `Idempotent-Replayed: true`).
+
     **Response:**
     - `formsProcessed`: Total number of forms in package
     - `formsInserted`: New forms added
     - `formsUpdated`: Existing forms updated
     - `errors`: List of errors (if any)
     - `results`: Detail for each processed form
+    - `stageTimings`: Duration (ms) of each processing stage
     """
+    content = await read_deployment_upload(file)
+    digest = package_digest(content)
+    key = deployment_idempotency_key(idempotency_key, digest)
+
+    async with result_store.lock(key):
+        previous, active_job = await find_previous_deployment(key, digest)
+        if previous:
+            print(f"[Deployment API] Replaying previous result for {file.filename} (digest {digest[:12]})")
+            http_response.headers["Idempotent-Replayed"] = "true"
+            return previous
+
+        if active_job:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Identical deployment is already being processed by job '{active_job.jobId}'"
+            )
+
+        # Directorio de staging exclusivo para este deployment
+        temp_dir = create_staging_dir(TEMP_UPLOAD_PATH)
+
+        try:
+            # Guardar .zip temporalmente
+            zip_path = temp_dir / file.filename
+            with open(zip_path, "wb") as f:
+                f.write(content)
+
+            response = await run_in_threadpool(run_deployment, zip_path, temp_dir, None, current_user.get("username"))
+
+        finally:
+            # Cleanup: eliminar directorio temporal
+            try:
+                shutil.rmtree(temp_dir)
+                print(f"[Deployment API] Cleaned up temp directory: {temp_dir}")
+            except Exception as e:
+                print(f"[Deployment API] Warning: Failed to cleanup {temp_dir}: {e}")
+
+        # Solo se registran deployments exitosos: los fallidos se re-procesan al reintentar
+        if response.success:
+            await run_in_threadpool(result_store.save, key, digest, response)
 
-    # Validaciones
+    print(f"[Deployment API] Returning response: {response.model_dump_json()}")
+    return response
+
+
+def deployment_idempotency_key(idempotency_key: Optional[str], digest: str) -> str:
+    """
+    Key de idempotencia del deployment (header Idempotency-Key o digest del package)
+
+    Raises:
+        HTTPException 400: Si el header tiene un formato inválido
+    """
+    try:
+        return resolve_idempotency_key(idempotency_key, digest)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def find_previous_deployment(
+    key: str,
+    digest: str
+) -> Tuple[Optional[UploadDeploymentResponse], Optional[DeploymentJobStatus]]:
+    """
+    Busca un deployment previo registrado para la key
+
+    Raises:
+        HTTPException 422: Si el Idempotency-Key se usó con otro package
+    """
+    try:
+        return await run_in_threadpool(result_store.find_previous, key, digest)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def submit_idempotent_job(
+    key: str,
+    digest: str,
+    file_name: str,
+    size_bytes: int,
+    submitted_by: Optional[str],
+    submit: Callable[[], Awaitable[DeploymentJobStatus]],
+    http_response: Response
+) -> DeploymentJobStatus:
+    """
+    Encola un deployment job salvo que el mismo package ya se haya deployado
+
+    - Job previo (en curso o completado) para la key: se retorna ese job (200)
+    - Resultado previo sin job: se registra un job ya completado con ese resultado (200)
+    - Sin registro: se encola con submit() (202)
+    """
+    async with result_store.lock(key):
+        previous, job = await find_previous_deployment(key, digest)
+
+        if job:
+            http_response.status_code = 200
+            http_response.headers["Idempotent-Replayed"] = "true"
+            return job
+
+        if previous:
+            job = await job_queue.submit_replayed(file_name, size_bytes, previous, submitted_by)
+            http_response.status_code = 200
+            http_response.headers["Idempotent-Replayed"] = "true"
+        else:
+            job = await submit()
+
+        await run_in_threadpool(result_store.save, key, digest, previous, job.jobId)
+        return job
+
+
+async def read_deployment_upload(file: UploadFile) -> bytes:
+    """
+    Valida nombre/extensión/tamaño de un deployment package y retorna su contenido
+
+    Raises:
+        HTTPException 400: Si el archivo no es un .zip válido o excede el tamaño máximo
+    """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file uploaded")
 
@@ -957,157 +1816,498 @@ async def upload_deployment_package(
         )
 
     print(f"[Deployment API] Received upload: {file.filename} ({file_size} bytes)")
+    return content
+
+
+@app.post("/api/deployment/jobs", response_model=DeploymentJobStatus, status_code=202, tags=["Deployment"])
+async def submit_deployment_job(
+    http_response: Response,
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Submit deployment package (.zip) for background processing
 
-    # Crear directorio temporal para este deployment
-    temp_dir = Path(TEMP_UPLOAD_PATH) / f"deployment_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
-    temp_dir.mkdir(parents=True, exist_ok=True)
-
-    response = UploadDeploymentResponse(
-        success=False,
-        message="",
-        formsProcessed=0,
-        formsInserted=0,
-        formsUpdated=0,
-        errors=[],
-        results=[]
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    Accepts the same package as `POST /api/deployment/upload`, stores it and
+    returns `202 Accepted` with a `jobId` right away. Poll
+    `GET /api/deployment/jobs/{job_id}` for status, per-form results and stage timings.
+
+    Repeating the same `Idempotency-Key` (or identical package) returns the
+    existing job with `200 OK` instead of queueing it again.
+    """
+    content = await read_deployment_upload(file)
+    digest = package_digest(content)
+    submitted_by = current_user.get("username")
+
+    return await submit_idempotent_job(
+        deployment_idempotency_key(idempotency_key, digest),
+        digest,
+        file.filename,
+        len(content),
+        submitted_by,
+        lambda: job_queue.submit(file.filename, content, submitted_by),
+        http_response
     )
 
+
+@app.get("/api/deployment/jobs/{job_id}", response_model=DeploymentJobStatus, tags=["Deployment"])
+def get_deployment_job(
+    job_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Get status of a background deployment job
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    **Status values:** `queued`, `running`, `completed`, `failed`.
+    When finished, `result` contains the same `UploadDeploymentResponse` returned
+    by the synchronous upload (per-form results and `stageTimings`).
+    """
+    if not validate_job_id(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job_id format")
+
+    job = job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Deployment job '{job_id}' not found")
+
+    return job
+
+
+@app.get("/api/deployment/jobs/{job_id}/events", tags=["Deployment"])
+async def stream_deployment_job_events(
+    job_id: str,
+    request: Request,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Stream live progress of a deployment job (Server-Sent Events)
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    **Events** (`event:` field, `data:` is a `DeploymentProgressEvent` JSON):
+    - `upload_received` - package accepted
+    - `zip_validated` - zip extracted and validated
+    - `manifest_parsed` - manifest read (package version, forms count)
+    - `forms_locked` - forms reserved; `waitMs` > 0 when another deployment of the same forms ran first
+    - `form_processed` - one per form, `form` is a `FormDeploymentResult` (action + durationMs)
+    - `summary` - final `UploadDeploymentResponse`
+
+    The stream replays past events and closes once the job finishes.
+    Reconnects may send `Last-Event-ID` to resume after the last received event.
+
+    **Example (CI):**
+    ```
+    curl -N -H "Authorization: Bearer $TOKEN" $API/api/deployment/jobs/$JOB_ID/events
+    ```
+    """
+    if not validate_job_id(job_id):
+        raise HTTPException(status_code=400, detail="Invalid job_id format")
+
+    if not job_queue.get(job_id):
+        raise HTTPException(status_code=404, detail=f"Deployment job '{job_id}' not found")
+
+    last_event_id = request.headers.get("Last-Event-ID", "0")
+    after_sequence = int(last_event_id) if last_event_id.isdigit() else 0
+
+    return StreamingResponse(
+        job_queue.stream_events(job_id, after_sequence),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        }
+    )
+
+
+@app.get("/api/deployment/ledger", tags=["Deployment"])
+def list_form_deployments(limit: int = 50, current_user: dict = Depends(get_current_admin_user)):
+    """
+    List recorded deployment packages, newest first
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    Each entry has the versions the package deployed and the versions that
+    were current before it, plus the last promote/rollback applied to it.
+    """
+    from database import get_form_deployments
+
+    if not 1 <= limit <= 500:
+        raise HTTPException(status_code=400, detail="Invalid limit (1-500)")
+
     try:
-        # Guardar .zip temporalmente
-        zip_path = temp_dir / file.filename
-        with open(zip_path, "wb") as f:
-            f.write(content)
+        return get_form_deployments(limit)
+    except Exception as e:
+        print(f"[Deployment Ledger API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch deployments: {str(e)}")
 
-        # SECURITY: Extraer .zip con validaciones de seguridad
-        extract_dir = temp_dir / "extracted"
-        extract_dir.mkdir(parents=True, exist_ok=True)
 
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                extracted_files = safe_extract(zip_ref, extract_dir)
-                print(f"[Deployment API] Safely extracted {len(extracted_files)} files to: {extract_dir}")
-        except ValueError as e:
-            # Validación de seguridad falló
-            raise HTTPException(
-                status_code=400,
-                detail=f"Security validation failed: {str(e)}"
-            )
+@app.get("/api/deployment/ledger/{deployment_id}", tags=["Deployment"])
+def get_form_deployment(deployment_id: int, current_user: dict = Depends(get_current_admin_user)):
+    """
+    Get a recorded deployment package
 
-        print(f"[Deployment API] Extracted to: {extract_dir}")
-
-        # DEBUG: List all extracted files
-        all_files = list(extract_dir.glob('**/*'))
-        print(f"[Deployment API] Extracted files ({len(all_files)}):")
-        for file_path in all_files:
-            rel_path = file_path.relative_to(extract_dir)
-            print(f"  - {rel_path} {'[DIR]' if file_path.is_dir() else f'[{file_path.stat().st_size} bytes]'}")
-
-        # Leer manifest.json
-        manifest_path = extract_dir / "manifest.json"
-        print(f"[Deployment API] Looking for manifest at: {manifest_path}")
-        print(f"[Deployment API] Manifest exists: {manifest_path.exists()}")
-        if not manifest_path.exists():
-            raise Exception("manifest.json not found in deployment package")
-
-        with open(manifest_path, 'r', encoding='utf-8') as f:
-            manifest_data = json.load(f)
-            manifest = DeploymentManifest(**manifest_data)
-
-        print(f"[Deployment API] Package version: {manifest.packageVersion}")
-        print(f"[Deployment API] Forms to process: {len(manifest.forms)}")
-
-        response.formsProcessed = len(manifest.forms)
-
-        # Procesar cada form
-        for form_info in manifest.forms:
-            result = await process_form(form_info, extract_dir, manifest)
-            response.results.append(result)
-
-            if result.success:
-                if result.action == "inserted":
-                    response.formsInserted += 1
-                elif result.action == "updated":
-                    response.formsUpdated += 1
-            else:
-                response.errors.append(f"{form_info.formName}: {result.error}")
-
-        # Resultado final
-        response.success = len(response.errors) == 0
-        response.message = (
-            f"Deployment successful: {response.formsInserted} inserted, {response.formsUpdated} updated"
-            if response.success
-            else f"Deployment completed with errors: {len(response.errors)} failed"
-        )
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+    """
+    from database import get_form_deployments
+
+    try:
+        deployments = get_form_deployments(1, deployment_id)
+    except Exception as e:
+        print(f"[Deployment Ledger API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch deployment: {str(e)}")
 
-        print(f"[Deployment API] {response.message}")
+    if not deployments:
+        raise HTTPException(status_code=404, detail=f"Deployment {deployment_id} not found")
+    return deployments[0]
 
+
+def _apply_form_deployment(deployment_id: int, rollback: bool, current_user: dict) -> dict:
+    """Promote/rollback de un package completo e invalidación de caches en una pasada"""
+    from database import apply_form_deployment
+
+    try:
+        result = apply_form_deployment(deployment_id, rollback, current_user.get("username"))
+    except ValueError as e:
+        # Deployment not found or versions deleted since the deployment
+        status_code = 404 if "not found" in str(e) else 409
+        raise HTTPException(status_code=status_code, detail=str(e))
     except Exception as e:
-        print(f"[Deployment API] Error: {str(e)}")
-        response.success = False
-        response.message = f"Deployment failed: {str(e)}"
-        response.errors.append(str(e))
+        print(f"[Deployment Ledger API] Error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to apply deployment: {str(e)}")
 
-    finally:
-        # Cleanup: eliminar directorio temporal
-        try:
-            shutil.rmtree(temp_dir)
-            print(f"[Deployment API] Cleaned up temp directory: {temp_dir}")
-        except Exception as e:
-            print(f"[Deployment API] Warning: Failed to cleanup {temp_dir}: {e}")
+    change_feed.notify()
+    form_version_index.invalidate(*[form["formName"] for form in result["forms"]])
+    print(f"[Deployment Ledger API] Deployment {deployment_id} {result['action']} by {current_user.get('username')}")
+    return result
 
-    print(f"[Deployment API] Returning response: {response.model_dump_json()}")
-    return response
 
+@app.post("/api/deployment/ledger/{deployment_id}/promote", tags=["Deployment"])
+def promote_form_deployment(deployment_id: int, current_user: dict = Depends(get_current_admin_user)):
+    """
+    Make every version deployed by a package current, atomically
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
 
-async def process_form(form_info, extract_dir: Path, manifest: DeploymentManifest) -> FormDeploymentResult:
+    All forms of the package switch in one database transaction (or none
+    does), e.g. to re-apply a package after a rollback. Returns 409 if any
+    of its versions was deleted since.
     """
-    Procesa un form individual del deployment package
+    return _apply_form_deployment(deployment_id, False, current_user)
+
+
+@app.post("/api/deployment/ledger/{deployment_id}/rollback", tags=["Deployment"])
+def rollback_form_deployment(deployment_id: int, current_user: dict = Depends(get_current_admin_user)):
     """
-    result = FormDeploymentResult(
-        formName=form_info.formName,
-        success=False,
-        action="failed",
-        error=None
-    )
+    Restore the versions that were current before a package, atomically
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    All forms of the package switch back in one database transaction (or
+    none does). Forms created by the package have no previous version and
+    are left as they are (status `skipped`). Returns 409 if any previous
+    version was deleted since.
 
+    **Example (incident):**
+    ```
+    curl -X POST -H "Authorization: Bearer $TOKEN" $API/api/deployment/ledger/42/rollback
+    ```
+    """
+    return _apply_form_deployment(deployment_id, True, current_user)
+
+
+@app.post("/api/deployment/uploads", response_model=ChunkedUploadStatus, status_code=201, tags=["Deployment"])
+def initiate_chunked_upload(
+    request: ChunkedUploadInitRequest,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Initiate a chunked, resumable deployment upload
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    **Protocol:**
+    1. `POST /api/deployment/uploads` with `fileName`, `totalSize` and the `sha256` of the whole package
+    2. `PUT /api/deployment/uploads/{upload_id}/chunks/{index}?offset=<index * chunkSize>`
+       with the raw chunk as body and its SHA-256 in the `X-Chunk-SHA256` header
+    3. `GET /api/deployment/uploads/{upload_id}` returns `receivedRanges` and `missingChunks`;
+       after a dropped connection only the missing chunks need to be resent
+    4. `POST /api/deployment/uploads/{upload_id}/complete` verifies the package and
+       queues it as a deployment job (same response as `POST /api/deployment/jobs`)
+    """
     try:
-        # Leer código compilado
-        form_code_path = extract_dir / form_info.path
-        if not form_code_path.exists():
-            raise Exception(f"Form file not found: {form_info.path}")
-
-        with open(form_code_path, 'r', encoding='utf-8') as f:
-            compiled_code = f.read()
-
-        print(f"[Deployment API] Processing form: {form_info.formName} ({len(compiled_code)} bytes)")
-
-        # Guardar en BD usando stored procedure
-        db_result = upsert_custom_form(
-            form_name=form_info.formName,
-            process_name=form_info.processName,
-            version=form_info.version,
-            description=form_info.description,
-            author=form_info.author,
-            compiled_code=compiled_code,
-            size_bytes=len(compiled_code),
-            package_version=manifest.packageVersion,
-            commit_hash=manifest.commitHash,
-            build_date=manifest.buildDate,  # Pass datetime object directly
-            release_notes=form_info.releaseNotes or ""
+        upload = upload_store.create(
+            request.fileName,
+            request.totalSize,
+            request.sha256,
+            request.chunkSize,
+            current_user.get("username")
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-        result.success = db_result["success"]
-        result.action = db_result["action"]
+    print(f"[Deployment API] Chunked upload {upload.uploadId} initiated: {upload.fileName} "
+          f"({upload.totalSize} bytes, {upload.totalChunks} chunks)")
+    return upload
 
-        print(f"[Deployment API] Form {form_info.formName} {result.action} successfully")
 
+@app.put("/api/deployment/uploads/{upload_id}/chunks/{index}", response_model=ChunkedUploadStatus, tags=["Deployment"])
+async def upload_chunk(
+    upload_id: str,
+    index: int,
+    offset: int,
+    request: Request,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Upload chunk `index` of a chunked upload
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    Body is the raw chunk (`application/octet-stream`). The `X-Chunk-SHA256`
+    header must contain the SHA-256 (hex) of the chunk. Resending a chunk is safe.
+    """
+    if not validate_upload_id(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload_id format")
+
+    # Rechazar chunks demasiado grandes antes de leer el body
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_CHUNK_SIZE:
+        raise HTTPException(status_code=413, detail="Chunk exceeds maximum chunk size")
+
+    # Sin Content-Length (Transfer-Encoding: chunked) el tope se aplica al leer
+    received = bytearray()
+    async for part in request.stream():
+        received += part
+        if len(received) > MAX_CHUNK_SIZE:
+            raise HTTPException(status_code=413, detail="Chunk exceeds maximum chunk size")
+    data = bytes(received)
+    checksum = request.headers.get("X-Chunk-SHA256", "")
+
+    try:
+        upload = await run_in_threadpool(upload_store.write_chunk, upload_id, index, offset, data, checksum)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not upload:
+        raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+
+    return upload
+
+
+@app.get("/api/deployment/uploads/{upload_id}", response_model=ChunkedUploadStatus, tags=["Deployment"])
+def get_chunked_upload(
+    upload_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Get received ranges and missing chunks of a chunked upload
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+    """
+    if not validate_upload_id(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload_id format")
+
+    upload = upload_store.load(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+
+    return upload
+
+
+@app.post("/api/deployment/uploads/{upload_id}/complete", response_model=DeploymentJobStatus, status_code=202, tags=["Deployment"])
+async def complete_chunked_upload(
+    upload_id: str,
+    http_response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Finalize a chunked upload and queue it for deployment
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+
+    Verifies that every chunk was received and that the assembled package
+    matches the declared `sha256`, then hands it to the background deployment
+    queue. Returns `409` with the missing chunks if the upload is incomplete.
+    Like `POST /api/deployment/jobs`, an already deployed package returns the existing job.
+    """
+    if not validate_upload_id(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload_id format")
+
+    try:
+        upload = await run_in_threadpool(upload_store.verify, upload_id)
+    except UploadIncompleteError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not upload:
+        raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+
+    submitted_by = current_user.get("username")
+    job = await submit_idempotent_job(
+        deployment_idempotency_key(idempotency_key, upload.sha256),
+        upload.sha256,
+        upload.fileName,
+        upload.totalSize,
+        submitted_by,
+        lambda: job_queue.submit_file(upload.fileName, upload_store.partial_path(upload_id), submitted_by),
+        http_response
+    )
+    await run_in_threadpool(upload_store.discard, upload_id)
+    print(f"[Deployment API] Chunked upload {upload_id} completed -> job {job.jobId}")
+    return job
+
+
+@app.delete("/api/deployment/uploads/{upload_id}", tags=["Deployment"])
+def abort_chunked_upload(
+    upload_id: str,
+    current_user: dict = Depends(get_current_admin_user)
+):
+    """
+    Abort a chunked upload and delete its received chunks
+
+    **⚠️ Requires admin authentication** - Header: `Authorization: Bearer <token>`
+    """
+    if not validate_upload_id(upload_id):
+        raise HTTPException(status_code=400, detail="Invalid upload_id format")
+
+    if not upload_store.discard(upload_id):
+        raise HTTPException(status_code=404, detail=f"Upload '{upload_id}' not found")
+
+    return {"success": True, "message": f"Upload '{upload_id}' aborted"}
+
+
+@app.on_event("startup")
+async def recover_deployment_jobs():
+    """Re-encola deployment jobs pendientes tras un reinicio del worker"""
+    try:
+        await job_queue.recover()
     except Exception as e:
-        print(f"[Deployment API] Error processing form {form_info.formName}: {str(e)}")
-        result.success = False
-        result.action = "failed"
-        result.error = str(e)
+        print(f"[Deployment Jobs] Warning: Failed to recover pending jobs: {e}")
 
-    return result
+    try:
+        purged = await run_in_threadpool(upload_store.purge_expired, DEPLOYMENT_UPLOAD_TTL_HOURS)
+        if purged:
+            print(f"[Chunked Uploads] Purged {purged} expired upload(s)")
+    except Exception as e:
+        print(f"[Chunked Uploads] Warning: Failed to purge expired uploads: {e}")
+
+    try:
+        purged = await run_in_threadpool(result_store.purge_expired)
+        if purged:
+            print(f"[Deployment Idempotency] Purged {purged} expired record(s)")
+    except Exception as e:
+        print(f"[Deployment Idempotency] Warning: Failed to purge expired records: {e}")
+
+
+@app.on_event("shutdown")
+async def stop_deployment_jobs():
+    await job_queue.shutdown()
+
+
+_delta_rebase_task: Optional[asyncio.Task] = None
+
+
+async def _rebase_form_deltas_periodically():
+    """Re-codifica las versiones viejas como deltas contra la versión current de cada form"""
+    from database import rebase_all_form_deltas
+
+    while True:
+        await asyncio.sleep(FORM_DELTA_REBASE_INTERVAL_MINUTES * 60)
+        try:
+            results = await run_in_threadpool(rebase_all_form_deltas)
+            deltas = sum(result["deltas"] for result in results)
+            print(f"[Form Delta] Rebase completed: {len(results)} form(s), {deltas} delta(s) written")
+        except Exception as e:
+            print(f"[Form Delta] Warning: Rebase failed: {e}")
+
+
+@app.on_event("startup")
+async def start_delta_rebase():
+    global _delta_rebase_task
+    if FORM_DELTA_STORAGE:
+        _delta_rebase_task = asyncio.create_task(_rebase_form_deltas_periodically())
+        print(f"[Form Delta] Delta storage enabled, rebasing every {FORM_DELTA_REBASE_INTERVAL_MINUTES} min")
+
+
+@app.on_event("shutdown")
+async def stop_delta_rebase():
+    if _delta_rebase_task:
+        _delta_rebase_task.cancel()
+
+
+_retention_task: Optional[asyncio.Task] = None
+
+
+async def _prune_form_versions_periodically():
+    """Borra por lotes las versiones fuera de la política de retención"""
+    from database import get_prune_candidates, prune_form_versions
+
+    def find_candidates(limit: int) -> List[int]:
+        return get_prune_candidates(
+            FORM_RETENTION_KEEP_VERSIONS, FORM_RETENTION_KEEP_DAYS, FORM_RETENTION_KEEP_DEPLOYMENTS, limit
+        )
+
+    def prune_batch(version_ids: List[int]) -> dict:
+        return prune_form_versions(
+            version_ids, FORM_RETENTION_KEEP_VERSIONS, FORM_RETENTION_KEEP_DAYS, FORM_RETENTION_KEEP_DEPLOYMENTS
+        )
+
+    def on_batch(result: dict) -> None:
+        # Los borrados de versiones no-current no pasan por el feed de cambios
+        form_version_index.invalidate(*result["forms"])
+
+    while True:
+        await asyncio.sleep(FORM_RETENTION_INTERVAL_MINUTES * 60)
+        if not in_window(retention_window, datetime.now()):
+            continue
+        try:
+            totals = await prune_in_batches(find_candidates, prune_batch, on_batch)
+            if totals["deleted"]:
+                print(
+                    f"[Form Retention] Pruned {totals['deleted']} version(s) in {totals['batches']} batch(es), "
+                    f"{totals['bytes']} bytes"
+                )
+        except Exception as e:
+            print(f"[Form Retention] Warning: Pruning failed: {e}")
+
+
+@app.on_event("startup")
+async def start_form_retention():
+    global _retention_task
+    if FORM_RETENTION_ENABLED:
+        _retention_task = asyncio.create_task(_prune_form_versions_periodically())
+        print(
+            f"[Form Retention] Keeping last {FORM_RETENTION_KEEP_VERSIONS} version(s) / {FORM_RETENTION_KEEP_DAYS} day(s) "
+            f"and the versions of the last {FORM_RETENTION_KEEP_DEPLOYMENTS} deployment(s), pruning every {FORM_RETENTION_INTERVAL_MINUTES} min"
+            + (f" within {FORM_RETENTION_WINDOW}" if retention_window else "")
+        )
+
+
+@app.on_event("shutdown")
+async def stop_form_retention():
+    if _retention_task:
+        _retention_task.cancel()
+
+
+_change_feed_task: Optional[asyncio.Task] = None
+
+
+@app.on_event("startup")
+async def start_change_feed():
+    global _change_feed_task
+    _change_feed_task = asyncio.create_task(change_feed.run())
+
+
+@app.on_event("shutdown")
+async def stop_change_feed():
+    if _change_feed_task:
+        _change_feed_task.cancel()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,313 @@
+-- Migration: 006 - Compressed binary storage for CompiledCode
+-- Description: Stores form bundles as compressed VARBINARY(MAX) with an encoding marker
+--              instead of NVARCHAR(MAX) (UTF-16, double the size of the UTF-8 source)
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before altering; conversion resumes where it stopped)
+-- Requires: SQL Server 2016+ (COMPRESS / DECOMPRESS)
+--
+-- Storage formats (CustomFormVersions.CodeEncoding):
+--   NULL           Legacy row: code is in CompiledCode (NVARCHAR)
+--   'gzip-utf8'    CompiledCodeBinary = gzip(UTF-8 code). Written by the Python backend.
+--                  Served as-is to clients that send Accept-Encoding: gzip.
+--   'gzip-utf16le' CompiledCodeBinary = COMPRESS(CompiledCode). Written by the batch
+--                  conversion below. Readable in T-SQL with
+--                  CAST(DECOMPRESS(CompiledCodeBinary) AS NVARCHAR(MAX)).
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that writes
+-- compressed code, whatever FORM_CODE_COMPRESSION says: that backend always passes
+-- @CompiledCodeBinary / @CodeEncoding to sp_UpsertCustomForm and always selects
+-- CompiledCodeBinary / CodeEncoding. FORM_CODE_COMPRESSION=false does not make it
+-- run on a database without this migration.
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. New columns
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.columns
+               WHERE object_id = OBJECT_ID('dbo.CustomFormVersions') AND name = 'CompiledCodeBinary')
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ADD [CompiledCodeBinary] VARBINARY(MAX) NULL;
+    PRINT 'Column CompiledCodeBinary added';
+END
+ELSE
+BEGIN
+    PRINT 'Column CompiledCodeBinary already exists';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.columns
+               WHERE object_id = OBJECT_ID('dbo.CustomFormVersions') AND name = 'CodeEncoding')
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ADD [CodeEncoding] VARCHAR(20) NULL;
+    PRINT 'Column CodeEncoding added';
+END
+ELSE
+BEGIN
+    PRINT 'Column CodeEncoding already exists';
+END
+GO
+
+-- CompiledCode is NULL for compressed rows
+IF EXISTS (SELECT * FROM sys.columns
+           WHERE object_id = OBJECT_ID('dbo.CustomFormVersions') AND name = 'CompiledCode' AND is_nullable = 0)
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ALTER COLUMN [CompiledCode] NVARCHAR(MAX) NULL;
+    PRINT 'Column CompiledCode is now nullable';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.check_constraints WHERE name = 'CK_CustomFormVersions_CodeStorage')
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ADD CONSTRAINT [CK_CustomFormVersions_CodeStorage] CHECK (
+        ([CodeEncoding] IS NULL AND [CompiledCode] IS NOT NULL)
+        OR ([CodeEncoding] IN ('gzip-utf8', 'gzip-utf16le') AND [CompiledCodeBinary] IS NOT NULL)
+    );
+    PRINT 'Constraint CK_CustomFormVersions_CodeStorage created';
+END
+GO
+
+-- ==============================================================================
+-- 2. sp_UpsertCustomForm: accepts compressed code
+--    @CompiledCode (text) is still accepted, so existing callers keep working.
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.sp_UpsertCustomForm', 'P') IS NOT NULL
+    DROP PROCEDURE dbo.sp_UpsertCustomForm;
+GO
+
+CREATE PROCEDURE [dbo].[sp_UpsertCustomForm]
+    @FormName NVARCHAR(255),
+    @ProcessName NVARCHAR(255),
+    @Version NVARCHAR(50),
+    @Description NVARCHAR(MAX),
+    @Author NVARCHAR(255),
+    @CompiledCode NVARCHAR(MAX) = NULL,
+    @SizeBytes INT,
+    @PackageVersion NVARCHAR(50),
+    @CommitHash NVARCHAR(50),
+    @BuildDate DATETIME,
+    @ReleaseNotes NVARCHAR(MAX) = NULL,
+    @CompiledCodeBinary VARBINARY(MAX) = NULL,
+    @CodeEncoding VARCHAR(20) = NULL
+AS
+BEGIN
+    -- Ensure proper SET options inside the procedure
+    SET NOCOUNT ON;
+    SET QUOTED_IDENTIFIER ON;
+    SET ANSI_NULLS ON;
+    SET ANSI_WARNINGS ON;
+    SET ARITHABORT ON;
+    SET CONCAT_NULL_YIELDS_NULL ON;
+    SET NUMERIC_ROUNDABORT OFF;
+
+    DECLARE @FormId INT;
+    DECLARE @ExistingVersionId INT;
+    DECLARE @Action NVARCHAR(20);
+
+    -- Compressed code replaces the text column
+    IF @CompiledCodeBinary IS NOT NULL
+        SET @CompiledCode = NULL;
+    ELSE
+        SET @CodeEncoding = NULL;
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        -- 1. Check if form exists in CustomForms
+        SELECT @FormId = FormId
+        FROM CustomForms WITH (NOLOCK)
+        WHERE FormName = @FormName;
+
+        -- 2. If not exists, create record in CustomForms
+        IF @FormId IS NULL
+        BEGIN
+            INSERT INTO CustomForms (
+                FormName,
+                ProcessName,
+                DisplayName,
+                Description,
+                CurrentVersion,
+                Status,
+                Author,
+                CreatedBy,
+                CreatedAt,
+                UpdatedAt
+            )
+            VALUES (
+                @FormName,
+                @ProcessName,
+                @FormName,
+                @Description,
+                @Version,
+                'active',
+                @Author,
+                @Author,
+                GETUTCDATE(),
+                GETUTCDATE()
+            );
+
+            SET @FormId = SCOPE_IDENTITY();
+            SET @Action = 'inserted';
+        END
+        ELSE
+        BEGIN
+            -- Update form metadata
+            UPDATE CustomForms
+            SET ProcessName = @ProcessName,
+                Description = @Description,
+                CurrentVersion = @Version,
+                Author = @Author,
+                UpdatedBy = @Author,
+                UpdatedAt = GETUTCDATE()
+            WHERE FormId = @FormId;
+
+            SET @Action = 'updated';
+        END
+
+        -- 3. Deactivate current version (if exists)
+        UPDATE CustomFormVersions
+        SET IsCurrent = 0
+        WHERE FormId = @FormId AND IsCurrent = 1;
+
+        -- 4. Check if this specific version already exists
+        SELECT @ExistingVersionId = VersionId
+        FROM CustomFormVersions WITH (NOLOCK)
+        WHERE FormId = @FormId AND Version = @Version;
+
+        -- 5. Prepare metadata JSON with deployment info
+        DECLARE @MetadataJson NVARCHAR(MAX);
+        SET @MetadataJson = '{' +
+            '"packageVersion":"' + ISNULL(@PackageVersion, '') + '",' +
+            '"commitHash":"' + ISNULL(@CommitHash, '') + '",' +
+            '"buildDate":"' + ISNULL(CONVERT(NVARCHAR(50), @BuildDate, 127), '') + '"' +
+        '}';
+
+        IF @ExistingVersionId IS NOT NULL
+        BEGIN
+            -- Update existing version
+            UPDATE CustomFormVersions
+            SET CompiledCode = @CompiledCode,
+                CompiledCodeBinary = @CompiledCodeBinary,
+                CodeEncoding = @CodeEncoding,
+                SizeBytes = @SizeBytes,
+                CommitHash = @CommitHash,
+                BuildNumber = @PackageVersion,
+                IsCurrent = 1,
+                PublishedBy = @Author,
+                PublishedAt = GETUTCDATE(),
+                Metadata = @MetadataJson,
+                ReleaseNotes = @ReleaseNotes
+            WHERE VersionId = @ExistingVersionId;
+        END
+        ELSE
+        BEGIN
+            -- Insert new version
+            INSERT INTO CustomFormVersions (
+                FormId,
+                Version,
+                CompiledCode,
+                CompiledCodeBinary,
+                CodeEncoding,
+                SizeBytes,
+                CommitHash,
+                BuildNumber,
+                IsCurrent,
+                PublishedBy,
+                PublishedAt,
+                Metadata,
+                ReleaseNotes
+            )
+            VALUES (
+                @FormId,
+                @Version,
+                @CompiledCode,
+                @CompiledCodeBinary,
+                @CodeEncoding,
+                @SizeBytes,
+                @CommitHash,
+                @PackageVersion,
+                1,
+                @Author,
+                GETUTCDATE(),
+                @MetadataJson,
+                @ReleaseNotes
+            );
+        END
+
+        COMMIT TRANSACTION;
+
+        -- Return result
+        SELECT @Action AS Action, @FormId AS FormId;
+
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        -- Re-throw error
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+        DECLARE @ErrorSeverity INT = ERROR_SEVERITY();
+        DECLARE @ErrorState INT = ERROR_STATE();
+
+        RAISERROR(@ErrorMessage, @ErrorSeverity, @ErrorState);
+    END CATCH
+END
+GO
+
+PRINT 'Stored procedure sp_UpsertCustomForm recreated with compressed code support';
+GO
+
+-- ==============================================================================
+-- 3. Convert existing rows in batches
+--    Small batches keep each transaction short (log growth, lock duration).
+--    Safe to stop and re-run: only rows still in NVARCHAR are converted.
+-- ==============================================================================
+
+DECLARE @BatchSize INT = 50;
+DECLARE @Converted INT = 1;
+DECLARE @Total INT = 0;
+
+WHILE @Converted > 0
+BEGIN
+    UPDATE TOP (@BatchSize) [dbo].[CustomFormVersions]
+    SET CompiledCodeBinary = COMPRESS(CompiledCode),
+        CodeEncoding = 'gzip-utf16le',
+        CompiledCode = NULL
+    WHERE CodeEncoding IS NULL
+      AND CompiledCode IS NOT NULL;
+
+    SET @Converted = @@ROWCOUNT;
+    SET @Total = @Total + @Converted;
+
+    IF @Converted > 0
+    BEGIN
+        PRINT CONCAT('Converted ', @Total, ' version(s) so far...');
+        WAITFOR DELAY '00:00:00.200';
+    END
+END
+
+PRINT CONCAT('Compressed ', @Total, ' existing version(s)');
+GO
+
+-- Verify storage distribution
+SELECT
+    ISNULL(CodeEncoding, 'nvarchar (legacy)') AS CodeEncoding,
+    COUNT(*) AS Versions,
+    SUM(DATALENGTH(CompiledCode)) AS TextBytes,
+    SUM(DATALENGTH(CompiledCodeBinary)) AS BinaryBytes
+FROM [dbo].[CustomFormVersions]
+GROUP BY CodeEncoding;
+GO
+
+PRINT '✓ Migration 006 completed';
+PRINT 'Run ALTER INDEX ALL ON dbo.CustomFormVersions REBUILD during a maintenance window to reclaim space';
+GO
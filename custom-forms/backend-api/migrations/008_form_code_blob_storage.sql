@@ -0,0 +1,305 @@
+-- Migration: 008 - Content-addressed blob storage for compiled code
+-- Description: Keeps version metadata in SQL and optionally stores the payload in a
+--              blob store (local filesystem or HTTP object store), keyed by content hash
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before altering)
+-- Requires: Migration 007
+--
+-- New columns (CustomFormVersions):
+--   ContentHash     sha256 (hex) of the UTF-8 code. Written for every new deployment,
+--                   whatever the storage backend. NULL for rows deployed before this
+--                   migration.
+--   StorageBackend  NULL = payload in CompiledCode / CompiledCodeBinary (SQL)
+--                   'filesystem' / 'object' = gzip(UTF-8 code) in the blob store under
+--                   sha256/<hash[0:2]>/<hash[2:4]>/<hash>.js.gz. CodeEncoding is 'gzip-utf8'.
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that passes
+-- @ContentHash / @StorageBackend to sp_UpsertCustomForm. Migrations 006 to 011 are
+-- applied in order before that backend is deployed.
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. New columns
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.columns
+               WHERE object_id = OBJECT_ID('dbo.CustomFormVersions') AND name = 'ContentHash')
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ADD [ContentHash] CHAR(64) NULL;
+    PRINT 'Column ContentHash added';
+END
+ELSE
+BEGIN
+    PRINT 'Column ContentHash already exists';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.columns
+               WHERE object_id = OBJECT_ID('dbo.CustomFormVersions') AND name = 'StorageBackend')
+BEGIN
+    ALTER TABLE [dbo].[CustomFormVersions] ADD [StorageBackend] VARCHAR(20) NULL;
+    PRINT 'Column StorageBackend added';
+END
+ELSE
+BEGIN
+    PRINT 'Column StorageBackend already exists';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormVersions_ContentHash')
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_CustomFormVersions_ContentHash]
+        ON [dbo].[CustomFormVersions] ([ContentHash])
+        WHERE [ContentHash] IS NOT NULL;
+    PRINT 'Index IX_CustomFormVersions_ContentHash created';
+END
+GO
+
+-- ==============================================================================
+-- 2. Storage constraint: blob rows have no code in the table
+-- ==============================================================================
+
+IF EXISTS (SELECT * FROM sys.check_constraints WHERE name = 'CK_CustomFormVersions_CodeStorage')
+    ALTER TABLE [dbo].[CustomFormVersions] DROP CONSTRAINT [CK_CustomFormVersions_CodeStorage];
+GO
+
+ALTER TABLE [dbo].[CustomFormVersions] ADD CONSTRAINT [CK_CustomFormVersions_CodeStorage] CHECK (
+    ([StorageBackend] IS NULL AND (
+        ([CodeEncoding] IS NULL AND [CompiledCode] IS NOT NULL AND [DeltaBaseVersionId] IS NULL)
+        OR ([CodeEncoding] IN ('gzip-utf8', 'gzip-utf16le') AND [CompiledCodeBinary] IS NOT NULL AND [DeltaBaseVersionId] IS NULL)
+        OR ([CodeEncoding] = 'delta-gzip' AND [CompiledCodeBinary] IS NOT NULL AND [DeltaBaseVersionId] IS NOT NULL AND [IsCurrent] = 0)
+    ))
+    OR ([StorageBackend] IN ('filesystem', 'object')
+        AND [ContentHash] IS NOT NULL
+        AND [CodeEncoding] = 'gzip-utf8'
+        AND [CompiledCode] IS NULL
+        AND [CompiledCodeBinary] IS NULL
+        AND [DeltaBaseVersionId] IS NULL)
+);
+PRINT 'Constraint CK_CustomFormVersions_CodeStorage updated';
+GO
+
+-- ==============================================================================
+-- 3. sp_UpsertCustomForm: accepts @ContentHash and @StorageBackend
+--    Both are optional, so existing callers (.NET backend) keep working.
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.sp_UpsertCustomForm', 'P') IS NOT NULL
+    DROP PROCEDURE dbo.sp_UpsertCustomForm;
+GO
+
+CREATE PROCEDURE [dbo].[sp_UpsertCustomForm]
+    @FormName NVARCHAR(255),
+    @ProcessName NVARCHAR(255),
+    @Version NVARCHAR(50),
+    @Description NVARCHAR(MAX),
+    @Author NVARCHAR(255),
+    @CompiledCode NVARCHAR(MAX) = NULL,
+    @SizeBytes INT,
+    @PackageVersion NVARCHAR(50),
+    @CommitHash NVARCHAR(50),
+    @BuildDate DATETIME,
+    @ReleaseNotes NVARCHAR(MAX) = NULL,
+    @CompiledCodeBinary VARBINARY(MAX) = NULL,
+    @CodeEncoding VARCHAR(20) = NULL,
+    @ContentHash CHAR(64) = NULL,
+    @StorageBackend VARCHAR(20) = NULL
+AS
+BEGIN
+    -- Ensure proper SET options inside the procedure
+    SET NOCOUNT ON;
+    SET QUOTED_IDENTIFIER ON;
+    SET ANSI_NULLS ON;
+    SET ANSI_WARNINGS ON;
+    SET ARITHABORT ON;
+    SET CONCAT_NULL_YIELDS_NULL ON;
+    SET NUMERIC_ROUNDABORT OFF;
+
+    DECLARE @FormId INT;
+    DECLARE @ExistingVersionId INT;
+    DECLARE @Action NVARCHAR(20);
+
+    -- Blob storage: the payload lives outside the table (ContentHash is the key)
+    -- Compressed code replaces the text column
+    IF @StorageBackend IS NOT NULL
+    BEGIN
+        SET @CompiledCode = NULL;
+        SET @CompiledCodeBinary = NULL;
+    END
+    ELSE IF @CompiledCodeBinary IS NOT NULL
+        SET @CompiledCode = NULL;
+    ELSE
+        SET @CodeEncoding = NULL;
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        -- 1. Check if form exists in CustomForms
+        SELECT @FormId = FormId
+        FROM CustomForms WITH (NOLOCK)
+        WHERE FormName = @FormName;
+
+        -- 2. If not exists, create record in CustomForms
+        IF @FormId IS NULL
+        BEGIN
+            INSERT INTO CustomForms (
+                FormName,
+                ProcessName,
+                DisplayName,
+                Description,
+                CurrentVersion,
+                Status,
+                Author,
+                CreatedBy,
+                CreatedAt,
+                UpdatedAt
+            )
+            VALUES (
+                @FormName,
+                @ProcessName,
+                @FormName,
+                @Description,
+                @Version,
+                'active',
+                @Author,
+                @Author,
+                GETUTCDATE(),
+                GETUTCDATE()
+            );
+
+            SET @FormId = SCOPE_IDENTITY();
+            SET @Action = 'inserted';
+        END
+        ELSE
+        BEGIN
+            -- Update form metadata
+            UPDATE CustomForms
+            SET ProcessName = @ProcessName,
+                Description = @Description,
+                CurrentVersion = @Version,
+                Author = @Author,
+                UpdatedBy = @Author,
+                UpdatedAt = GETUTCDATE()
+            WHERE FormId = @FormId;
+
+            SET @Action = 'updated';
+        END
+
+        -- 3. Deactivate current version (if exists)
+        UPDATE CustomFormVersions
+        SET IsCurrent = 0
+        WHERE FormId = @FormId AND IsCurrent = 1;
+
+        -- 4. Check if this specific version already exists
+        SELECT @ExistingVersionId = VersionId
+        FROM CustomFormVersions WITH (NOLOCK)
+        WHERE FormId = @FormId AND Version = @Version;
+
+        -- 4b. Re-deploying a version that other versions use as delta base would
+        --     invalidate their deltas. The Python backend materializes them first.
+        IF @ExistingVersionId IS NOT NULL
+           AND EXISTS (SELECT 1 FROM CustomFormVersions WHERE DeltaBaseVersionId = @ExistingVersionId)
+        BEGIN
+            RAISERROR('Version %s is the delta base of other versions; materialize them before re-deploying it', 16, 1, @Version);
+        END
+
+        -- 5. Prepare metadata JSON with deployment info
+        DECLARE @MetadataJson NVARCHAR(MAX);
+        SET @MetadataJson = '{' +
+            '"packageVersion":"' + ISNULL(@PackageVersion, '') + '",' +
+            '"commitHash":"' + ISNULL(@CommitHash, '') + '",' +
+            '"buildDate":"' + ISNULL(CONVERT(NVARCHAR(50), @BuildDate, 127), '') + '"' +
+        '}';
+
+        IF @ExistingVersionId IS NOT NULL
+        BEGIN
+            -- Update existing version
+            UPDATE CustomFormVersions
+            SET CompiledCode = @CompiledCode,
+                CompiledCodeBinary = @CompiledCodeBinary,
+                CodeEncoding = @CodeEncoding,
+                DeltaBaseVersionId = NULL,
+                ContentHash = @ContentHash,
+                StorageBackend = @StorageBackend,
+                SizeBytes = @SizeBytes,
+                CommitHash = @CommitHash,
+                BuildNumber = @PackageVersion,
+                IsCurrent = 1,
+                PublishedBy = @Author,
+                PublishedAt = GETUTCDATE(),
+                Metadata = @MetadataJson,
+                ReleaseNotes = @ReleaseNotes
+            WHERE VersionId = @ExistingVersionId;
+        END
+        ELSE
+        BEGIN
+            -- Insert new version
+            INSERT INTO CustomFormVersions (
+                FormId,
+                Version,
+                CompiledCode,
+                CompiledCodeBinary,
+                CodeEncoding,
+                ContentHash,
+                StorageBackend,
+                SizeBytes,
+                CommitHash,
+                BuildNumber,
+                IsCurrent,
+                PublishedBy,
+                PublishedAt,
+                Metadata,
+                ReleaseNotes
+            )
+            VALUES (
+                @FormId,
+                @Version,
+                @CompiledCode,
+                @CompiledCodeBinary,
+                @CodeEncoding,
+                @ContentHash,
+                @StorageBackend,
+                @SizeBytes,
+                @CommitHash,
+                @PackageVersion,
+                1,
+                @Author,
+                GETUTCDATE(),
+                @MetadataJson,
+                @ReleaseNotes
+            );
+        END
+
+        COMMIT TRANSACTION;
+
+        -- Return result
+        SELECT @Action AS Action, @FormId AS FormId;
+
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        -- Re-throw error
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+        DECLARE @ErrorSeverity INT = ERROR_SEVERITY();
+        DECLARE @ErrorState INT = ERROR_STATE();
+
+        RAISERROR(@ErrorMessage, @ErrorSeverity, @ErrorState);
+    END CATCH
+END
+GO
+
+PRINT 'Stored procedure sp_UpsertCustomForm recreated with blob storage support';
+GO
+
+PRINT '✓ Migration 008 completed';
+GO
@@ -0,0 +1,453 @@
+-- Migration: 009 - Shared compiled code blobs (deduplication)
+-- Description: Stores each distinct compiled bundle once (CustomFormBlobs, keyed by
+--              ContentHash) and makes versions reference it, with reference counting
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before altering; conversion resumes where it stopped)
+-- Requires: Migration 008
+--
+-- Version rows with StorageBackend NOT NULL reference CustomFormBlobs.ContentHash:
+--   'sql'                  payload in CustomFormBlobs.CompiledCodeBinary (gzip-utf8)
+--   'filesystem'/'object'  payload in the blob store (see blob_storage.py)
+--
+-- CustomFormBlobs.RefCount is maintained by TR_CustomFormVersions_BlobRefCount, so it
+-- stays correct for every writer (stored procedure, Python and .NET deletes). Blobs
+-- with RefCount = 0 are removed by the Python backend when versions are deleted.
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that writes
+-- shared blobs, whatever FORM_CODE_DEDUP says: every code read of the Python and
+-- .NET backends joins CustomFormBlobs. Migrations 006 to 011 are applied in order.
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. CustomFormBlobs
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'CustomFormBlobs')
+BEGIN
+    CREATE TABLE [dbo].[CustomFormBlobs] (
+        [ContentHash] CHAR(64) NOT NULL,
+        [StorageBackend] VARCHAR(20) NOT NULL,
+        [CompiledCodeBinary] VARBINARY(MAX) NULL,
+        [CodeEncoding] VARCHAR(20) NOT NULL,
+        [SizeBytes] INT NOT NULL,
+        [RefCount] INT NOT NULL CONSTRAINT [DF_CustomFormBlobs_RefCount] DEFAULT 0,
+        [CreatedAt] DATETIME NOT NULL CONSTRAINT [DF_CustomFormBlobs_CreatedAt] DEFAULT GETUTCDATE(),
+        CONSTRAINT [PK_CustomFormBlobs] PRIMARY KEY CLUSTERED ([ContentHash]),
+        CONSTRAINT [CK_CustomFormBlobs_Storage] CHECK (
+            ([StorageBackend] = 'sql' AND [CompiledCodeBinary] IS NOT NULL)
+            OR ([StorageBackend] IN ('filesystem', 'object') AND [CompiledCodeBinary] IS NULL)
+        )
+    );
+    PRINT 'Table CustomFormBlobs created';
+END
+ELSE
+BEGIN
+    PRINT 'Table CustomFormBlobs already exists';
+END
+GO
+
+-- Versions written to the blob store by the migration 008 backend
+INSERT INTO [dbo].[CustomFormBlobs] (ContentHash, StorageBackend, CodeEncoding, SizeBytes)
+SELECT cfv.ContentHash, MIN(cfv.StorageBackend), 'gzip-utf8', MAX(cfv.SizeBytes)
+FROM [dbo].[CustomFormVersions] cfv
+WHERE cfv.StorageBackend IN ('filesystem', 'object')
+  AND NOT EXISTS (SELECT 1 FROM [dbo].[CustomFormBlobs] b WHERE b.ContentHash = cfv.ContentHash)
+GROUP BY cfv.ContentHash;
+PRINT CONCAT('Registered ', @@ROWCOUNT, ' existing blob store payload(s)');
+GO
+
+-- ==============================================================================
+-- 2. Storage constraint: 'sql' shared blobs
+-- ==============================================================================
+
+IF EXISTS (SELECT * FROM sys.check_constraints WHERE name = 'CK_CustomFormVersions_CodeStorage')
+    ALTER TABLE [dbo].[CustomFormVersions] DROP CONSTRAINT [CK_CustomFormVersions_CodeStorage];
+GO
+
+ALTER TABLE [dbo].[CustomFormVersions] ADD CONSTRAINT [CK_CustomFormVersions_CodeStorage] CHECK (
+    ([StorageBackend] IS NULL AND (
+        ([CodeEncoding] IS NULL AND [CompiledCode] IS NOT NULL AND [DeltaBaseVersionId] IS NULL)
+        OR ([CodeEncoding] IN ('gzip-utf8', 'gzip-utf16le') AND [CompiledCodeBinary] IS NOT NULL AND [DeltaBaseVersionId] IS NULL)
+        OR ([CodeEncoding] = 'delta-gzip' AND [CompiledCodeBinary] IS NOT NULL AND [DeltaBaseVersionId] IS NOT NULL AND [IsCurrent] = 0)
+    ))
+    OR ([StorageBackend] IN ('sql', 'filesystem', 'object')
+        AND [ContentHash] IS NOT NULL
+        AND [CodeEncoding] = 'gzip-utf8'
+        AND [CompiledCode] IS NULL
+        AND [CompiledCodeBinary] IS NULL
+        AND [DeltaBaseVersionId] IS NULL)
+);
+PRINT 'Constraint CK_CustomFormVersions_CodeStorage updated';
+GO
+
+-- ==============================================================================
+-- 3. Reference counting
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.TR_CustomFormVersions_BlobRefCount', 'TR') IS NOT NULL
+    DROP TRIGGER dbo.TR_CustomFormVersions_BlobRefCount;
+GO
+
+CREATE TRIGGER [dbo].[TR_CustomFormVersions_BlobRefCount]
+ON [dbo].[CustomFormVersions]
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- Updates that don't touch the blob reference
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(ContentHash) OR UPDATE(StorageBackend))
+        RETURN;
+
+    UPDATE b
+    SET RefCount = b.RefCount + refs.Delta
+    FROM CustomFormBlobs b
+    INNER JOIN (
+        SELECT ContentHash, SUM(Delta) AS Delta
+        FROM (
+            SELECT ContentHash, 1 AS Delta FROM inserted WHERE StorageBackend IS NOT NULL
+            UNION ALL
+            SELECT ContentHash, -1 AS Delta FROM deleted WHERE StorageBackend IS NOT NULL
+        ) changes
+        GROUP BY ContentHash
+    ) refs ON refs.ContentHash = b.ContentHash
+    WHERE refs.Delta <> 0;
+END
+GO
+
+PRINT 'Trigger TR_CustomFormVersions_BlobRefCount created';
+GO
+
+-- ==============================================================================
+-- 4. sp_UpsertCustomForm: shared blobs
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.sp_UpsertCustomForm', 'P') IS NOT NULL
+    DROP PROCEDURE dbo.sp_UpsertCustomForm;
+GO
+
+CREATE PROCEDURE [dbo].[sp_UpsertCustomForm]
+    @FormName NVARCHAR(255),
+    @ProcessName NVARCHAR(255),
+    @Version NVARCHAR(50),
+    @Description NVARCHAR(MAX),
+    @Author NVARCHAR(255),
+    @CompiledCode NVARCHAR(MAX) = NULL,
+    @SizeBytes INT,
+    @PackageVersion NVARCHAR(50),
+    @CommitHash NVARCHAR(50),
+    @BuildDate DATETIME,
+    @ReleaseNotes NVARCHAR(MAX) = NULL,
+    @CompiledCodeBinary VARBINARY(MAX) = NULL,
+    @CodeEncoding VARCHAR(20) = NULL,
+    @ContentHash CHAR(64) = NULL,
+    @StorageBackend VARCHAR(20) = NULL
+AS
+BEGIN
+    -- Ensure proper SET options inside the procedure
+    SET NOCOUNT ON;
+    SET QUOTED_IDENTIFIER ON;
+    SET ANSI_NULLS ON;
+    SET ANSI_WARNINGS ON;
+    SET ARITHABORT ON;
+    SET CONCAT_NULL_YIELDS_NULL ON;
+    SET NUMERIC_ROUNDABORT OFF;
+
+    DECLARE @FormId INT;
+    DECLARE @ExistingVersionId INT;
+    DECLARE @Action NVARCHAR(20);
+
+    -- Shared blob: the payload lives in CustomFormBlobs / the blob store (ContentHash is the key)
+    -- Compressed code replaces the text column
+    DECLARE @SharedCodeBinary VARBINARY(MAX) = NULL;
+
+    IF @StorageBackend IS NOT NULL
+    BEGIN
+        SET @SharedCodeBinary = @CompiledCodeBinary;
+        SET @CompiledCode = NULL;
+        SET @CompiledCodeBinary = NULL;
+    END
+    ELSE IF @CompiledCodeBinary IS NOT NULL
+        SET @CompiledCode = NULL;
+    ELSE
+        SET @CodeEncoding = NULL;
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        -- 0. Shared blob: stored once per ContentHash. When it already exists the
+        --    payload may be omitted and the version is a metadata-only insert.
+        IF @StorageBackend IS NOT NULL
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM CustomFormBlobs WITH (UPDLOCK, HOLDLOCK) WHERE ContentHash = @ContentHash)
+            BEGIN
+                IF @StorageBackend = 'sql' AND @SharedCodeBinary IS NULL
+                    RAISERROR('Blob %s was removed before the deployment completed; retry the deployment', 16, 1, @ContentHash);
+
+                INSERT INTO CustomFormBlobs (ContentHash, StorageBackend, CompiledCodeBinary, CodeEncoding, SizeBytes)
+                VALUES (
+                    @ContentHash,
+                    @StorageBackend,
+                    CASE WHEN @StorageBackend = 'sql' THEN @SharedCodeBinary END,
+                    @CodeEncoding,
+                    @SizeBytes
+                );
+            END
+
+            -- An existing blob keeps its location
+            SELECT @StorageBackend = StorageBackend, @CodeEncoding = CodeEncoding
+            FROM CustomFormBlobs
+            WHERE ContentHash = @ContentHash;
+        END
+
+        -- 1. Check if form exists in CustomForms
+        SELECT @FormId = FormId
+        FROM CustomForms WITH (NOLOCK)
+        WHERE FormName = @FormName;
+
+        -- 2. If not exists, create record in CustomForms
+        IF @FormId IS NULL
+        BEGIN
+            INSERT INTO CustomForms (
+                FormName,
+                ProcessName,
+                DisplayName,
+                Description,
+                CurrentVersion,
+                Status,
+                Author,
+                CreatedBy,
+                CreatedAt,
+                UpdatedAt
+            )
+            VALUES (
+                @FormName,
+                @ProcessName,
+                @FormName,
+                @Description,
+                @Version,
+                'active',
+                @Author,
+                @Author,
+                GETUTCDATE(),
+                GETUTCDATE()
+            );
+
+            SET @FormId = SCOPE_IDENTITY();
+            SET @Action = 'inserted';
+        END
+        ELSE
+        BEGIN
+            -- Update form metadata
+            UPDATE CustomForms
+            SET ProcessName = @ProcessName,
+                Description = @Description,
+                CurrentVersion = @Version,
+                Author = @Author,
+                UpdatedBy = @Author,
+                UpdatedAt = GETUTCDATE()
+            WHERE FormId = @FormId;
+
+            SET @Action = 'updated';
+        END
+
+        -- 3. Deactivate current version (if exists)
+        UPDATE CustomFormVersions
+        SET IsCurrent = 0
+        WHERE FormId = @FormId AND IsCurrent = 1;
+
+        -- 4. Check if this specific version already exists
+        SELECT @ExistingVersionId = VersionId
+        FROM CustomFormVersions WITH (NOLOCK)
+        WHERE FormId = @FormId AND Version = @Version;
+
+        -- 4b. Re-deploying a version that other versions use as delta base would
+        --     invalidate their deltas. The Python backend materializes them first.
+        IF @ExistingVersionId IS NOT NULL
+           AND EXISTS (SELECT 1 FROM CustomFormVersions WHERE DeltaBaseVersionId = @ExistingVersionId)
+        BEGIN
+            RAISERROR('Version %s is the delta base of other versions; materialize them before re-deploying it', 16, 1, @Version);
+        END
+
+        -- 5. Prepare metadata JSON with deployment info
+        DECLARE @MetadataJson NVARCHAR(MAX);
+        SET @MetadataJson = '{' +
+            '"packageVersion":"' + ISNULL(@PackageVersion, '') + '",' +
+            '"commitHash":"' + ISNULL(@CommitHash, '') + '",' +
+            '"buildDate":"' + ISNULL(CONVERT(NVARCHAR(50), @BuildDate, 127), '') + '"' +
+        '}';
+
+        IF @ExistingVersionId IS NOT NULL
+        BEGIN
+            -- Update existing version
+            UPDATE CustomFormVersions
+            SET CompiledCode = @CompiledCode,
+                CompiledCodeBinary = @CompiledCodeBinary,
+                CodeEncoding = @CodeEncoding,
+                DeltaBaseVersionId = NULL,
+                ContentHash = @ContentHash,
+                StorageBackend = @StorageBackend,
+                SizeBytes = @SizeBytes,
+                CommitHash = @CommitHash,
+                BuildNumber = @PackageVersion,
+                IsCurrent = 1,
+                PublishedBy = @Author,
+                PublishedAt = GETUTCDATE(),
+                Metadata = @MetadataJson,
+                ReleaseNotes = @ReleaseNotes
+            WHERE VersionId = @ExistingVersionId;
+        END
+        ELSE
+        BEGIN
+            -- Insert new version
+            INSERT INTO CustomFormVersions (
+                FormId,
+                Version,
+                CompiledCode,
+                CompiledCodeBinary,
+                CodeEncoding,
+                ContentHash,
+                StorageBackend,
+                SizeBytes,
+                CommitHash,
+                BuildNumber,
+                IsCurrent,
+                PublishedBy,
+                PublishedAt,
+                Metadata,
+                ReleaseNotes
+            )
+            VALUES (
+                @FormId,
+                @Version,
+                @CompiledCode,
+                @CompiledCodeBinary,
+                @CodeEncoding,
+                @ContentHash,
+                @StorageBackend,
+                @SizeBytes,
+                @CommitHash,
+                @PackageVersion,
+                1,
+                @Author,
+                GETUTCDATE(),
+                @MetadataJson,
+                @ReleaseNotes
+            );
+        END
+
+        COMMIT TRANSACTION;
+
+        -- Return result
+        SELECT @Action AS Action, @FormId AS FormId;
+
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        -- Re-throw error
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+        DECLARE @ErrorSeverity INT = ERROR_SEVERITY();
+        DECLARE @ErrorState INT = ERROR_STATE();
+
+        RAISERROR(@ErrorMessage, @ErrorSeverity, @ErrorState);
+    END CATCH
+END
+GO
+
+PRINT 'Stored procedure sp_UpsertCustomForm recreated with shared blob support';
+GO
+
+-- ==============================================================================
+-- 5. Deduplicate existing 'gzip-utf8' rows in batches
+--    (sha256 of the decompressed UTF-8 code = ContentHash). Rows still in NVARCHAR,
+--    'gzip-utf16le' rows and deltas are left as they are.
+-- ==============================================================================
+
+DECLARE @BatchSize INT = 50;
+DECLARE @Converted INT = 1;
+DECLARE @Total INT = 0;
+
+WHILE @Converted > 0
+BEGIN
+    UPDATE TOP (@BatchSize) [dbo].[CustomFormVersions]
+    SET ContentHash = LOWER(CONVERT(CHAR(64), HASHBYTES('SHA2_256', DECOMPRESS(CompiledCodeBinary)), 2))
+    WHERE ContentHash IS NULL
+      AND StorageBackend IS NULL
+      AND CodeEncoding = 'gzip-utf8';
+
+    SET @Converted = @@ROWCOUNT;
+END
+
+SET @Converted = 1;
+
+WHILE @Converted > 0
+BEGIN
+    BEGIN TRANSACTION;
+
+    INSERT INTO [dbo].[CustomFormBlobs] (ContentHash, StorageBackend, CompiledCodeBinary, CodeEncoding, SizeBytes)
+    SELECT TOP (@BatchSize) candidates.ContentHash, 'sql', candidates.CompiledCodeBinary, 'gzip-utf8', candidates.SizeBytes
+    FROM (
+        SELECT ContentHash, CompiledCodeBinary, SizeBytes,
+               ROW_NUMBER() OVER (PARTITION BY ContentHash ORDER BY VersionId) AS RowNumber
+        FROM [dbo].[CustomFormVersions]
+        WHERE StorageBackend IS NULL AND CodeEncoding = 'gzip-utf8' AND ContentHash IS NOT NULL
+    ) candidates
+    WHERE candidates.RowNumber = 1
+      AND NOT EXISTS (SELECT 1 FROM [dbo].[CustomFormBlobs] b WHERE b.ContentHash = candidates.ContentHash);
+
+    UPDATE cfv
+    SET StorageBackend = b.StorageBackend,
+        CompiledCodeBinary = NULL
+    FROM [dbo].[CustomFormVersions] cfv
+    INNER JOIN [dbo].[CustomFormBlobs] b ON b.ContentHash = cfv.ContentHash
+    WHERE cfv.StorageBackend IS NULL AND cfv.CodeEncoding = 'gzip-utf8';
+
+    SET @Converted = @@ROWCOUNT;
+    SET @Total = @Total + @Converted;
+
+    COMMIT TRANSACTION;
+
+    IF @Converted > 0
+    BEGIN
+        PRINT CONCAT('Deduplicated ', @Total, ' version(s) so far...');
+        WAITFOR DELAY '00:00:00.200';
+    END
+END
+
+PRINT CONCAT('Moved ', @Total, ' version(s) to shared blobs');
+GO
+
+-- Recount references (absolute, so re-running the migration is safe)
+UPDATE b
+SET RefCount = (
+    SELECT COUNT(*)
+    FROM [dbo].[CustomFormVersions] cfv
+    WHERE cfv.ContentHash = b.ContentHash AND cfv.StorageBackend IS NOT NULL
+)
+FROM [dbo].[CustomFormBlobs] b;
+GO
+
+-- Verify deduplication
+SELECT
+    b.StorageBackend,
+    COUNT(*) AS Blobs,
+    SUM(b.RefCount) AS Versions,
+    SUM(DATALENGTH(b.CompiledCodeBinary)) AS BinaryBytes
+FROM [dbo].[CustomFormBlobs] b
+GROUP BY b.StorageBackend;
+GO
+
+PRINT '✓ Migration 009 completed';
+PRINT 'Run ALTER INDEX ALL ON dbo.CustomFormVersions REBUILD during a maintenance window to reclaim space';
+GO
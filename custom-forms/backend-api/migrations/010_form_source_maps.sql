@@ -0,0 +1,48 @@
+-- Migration: 010 - Per-version source maps
+-- Description: Stores the source map of each form version separately from its code,
+--              so bundles are served without it and devtools fetch it on demand
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before creating)
+-- Requires: Migration 001
+--
+-- SourceMapBinary is the gzip of the source map JSON in UTF-8 (same format as the
+-- 'gzip-utf8' code encoding). Rows are deleted together with their version
+-- (ON DELETE CASCADE), including the raw DELETEs issued by the .NET backend.
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that stores
+-- source maps (after migrations 006 to 009; they are applied in order).
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. CustomFormSourceMaps
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'CustomFormSourceMaps')
+BEGIN
+    CREATE TABLE [dbo].[CustomFormSourceMaps] (
+        [VersionId] INT NOT NULL,
+        [SourceMapBinary] VARBINARY(MAX) NOT NULL,
+        [SizeBytes] INT NOT NULL,
+        [CreatedAt] DATETIME NOT NULL CONSTRAINT [DF_CustomFormSourceMaps_CreatedAt] DEFAULT GETUTCDATE(),
+        CONSTRAINT [PK_CustomFormSourceMaps] PRIMARY KEY CLUSTERED ([VersionId]),
+        CONSTRAINT [FK_CustomFormSourceMaps_Version] FOREIGN KEY ([VersionId])
+            REFERENCES [dbo].[CustomFormVersions] ([VersionId]) ON DELETE CASCADE
+    );
+    PRINT 'Table CustomFormSourceMaps created';
+END
+ELSE
+BEGIN
+    PRINT 'Table CustomFormSourceMaps already exists';
+END
+GO
+
+PRINT '✓ Migration 010 completed';
+GO
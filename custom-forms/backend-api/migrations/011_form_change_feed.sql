@@ -0,0 +1,140 @@
+-- Migration: 011 - Form catalog change feed
+-- Description: Records every change of a form's current version (deploys, promotions,
+--              deletions) in CustomFormChanges, read by GET /api/custom-forms/changes
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before creating; trigger is recreated)
+-- Requires: Migration 008
+--
+-- Rows are written by TR_CustomFormVersions_Changes, so changes made by every writer
+-- (stored procedure, Python and .NET backends) are recorded. The trigger compares the
+-- form's current version (Version, ContentHash, PublishedAt) with the last recorded
+-- change, so intermediate states inside a transaction (IsCurrent cleared before the
+-- new current version is set) and updates that don't change the current bundle
+-- (delta materialization, content hash backfill) don't produce changes.
+--
+-- ChangeType:
+--   'updated'  the current version or its bundle changed (NewVersion, ContentHash)
+--   'deleted'  the form has no versions left
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that serves
+-- the change feed (after migrations 006 to 010; they are applied in order).
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. CustomFormChanges
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'CustomFormChanges')
+BEGIN
+    CREATE TABLE [dbo].[CustomFormChanges] (
+        [ChangeId] BIGINT IDENTITY(1,1) NOT NULL,
+        [FormId] INT NOT NULL,
+        [FormName] NVARCHAR(255) NOT NULL,
+        [ChangeType] VARCHAR(20) NOT NULL,
+        [OldVersion] NVARCHAR(50) NULL,
+        [NewVersion] NVARCHAR(50) NULL,
+        [ContentHash] CHAR(64) NULL,
+        [PublishedAt] DATETIME NULL,
+        [ChangedAt] DATETIME NOT NULL CONSTRAINT [DF_CustomFormChanges_ChangedAt] DEFAULT GETUTCDATE(),
+        CONSTRAINT [PK_CustomFormChanges] PRIMARY KEY CLUSTERED ([ChangeId]),
+        CONSTRAINT [CK_CustomFormChanges_ChangeType] CHECK ([ChangeType] IN ('updated', 'deleted'))
+    );
+    PRINT 'Table CustomFormChanges created';
+END
+ELSE
+BEGIN
+    PRINT 'Table CustomFormChanges already exists';
+END
+GO
+
+-- Last change of a form (read by the trigger)
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormChanges_FormId' AND object_id = OBJECT_ID('dbo.CustomFormChanges'))
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_CustomFormChanges_FormId]
+    ON [dbo].[CustomFormChanges] ([FormId], [ChangeId] DESC)
+    INCLUDE ([ChangeType], [NewVersion], [ContentHash], [PublishedAt]);
+    PRINT 'Index IX_CustomFormChanges_FormId created';
+END
+GO
+
+-- Baseline: current version of every existing form (first run only)
+IF NOT EXISTS (SELECT 1 FROM [dbo].[CustomFormChanges])
+BEGIN
+    INSERT INTO [dbo].[CustomFormChanges] (FormId, FormName, ChangeType, NewVersion, ContentHash, PublishedAt)
+    SELECT cf.FormId, cf.FormName, 'updated', cfv.Version, cfv.ContentHash, cfv.PublishedAt
+    FROM [dbo].[CustomForms] cf
+    INNER JOIN [dbo].[CustomFormVersions] cfv ON cfv.FormId = cf.FormId AND cfv.IsCurrent = 1
+    ORDER BY cf.FormId;
+    PRINT CONCAT('Recorded baseline for ', @@ROWCOUNT, ' form(s)');
+END
+GO
+
+-- ==============================================================================
+-- 2. Trigger
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.TR_CustomFormVersions_Changes', 'TR') IS NOT NULL
+    DROP TRIGGER dbo.TR_CustomFormVersions_Changes;
+GO
+
+CREATE TRIGGER [dbo].[TR_CustomFormVersions_Changes]
+ON [dbo].[CustomFormVersions]
+AFTER INSERT, UPDATE, DELETE
+AS
+BEGIN
+    SET NOCOUNT ON;
+
+    -- Updates that can't change the current bundle
+    IF EXISTS (SELECT 1 FROM inserted) AND EXISTS (SELECT 1 FROM deleted)
+       AND NOT (UPDATE(IsCurrent) OR UPDATE(Version) OR UPDATE(ContentHash) OR UPDATE(PublishedAt))
+        RETURN;
+
+    INSERT INTO CustomFormChanges (FormId, FormName, ChangeType, OldVersion, NewVersion, ContentHash, PublishedAt)
+    SELECT
+        forms.FormId,
+        cf.FormName,
+        CASE WHEN cur.Version IS NULL THEN 'deleted' ELSE 'updated' END,
+        CASE WHEN last.ChangeType = 'updated' THEN last.NewVersion END,
+        cur.Version,
+        cur.ContentHash,
+        cur.PublishedAt
+    FROM (SELECT FormId FROM inserted UNION SELECT FormId FROM deleted) forms
+    INNER JOIN CustomForms cf ON cf.FormId = forms.FormId
+    OUTER APPLY (
+        SELECT TOP 1 v.Version, v.ContentHash, v.PublishedAt
+        FROM CustomFormVersions v
+        WHERE v.FormId = forms.FormId AND v.IsCurrent = 1
+    ) cur
+    OUTER APPLY (
+        SELECT TOP 1 c.ChangeType, c.NewVersion, c.ContentHash, c.PublishedAt
+        FROM CustomFormChanges c
+        WHERE c.FormId = forms.FormId
+        ORDER BY c.ChangeId DESC
+    ) last
+    WHERE
+        -- Form without versions (no current version while others remain is a transient state)
+        (cur.Version IS NULL
+         AND NOT EXISTS (SELECT 1 FROM CustomFormVersions v WHERE v.FormId = forms.FormId)
+         AND ISNULL(last.ChangeType, '') <> 'deleted')
+        OR
+        (cur.Version IS NOT NULL
+         AND (ISNULL(last.ChangeType, 'deleted') = 'deleted'
+              OR last.NewVersion <> cur.Version
+              OR ISNULL(last.ContentHash, '') <> ISNULL(cur.ContentHash, '')
+              OR ISNULL(last.PublishedAt, '19000101') <> ISNULL(cur.PublishedAt, '19000101')));
+END
+GO
+
+PRINT 'Trigger TR_CustomFormVersions_Changes created';
+GO
+
+PRINT '✓ Migration 011 completed';
+GO
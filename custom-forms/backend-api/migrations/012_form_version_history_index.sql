@@ -0,0 +1,41 @@
+-- Migration: 012 - Version history covering index
+-- Description: Covering index for the paginated version history
+--              (GET /api/custom-forms/{form_name}/versions?limit=)
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before creating)
+-- Requires: Migration 001
+--
+-- The history is read in (PublishedAt DESC, VersionId DESC) order, one page after
+-- the last (PublishedAt, VersionId) of the previous page. With this index a page is
+-- a seek plus a range scan of `limit` rows, whatever the length of the history, and
+-- no lookup into the clustered index (where the code columns live) is needed.
+-- ReleaseNotes is not included: it is only read when the client asks for it.
+--
+-- Rollout: can be applied before or after deploying the backend version that
+-- paginates the history (without it the query is correct but scans the form's
+-- versions).
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormVersions_History' AND object_id = OBJECT_ID('dbo.CustomFormVersions'))
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_CustomFormVersions_History]
+    ON [dbo].[CustomFormVersions] ([FormId], [PublishedAt] DESC, [VersionId] DESC)
+    INCLUDE ([Version], [SizeBytes], [IsCurrent], [PackageVersion], [CommitHash], [BuildDate]);
+    PRINT 'Index IX_CustomFormVersions_History created';
+END
+ELSE
+BEGIN
+    PRINT 'Index IX_CustomFormVersions_History already exists';
+END
+GO
+
+PRINT '✓ Migration 012 completed';
+GO
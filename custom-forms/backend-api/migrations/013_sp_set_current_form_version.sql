@@ -0,0 +1,118 @@
+-- Migration: 013 - Single round-trip version promotion
+-- Description: sp_SetCurrentFormVersion validates the version, flips IsCurrent and
+--              updates CustomForms.CurrentVersion in one call and one transaction
+-- Date: 2026-10-18
+-- Idempotent: Yes (procedure is recreated)
+-- Requires: Migration 007
+--
+-- IsCurrent is flipped with a single UPDATE (old current -> 0, new current -> 1), so
+-- there is no moment, not even inside the transaction, where the form has zero or
+-- two current versions. The CustomForms row is locked (UPDLOCK) first, which
+-- serializes concurrent promotions of the same form.
+--
+-- Result set (one row):
+--   Status           'ok', 'not_found' (form or version) or 'delta' (the version is
+--                    stored as a delta, CodeEncoding 'delta-gzip', and must be
+--                    materialized before promoting it; nothing was changed)
+--   FormId, VersionId, PreviousVersion, Version, ContentHash, PublishedAt, SizeBytes
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that calls
+-- sp_SetCurrentFormVersion.
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+IF OBJECT_ID('dbo.sp_SetCurrentFormVersion', 'P') IS NOT NULL
+    DROP PROCEDURE dbo.sp_SetCurrentFormVersion;
+GO
+
+CREATE PROCEDURE [dbo].[sp_SetCurrentFormVersion]
+    @FormName NVARCHAR(255),
+    @Version NVARCHAR(50)
+AS
+BEGIN
+    -- Ensure proper SET options inside the procedure
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    SET QUOTED_IDENTIFIER ON;
+    SET ANSI_NULLS ON;
+    SET ANSI_WARNINGS ON;
+    SET ARITHABORT ON;
+    SET CONCAT_NULL_YIELDS_NULL ON;
+    SET NUMERIC_ROUNDABORT OFF;
+
+    DECLARE @FormId INT;
+    DECLARE @PreviousVersion NVARCHAR(50);
+    DECLARE @VersionId INT;
+    DECLARE @CodeEncoding VARCHAR(20);
+    DECLARE @Status VARCHAR(20) = 'ok';
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        SELECT @FormId = FormId, @PreviousVersion = CurrentVersion
+        FROM CustomForms WITH (UPDLOCK, HOLDLOCK)
+        WHERE FormName = @FormName;
+
+        IF @FormId IS NOT NULL
+            SELECT @VersionId = VersionId, @CodeEncoding = CodeEncoding
+            FROM CustomFormVersions
+            WHERE FormId = @FormId AND Version = @Version;
+
+        IF @VersionId IS NULL
+            SET @Status = 'not_found';
+        ELSE IF @CodeEncoding = 'delta-gzip'
+            SET @Status = 'delta';
+
+        IF @Status = 'ok'
+        BEGIN
+            UPDATE CustomFormVersions
+            SET IsCurrent = CASE WHEN VersionId = @VersionId THEN 1 ELSE 0 END
+            WHERE FormId = @FormId
+              AND (IsCurrent = 1 OR VersionId = @VersionId);
+
+            UPDATE CustomForms
+            SET CurrentVersion = @Version
+            WHERE FormId = @FormId;
+        END
+
+        COMMIT TRANSACTION;
+
+        SELECT
+            @Status AS Status,
+            @FormId AS FormId,
+            @VersionId AS VersionId,
+            @PreviousVersion AS PreviousVersion,
+            cfv.Version,
+            cfv.ContentHash,
+            cfv.PublishedAt,
+            cfv.SizeBytes
+        FROM (SELECT 1 AS One) one
+        LEFT JOIN CustomFormVersions cfv ON cfv.VersionId = @VersionId;
+
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        -- Re-throw error
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+        DECLARE @ErrorSeverity INT = ERROR_SEVERITY();
+        DECLARE @ErrorState INT = ERROR_STATE();
+
+        RAISERROR(@ErrorMessage, @ErrorSeverity, @ErrorState);
+    END CATCH
+END
+GO
+
+PRINT 'Stored procedure sp_SetCurrentFormVersion created';
+GO
+
+PRINT '✓ Migration 013 completed';
+GO
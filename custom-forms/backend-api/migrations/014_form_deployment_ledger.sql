@@ -0,0 +1,203 @@
+-- Migration: 014 - Deployment ledger and package-level promotion/rollback
+-- Description: Records which form versions each deployment package produced and
+--              which versions were current before it, and adds sp_ApplyFormDeployment
+--              to promote or roll back a whole package in one transaction
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before creating; procedure is recreated)
+-- Requires: Migration 007
+--
+-- CustomFormDeploymentForms keeps versions by number (not VersionId): a version
+-- deleted after the deployment makes promotion/rollback of that package fail with
+-- status 'missing' instead of silently skipping the form.
+--
+-- sp_ApplyFormDeployment @DeploymentId, @Target:
+--   @Target = 'deployed'  makes the versions of the package current (promote)
+--   @Target = 'previous'  makes the versions current before the package current
+--                         (rollback); forms the package created have no previous
+--                         version and are left as they are ('skipped')
+-- All forms change in one set-based transaction, or none does. Result set, one row
+-- per form of the package:
+--   Status ('ok', 'skipped', 'missing' or 'delta'), FormName, FormId, VersionId,
+--   Version, PreviousVersion (current before this call), ContentHash
+-- If any form is 'missing' or 'delta' nothing is changed ('delta': the version is
+-- stored as a delta, CodeEncoding 'delta-gzip', and must be materialized first).
+--
+-- Rollout: apply this migration BEFORE deploying the backend version that records
+-- deployments.
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. Ledger tables
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'CustomFormDeployments')
+BEGIN
+    CREATE TABLE [dbo].[CustomFormDeployments] (
+        [DeploymentId] INT IDENTITY(1,1) NOT NULL,
+        [PackageVersion] NVARCHAR(50) NULL,
+        [CommitHash] NVARCHAR(50) NULL,
+        [DeployedBy] NVARCHAR(100) NULL,
+        [DeployedAt] DATETIME NOT NULL CONSTRAINT [DF_CustomFormDeployments_DeployedAt] DEFAULT GETUTCDATE(),
+        [LastAction] VARCHAR(20) NULL,
+        [LastActionBy] NVARCHAR(100) NULL,
+        [LastActionAt] DATETIME NULL,
+        CONSTRAINT [PK_CustomFormDeployments] PRIMARY KEY CLUSTERED ([DeploymentId]),
+        CONSTRAINT [CK_CustomFormDeployments_LastAction] CHECK ([LastAction] IN ('promoted', 'rolled_back'))
+    );
+    PRINT 'Table CustomFormDeployments created';
+END
+ELSE
+BEGIN
+    PRINT 'Table CustomFormDeployments already exists';
+END
+GO
+
+IF NOT EXISTS (SELECT * FROM sys.tables WHERE name = 'CustomFormDeploymentForms')
+BEGIN
+    CREATE TABLE [dbo].[CustomFormDeploymentForms] (
+        [DeploymentId] INT NOT NULL,
+        [FormId] INT NOT NULL,
+        [Version] NVARCHAR(50) NOT NULL,
+        [PreviousVersion] NVARCHAR(50) NULL,
+        CONSTRAINT [PK_CustomFormDeploymentForms] PRIMARY KEY CLUSTERED ([DeploymentId], [FormId]),
+        CONSTRAINT [FK_CustomFormDeploymentForms_Deployment] FOREIGN KEY ([DeploymentId])
+            REFERENCES [dbo].[CustomFormDeployments] ([DeploymentId]) ON DELETE CASCADE,
+        CONSTRAINT [FK_CustomFormDeploymentForms_Form] FOREIGN KEY ([FormId])
+            REFERENCES [dbo].[CustomForms] ([FormId]) ON DELETE CASCADE
+    );
+    PRINT 'Table CustomFormDeploymentForms created';
+END
+ELSE
+BEGIN
+    PRINT 'Table CustomFormDeploymentForms already exists';
+END
+GO
+
+-- Deletion of a form (cascade) without scanning the ledger
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormDeploymentForms_FormId' AND object_id = OBJECT_ID('dbo.CustomFormDeploymentForms'))
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_CustomFormDeploymentForms_FormId]
+    ON [dbo].[CustomFormDeploymentForms] ([FormId]);
+    PRINT 'Index IX_CustomFormDeploymentForms_FormId created';
+END
+GO
+
+-- ==============================================================================
+-- 2. sp_ApplyFormDeployment
+-- ==============================================================================
+
+IF OBJECT_ID('dbo.sp_ApplyFormDeployment', 'P') IS NOT NULL
+    DROP PROCEDURE dbo.sp_ApplyFormDeployment;
+GO
+
+CREATE PROCEDURE [dbo].[sp_ApplyFormDeployment]
+    @DeploymentId INT,
+    @Target VARCHAR(20),
+    @AppliedBy NVARCHAR(100) = NULL
+AS
+BEGIN
+    -- Ensure proper SET options inside the procedure
+    SET NOCOUNT ON;
+    SET XACT_ABORT ON;
+    SET QUOTED_IDENTIFIER ON;
+    SET ANSI_NULLS ON;
+    SET ANSI_WARNINGS ON;
+    SET ARITHABORT ON;
+    SET CONCAT_NULL_YIELDS_NULL ON;
+    SET NUMERIC_ROUNDABORT OFF;
+
+    IF @Target NOT IN ('deployed', 'previous')
+    BEGIN
+        RAISERROR('Invalid target %s', 16, 1, @Target);
+        RETURN;
+    END
+
+    DECLARE @Targets TABLE (
+        FormId INT PRIMARY KEY,
+        FormName NVARCHAR(255) NOT NULL,
+        Version NVARCHAR(50) NULL,
+        VersionId INT NULL,
+        CodeEncoding VARCHAR(20) NULL,
+        CurrentVersion NVARCHAR(50) NULL,
+        Status VARCHAR(20) NOT NULL
+    );
+
+    BEGIN TRY
+        BEGIN TRANSACTION;
+
+        -- Locks the forms of the package (serializes with other promotions)
+        INSERT INTO @Targets (FormId, FormName, Version, VersionId, CodeEncoding, CurrentVersion, Status)
+        SELECT
+            cf.FormId,
+            cf.FormName,
+            t.Version,
+            v.VersionId,
+            v.CodeEncoding,
+            cf.CurrentVersion,
+            CASE
+                WHEN t.Version IS NULL THEN 'skipped'
+                WHEN v.VersionId IS NULL THEN 'missing'
+                WHEN v.CodeEncoding = 'delta-gzip' THEN 'delta'
+                ELSE 'ok'
+            END
+        FROM CustomFormDeploymentForms df
+        INNER JOIN CustomForms cf WITH (UPDLOCK, HOLDLOCK) ON cf.FormId = df.FormId
+        CROSS APPLY (SELECT CASE WHEN @Target = 'deployed' THEN df.Version ELSE df.PreviousVersion END AS Version) t
+        LEFT JOIN CustomFormVersions v ON v.FormId = df.FormId AND v.Version = t.Version
+        WHERE df.DeploymentId = @DeploymentId;
+
+        IF NOT EXISTS (SELECT 1 FROM @Targets WHERE Status IN ('missing', 'delta'))
+        BEGIN
+            UPDATE v
+            SET IsCurrent = CASE WHEN v.VersionId = t.VersionId THEN 1 ELSE 0 END
+            FROM CustomFormVersions v
+            INNER JOIN @Targets t ON t.FormId = v.FormId AND t.Status = 'ok'
+            WHERE v.IsCurrent = 1 OR v.VersionId = t.VersionId;
+
+            UPDATE cf
+            SET CurrentVersion = t.Version
+            FROM CustomForms cf
+            INNER JOIN @Targets t ON t.FormId = cf.FormId AND t.Status = 'ok';
+
+            UPDATE CustomFormDeployments
+            SET LastAction = CASE WHEN @Target = 'deployed' THEN 'promoted' ELSE 'rolled_back' END,
+                LastActionBy = @AppliedBy,
+                LastActionAt = GETUTCDATE()
+            WHERE DeploymentId = @DeploymentId;
+        END
+
+        COMMIT TRANSACTION;
+
+        SELECT t.Status, t.FormName, t.FormId, t.VersionId, t.Version, t.CurrentVersion AS PreviousVersion, v.ContentHash
+        FROM @Targets t
+        LEFT JOIN CustomFormVersions v ON v.VersionId = t.VersionId
+        ORDER BY t.FormName;
+
+    END TRY
+    BEGIN CATCH
+        IF @@TRANCOUNT > 0
+            ROLLBACK TRANSACTION;
+
+        -- Re-throw error
+        DECLARE @ErrorMessage NVARCHAR(4000) = ERROR_MESSAGE();
+        DECLARE @ErrorSeverity INT = ERROR_SEVERITY();
+        DECLARE @ErrorState INT = ERROR_STATE();
+
+        RAISERROR(@ErrorMessage, @ErrorSeverity, @ErrorState);
+    END CATCH
+END
+GO
+
+PRINT 'Stored procedure sp_ApplyFormDeployment created';
+GO
+
+PRINT '✓ Migration 014 completed';
+GO
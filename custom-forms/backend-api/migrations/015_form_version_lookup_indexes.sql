@@ -0,0 +1,135 @@
+-- Migration: 015 - Covering and filtered indexes for the hot form lookups
+-- Description: Filtered unique index for the current version of each form, covering
+--              index for (FormId, Version) lookups, and removal of the single-column
+--              indexes of migration 001 that the hot queries never use
+-- Date: 2026-10-18
+-- Idempotent: Yes (checks for existence before creating/dropping)
+-- Requires: Migrations 008 (ContentHash, StorageBackend) and 012
+--
+-- The hot queries (code, metadata, code-batch, listing with sizeBytes) find the
+-- version either by cf.FormName + cfv.IsCurrent = 1 or by cf.FormName + cfv.Version:
+--
+--   UX_CustomFormVersions_Current   (FormId) WHERE IsCurrent = 1, UNIQUE
+--       One row per form: the current-version lookup is a single seek, and the
+--       database itself now enforces "at most one current version per form"
+--       (CK_CustomFormVersions_IsCurrent only checks 0/1). Every writer already
+--       clears the old current version before (or in the same UPDATE as) setting
+--       the new one: sp_UpsertCustomForm, sp_SetCurrentFormVersion,
+--       sp_ApplyFormDeployment and the .NET backend.
+--   IX_CustomFormVersions_FormId_Version   (FormId, Version)
+--       UQ_CustomFormVersions_FormId_Version already enforces uniqueness, but a
+--       constraint cannot INCLUDE columns, and replacing it with a unique index would
+--       change the duplicate-key error other writers get (2627 -> 2601).
+--
+-- Both INCLUDE the columns of the metadata/ETag queries, so only reading the code
+-- itself goes to the clustered index.
+--
+-- (FormId, PublishedAt DESC) is not added: IX_CustomFormVersions_History (migration
+-- 012) is (FormId, PublishedAt DESC, VersionId DESC) and already serves it.
+--
+-- Dropped (write cost without a reader):
+--   IX_CustomFormVersions_IsCurrent   single BIT column, never selective
+--   IX_CustomFormVersions_FormId      prefix of UQ_CustomFormVersions_FormId_Version
+--
+-- The filtered index requires the SET options below in every session that writes to
+-- CustomFormVersions; they are already required by the filtered index of migration 007.
+--
+-- If a form has more than one current version the unique index is NOT created and
+-- the migration raises an error listing the forms. Fix them with
+-- EXEC sp_SetCurrentFormVersion @FormName, @Version and re-run the migration.
+--
+-- Check the query plans before/after with custom-forms/database/hot_query_plans.sql.
+--
+-- Rollout: can be applied before or after deploying the backend (no code depends on
+-- the new indexes).
+
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+GO
+
+-- ==============================================================================
+-- 1. UX_CustomFormVersions_Current (one current version per form)
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'UX_CustomFormVersions_Current' AND object_id = OBJECT_ID('dbo.CustomFormVersions'))
+BEGIN
+    IF EXISTS (
+        SELECT FormId
+        FROM CustomFormVersions
+        WHERE IsCurrent = 1
+        GROUP BY FormId
+        HAVING COUNT(*) > 1
+    )
+    BEGIN
+        SELECT cf.FormName, cf.CurrentVersion, cfv.Version, cfv.PublishedAt
+        FROM CustomFormVersions cfv
+        INNER JOIN CustomForms cf ON cf.FormId = cfv.FormId
+        WHERE cfv.IsCurrent = 1
+          AND cfv.FormId IN (
+              SELECT FormId
+              FROM CustomFormVersions
+              WHERE IsCurrent = 1
+              GROUP BY FormId
+              HAVING COUNT(*) > 1
+          )
+        ORDER BY cf.FormName, cfv.PublishedAt DESC;
+
+        RAISERROR('Forms with more than one current version (listed above): fix them with sp_SetCurrentFormVersion and re-run migration 015', 16, 1);
+    END
+    ELSE
+    BEGIN
+        CREATE UNIQUE NONCLUSTERED INDEX [UX_CustomFormVersions_Current]
+        ON [dbo].[CustomFormVersions] ([FormId])
+        INCLUDE ([Version], [PublishedAt], [SizeBytes], [ContentHash], [StorageBackend], [CodeEncoding])
+        WHERE [IsCurrent] = 1;
+        PRINT 'Index UX_CustomFormVersions_Current created';
+    END
+END
+ELSE
+BEGIN
+    PRINT 'Index UX_CustomFormVersions_Current already exists';
+END
+GO
+
+-- ==============================================================================
+-- 2. IX_CustomFormVersions_FormId_Version (covering lookup of a specific version)
+-- ==============================================================================
+
+IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormVersions_FormId_Version' AND object_id = OBJECT_ID('dbo.CustomFormVersions'))
+BEGIN
+    CREATE NONCLUSTERED INDEX [IX_CustomFormVersions_FormId_Version]
+    ON [dbo].[CustomFormVersions] ([FormId], [Version])
+    INCLUDE ([IsCurrent], [PublishedAt], [SizeBytes], [ContentHash], [StorageBackend], [CodeEncoding]);
+    PRINT 'Index IX_CustomFormVersions_FormId_Version created';
+END
+ELSE
+BEGIN
+    PRINT 'Index IX_CustomFormVersions_FormId_Version already exists';
+END
+GO
+
+-- ==============================================================================
+-- 3. Drop unused single-column indexes of migration 001
+-- ==============================================================================
+
+IF EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormVersions_IsCurrent' AND object_id = OBJECT_ID('dbo.CustomFormVersions'))
+BEGIN
+    DROP INDEX [IX_CustomFormVersions_IsCurrent] ON [dbo].[CustomFormVersions];
+    PRINT 'Index IX_CustomFormVersions_IsCurrent dropped';
+END
+GO
+
+IF EXISTS (SELECT * FROM sys.indexes WHERE name = 'IX_CustomFormVersions_FormId' AND object_id = OBJECT_ID('dbo.CustomFormVersions'))
+BEGIN
+    DROP INDEX [IX_CustomFormVersions_FormId] ON [dbo].[CustomFormVersions];
+    PRINT 'Index IX_CustomFormVersions_FormId dropped';
+END
+GO
+
+PRINT '✓ Migration 015 completed';
+GO
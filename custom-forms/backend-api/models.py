@@ -118,6 +118,42 @@ class ValidateDashboardTokenResponse(BaseModel):
     error: Optional[str] = None
 
 
+# ==============================================================================
+# Form Code Batch Models
+# ==============================================================================
+
+class FormCodeBatchItem(BaseModel):
+    """Form pedido en un batch de código"""
+    formName: str
+    version: Optional[str] = None  # default: versión current
+    etag: Optional[str] = None  # ETag (o ContentHash) que el cliente ya tiene: no se reenvía el código
+
+
+class FormCodeBatchRequest(BaseModel):
+    """Request de POST /api/custom-forms/code-batch"""
+    forms: List[FormCodeBatchItem]
+
+
+class FormCodeBatchResult(BaseModel):
+    """Código (o estado) de un form del batch"""
+    formName: str
+    requestedVersion: Optional[str] = None
+    status: str  # "ok", "not_modified", "not_found", "error"
+    version: Optional[str] = None
+    contentHash: Optional[str] = None
+    etag: Optional[str] = None
+    sizeBytes: Optional[int] = None
+    publishedAt: Optional[str] = None
+    sourceMap: Optional[str] = None  # URL del source map (ver /sourcemap)
+    code: Optional[str] = None
+    error: Optional[str] = None
+
+
+class FormCodeBatchResponse(BaseModel):
+    """Response de POST /api/custom-forms/code-batch (mismo orden que el request)"""
+    forms: List[FormCodeBatchResult]
+
+
 # ==============================================================================
 # Form Deployment Models
 # ==============================================================================
@@ -132,6 +168,7 @@ class FormDeployment(BaseModel):
     sizeBytes: int
     path: str
     releaseNotes: Optional[str] = ""
+    sourceMapPath: Optional[str] = None  # default: <path>.map si el package lo incluye
 
 
 class DeploymentManifest(BaseModel):
@@ -148,6 +185,7 @@ class FormDeploymentResult(BaseModel):
     success: bool
     action: str  # "inserted", "updated", "failed"
     error: Optional[str] = None
+    durationMs: Optional[float] = None  # Tiempo de procesamiento del form
 
 
 class UploadDeploymentResponse(BaseModel):
@@ -159,3 +197,77 @@ class UploadDeploymentResponse(BaseModel):
     formsUpdated: int
     errors: List[str]
     results: List[FormDeploymentResult]
+    stageTimings: Dict[str, float] = {}  # Duración (ms) de cada etapa: extract, manifest, forms, total
+    deploymentId: Optional[int] = None  # Registro en el ledger (promote/rollback del package)
+
+
+# ==============================================================================
+# Deployment Job Models
+# ==============================================================================
+
+class DeploymentJobStatus(BaseModel):
+    """Estado de un deployment job encolado en background"""
+    jobId: str
+    status: str  # "queued", "running", "completed", "failed"
+    fileName: str
+    sizeBytes: int
+    submittedBy: Optional[str] = None
+    createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
+    result: Optional[UploadDeploymentResponse] = None
+    error: Optional[str] = None
+
+
+class DeploymentIdempotencyRecord(BaseModel):
+    """Resultado registrado para un Idempotency-Key o digest de package"""
+    key: str  # Idempotency-Key del cliente, o "sha256:<digest>" del package
+    packageSha256: str
+    jobId: Optional[str] = None  # Job que procesa/procesó el package (si se envió como job)
+    response: Optional[UploadDeploymentResponse] = None  # Resultado exitoso registrado
+    createdAt: datetime
+
+
+class ChunkedUploadInitRequest(BaseModel):
+    """Request para iniciar un upload de deployment package por chunks"""
+    fileName: str
+    totalSize: int  # Tamaño total del package en bytes
+    sha256: str  # SHA-256 (hex) del package completo, verificado al finalizar
+    chunkSize: Optional[int] = None  # Bytes por chunk (default: DEPLOYMENT_UPLOAD_CHUNK_SIZE_MB)
+
+
+class ChunkedUploadStatus(BaseModel):
+    """Estado de un upload por chunks (reanudable)"""
+    uploadId: str
+    fileName: str
+    totalSize: int
+    chunkSize: int
+    totalChunks: int
+    sha256: str
+    receivedChunks: List[int] = []
+    receivedRanges: List[List[int]] = []  # Rangos [start, end) de bytes recibidos
+    missingChunks: List[int] = []
+    receivedBytes: int = 0
+    createdBy: Optional[str] = None
+    createdAt: datetime
+    updatedAt: datetime
+
+
+class DeploymentProgressEvent(BaseModel):
+    """
+    Evento de progreso de un deployment job (enviado por Server-Sent Events)
+
+    Event types:
+    - upload_received: package aceptado (details: fileName, sizeBytes)
+    - zip_validated: zip extraído y validado (details: files, durationMs)
+    - manifest_parsed: manifest leído (details: packageVersion, commitHash, forms, durationMs)
+    - form_processed: form insertado/actualizado/fallido (form: FormDeploymentResult)
+    - summary: resultado final (summary: UploadDeploymentResponse)
+    """
+    jobId: str
+    sequence: int
+    event: str
+    timestamp: datetime
+    details: Dict[str, Any] = {}
+    form: Optional[FormDeploymentResult] = None
+    summary: Optional[UploadDeploymentResponse] = None
@@ -0,0 +1,109 @@
+"""
+Source Maps
+
+Los source maps de cada versión se guardan aparte del código (tabla
+CustomFormSourceMaps, migración 010) y solo se transfieren cuando las devtools
+los piden: /code responde con un header SourceMap que apunta a
+GET /api/custom-forms/{form_name}/sourcemap?version=...
+
+En el deployment:
+- Se usa el archivo sourceMapPath del manifest o, si no se indica,
+  <path>.map junto al bundle (si el package lo incluye).
+- Si el bundle trae el source map inline (data: URL) se extrae.
+- El comentario sourceMappingURL final se quita del código cuando el source
+  map queda guardado: el header SourceMap lo reemplaza.
+"""
+
+import base64
+import binascii
+import json
+import os
+import re
+from pathlib import Path
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+# En false los source maps se siguen guardando pero no se exponen
+FORM_SOURCE_MAPS_ENABLED = os.getenv("FORM_SOURCE_MAPS_ENABLED", "true").lower() == "true"
+
+MAX_SOURCE_MAP_SIZE = 50 * 1024 * 1024
+
+_SOURCE_MAPPING_URL = re.compile(r"\s*//[#@] sourceMappingURL=(\S+)\s*$")
+_INLINE_SOURCE_MAP = re.compile(r"^data:application/json(?:;charset=[\w-]+)?;base64,(.+)$")
+
+
+def is_valid_source_map(source_map: str) -> bool:
+    """Indica si el texto es un source map v3 (objeto JSON con 'version' y 'mappings' o 'sections')"""
+    if len(source_map) > MAX_SOURCE_MAP_SIZE:
+        return False
+    try:
+        data = json.loads(source_map)
+    except ValueError:
+        return False
+    return isinstance(data, dict) and "version" in data and ("mappings" in data or "sections" in data)
+
+
+def read_source_map_file(extract_dir: Path, code_path: str, source_map_path: Optional[str] = None) -> Optional[str]:
+    """
+    Lee el source map de un form desde el package extraído
+
+    Args:
+        extract_dir: Directorio del package extraído
+        code_path: path del bundle en el manifest
+        source_map_path: sourceMapPath del manifest (default: code_path + ".map")
+
+    Returns:
+        Contenido del source map o None si el package no lo incluye
+
+    Raises:
+        ValueError: Si sourceMapPath apunta fuera del package
+    """
+    root = extract_dir.resolve()
+    path = (extract_dir / (source_map_path or f"{code_path}.map")).resolve()
+    if root not in path.parents:
+        raise ValueError(f"Invalid source map path: {source_map_path}")
+
+    if not path.is_file():
+        if source_map_path:
+            raise ValueError(f"Source map file not found: {source_map_path}")
+        return None
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def split_source_map(code: str, source_map: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """
+    Separa el source map del bundle
+
+    Args:
+        code: Bundle tal como viene en el package
+        source_map: Source map leído del package (tiene prioridad sobre el inline)
+
+    Returns:
+        (código sin el comentario sourceMappingURL, source map o None)
+    """
+    match = _SOURCE_MAPPING_URL.search(code)
+    if not match:
+        return code, source_map
+
+    if source_map is None:
+        inline = _INLINE_SOURCE_MAP.match(match.group(1))
+        if inline:
+            try:
+                source_map = base64.b64decode(inline.group(1), validate=True).decode("utf-8")
+            except (binascii.Error, UnicodeDecodeError):
+                print("[Source Maps] Warning: Invalid inline source map, keeping it in the bundle")
+                return code, None
+
+    if source_map is None:
+        # Referencia a un archivo que no vino en el package: se deja como está
+        return code, None
+
+    return code[:match.start()], source_map
@@ -0,0 +1,22 @@
+"""
+Fixtures compartidos por los tests
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+
+@pytest.fixture
+def db_connection():
+    """
+    Conexión y cursor mockeados que devuelve database.get_db_connection
+
+    Yields:
+        (mock_conn, mock_cursor)
+    """
+    with patch('database.get_db_connection') as mock_get_conn:
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+        yield mock_conn, mock_cursor
@@ -281,7 +281,7 @@ class TestProtectedEndpoints:
 
     @pytest.mark.asyncio
     @patch('dependencies.verify_session_token')
-    @patch('main.zipfile.ZipFile')
+    @patch('deployment_service.zipfile.ZipFile')
     async def test_protected_endpoint_with_valid_auth(self, mock_zipfile, mock_verify):
         """Test accessing protected endpoint with valid authentication"""
         # Arrange: Mock valid token
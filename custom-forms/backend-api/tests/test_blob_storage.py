@@ -0,0 +1,188 @@
+"""
+Unit Tests for Blob Storage
+
+Tests the content-addressed blob backends (migration 008) and sendfile
+serving of filesystem blobs on the code endpoint. Database access and the
+object store are mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from blob_storage import (
+    FilesystemBlobStore,
+    ObjectBlobStore,
+    BlobNotFoundError,
+    blob_key,
+    content_hash,
+    get_blob_store
+)
+from code_storage import StoredCode, encode_compiled_code
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación'; }"
+
+
+class TestBlobKeys:
+    """Unit tests for content_hash / blob_key"""
+
+    def test_hash_is_sha256_of_utf8_code(self):
+        import hashlib
+
+        assert content_hash(SAMPLE_CODE) == hashlib.sha256(SAMPLE_CODE.encode("utf-8")).hexdigest()
+
+    def test_key_is_sharded_by_hash_prefix(self):
+        digest = content_hash(SAMPLE_CODE)
+
+        assert blob_key(digest) == f"sha256/{digest[:2]}/{digest[2:4]}/{digest}.js.gz"
+
+    def test_invalid_hash_rejected(self):
+        """Test keys can't escape the blob root"""
+        with pytest.raises(ValueError):
+            blob_key("../../etc/passwd")
+
+    def test_unknown_backend_rejected(self):
+        with pytest.raises(ValueError):
+            get_blob_store("ftp")
+
+
+class TestFilesystemBlobStore:
+    """Unit tests for FilesystemBlobStore"""
+
+    def test_put_get_roundtrip(self, tmp_path):
+        """Test a stored blob is read back byte for byte"""
+        store = FilesystemBlobStore(str(tmp_path))
+        data, _ = encode_compiled_code(SAMPLE_CODE)
+        digest = content_hash(SAMPLE_CODE)
+
+        store.put(digest, data)
+
+        assert store.get(digest) == data
+        assert store.local_path(digest).read_bytes() == data
+        # Sin archivos temporales remanentes
+        assert [p.name for p in store.local_path(digest).parent.iterdir()] == [f"{digest}.js.gz"]
+
+    def test_put_is_idempotent(self, tmp_path):
+        """Test re-deploying the same code doesn't rewrite the blob"""
+        store = FilesystemBlobStore(str(tmp_path))
+        digest = content_hash(SAMPLE_CODE)
+        store.put(digest, b"first")
+
+        store.put(digest, b"second")
+
+        assert store.get(digest) == b"first"
+
+    def test_missing_blob(self, tmp_path):
+        store = FilesystemBlobStore(str(tmp_path))
+        digest = content_hash(SAMPLE_CODE)
+
+        assert not store.exists(digest)
+        assert store.local_path(digest) is None
+        assert store.delete(digest) is False
+        with pytest.raises(BlobNotFoundError):
+            store.get(digest)
+
+
+class TestObjectBlobStore:
+    """Unit tests for ObjectBlobStore (HTTP mocked)"""
+
+    def test_requires_url(self):
+        with pytest.raises(ValueError):
+            ObjectBlobStore("")
+
+    def test_put_skips_existing_objects(self):
+        """Test an object already in the store isn't uploaded again"""
+        store = ObjectBlobStore("http://blobs.local/forms", token="secret")
+        store.session = MagicMock()
+        store.session.head.return_value = MagicMock(status_code=200)
+
+        store.put(content_hash(SAMPLE_CODE), b"data")
+
+        store.session.put.assert_not_called()
+
+    def test_get_missing_object(self):
+        store = ObjectBlobStore("http://blobs.local/forms/")
+        store.session = MagicMock()
+        store.session.get.return_value = MagicMock(status_code=404)
+        digest = content_hash(SAMPLE_CODE)
+
+        with pytest.raises(BlobNotFoundError):
+            store.get(digest)
+
+        url = store.session.get.call_args[0][0]
+        assert url == f"http://blobs.local/forms/{blob_key(digest)}"
+
+    def test_token_sent_as_bearer(self):
+        store = ObjectBlobStore("http://blobs.local/forms", token="secret")
+
+        assert store.session.headers["Authorization"] == "Bearer secret"
+
+
+class TestFormCodeEndpointBlob:
+    """Tests for GET /api/custom-forms/{form_name}/code with blob storage"""
+
+    @patch('database.get_form_compiled_code')
+    async def test_filesystem_blob_served_with_sendfile(self, mock_get_code, tmp_path):
+        """Test filesystem blobs are sent as files without loading them in Python"""
+        # Arrange
+        store = FilesystemBlobStore(str(tmp_path))
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        digest = content_hash(SAMPLE_CODE)
+        store.put(digest, data)
+        loader = MagicMock(return_value=data)
+        mock_get_code.return_value = {
+            'code': StoredCode(encoding=encoding, loader=loader),
+            'version': '1.0.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(SAMPLE_CODE),
+            'content_hash': digest,
+            'storage_backend': 'filesystem'
+        }
+        from main import app
+
+        # Act
+        with patch('main.get_blob_store', return_value=store):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get(
+                    "/api/custom-forms/my-form/code",
+                    headers={"Accept-Encoding": "gzip"}
+                )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["x-form-version"] == "1.0.0"
+        assert response.text == SAMPLE_CODE
+        loader.assert_not_called()
+
+    @patch('database.get_form_compiled_code')
+    async def test_blob_decompressed_for_plain_clients(self, mock_get_code):
+        """Test clients without gzip support get the blob decompressed"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        mock_get_code.return_value = {
+            'code': StoredCode(encoding=encoding, loader=lambda: data),
+            'version': '1.0.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(SAMPLE_CODE),
+            'content_hash': content_hash(SAMPLE_CODE),
+            'storage_backend': 'object'
+        }
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity"}
+            )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.content == SAMPLE_CODE.encode("utf-8")
+
+
+# Run with: pytest tests/test_blob_storage.py -v
@@ -0,0 +1,248 @@
+"""
+Unit Tests for Chunked Uploads
+
+These tests use a temporary upload store; finalize is tested against a
+queue with run_deployment mocked, so no zip processing or database access happens.
+"""
+
+import hashlib
+import pytest
+from unittest.mock import patch, AsyncMock
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import DeploymentJobStatus
+from deployment_idempotency import DeploymentResultStore
+from chunked_uploads import (
+    ChunkedUploadStore,
+    UploadIncompleteError,
+    MIN_CHUNK_SIZE,
+    received_ranges
+)
+
+
+CHUNK_SIZE = MIN_CHUNK_SIZE
+
+
+def sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def make_package(chunks: float = 2.5) -> bytes:
+    """Genera un package de prueba de `chunks` chunks"""
+    return bytes(range(256)) * int(CHUNK_SIZE * chunks / 256)
+
+
+def chunk(package: bytes, index: int) -> bytes:
+    return package[index * CHUNK_SIZE:(index + 1) * CHUNK_SIZE]
+
+
+class TestChunkedUploadStore:
+    """Unit tests for ChunkedUploadStore"""
+
+    def test_create_upload(self, tmp_path):
+        """Test initiate computes chunk count and preallocates the package"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package()
+
+        upload = store.create("package.zip", len(package), sha256(package), CHUNK_SIZE, "admin")
+
+        assert upload.totalChunks == 3
+        assert upload.missingChunks == [0, 1, 2]
+        assert upload.receivedBytes == 0
+        assert store.partial_path(upload.uploadId).stat().st_size == len(package)
+
+    @pytest.mark.parametrize("file_name,total_size,digest", [
+        ("package.txt", 100, "a" * 64),
+        ("package.zip", 0, "a" * 64),
+        ("package.zip", 100 * 1024 * 1024, "a" * 64),
+        ("package.zip", 100, "not-a-digest"),
+    ])
+    def test_create_rejects_invalid_request(self, tmp_path, file_name, total_size, digest):
+        """Test initiate validates name, size and digest"""
+        store = ChunkedUploadStore(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.create(file_name, total_size, digest, CHUNK_SIZE)
+
+    def test_out_of_order_chunks_assemble_and_verify(self, tmp_path):
+        """Test chunks written in any order produce the original package"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package()
+        upload = store.create("package.zip", len(package), sha256(package), CHUNK_SIZE)
+
+        for index in (2, 0, 1):
+            data = chunk(package, index)
+            store.write_chunk(upload.uploadId, index, index * CHUNK_SIZE, data, sha256(data))
+        verified = store.verify(upload.uploadId)
+
+        assert verified.missingChunks == []
+        assert verified.receivedRanges == [[0, len(package)]]
+        assert store.partial_path(upload.uploadId).read_bytes() == package
+
+    def test_resume_reports_missing_chunks(self, tmp_path):
+        """Test status after a dropped connection lists only missing chunks"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package()
+        upload = store.create("package.zip", len(package), sha256(package), CHUNK_SIZE)
+        data = chunk(package, 0)
+        store.write_chunk(upload.uploadId, 0, 0, data, sha256(data))
+
+        # Re-enviar un chunk ya recibido es idempotente
+        store.write_chunk(upload.uploadId, 0, 0, data, sha256(data))
+        status = store.load(upload.uploadId)
+
+        assert status.receivedChunks == [0]
+        assert status.missingChunks == [1, 2]
+        assert status.receivedRanges == [[0, CHUNK_SIZE]]
+        with pytest.raises(UploadIncompleteError):
+            store.verify(upload.uploadId)
+
+    def test_chunk_checksum_mismatch_rejected(self, tmp_path):
+        """Test corrupted chunk is rejected and not marked as received"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package()
+        upload = store.create("package.zip", len(package), sha256(package), CHUNK_SIZE)
+        data = chunk(package, 1)
+
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            store.write_chunk(upload.uploadId, 1, CHUNK_SIZE, data, sha256(b"other"))
+
+        assert store.load(upload.uploadId).receivedChunks == []
+
+    def test_chunk_offset_and_size_validated(self, tmp_path):
+        """Test offset must match the chunk index and size must match chunkSize"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package()
+        upload = store.create("package.zip", len(package), sha256(package), CHUNK_SIZE)
+        data = chunk(package, 1)
+
+        with pytest.raises(ValueError, match="Offset"):
+            store.write_chunk(upload.uploadId, 1, 0, data, sha256(data))
+        with pytest.raises(ValueError, match="must be"):
+            store.write_chunk(upload.uploadId, 1, CHUNK_SIZE, data[:10], sha256(data[:10]))
+
+    def test_package_digest_mismatch_rejected(self, tmp_path):
+        """Test finalize fails if the declared sha256 doesn't match the assembled package"""
+        store = ChunkedUploadStore(str(tmp_path))
+        package = make_package(1)
+        upload = store.create("package.zip", len(package), "0" * 64, CHUNK_SIZE)
+        store.write_chunk(upload.uploadId, 0, 0, package, sha256(package))
+
+        with pytest.raises(ValueError, match="Checksum mismatch"):
+            store.verify(upload.uploadId)
+
+    def test_received_ranges_merges_contiguous_chunks(self):
+        """Test contiguous chunks collapse into a single byte range"""
+        assert received_ranges([0, 1, 3], 10, 35) == [[0, 20], [30, 35]]
+        assert received_ranges([], 10, 35) == []
+
+
+class TestChunkedUploadEndpoints:
+    """Tests for /api/deployment/uploads endpoints"""
+
+    @patch('main.job_queue')
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_full_chunked_upload_flow(self, mock_mw_verify, mock_dep_verify, mock_queue, tmp_path):
+        """Test initiate, chunk upload and finalize hand off to the job queue"""
+        # Arrange
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        store = ChunkedUploadStore(str(tmp_path / "uploads"))
+        submitted = {}
+
+        async def submit_file(file_name, source_path, submitted_by):
+            submitted["content"] = Path(source_path).read_bytes()
+            return DeploymentJobStatus(
+                jobId="a" * 32,
+                status="queued",
+                fileName=file_name,
+                sizeBytes=len(submitted["content"]),
+                submittedBy=submitted_by,
+                createdAt=datetime.utcnow()
+            )
+
+        mock_queue.submit_file = AsyncMock(side_effect=submit_file)
+        package = make_package()
+        headers = {"Authorization": "Bearer valid_jwt_token"}
+        from main import app
+
+        # Act
+        with patch('main.upload_store', store), \
+             patch('main.result_store', DeploymentResultStore(str(tmp_path / "results"))):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                init = await client.post("/api/deployment/uploads", headers=headers, json={
+                    "fileName": "package.zip",
+                    "totalSize": len(package),
+                    "sha256": sha256(package),
+                    "chunkSize": CHUNK_SIZE
+                })
+                upload_id = init.json()["uploadId"]
+
+                for index in range(init.json()["totalChunks"]):
+                    data = chunk(package, index)
+                    response = await client.put(
+                        f"/api/deployment/uploads/{upload_id}/chunks/{index}",
+                        params={"offset": index * CHUNK_SIZE},
+                        headers={**headers, "X-Chunk-SHA256": sha256(data)},
+                        content=data
+                    )
+                    assert response.status_code == 200
+
+                complete = await client.post(f"/api/deployment/uploads/{upload_id}/complete", headers=headers)
+
+        # Assert
+        assert init.status_code == 201
+        assert complete.status_code == 202
+        assert complete.json()["submittedBy"] == "admin"
+        assert response.json()["missingChunks"] == []
+        assert submitted["content"] == package
+        mock_queue.submit_file.assert_called_once()
+        assert not store.upload_dir(upload_id).exists()
+
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_oversized_chunk_without_content_length_rejected(self, mock_mw_verify, mock_dep_verify):
+        """Test the chunk size cap also applies to chunked transfer encoding"""
+        # Arrange
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        from main import app
+
+        async def body():
+            for _ in range(3):
+                yield b"x" * 1024
+
+        # Act
+        with patch('main.MAX_CHUNK_SIZE', 2048):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.put(
+                    f"/api/deployment/uploads/{'a' * 32}/chunks/0",
+                    params={"offset": 0},
+                    headers={"Authorization": "Bearer valid_jwt_token"},
+                    content=body()
+                )
+
+        # Assert
+        assert response.status_code == 413
+
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_invalid_upload_id_rejected(self, mock_mw_verify, mock_dep_verify):
+        """Test path traversal in upload_id is rejected"""
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/deployment/uploads/not-an-id",
+                headers={"Authorization": "Bearer valid_jwt_token"}
+            )
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_chunked_uploads.py -v
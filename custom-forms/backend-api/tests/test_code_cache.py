@@ -0,0 +1,169 @@
+"""
+Unit Tests for the Form Code Disk Cache
+
+Tests the content-addressed disk cache (verification, eviction) and the
+code endpoint serving cached bundles without reading the code from the
+database. Database access is mocked.
+"""
+
+import os
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_cache import DiskCodeCache
+from code_storage import StoredCode, encode_compiled_code
+from blob_storage import content_hash
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación'; }"
+
+
+def make_entry(code: str):
+    data, _ = encode_compiled_code(code)
+    return content_hash(code), data
+
+
+class TestDiskCodeCache:
+    """Unit tests for DiskCodeCache"""
+
+    def test_put_then_get(self, tmp_path):
+        """Test a cached bundle is returned as a file path"""
+        cache = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        digest, data = make_entry(SAMPLE_CODE)
+
+        cache.put(digest, data)
+        path = cache.get(digest)
+
+        assert path.read_bytes() == data
+
+    def test_put_rejects_mismatched_content(self, tmp_path):
+        """Test a bundle can't be cached under another version's hash"""
+        cache = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        digest, _ = make_entry(SAMPLE_CODE)
+        _, other_data = make_entry("export default 1;")
+
+        with pytest.raises(ValueError):
+            cache.put(digest, other_data)
+
+    def test_corrupt_entry_discarded_on_load(self, tmp_path):
+        """Test a worker verifies the hash of an entry written by another worker"""
+        writer = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        digest, data = make_entry(SAMPLE_CODE)
+        path = writer.put(digest, data)
+        _, other_data = make_entry("export default 1;")
+        path.write_bytes(other_data)
+
+        reader = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+
+        assert reader.get(digest) is None
+        assert not path.exists()
+
+    def test_least_recently_used_entries_evicted(self, tmp_path):
+        """Test the cache stays under its size limit dropping the oldest entries"""
+        entries = [make_entry(f"export default {i};" + "x" * 200) for i in range(3)]
+        cache = DiskCodeCache(str(tmp_path), max_bytes=sum(len(data) for _, data in entries) - 1)
+        digests = [digest for digest, _ in entries]
+
+        for i, (digest, data) in enumerate(entries[:2]):
+            path = cache.put(digest, data)
+            os.utime(path, (1000 + i, 1000 + i))
+        cache.get(digests[0])  # el primero pasa a ser el más reciente
+        cache.put(*entries[2])
+
+        assert cache.get(digests[0]) is not None
+        assert cache.get(digests[1]) is None
+        assert cache.get(digests[2]) is not None
+
+    def test_recently_used_entry_not_evicted(self, tmp_path):
+        """Test an entry just returned by get() survives eviction by another worker until it is sent"""
+        entries = [make_entry(f"export default {i};" + "x" * 200) for i in range(2)]
+        reader = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        path = reader.put(*entries[0])
+        os.utime(path, (1000, 1000))
+
+        served = reader.get(entries[0][0])
+        writer = DiskCodeCache(str(tmp_path), max_bytes=1)
+        writer.put(*entries[1])
+
+        assert served.read_bytes() == entries[0][1]
+
+    def test_warm_never_raises(self, tmp_path):
+        """Test a cache failure doesn't fail the deployment"""
+        cache = DiskCodeCache(str(tmp_path / "file"), max_bytes=1024)
+        (tmp_path / "file").write_text("not a directory")
+
+        cache.warm(SAMPLE_CODE)
+
+
+class TestFormCodeEndpointCache:
+    """Tests for GET /api/custom-forms/{form_name}/code with the disk cache"""
+
+    def metadata(self, digest):
+        return {
+            'version': '1.0.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(SAMPLE_CODE),
+            'version_id': 10,
+            'content_hash': digest,
+            'storage_backend': None
+        }
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    async def test_cache_hit_skips_code_query(self, mock_metadata, mock_get_code, tmp_path):
+        """Test a cached version is served from disk with a metadata-only query"""
+        # Arrange
+        cache = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        digest, data = make_entry(SAMPLE_CODE)
+        cache.put(digest, data)
+        mock_metadata.return_value = self.metadata(digest)
+        from main import app
+
+        # Act
+        with patch('main.FORM_CODE_CACHE_ENABLED', True), patch('main.code_cache', cache):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get(
+                    "/api/custom-forms/my-form/code",
+                    headers={"Accept-Encoding": "gzip"}
+                )
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["x-form-version"] == "1.0.0"
+        assert response.text == SAMPLE_CODE
+        mock_get_code.assert_not_called()
+
+    @patch('database.set_version_content_hash')
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    async def test_cache_miss_fills_cache(self, mock_metadata, mock_get_code, mock_set_hash, tmp_path):
+        """Test the first fetch stores the bundle and backfills a missing ContentHash"""
+        # Arrange: versión anterior a la migración 008 (sin ContentHash)
+        cache = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        mock_metadata.return_value = self.metadata(None)
+        mock_get_code.return_value = dict(self.metadata(None), code=StoredCode(text=SAMPLE_CODE))
+        from main import app
+
+        # Act
+        with patch('main.FORM_CODE_CACHE_ENABLED', True), patch('main.code_cache', cache):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get(
+                    "/api/custom-forms/my-form/code",
+                    headers={"Accept-Encoding": "gzip"}
+                )
+
+        # Assert
+        digest = content_hash(SAMPLE_CODE)
+        assert response.status_code == 200
+        assert response.text == SAMPLE_CODE
+        mock_set_hash.assert_called_once_with(10, digest)
+        assert cache.get(digest) is not None
+
+
+# Run with: pytest tests/test_code_cache.py -v
@@ -0,0 +1,190 @@
+"""
+Unit Tests for HEAD, ETag and Range on the Form Code Endpoint
+
+Tests conditional and partial requests to
+GET/HEAD /api/custom-forms/{form_name}/code. Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_storage import StoredCode, encode_compiled_code, CODE_ENCODING_GZIP_UTF8
+from code_cache import DiskCodeCache
+from blob_storage import content_hash
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación'; }"
+DIGEST = content_hash(SAMPLE_CODE)
+
+
+def metadata(code_encoding=CODE_ENCODING_GZIP_UTF8):
+    return {
+        'version': '1.0.0',
+        'published_at': '2026-01-01T00:00:00',
+        'size_bytes': len(SAMPLE_CODE),
+        'version_id': 10,
+        'content_hash': DIGEST,
+        'storage_backend': None,
+        'code_encoding': code_encoding
+    }
+
+
+def code_result(code: StoredCode):
+    return dict(metadata(), code=code)
+
+
+class TestParseByteRange:
+    """Unit tests for _parse_byte_range"""
+
+    def test_ranges(self):
+        from main import _parse_byte_range
+
+        assert _parse_byte_range("bytes=0-9", 100) == (0, 9)
+        assert _parse_byte_range("bytes=90-", 100) == (90, 99)
+        assert _parse_byte_range("bytes=-10", 100) == (90, 99)
+        assert _parse_byte_range("bytes=50-500", 100) == (50, 99)
+
+    def test_ignored_ranges(self):
+        """Test multiple ranges and invalid syntax fall back to the full response"""
+        from main import _parse_byte_range
+
+        assert _parse_byte_range("bytes=0-1,5-6", 100) is None
+        assert _parse_byte_range("items=0-1", 100) is None
+        assert _parse_byte_range("bytes=a-b", 100) is None
+
+    def test_unsatisfiable(self):
+        from main import _parse_byte_range
+
+        with pytest.raises(ValueError):
+            _parse_byte_range("bytes=100-", 100)
+
+
+class TestFormCodeHead:
+    """Tests for HEAD and If-None-Match"""
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    async def test_head_reads_only_metadata(self, mock_metadata, mock_get_code):
+        """Test HEAD returns version, size and ETag without loading the code"""
+        mock_metadata.return_value = metadata()
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.head("/api/custom-forms/my-form/code", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["x-form-version"] == "1.0.0"
+        assert response.headers["x-size-bytes"] == str(len(SAMPLE_CODE))
+        assert response.headers["etag"] == f'"{DIGEST}-gzip"'
+        assert response.content == b""
+        mock_get_code.assert_not_called()
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    async def test_unchanged_bundle_returns_304(self, mock_metadata, mock_get_code):
+        mock_metadata.return_value = metadata()
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity", "If-None-Match": f'"{DIGEST}"'}
+            )
+
+        assert response.status_code == 304
+        mock_get_code.assert_not_called()
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    async def test_get_etag_matches_head(self, mock_metadata, mock_get_code):
+        """Test the ETag announced by HEAD is the one of the GET response"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        mock_metadata.return_value = metadata()
+        mock_get_code.return_value = code_result(StoredCode(data=data, encoding=encoding))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            head = await client.head("/api/custom-forms/my-form/code", headers={"Accept-Encoding": "gzip"})
+            get = await client.get("/api/custom-forms/my-form/code", headers={"Accept-Encoding": "gzip"})
+
+        assert get.status_code == 200
+        assert get.headers["etag"] == head.headers["etag"]
+
+
+class TestFormCodeRange:
+    """Tests for single Range requests"""
+
+    @patch('database.get_form_compiled_code')
+    async def test_range_from_code_bytes(self, mock_get_code):
+        mock_get_code.return_value = code_result(StoredCode(text=SAMPLE_CODE))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity", "Range": "bytes=7-13"}
+            )
+
+        assert response.status_code == 206
+        assert response.content == SAMPLE_CODE.encode("utf-8")[7:14]
+        assert response.headers["content-range"] == f"bytes 7-13/{len(SAMPLE_CODE.encode('utf-8'))}"
+
+    @patch('database.get_form_compiled_code')
+    async def test_stale_if_range_sends_full_bundle(self, mock_get_code):
+        """Test a resume against an older version restarts the download"""
+        mock_get_code.return_value = code_result(StoredCode(text=SAMPLE_CODE))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity", "Range": "bytes=7-", "If-Range": '"old"'}
+            )
+
+        assert response.status_code == 200
+        assert response.content == SAMPLE_CODE.encode("utf-8")
+
+    @patch('database.get_form_code_metadata')
+    async def test_range_from_disk_cache(self, mock_metadata, tmp_path):
+        """Test a resumed gzip download is served from the cached file"""
+        cache = DiskCodeCache(str(tmp_path), max_bytes=1024 * 1024)
+        data, _ = encode_compiled_code(SAMPLE_CODE)
+        cache.put(DIGEST, data)
+        mock_metadata.return_value = metadata()
+        from main import app
+
+        with patch('main.FORM_CODE_CACHE_ENABLED', True), patch('main.code_cache', cache):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                # Bytes crudos: un gzip parcial no se puede descomprimir
+                async with client.stream(
+                    "GET",
+                    "/api/custom-forms/my-form/code",
+                    headers={"Accept-Encoding": "gzip", "Range": "bytes=10-", "If-Range": f'"{DIGEST}-gzip"'}
+                ) as response:
+                    body = b"".join([chunk async for chunk in response.aiter_raw()])
+
+        assert response.status_code == 206
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["content-range"] == f"bytes 10-{len(data) - 1}/{len(data)}"
+        assert body == data[10:]
+
+    @patch('database.get_form_compiled_code')
+    async def test_unsatisfiable_range(self, mock_get_code):
+        mock_get_code.return_value = code_result(StoredCode(text=SAMPLE_CODE))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity", "Range": "bytes=5000-"}
+            )
+
+        assert response.status_code == 416
+
+
+# Run with: pytest tests/test_code_ranges.py -v
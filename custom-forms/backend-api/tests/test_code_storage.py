@@ -0,0 +1,138 @@
+"""
+Unit Tests for Compiled Code Storage
+
+Tests the compressed storage formats of CustomFormVersions (migration 006)
+and gzip pass-through on the code endpoint. Database access is mocked.
+"""
+
+import gzip
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_storage import (
+    StoredCode,
+    encode_compiled_code,
+    accepts_gzip,
+    CODE_ENCODING_GZIP_UTF8,
+    CODE_ENCODING_GZIP_UTF16LE
+)
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación ✓'; }"
+
+
+def make_code_result(code: StoredCode):
+    return {
+        'code': code,
+        'version': '1.0.0',
+        'published_at': '2026-01-01T00:00:00',
+        'size_bytes': len(SAMPLE_CODE),
+        'content_hash': None,
+        'storage_backend': None
+    }
+
+
+class TestStoredCode:
+    """Unit tests for StoredCode decoding"""
+
+    def test_gzip_utf8_roundtrip(self):
+        """Test code written by the backend decodes back to the original"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+
+        code = StoredCode(data=data, encoding=encoding)
+
+        assert encoding == CODE_ENCODING_GZIP_UTF8
+        assert code.text == SAMPLE_CODE
+        assert code.utf8_bytes() == SAMPLE_CODE.encode("utf-8")
+        assert code.gzip_utf8() == data
+
+    def test_encoding_is_deterministic(self):
+        """Test same code always produces the same compressed bytes"""
+        assert encode_compiled_code(SAMPLE_CODE) == encode_compiled_code(SAMPLE_CODE)
+
+    def test_gzip_utf16le_from_sql_compress(self):
+        """Test rows converted by COMPRESS(NVARCHAR) are decoded"""
+        data = gzip.compress(SAMPLE_CODE.encode("utf-16-le"))
+
+        code = StoredCode(data=data, encoding=CODE_ENCODING_GZIP_UTF16LE)
+
+        assert code.text == SAMPLE_CODE
+        # No es UTF-8: no se puede enviar tal cual
+        assert code.gzip_utf8() is None
+
+    def test_legacy_text_row(self):
+        """Test rows still in NVARCHAR are served as text"""
+        code = StoredCode(text=SAMPLE_CODE)
+
+        assert not code.is_compressed
+        assert code.utf8_bytes() == SAMPLE_CODE.encode("utf-8")
+
+    def test_unknown_encoding_rejected(self):
+        """Test unknown CodeEncoding values fail loudly"""
+        with pytest.raises(ValueError):
+            StoredCode(data=b"x", encoding="brotli")
+
+
+class TestAcceptsGzip:
+    """Unit tests for accepts_gzip"""
+
+    @pytest.mark.parametrize("header,expected", [
+        ("gzip, deflate, br", True),
+        ("br;q=1.0, gzip;q=0.8", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("identity", False),
+        ("", False),
+        (None, False),
+    ])
+    def test_accept_encoding_parsing(self, header, expected):
+        assert accepts_gzip(header) is expected
+
+
+class TestFormCodeEndpoint:
+    """Tests for GET /api/custom-forms/{form_name}/code"""
+
+    @patch('database.get_form_compiled_code')
+    async def test_gzip_passthrough(self, mock_get_code):
+        """Test compressed rows are sent as stored to clients accepting gzip"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        mock_get_code.return_value = make_code_result(StoredCode(data=data, encoding=encoding))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        # httpx descomprime el body de forma transparente
+        assert response.text == SAMPLE_CODE
+
+    @patch('database.get_form_compiled_code')
+    async def test_plain_response_without_accept_encoding(self, mock_get_code):
+        """Test clients without gzip support get decompressed code"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        mock_get_code.return_value = make_code_result(StoredCode(data=data, encoding=encoding))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/code",
+                headers={"Accept-Encoding": "identity"}
+            )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.content == SAMPLE_CODE.encode("utf-8")
+        assert response.headers["x-form-version"] == "1.0.0"
+
+
+# Run with: pytest tests/test_code_storage.py -v
@@ -0,0 +1,173 @@
+"""
+Unit Tests for Streaming Reads of Compiled Code
+
+Tests chunked reads of large payloads (SUBSTRING), incremental
+decompression/decoding and the streamed code endpoint. Database access is
+mocked.
+"""
+
+import gzip
+import hashlib
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from code_storage import (
+    StoredCode,
+    encode_compiled_code,
+    CODE_ENCODING_GZIP_UTF8,
+    CODE_ENCODING_GZIP_UTF16LE
+)
+
+
+# Incluye un carácter fuera del BMP (par surrogate en UTF-16)
+SAMPLE_CODE = "export default function Form() { return 'Aprobación 🚀'; }\n" * 200
+
+
+def split(data: bytes, size: int):
+    return lambda: iter([data[i:i + size] for i in range(0, len(data), size)])
+
+
+class TestStoredCodeStreaming:
+    """Unit tests for StoredCode.iter_utf8 / iter_stored with chunked payloads"""
+
+    @patch('code_storage.FORM_CODE_STREAM_CHUNK_KB', 1)
+    def test_gzip_utf8_inflated_in_chunks(self):
+        """Test gzip payloads are decompressed incrementally with bounded output"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        code = StoredCode(encoding=encoding, chunks=split(data, 100))
+
+        parts = list(code.iter_utf8())
+
+        assert code.is_streamed
+        assert b"".join(parts) == SAMPLE_CODE.encode("utf-8")
+        assert max(len(part) for part in parts) <= 1024
+
+    def test_gzip_passed_through(self):
+        """Test gzip clients receive the stored chunks unchanged"""
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        code = StoredCode(encoding=encoding, chunks=split(data, 100))
+
+        assert b"".join(code.iter_stored()) == data
+
+    def test_legacy_text_split_inside_surrogate_pair(self):
+        """Test NVARCHAR chunks (UTF-16LE) are decoded across chunk boundaries"""
+        raw = SAMPLE_CODE.encode("utf-16-le")
+        code = StoredCode(chunks=split(raw, 63))
+
+        assert b"".join(code.iter_utf8()) == SAMPLE_CODE.encode("utf-8")
+        assert code.text == SAMPLE_CODE
+
+    def test_utf16_gzip_streamed(self):
+        data = gzip.compress(SAMPLE_CODE.encode("utf-16-le"))
+        code = StoredCode(encoding=CODE_ENCODING_GZIP_UTF16LE, chunks=split(data, 50))
+
+        assert b"".join(code.iter_utf8()) == SAMPLE_CODE.encode("utf-8")
+
+    def test_iter_stored_rejects_non_utf8_gzip(self):
+        code = StoredCode(encoding=CODE_ENCODING_GZIP_UTF16LE, chunks=split(b"x", 1))
+
+        with pytest.raises(ValueError):
+            list(code.iter_stored())
+
+
+class TestChunkedDatabaseReads:
+    """Tests for get_form_compiled_code with payloads above the streaming threshold"""
+
+    @patch('database.FORM_CODE_STREAM_CHUNK_KB', 1)
+    @patch('database.get_db_connection')
+    def test_large_payload_read_with_substring(self, mock_get_conn):
+        """Test the payload is withheld from the code query and read in chunks"""
+        from database import get_form_compiled_code
+
+        # Arrange: la query del código no trae el payload (supera el umbral)
+        large_code = "".join(f"const v{i} = '{hashlib.sha256(bytes([i])).hexdigest()}';\n" for i in range(200))
+        data, encoding = encode_compiled_code(large_code)
+        published_at = datetime(2026, 1, 1)
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+        chunks = [data[i:i + 1024] for i in range(0, len(data), 1024)]
+        if len(chunks[-1]) == 1024:
+            chunks.append(b"")
+        mock_cursor.fetchone.side_effect = [
+            (None, "1.0.0", published_at, len(large_code), None, encoding, 10, "a" * 64, None, 0)
+        ] + [(chunk,) for chunk in chunks]
+
+        # Act
+        result = get_form_compiled_code("my-form")
+        code = result["code"]
+        body = b"".join(code.iter_stored())
+
+        # Assert
+        assert code.is_streamed
+        assert body == data
+        substring_calls = [c for c in mock_cursor.execute.call_args_list if "SUBSTRING" in c.args[0]]
+        assert len(substring_calls) == len(chunks)
+        assert substring_calls[1].args[1] == (1025, 1024, 10, published_at)
+
+    @patch('database.get_db_connection')
+    def test_payload_changed_while_streaming(self, mock_get_conn):
+        """Test a redeploy during the read fails the stream instead of mixing versions"""
+        from database import _iter_code_chunks
+
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+        mock_cursor.fetchone.return_value = None
+
+        with pytest.raises(ValueError):
+            list(_iter_code_chunks(10, datetime(2026, 1, 1), None, None, CODE_ENCODING_GZIP_UTF8))
+        mock_conn.close.assert_called_once()
+
+
+class TestFormCodeEndpointStreaming:
+    """Tests for GET /api/custom-forms/{form_name}/code with streamed payloads"""
+
+    def make_result(self, code):
+        return {
+            'code': code,
+            'version': '1.0.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(SAMPLE_CODE),
+            'version_id': 10,
+            'content_hash': None,
+            'storage_backend': None
+        }
+
+    @patch('database.get_form_compiled_code')
+    async def test_streamed_gzip(self, mock_get_code):
+        data, encoding = encode_compiled_code(SAMPLE_CODE)
+        mock_get_code.return_value = self.make_result(StoredCode(encoding=encoding, chunks=split(data, 100)))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/code", headers={"Accept-Encoding": "gzip"})
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["x-form-version"] == "1.0.0"
+        assert response.text == SAMPLE_CODE
+
+    @patch('database.get_form_compiled_code')
+    async def test_streamed_plain(self, mock_get_code):
+        raw = SAMPLE_CODE.encode("utf-16-le")
+        mock_get_code.return_value = self.make_result(StoredCode(chunks=split(raw, 63)))
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/code", headers={"Accept-Encoding": "identity"})
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert response.content == SAMPLE_CODE.encode("utf-8")
+
+
+# Run with: pytest tests/test_code_streaming.py -v
@@ -0,0 +1,186 @@
+"""
+Unit Tests for Idempotent Deployments
+
+These tests use a temporary result store and mock run_deployment,
+so no zip processing or database access happens.
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import UploadDeploymentResponse
+from deployment_jobs import DeploymentJobStore, DeploymentJobQueue
+from deployment_idempotency import (
+    DeploymentResultStore,
+    IdempotencyConflictError,
+    package_digest,
+    resolve_idempotency_key
+)
+
+
+def make_response(success=True):
+    return UploadDeploymentResponse(
+        success=success,
+        message="Deployment successful: 1 inserted, 0 updated" if success else "Deployment failed: boom",
+        formsProcessed=1,
+        formsInserted=1 if success else 0,
+        formsUpdated=0,
+        errors=[] if success else ["boom"],
+        results=[]
+    )
+
+
+class TestIdempotencyKey:
+    """Unit tests for resolve_idempotency_key"""
+
+    def test_digest_used_without_header(self):
+        """Test package digest is the key when no header is sent"""
+        digest = package_digest(b"zip-bytes")
+
+        assert resolve_idempotency_key(None, digest) == f"sha256:{digest}"
+
+    def test_header_takes_precedence(self):
+        """Test Idempotency-Key header is used when present"""
+        assert resolve_idempotency_key("ci-run-42", "a" * 64) == "ci-run-42"
+
+    def test_invalid_header_rejected(self):
+        """Test malformed Idempotency-Key is rejected"""
+        with pytest.raises(ValueError):
+            resolve_idempotency_key("bad key; DROP", "a" * 64)
+
+
+class TestDeploymentResultStore:
+    """Unit tests for DeploymentResultStore"""
+
+    def test_save_and_find_previous(self, tmp_path):
+        """Test stored successful response is returned for the same key"""
+        store = DeploymentResultStore(str(tmp_path))
+        store.save("ci-run-42", "a" * 64, make_response())
+
+        previous, job = store.find_previous("ci-run-42", "a" * 64)
+
+        assert previous.formsInserted == 1
+        assert job is None
+
+    def test_unknown_key(self, tmp_path):
+        """Test key without record returns nothing"""
+        store = DeploymentResultStore(str(tmp_path))
+
+        assert store.find_previous("ci-run-42", "a" * 64) == (None, None)
+
+    def test_key_reused_with_different_package(self, tmp_path):
+        """Test same key with a different package is a conflict"""
+        store = DeploymentResultStore(str(tmp_path))
+        store.save("ci-run-42", "a" * 64, make_response())
+
+        with pytest.raises(IdempotencyConflictError):
+            store.find_previous("ci-run-42", "b" * 64)
+
+    def test_expired_records_ignored_and_purged(self, tmp_path):
+        """Test records older than the retention window are not replayed"""
+        store = DeploymentResultStore(str(tmp_path), retention_hours=24)
+        record = store.save("old", "a" * 64, make_response())
+        record.createdAt = datetime.utcnow() - timedelta(hours=25)
+        store._write(record)
+        store.save("recent", "b" * 64, make_response())
+
+        purged = store.purge_expired()
+
+        assert purged == 1
+        assert store.get("old", "a" * 64) is None
+        assert store.get("recent", "b" * 64) is not None
+
+
+class TestIdempotentUploadEndpoint:
+    """Tests for idempotency on POST /api/deployment/upload"""
+
+    @patch('main.run_deployment')
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_identical_package_is_not_reprocessed(
+        self, mock_mw_verify, mock_dep_verify, mock_run, tmp_path
+    ):
+        """Test second upload of the same package replays the stored result"""
+        # Arrange
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        mock_run.return_value = make_response(success=True)
+        headers = {"Authorization": "Bearer valid_jwt_token"}
+        files = {"file": ("package.zip", b"zip-bytes", "application/zip")}
+        from main import app
+
+        # Act
+        with patch('main.result_store', DeploymentResultStore(str(tmp_path))):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                first = await client.post("/api/deployment/upload", headers=headers, files=files)
+                second = await client.post("/api/deployment/upload", headers=headers, files=files)
+
+        # Assert
+        assert first.status_code == 200
+        assert second.status_code == 200
+        assert second.headers["Idempotent-Replayed"] == "true"
+        assert second.json()["formsInserted"] == 1
+        mock_run.assert_called_once()
+
+    @patch('main.run_deployment')
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_failed_deployment_is_retried(
+        self, mock_mw_verify, mock_dep_verify, mock_run, tmp_path
+    ):
+        """Test failed results are not stored, so a retry processes the package"""
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        mock_run.return_value = make_response(success=False)
+        headers = {"Authorization": "Bearer valid_jwt_token", "Idempotency-Key": "ci-run-42"}
+        files = {"file": ("package.zip", b"zip-bytes", "application/zip")}
+        from main import app
+
+        with patch('main.result_store', DeploymentResultStore(str(tmp_path))):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                await client.post("/api/deployment/upload", headers=headers, files=files)
+                second = await client.post("/api/deployment/upload", headers=headers, files=files)
+
+        assert "Idempotent-Replayed" not in second.headers
+        assert mock_run.call_count == 2
+
+
+class TestIdempotentJobEndpoint:
+    """Tests for idempotency on POST /api/deployment/jobs"""
+
+    @patch('deployment_jobs.run_deployment')
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_identical_package_returns_existing_job(
+        self, mock_mw_verify, mock_dep_verify, mock_run, tmp_path
+    ):
+        """Test resubmitting the same package returns the first job instead of queueing again"""
+        # Arrange
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        mock_run.return_value = make_response(success=True)
+        queue = DeploymentJobQueue(DeploymentJobStore(str(tmp_path / "jobs")), max_concurrent=1)
+        headers = {"Authorization": "Bearer valid_jwt_token"}
+        files = {"file": ("package.zip", b"zip-bytes", "application/zip")}
+        from main import app
+
+        # Act
+        with patch('main.job_queue', queue), \
+             patch('deployment_idempotency.job_queue', queue), \
+             patch('main.result_store', DeploymentResultStore(str(tmp_path / "results"))):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                first = await client.post("/api/deployment/jobs", headers=headers, files=files)
+                second = await client.post("/api/deployment/jobs", headers=headers, files=files)
+        await queue.shutdown()
+
+        # Assert
+        assert first.status_code == 202
+        assert second.status_code == 200
+        assert second.json()["jobId"] == first.json()["jobId"]
+        assert len(queue.store.list_jobs()) == 1
+
+
+# Run with: pytest tests/test_deployment_idempotency.py -v
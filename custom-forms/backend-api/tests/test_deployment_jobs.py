@@ -0,0 +1,236 @@
+"""
+Unit Tests for Deployment Jobs
+
+These tests use a temporary job store and mock run_deployment,
+so no zip processing or database access happens.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from datetime import datetime, timedelta
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models import UploadDeploymentResponse, FormDeploymentResult
+from deployment_jobs import (
+    DeploymentJobStore,
+    DeploymentJobQueue,
+    JOB_QUEUED,
+    JOB_RUNNING,
+    JOB_COMPLETED,
+    JOB_FAILED
+)
+
+
+def make_response(success=True):
+    return UploadDeploymentResponse(
+        success=success,
+        message="Deployment successful: 1 inserted, 0 updated" if success else "Deployment failed: boom",
+        formsProcessed=1,
+        formsInserted=1 if success else 0,
+        formsUpdated=0,
+        errors=[] if success else ["boom"],
+        results=[],
+        stageTimings={"extract": 1.0, "total": 2.0}
+    )
+
+
+async def wait_for_status(queue, job_id, statuses, timeout=2.0):
+    """Espera hasta que el job alcance alguno de los estados indicados"""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while asyncio.get_running_loop().time() < deadline:
+        job = queue.get(job_id)
+        if job and job.status in statuses:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"Job {job_id} did not reach {statuses}")
+
+
+class TestDeploymentJobStore:
+    """Unit tests for DeploymentJobStore"""
+
+    def test_create_and_load_job(self, tmp_path):
+        """Test job is persisted with its package"""
+        store = DeploymentJobStore(str(tmp_path))
+
+        job = store.create("package.zip", b"zip-bytes", "admin")
+        loaded = store.load(job.jobId)
+
+        assert loaded.status == JOB_QUEUED
+        assert loaded.sizeBytes == len(b"zip-bytes")
+        assert loaded.submittedBy == "admin"
+        assert store.package_path(job.jobId).read_bytes() == b"zip-bytes"
+
+    def test_load_unknown_job(self, tmp_path):
+        """Test loading a job that doesn't exist"""
+        store = DeploymentJobStore(str(tmp_path))
+
+        assert store.load("0" * 32) is None
+
+    def test_invalid_job_id_rejected(self, tmp_path):
+        """Test path traversal attempts are rejected"""
+        store = DeploymentJobStore(str(tmp_path))
+
+        with pytest.raises(ValueError):
+            store.load("../../etc/passwd")
+
+    def test_purge_expired_keeps_recent_and_pending(self, tmp_path):
+        """Test only old finished jobs are purged"""
+        store = DeploymentJobStore(str(tmp_path))
+        old = store.create("old.zip", b"x")
+        old.status = JOB_COMPLETED
+        old.finishedAt = datetime.utcnow() - timedelta(hours=100)
+        store.save(old)
+        pending = store.create("pending.zip", b"x")
+
+        purged = store.purge_expired(72)
+
+        assert purged == 1
+        assert store.load(old.jobId) is None
+        assert store.load(pending.jobId) is not None
+
+
+class TestDeploymentJobQueue:
+    """Unit tests for DeploymentJobQueue"""
+
+    @patch('deployment_jobs.run_deployment')
+    async def test_job_completes_in_background(self, mock_run, tmp_path):
+        """Test submitted job runs and stores the deployment result"""
+        mock_run.return_value = make_response(success=True)
+        queue = DeploymentJobQueue(DeploymentJobStore(str(tmp_path)), max_concurrent=1)
+
+        job = await queue.submit("package.zip", b"zip-bytes", "admin")
+        finished = await wait_for_status(queue, job.jobId, (JOB_COMPLETED, JOB_FAILED))
+        await queue.shutdown()
+
+        assert finished.status == JOB_COMPLETED
+        assert finished.result.formsInserted == 1
+        assert finished.startedAt is not None
+        assert finished.finishedAt is not None
+        # Package and staging are released once the job finishes
+        assert not queue.store.package_path(job.jobId).exists()
+
+    @patch('deployment_jobs.run_deployment')
+    async def test_job_with_errors_is_failed(self, mock_run, tmp_path):
+        """Test deployment with errors marks the job as failed"""
+        mock_run.return_value = make_response(success=False)
+        queue = DeploymentJobQueue(DeploymentJobStore(str(tmp_path)), max_concurrent=1)
+
+        job = await queue.submit("package.zip", b"zip-bytes")
+        finished = await wait_for_status(queue, job.jobId, (JOB_COMPLETED, JOB_FAILED))
+        await queue.shutdown()
+
+        assert finished.status == JOB_FAILED
+        assert finished.error == "Deployment failed: boom"
+
+    @patch('deployment_jobs.run_deployment')
+    async def test_recover_requeues_interrupted_jobs(self, mock_run, tmp_path):
+        """Test jobs left running by a dead worker are re-run on startup"""
+        mock_run.return_value = make_response(success=True)
+        store = DeploymentJobStore(str(tmp_path))
+        interrupted = store.create("a.zip", b"a")
+        interrupted.status = JOB_RUNNING
+        store.save(interrupted)
+        orphan = store.create("b.zip", b"b")
+        store.package_path(orphan.jobId).unlink()
+
+        queue = DeploymentJobQueue(store, max_concurrent=1)
+        requeued = await queue.recover()
+        finished = await wait_for_status(queue, interrupted.jobId, (JOB_COMPLETED,))
+        await queue.shutdown()
+
+        assert requeued == 1
+        assert finished.status == JOB_COMPLETED
+        assert store.load(orphan.jobId).status == JOB_FAILED
+
+
+class TestDeploymentJobEvents:
+    """Unit tests for deployment progress events (SSE)"""
+
+    @staticmethod
+    def fake_deployment(zip_path, work_dir, on_event=None, deployed_by=None):
+        """Simula run_deployment emitiendo los eventos de progreso"""
+        response = make_response(success=True)
+        on_event("zip_validated", details={"files": 2, "durationMs": 1.0})
+        on_event("manifest_parsed", details={"packageVersion": "1.0.0", "forms": 1})
+        on_event("form_processed", form=FormDeploymentResult(
+            formName="my-form", success=True, action="inserted", durationMs=5.0
+        ))
+        on_event("summary", summary=response)
+        return response
+
+    @patch('deployment_jobs.run_deployment')
+    async def test_stream_replays_all_events_and_closes(self, mock_run, tmp_path):
+        """Test stream delivers every stage in order and ends with the summary"""
+        mock_run.side_effect = self.fake_deployment
+        queue = DeploymentJobQueue(DeploymentJobStore(str(tmp_path)), max_concurrent=1)
+
+        job = await queue.submit("package.zip", b"zip-bytes")
+        messages = [message async for message in queue.stream_events(job.jobId)]
+        await queue.shutdown()
+
+        events = [m.split("\n")[1] for m in messages if m.startswith("id:")]
+        assert events == [
+            "event: upload_received",
+            "event: zip_validated",
+            "event: manifest_parsed",
+            "event: form_processed",
+            "event: summary",
+        ]
+        assert '"action":"inserted"' in messages[3]
+
+    @patch('deployment_jobs.run_deployment')
+    async def test_stream_resumes_after_last_event_id(self, mock_run, tmp_path):
+        """Test reconnect only receives events after Last-Event-ID"""
+        mock_run.side_effect = self.fake_deployment
+        queue = DeploymentJobQueue(DeploymentJobStore(str(tmp_path)), max_concurrent=1)
+
+        job = await queue.submit("package.zip", b"zip-bytes")
+        await wait_for_status(queue, job.jobId, (JOB_COMPLETED,))
+        messages = [message async for message in queue.stream_events(job.jobId, after_sequence=4)]
+        await queue.shutdown()
+
+        assert len(messages) == 1
+        assert messages[0].startswith("id: 5\nevent: summary")
+
+
+class TestDeploymentJobEndpoints:
+    """Tests for /api/deployment/jobs endpoints"""
+
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_get_unknown_job_returns_404(self, mock_mw_verify, mock_dep_verify):
+        """Test status of a job that doesn't exist"""
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                f"/api/deployment/jobs/{'0' * 32}",
+                headers={"Authorization": "Bearer valid_jwt_token"}
+            )
+
+        assert response.status_code == 404
+
+    @patch('dependencies.verify_session_token')
+    @patch('middleware.verify_session_token')
+    async def test_submit_rejects_non_zip(self, mock_mw_verify, mock_dep_verify):
+        """Test submit validates the uploaded file before queueing"""
+        mock_mw_verify.return_value = mock_dep_verify.return_value = {"username": "admin"}
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.post(
+                "/api/deployment/jobs",
+                headers={"Authorization": "Bearer valid_jwt_token"},
+                files={"file": ("package.txt", b"not a zip", "text/plain")}
+            )
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_deployment_jobs.py -v
@@ -0,0 +1,250 @@
+"""
+Unit Tests for the Deployment Ledger
+
+Tests recording deployment packages and promoting/rolling them back as a
+unit through sp_ApplyFormDeployment (migration 014). Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import apply_form_deployment, record_form_deployment
+from deployment_service import _record_deployment
+from models import DeploymentManifest, FormDeployment, FormDeploymentResult, UploadDeploymentResponse
+from code_storage import CODE_ENCODING_DELTA
+
+
+MIGRATION = Path(__file__).parent.parent / "migrations" / "014_form_deployment_ledger.sql"
+
+
+def sp_row(status, form_name, version="1.1.0", version_id=20, previous="1.0.0"):
+    return (status, form_name, 1, version_id, version, previous, "c" * 64)
+
+
+class TestRecordFormDeployment:
+    """Tests for record_form_deployment"""
+
+    def test_single_batch(self, db_connection):
+        """Test the deployment and all its forms are inserted in one statement"""
+        # Arrange
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = (42,)
+
+        # Act
+        deployment_id = record_form_deployment("1.0.0", "abc123", "admin", [
+            ("form-a", "1.1.0", "1.0.0"),
+            ("form-b", "2.0.0", None)
+        ])
+
+        # Assert
+        assert deployment_id == 42
+        mock_cursor.execute.assert_called_once()
+        params = mock_cursor.execute.call_args.args[1]
+        assert params == ["1.0.0", "abc123", "admin", "form-a", "1.1.0", "1.0.0", "form-b", "2.0.0", None]
+        mock_conn.commit.assert_called_once()
+
+    @patch('database.get_db_connection')
+    def test_nothing_to_record(self, mock_get_conn):
+        assert record_form_deployment("1.0.0", "abc123", "admin", []) is None
+        mock_get_conn.assert_not_called()
+
+
+class TestApplyFormDeployment:
+    """Tests for apply_form_deployment"""
+
+    def test_promote_is_one_call(self, db_connection):
+        """Test every form of the package switches in one procedure call"""
+        # Arrange
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [sp_row("ok", "form-a"), sp_row("ok", "form-b")]
+
+        # Act
+        result = apply_form_deployment(42, applied_by="admin")
+
+        # Assert
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args.args
+        assert "sp_ApplyFormDeployment" in query
+        assert params == (42, "deployed", "admin")
+        mock_conn.commit.assert_called_once()
+        assert result["action"] == "promoted"
+        assert [form["formName"] for form in result["forms"]] == ["form-a", "form-b"]
+
+    def test_rollback_targets_previous_versions(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [
+            sp_row("ok", "form-a", version="1.0.0", previous="1.1.0"),
+            sp_row("skipped", "form-b", version=None, version_id=None, previous="2.0.0")
+        ]
+
+        result = apply_form_deployment(42, rollback=True)
+
+        assert mock_cursor.execute.call_args.args[1] == (42, "previous", None)
+        assert result["action"] == "rolled_back"
+        assert [form["status"] for form in result["forms"]] == ["ok", "skipped"]
+
+    @patch('database._materialize_version')
+    def test_delta_versions_materialized_first(self, mock_materialize, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.side_effect = [
+            [
+                sp_row("delta", "form-a", version_id=20),
+                sp_row("ok", "form-b", version_id=30)
+            ],
+            [sp_row("ok", "form-a", version_id=20), sp_row("ok", "form-b", version_id=30)]
+        ]
+
+        apply_form_deployment(42)
+
+        mock_materialize.assert_called_once_with(mock_cursor, 20)
+        assert mock_cursor.execute.call_count == 2
+        mock_conn.commit.assert_called_once()
+
+    def test_procedure_detects_delta_encoding(self):
+        """Test the procedure reports 'delta' for the encoding database.py writes for deltas"""
+        assert f"WHEN v.CodeEncoding = '{CODE_ENCODING_DELTA}' THEN 'delta'" in MIGRATION.read_text(encoding="utf-8")
+
+    def test_missing_version_changes_nothing(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [sp_row("ok", "form-a"), sp_row("missing", "form-b", version_id=None)]
+
+        with pytest.raises(ValueError, match="form-b@1.1.0"):
+            apply_form_deployment(42)
+
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+
+    def test_unknown_deployment(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = []
+
+        with pytest.raises(ValueError, match="not found"):
+            apply_form_deployment(99)
+
+
+class TestRecordDeployment:
+    """Tests for recording the ledger from run_deployment"""
+
+    def make_form(self, form_name, version):
+        return FormDeployment(
+            formName=form_name,
+            processName="Process",
+            version=version,
+            author="dev",
+            description="",
+            sizeBytes=100,
+            path=f"forms/{form_name}"
+        )
+
+    def make_response(self, results):
+        return UploadDeploymentResponse(
+            success=True, message="", formsProcessed=len(results), formsInserted=0,
+            formsUpdated=0, errors=[], results=results
+        )
+
+    def make_manifest(self):
+        return DeploymentManifest(
+            packageVersion="1.0.0",
+            buildDate=datetime(2026, 1, 1),
+            commitHash="abc123",
+            forms=[
+                self.make_form("form-a", "1.1.0"),
+                self.make_form("form-b", "2.0.0")
+            ]
+        )
+
+    @patch('deployment_service.record_form_deployment')
+    def test_only_successful_forms_recorded(self, mock_record):
+        # Arrange
+        mock_record.return_value = 7
+        response = self.make_response([
+            FormDeploymentResult(formName="form-a", success=True, action="updated"),
+            FormDeploymentResult(formName="form-b", success=False, action="failed", error="boom")
+        ])
+
+        # Act
+        deployment_id = _record_deployment(self.make_manifest(), response, {"form-a": "1.0.0"}, "admin")
+
+        # Assert
+        assert deployment_id == 7
+        mock_record.assert_called_once_with("1.0.0", "abc123", "admin", [("form-a", "1.1.0", "1.0.0")])
+
+    @patch('deployment_service.record_form_deployment')
+    def test_ledger_failure_does_not_fail_deployment(self, mock_record):
+        mock_record.side_effect = Exception("Table not found")
+        response = self.make_response([
+            FormDeploymentResult(formName="form-a", success=True, action="inserted"),
+            FormDeploymentResult(formName="form-b", success=True, action="inserted")
+        ])
+
+        assert _record_deployment(self.make_manifest(), response, {}, "admin") is None
+
+
+class TestDeploymentLedgerEndpoints:
+    """Tests for /api/deployment/ledger"""
+
+    @pytest.fixture
+    def client(self):
+        from main import app
+        return TestClient(app)
+
+    @pytest.fixture
+    def admin_headers(self):
+        with patch('dependencies.verify_session_token') as mock_dep, \
+             patch('middleware.verify_session_token') as mock_mw:
+            mock_dep.return_value = {"username": "admin"}
+            mock_mw.return_value = {"username": "admin"}
+            yield {"Authorization": "Bearer valid_jwt_token"}
+
+    @patch('main.form_version_index')
+    @patch('main.change_feed')
+    @patch('database.apply_form_deployment')
+    def test_rollback_invalidates_all_forms_once(self, mock_apply, mock_feed, mock_index, client, admin_headers):
+        # Arrange
+        mock_apply.return_value = {
+            "deployment_id": 42,
+            "action": "rolled_back",
+            "forms": [
+                {"status": "ok", "formName": "form-a", "version": "1.0.0", "previousVersion": "1.1.0", "contentHash": None},
+                {"status": "skipped", "formName": "form-b", "version": None, "previousVersion": "2.0.0", "contentHash": None}
+            ]
+        }
+
+        # Act
+        response = client.post("/api/deployment/ledger/42/rollback", headers=admin_headers)
+
+        # Assert
+        assert response.status_code == 200
+        mock_apply.assert_called_once_with(42, True, "admin")
+        mock_feed.notify.assert_called_once()
+        mock_index.invalidate.assert_called_once_with("form-a", "form-b")
+
+    @patch('database.apply_form_deployment')
+    def test_deleted_version_conflict(self, mock_apply, client, admin_headers):
+        mock_apply.side_effect = ValueError("Versions no longer exist: form-a@1.1.0")
+
+        response = client.post("/api/deployment/ledger/42/promote", headers=admin_headers)
+
+        assert response.status_code == 409
+
+    @patch('database.apply_form_deployment')
+    def test_unknown_deployment(self, mock_apply, client, admin_headers):
+        mock_apply.side_effect = ValueError("Deployment 99 not found")
+
+        response = client.post("/api/deployment/ledger/99/promote", headers=admin_headers)
+
+        assert response.status_code == 404
+
+    def test_requires_authentication(self, client):
+        response = client.post("/api/deployment/ledger/42/promote")
+
+        assert response.status_code == 401
+
+
+# Run with: pytest tests/test_deployment_ledger.py -v
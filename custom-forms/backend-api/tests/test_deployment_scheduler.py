@@ -0,0 +1,104 @@
+"""
+Unit Tests for Deployment Scheduler
+
+Tests staging directory isolation and per-form serialization of
+concurrent deployments (threads, no database access).
+"""
+
+import threading
+import time
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from deployment_scheduler import FormLockManager, create_staging_dir
+
+
+def run_in_thread(locks, forms, log, name, hold_seconds=0.05, started=None):
+    """Simula un deployment que retiene sus forms hold_seconds"""
+    def deploy():
+        if started:
+            started.wait()
+        with locks.hold(forms):
+            log.append(f"{name}:start")
+            time.sleep(hold_seconds)
+            log.append(f"{name}:end")
+
+    thread = threading.Thread(target=deploy)
+    thread.start()
+    return thread
+
+
+class TestStagingDirectories:
+    """Unit tests for create_staging_dir"""
+
+    def test_same_second_uploads_get_distinct_dirs(self, tmp_path):
+        """Test two deployments created in the same second don't share staging"""
+        first = create_staging_dir(str(tmp_path))
+        second = create_staging_dir(str(tmp_path))
+
+        assert first != second
+        assert first.is_dir() and second.is_dir()
+        assert first.name.startswith("deployment_")
+
+
+class TestFormLockManager:
+    """Unit tests for FormLockManager"""
+
+    def test_overlapping_deployments_are_serialized(self):
+        """Test deployments sharing a form never overlap"""
+        locks = FormLockManager()
+        log = []
+
+        first = run_in_thread(locks, ["form-a", "form-b"], log, "first")
+        time.sleep(0.01)
+        second = run_in_thread(locks, ["FORM-B", "form-c"], log, "second")
+        first.join()
+        second.join()
+
+        assert log == ["first:start", "first:end", "second:start", "second:end"]
+
+    def test_disjoint_deployments_run_in_parallel(self):
+        """Test deployments of different forms overlap in time"""
+        locks = FormLockManager()
+        log = []
+
+        first = run_in_thread(locks, ["form-a"], log, "first", hold_seconds=0.1)
+        time.sleep(0.01)
+        second = run_in_thread(locks, ["form-b"], log, "second", hold_seconds=0.01)
+        first.join()
+        second.join()
+
+        assert log.index("second:end") < log.index("first:end")
+
+    def test_waiters_are_served_in_arrival_order(self):
+        """Test a later deployment doesn't jump ahead of an earlier conflicting one"""
+        locks = FormLockManager()
+        log = []
+
+        holder = run_in_thread(locks, ["form-a"], log, "holder", hold_seconds=0.1)
+        time.sleep(0.01)
+        # "wide" espera form-a; "narrow" solo necesita form-b pero llega después
+        wide = run_in_thread(locks, ["form-a", "form-b"], log, "wide")
+        time.sleep(0.01)
+        narrow = run_in_thread(locks, ["form-b"], log, "narrow")
+        for thread in (holder, wide, narrow):
+            thread.join()
+
+        assert log.index("wide:end") < log.index("narrow:start")
+
+    def test_locks_released_on_error(self):
+        """Test forms are released when the deployment raises"""
+        locks = FormLockManager()
+
+        try:
+            with locks.hold(["form-a"]):
+                raise RuntimeError("boom")
+        except RuntimeError:
+            pass
+
+        assert locks.held_forms() == set()
+
+
+# Run with: pytest tests/test_deployment_scheduler.py -v
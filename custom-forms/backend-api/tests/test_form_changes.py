@@ -0,0 +1,225 @@
+"""
+Unit Tests for the Form Change Feed
+
+Tests the in-memory FormChangeFeed (polling, buffer, long-poll and SSE
+broadcast) and GET /api/custom-forms/changes. Database access is mocked.
+"""
+
+import asyncio
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from form_changes import FormChangeFeed
+
+
+def change(change_id, form_name="my-form", version="1.0.0"):
+    return {
+        "changeId": change_id,
+        "formName": form_name,
+        "changeType": "updated",
+        "oldVersion": None,
+        "newVersion": version,
+        "contentHash": "a" * 64,
+        "publishedAt": "2026-01-01T00:00:00",
+        "changedAt": "2026-01-01T00:00:00"
+    }
+
+
+class TestFormChangeFeed:
+    """Tests for FormChangeFeed"""
+
+    @patch('database.get_form_changes')
+    @patch('database.get_latest_form_change_id')
+    async def test_poll_buffers_changes(self, mock_latest, mock_changes):
+        """Test the first poll only reads the cursor and later polls buffer new changes"""
+        # Arrange
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        mock_latest.return_value = 5
+        mock_changes.return_value = [change(6), change(7)]
+
+        # Act
+        first = await feed.poll()
+        second = await feed.poll()
+
+        # Assert
+        assert first == []
+        assert [c["changeId"] for c in second] == [6, 7]
+        assert feed.latest_id == 7
+        mock_changes.assert_called_once_with(5, 100)
+
+    @patch('database.get_form_changes')
+    async def test_changes_since_served_from_buffer(self, mock_changes):
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+        mock_changes.return_value = [change(6), change(7), change(8)]
+        await feed.poll()
+        mock_changes.reset_mock()
+
+        changes, cursor = await feed.changes_since(6, limit=10)
+
+        assert [c["changeId"] for c in changes] == [7, 8]
+        assert cursor == 8
+        mock_changes.assert_not_called()
+
+    @patch('database.get_form_changes')
+    async def test_old_cursor_reads_database(self, mock_changes):
+        """Test a cursor older than the buffer is resolved with a query"""
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+        mock_changes.return_value = [change(6)]
+        await feed.poll()
+        mock_changes.return_value = [change(2), change(6)]
+
+        changes, cursor = await feed.changes_since(1, limit=10)
+
+        assert cursor == 6
+        mock_changes.assert_called_with(1, 10)
+
+    @patch('database.get_form_changes')
+    async def test_wait_returns_on_new_change(self, mock_changes):
+        """Test a long-poll request is woken up by the poller"""
+        # Arrange
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+        mock_changes.return_value = [change(6)]
+
+        # Act: el poll llega mientras el request espera
+        waiter = asyncio.create_task(feed.wait(5, timeout=5))
+        await asyncio.sleep(0.01)
+        await feed.poll()
+        changes, cursor = await asyncio.wait_for(waiter, 1)
+
+        # Assert
+        assert [c["changeId"] for c in changes] == [6]
+        assert cursor == 6
+
+    async def test_wait_timeout(self):
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+
+        changes, cursor = await feed.wait(5, timeout=0.05)
+
+        assert changes == []
+        assert cursor == 5
+
+
+class TestFormChangeStream:
+    """Tests for the SSE broadcast of FormChangeFeed"""
+
+    @patch('database.get_form_changes')
+    async def test_replays_then_pushes_live_changes(self, mock_changes):
+        """Test a client resuming from a cursor gets missed and new changes once each"""
+        # Arrange
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+        mock_changes.return_value = [change(6)]
+        await feed.poll()
+        stream = feed.stream(since=5)
+
+        # Act
+        retry = await stream.__anext__()
+        replayed = await stream.__anext__()
+        mock_changes.return_value = [change(7)]
+        await feed.poll()
+        live = await asyncio.wait_for(stream.__anext__(), 1)
+        await stream.aclose()
+
+        # Assert
+        assert retry.startswith("retry:")
+        assert replayed.startswith("id: 6\nevent: form_changed\n")
+        assert live.startswith("id: 7\n")
+        assert feed.subscriber_count == 0
+
+    @patch('form_changes.FORM_CHANGES_STREAM_QUEUE_SIZE', 2)
+    @patch('database.get_form_changes')
+    async def test_slow_client_is_disconnected(self, mock_changes):
+        """Test a client that doesn't consume its queue is dropped instead of buffering"""
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 5
+        mock_changes.return_value = []
+        stream = feed.stream(since=5)
+        await stream.__anext__()
+        waiting = asyncio.ensure_future(stream.__anext__())
+        await asyncio.sleep(0)
+
+        mock_changes.return_value = [change(6), change(7), change(8)]
+        await feed.poll()
+
+        # El stream termina: el cliente reconecta con Last-Event-ID
+        with pytest.raises(StopAsyncIteration):
+            await asyncio.wait_for(waiting, 1)
+        assert feed.subscriber_count == 0
+
+    @patch('database.get_form_changes')
+    @patch('database.get_latest_form_change_id')
+    async def test_notify_triggers_immediate_poll(self, mock_latest, mock_changes):
+        # Arrange: intervalo largo, solo notify puede disparar el segundo poll
+        feed = FormChangeFeed(poll_interval_ms=60000, buffer_size=100)
+        mock_latest.return_value = 5
+        mock_changes.return_value = [change(6)]
+        runner = asyncio.create_task(feed.run())
+        await asyncio.sleep(0.01)
+
+        # Act
+        feed.notify()
+        await asyncio.sleep(0.05)
+        runner.cancel()
+
+        # Assert
+        assert feed.latest_id == 6
+
+
+class TestFormChangesEndpoint:
+    """Tests for GET /api/custom-forms/changes"""
+
+    @patch('database.get_latest_form_change_id')
+    async def test_without_cursor_returns_current_cursor(self, mock_latest):
+        mock_latest.return_value = 42
+        from main import app
+
+        with patch('main.change_feed', FormChangeFeed(poll_interval_ms=10, buffer_size=100)):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/changes")
+
+        assert response.status_code == 200
+        assert response.json() == {"cursor": 42, "changes": []}
+
+    @patch('database.get_form_changes')
+    async def test_returns_changes_after_cursor(self, mock_changes):
+        feed = FormChangeFeed(poll_interval_ms=10, buffer_size=100)
+        feed.latest_id = 7
+        mock_changes.return_value = [change(6), change(7, version="1.1.0")]
+        from main import app
+
+        with patch('main.change_feed', feed):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/changes", params={"since": 5})
+
+        assert response.status_code == 200
+        assert response.json()["cursor"] == 7
+        assert response.json()["changes"][1]["newVersion"] == "1.1.0"
+
+    async def test_invalid_limit(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/changes", params={"since": 1, "limit": 0})
+
+        assert response.status_code == 400
+
+    async def test_stream_client_limit(self):
+        from main import app
+
+        with patch('main.FORM_CHANGES_STREAM_MAX_CLIENTS', 0):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/changes/stream")
+
+        assert response.status_code == 503
+
+
+# Run with: pytest tests/test_form_changes.py -v
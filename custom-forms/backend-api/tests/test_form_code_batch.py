@@ -0,0 +1,137 @@
+"""
+Unit Tests for the Batch Form Code Endpoint
+
+Tests POST /api/custom-forms/code-batch and the single set-based query
+behind it, including per-form ETag skipping. Database access is mocked.
+"""
+
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_forms_compiled_code
+from code_storage import StoredCode, encode_compiled_code
+from blob_storage import content_hash
+
+
+FORM_A = "export default function A() { return 'Aprobación'; }"
+FORM_B = "export default function B() { return 2; }"
+
+
+class TestGetFormsCompiledCode:
+    """Tests for get_forms_compiled_code"""
+
+    def test_single_query_for_all_forms(self, db_connection):
+        """Test every form is resolved by one query and returned in request order"""
+        # Arrange: el form A no cambió, el B se envía, el C no existe
+        data, encoding = encode_compiled_code(FORM_B)
+        mock_conn, mock_cursor = db_connection
+        published_at = datetime(2026, 1, 1)
+        mock_cursor.fetchall.return_value = [
+            (1, None, "2.0.0", published_at, len(FORM_B), data, encoding, 20, content_hash(FORM_B), "sql", 0, 0),
+            (0, None, "1.0.0", published_at, len(FORM_A), None, encoding, 10, content_hash(FORM_A), "sql", 0, 1),
+        ]
+
+        # Act
+        results = get_forms_compiled_code([
+            ("form-a", None, content_hash(FORM_A)),
+            ("form-b", "2.0.0", None),
+            ("form-c", None, None),
+        ])
+
+        # Assert
+        mock_cursor.execute.assert_called_once()
+        params = mock_cursor.execute.call_args.args[1]
+        assert params == [0, "form-a", None, content_hash(FORM_A), 1, "form-b", "2.0.0", None, 2, "form-c", None, None]
+        assert results[0]["not_modified"] is True
+        assert results[0]["code"] is None
+        assert results[1]["code"].text == FORM_B
+        assert results[2] is None
+
+    def test_invalid_form_name_rejected(self):
+        with pytest.raises(ValueError):
+            get_forms_compiled_code([("bad name'; --", None, None)])
+
+
+class TestFormCodeBatchEndpoint:
+    """Tests for POST /api/custom-forms/code-batch"""
+
+    def make_result(self, code, version="1.0.0", not_modified=False):
+        return {
+            'code': None if not_modified else StoredCode(text=code),
+            'not_modified': not_modified,
+            'version': version,
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(code),
+            'version_id': 10,
+            'content_hash': content_hash(code),
+            'storage_backend': None,
+            'has_source_map': False
+        }
+
+    @patch('database.get_forms_compiled_code')
+    async def test_batch_response(self, mock_batch):
+        """Test bundles and per-form metadata come back in one response"""
+        # Arrange
+        mock_batch.return_value = [
+            self.make_result(FORM_A, not_modified=True),
+            self.make_result(FORM_B, version="2.0.0"),
+            None,
+        ]
+        from main import app
+
+        # Act
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.post("/api/custom-forms/code-batch", json={"forms": [
+                {"formName": "form-a", "etag": f'"{content_hash(FORM_A)}-gzip"'},
+                {"formName": "form-b", "version": "2.0.0"},
+                {"formName": "form-c"},
+            ]})
+
+        # Assert
+        assert response.status_code == 200
+        forms = response.json()["forms"]
+        assert [form["status"] for form in forms] == ["not_modified", "ok", "not_found"]
+        assert forms[0]["code"] is None
+        assert forms[1]["code"] == FORM_B
+        assert forms[1]["etag"] == f'"{content_hash(FORM_B)}"'
+        # El ETag de /code (representación gzip) se acepta como hash conocido
+        assert mock_batch.call_args.args[0][0] == ("form-a", None, content_hash(FORM_A))
+
+    @patch('database.get_forms_compiled_code')
+    async def test_gzip_response(self, mock_batch):
+        mock_batch.return_value = [self.make_result(FORM_A)]
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            async with client.stream(
+                "POST",
+                "/api/custom-forms/code-batch",
+                json={"forms": [{"formName": "form-a"}]},
+                headers={"Accept-Encoding": "gzip"}
+            ) as response:
+                raw = b"".join([chunk async for chunk in response.aiter_raw()])
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert json.loads(gzip.decompress(raw))["forms"][0]["code"] == FORM_A
+
+    async def test_too_many_forms(self):
+        from main import app
+
+        with patch('main.FORM_CODE_BATCH_MAX_FORMS', 2):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.post("/api/custom-forms/code-batch", json={
+                    "forms": [{"formName": f"form-{i}"} for i in range(3)]
+                })
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_form_code_batch.py -v
@@ -0,0 +1,129 @@
+"""
+Unit Tests for Form Delta Storage
+
+Tests the delta codec, the reconstruction cache and the reconstruction of
+delta rows in get_form_compiled_code (migration 007). Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from form_delta import create_delta, apply_delta, ReconstructedCodeCache, DeltaError
+from code_storage import encode_compiled_code, CODE_ENCODING_DELTA
+
+
+def make_bundle(release: str) -> bytes:
+    """Bundle minificado de ~40KB en una sola línea"""
+    functions = "".join(f"function f{i}(a){{return a+{i};}}" for i in range(1500))
+    return f"var release='{release}';{functions}export default f1;".encode("utf-8")
+
+
+class TestDeltaCodec:
+    """Unit tests for create_delta / apply_delta"""
+
+    def test_roundtrip(self):
+        """Test a delta rebuilds the exact target version"""
+        base = make_bundle("1.0.0")
+        target = make_bundle("1.0.1").replace(b"return a+7;", b"return a*7;")
+
+        delta = create_delta(base, target)
+
+        assert apply_delta(base, delta) == target
+
+    def test_small_change_produces_small_delta(self):
+        """Test consecutive versions store much less than a full copy"""
+        base = make_bundle("1.0.0")
+        target = make_bundle("1.0.1")
+        full_binary, _ = encode_compiled_code(target.decode("utf-8"))
+
+        delta = create_delta(base, target)
+
+        assert len(delta) < len(full_binary) / 10
+
+    def test_wrong_base_rejected(self):
+        """Test applying a delta to a different base fails instead of returning corrupt code"""
+        base = make_bundle("1.0.0")
+        delta = create_delta(base, make_bundle("1.0.1"))
+
+        with pytest.raises(DeltaError):
+            apply_delta(make_bundle("2.0.0").replace(b"a+1", b"a-1"), delta)
+
+    def test_invalid_delta_rejected(self):
+        """Test data that is not a delta is rejected"""
+        import gzip
+
+        with pytest.raises(DeltaError):
+            apply_delta(b"base", gzip.compress(b"not a delta"))
+
+
+class TestReconstructedCodeCache:
+    """Unit tests for ReconstructedCodeCache"""
+
+    def test_evicts_least_recently_used(self):
+        """Test the cache stays within its byte budget evicting the oldest entry"""
+        cache = ReconstructedCodeCache(max_bytes=10)
+        cache.put((1, b"a"), b"12345")
+        cache.put((2, b"b"), b"12345")
+        cache.get((1, b"a"))
+
+        cache.put((3, b"c"), b"12345")
+
+        assert cache.get((1, b"a")) == b"12345"
+        assert cache.get((2, b"b")) is None
+        assert len(cache) == 2
+
+    def test_key_changes_when_version_is_rebased(self):
+        """Test a re-encoded delta doesn't hit the old cache entry"""
+        assert ReconstructedCodeCache.key(7, b"delta-1") != ReconstructedCodeCache.key(7, b"delta-2")
+
+    def test_oversized_values_not_cached(self):
+        """Test a version larger than the whole budget is not cached"""
+        cache = ReconstructedCodeCache(max_bytes=4)
+
+        cache.put((1, b"a"), b"12345")
+
+        assert len(cache) == 0
+
+
+class TestGetFormCompiledCodeDelta:
+    """Tests reconstruction of delta rows in get_form_compiled_code"""
+
+    @patch('database.get_db_connection')
+    def test_old_version_is_reconstructed(self, mock_get_conn):
+        """Test ?version= of a delta row returns the original code"""
+        from database import get_form_compiled_code
+
+        # Arrange: versión 1.0.0 guardada como delta contra la versión 11 (current)
+        base = make_bundle("1.0.1")
+        target = make_bundle("1.0.0")
+        delta = create_delta(base, target)
+        base_binary, base_encoding = encode_compiled_code(base.decode("utf-8"))
+
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+        cache = ReconstructedCodeCache(1024 * 1024)
+        mock_cursor.fetchone.side_effect = [
+            (None, "1.0.0", datetime(2026, 1, 1), len(target), delta, CODE_ENCODING_DELTA, 10, None, None, 0),
+            (None, delta, CODE_ENCODING_DELTA, None, None),
+            (11,),
+            (None, base_binary, base_encoding, None, None),
+        ]
+
+        # Act
+        with patch('database.reconstruct_cache', cache):
+            result = get_form_compiled_code("my-form", "1.0.0")
+
+        # Assert
+        assert result["code"].utf8_bytes() == target
+        assert result["version"] == "1.0.0"
+        assert cache.get(ReconstructedCodeCache.key(10, delta)) == target
+
+
+# Run with: pytest tests/test_form_delta.py -v
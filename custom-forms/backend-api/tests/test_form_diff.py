@@ -0,0 +1,152 @@
+"""
+Unit Tests for the Form Diff Endpoint
+
+Tests the unified diff, its cache and
+GET /api/custom-forms/{form_name}/diff. Database access is mocked.
+"""
+
+import gzip
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from form_diff import DiffCache, DiffTooLargeError, compute_diff_gzip, iter_gunzip, unified_diff
+from code_storage import StoredCode
+from blob_storage import content_hash
+
+
+FROM_CODE = "export default function Form() {\n  return 'v1';\n}\n"
+TO_CODE = "export default function Form() {\n  return 'v2 – Aprobación';\n}\n"
+
+
+def metadata(version, code):
+    return {
+        'version': version,
+        'published_at': '2026-01-01T00:00:00',
+        'size_bytes': len(code),
+        'version_id': 10,
+        'content_hash': content_hash(code),
+        'storage_backend': None,
+        'has_source_map': False,
+        'code_encoding': None,
+        'process_name': 'MyProcess'
+    }
+
+
+class TestUnifiedDiff:
+    """Tests for the diff computation"""
+
+    def test_unified_diff(self):
+        diff = unified_diff(FROM_CODE, TO_CODE, "form@1.0.0", "form@1.1.0", 1024 * 1024).decode("utf-8")
+
+        assert diff.startswith("--- form@1.0.0\n+++ form@1.1.0\n")
+        assert "-  return 'v1';\n" in diff
+        assert "+  return 'v2 – Aprobación';\n" in diff
+
+    def test_output_cap(self):
+        with pytest.raises(DiffTooLargeError):
+            unified_diff(FROM_CODE, TO_CODE, "a", "b", max_output_bytes=20)
+
+    def test_gzip_round_trip(self):
+        data = compute_diff_gzip(FROM_CODE, TO_CODE, "a", "b")
+
+        assert b"".join(iter_gunzip(data)) == gzip.decompress(data)
+
+    def test_cache_evicts_least_recently_used(self):
+        cache = DiffCache(max_bytes=10)
+        cache.put(("a", "b"), b"12345")
+        cache.put(("b", "c"), b"12345")
+        cache.get(("a", "b"))
+
+        cache.put(("c", "d"), b"12345")
+
+        assert cache.get(("a", "b")) == b"12345"
+        assert cache.get(("b", "c")) is None
+
+
+class TestFormDiffEndpoint:
+    """Tests for GET /api/custom-forms/{form_name}/diff"""
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    @patch('dependencies.verify_session_token')
+    async def test_diff_is_cached_per_content_hash(self, mock_verify, mock_metadata, mock_get_code):
+        """Test the second request for the same pair doesn't read the bundles"""
+        # Arrange
+        mock_verify.return_value = {"username": "admin"}
+        mock_metadata.side_effect = lambda name, version: metadata(version, FROM_CODE if version == "1.0.0" else TO_CODE)
+        mock_get_code.side_effect = lambda name, version: {'code': StoredCode(text=FROM_CODE if version == "1.0.0" else TO_CODE)}
+        headers = {"Authorization": "Bearer valid_jwt_token", "Accept-Encoding": "identity"}
+        from main import app
+
+        # Act
+        with patch('main.diff_cache', DiffCache(1024 * 1024)):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                params = {"from": "1.0.0", "to": "1.1.0"}
+                first = await client.get("/api/custom-forms/my-form/diff", params=params, headers=headers)
+                second = await client.get("/api/custom-forms/my-form/diff", params=params, headers=headers)
+
+        # Assert
+        assert first.status_code == 200
+        assert "+  return 'v2 – Aprobación';" in first.text
+        assert first.headers["x-size-delta"] == str(len(TO_CODE) - len(FROM_CODE))
+        assert second.text == first.text
+        assert mock_get_code.call_count == 2  # Solo el primer request lee los dos bundles
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    @patch('dependencies.verify_session_token')
+    async def test_same_content_on_another_form_keeps_its_labels(self, mock_verify, mock_metadata, mock_get_code):
+        """Test a cached diff is not served with the headers of another form with identical bundles"""
+        # Arrange
+        mock_verify.return_value = {"username": "admin"}
+        mock_metadata.side_effect = lambda name, version: metadata(version, FROM_CODE if version == "1.0.0" else TO_CODE)
+        mock_get_code.side_effect = lambda name, version: {'code': StoredCode(text=FROM_CODE if version == "1.0.0" else TO_CODE)}
+        headers = {"Authorization": "Bearer valid_jwt_token", "Accept-Encoding": "identity"}
+        from main import app
+
+        # Act
+        with patch('main.diff_cache', DiffCache(1024 * 1024)):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                params = {"from": "1.0.0", "to": "1.1.0"}
+                await client.get("/api/custom-forms/my-form/diff", params=params, headers=headers)
+                other = await client.get("/api/custom-forms/other-form/diff", params=params, headers=headers)
+
+        # Assert
+        assert "--- other-form@1.0.0" in other.text
+        assert "+++ other-form@1.1.0" in other.text
+        assert "my-form" not in other.text
+
+    @patch('database.get_form_compiled_code')
+    @patch('database.get_form_code_metadata')
+    @patch('dependencies.verify_session_token')
+    async def test_bundle_too_large(self, mock_verify, mock_metadata, mock_get_code):
+        mock_verify.return_value = {"username": "admin"}
+        mock_metadata.side_effect = lambda name, version: metadata(version, FROM_CODE)
+        from main import app
+
+        with patch('form_diff.FORM_DIFF_MAX_CODE_KB', 0):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get(
+                    "/api/custom-forms/my-form/diff",
+                    params={"from": "1.0.0", "to": "1.1.0"},
+                    headers={"Authorization": "Bearer valid_jwt_token"}
+                )
+
+        assert response.status_code == 413
+        mock_get_code.assert_not_called()
+
+    async def test_requires_admin(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/diff", params={"from": "1.0.0", "to": "1.1.0"})
+
+        assert response.status_code == 401
+
+
+# Run with: pytest tests/test_form_diff.py -v
@@ -0,0 +1,125 @@
+"""
+Unit Tests for the Form Listing
+
+Tests filters, keyset pagination and field projection of
+GET /api/custom-forms and get_custom_forms_page. Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_custom_forms_page
+
+
+class TestGetCustomFormsPage:
+    """Tests for get_custom_forms_page"""
+
+    def test_filters_and_keyset_in_query(self, db_connection):
+        """Test filters and the cursor are pushed into the query"""
+        # Arrange: limit 2 + 1 fila de más => hay página siguiente
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [
+            ("form-b", "form-b", "1.0.0"),
+            ("form-c", "form-c", "2.0.0"),
+            ("form-d", "form-d", "1.1.0"),
+        ]
+
+        # Act
+        forms, next_after = get_custom_forms_page(
+            process_name="Expenses",
+            updated_since=datetime(2026, 1, 1),
+            fields=["formName", "currentVersion"],
+            after="form-a",
+            limit=2
+        )
+
+        # Assert
+        query, params = mock_cursor.execute.call_args.args
+        assert "TOP (?)" in query
+        assert "cf.FormName > ?" in query
+        assert "CustomFormVersions" not in query  # sin sizeBytes no hay JOIN
+        assert params == [3, "active", "Expenses", datetime(2026, 1, 1), "form-a"]
+        assert forms == [
+            {"formName": "form-b", "currentVersion": "1.0.0"},
+            {"formName": "form-c", "currentVersion": "2.0.0"},
+        ]
+        assert next_after == "form-c"
+
+    def test_last_page(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [("form-a", "form-a", 1200)]
+
+        forms, next_after = get_custom_forms_page(fields=["formName", "sizeBytes"], limit=10)
+
+        assert "LEFT JOIN CustomFormVersions" in mock_cursor.execute.call_args.args[0]
+        assert forms == [{"formName": "form-a", "sizeBytes": 1200}]
+        assert next_after is None
+
+    def test_invalid_field_rejected(self):
+        with pytest.raises(ValueError):
+            get_custom_forms_page(fields=["compiledCode"])
+
+    def test_invalid_status_rejected(self):
+        with pytest.raises(ValueError):
+            get_custom_forms_page(status="archived")
+
+
+class TestFormListingEndpoint:
+    """Tests for GET /api/custom-forms"""
+
+    @patch('database.get_custom_forms_page')
+    async def test_without_limit_returns_array(self, mock_page):
+        """Test the unpaginated response stays a plain array"""
+        mock_page.return_value = ([{"formName": "form-a"}], None)
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms")
+
+        assert response.status_code == 200
+        assert response.json() == [{"formName": "form-a"}]
+        assert mock_page.call_args.kwargs["limit"] is None
+
+    @patch('database.get_custom_forms_page')
+    async def test_cursor_round_trip(self, mock_page):
+        """Test nextCursor of a page resumes after its last form"""
+        # Arrange
+        mock_page.return_value = ([{"formName": "form-a"}, {"formName": "form-b"}], "form-b")
+        from main import app
+
+        # Act
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            first = await client.get("/api/custom-forms", params={"limit": 2, "fields": "formName"})
+            mock_page.return_value = ([{"formName": "form-c"}], None)
+            second = await client.get("/api/custom-forms", params={"limit": 2, "cursor": first.json()["nextCursor"]})
+
+        # Assert
+        assert first.json()["items"][1] == {"formName": "form-b"}
+        assert mock_page.call_args_list[0].kwargs["fields"] == ["formName"]
+        assert mock_page.call_args.kwargs["after"] == "form-b"
+        assert second.json() == {"items": [{"formName": "form-c"}], "nextCursor": None}
+
+    async def test_invalid_cursor(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms", params={"cursor": "not-a-cursor"})
+
+        assert response.status_code == 400
+
+    async def test_invalid_limit(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms", params={"limit": 0})
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_form_listing.py -v
@@ -0,0 +1,100 @@
+"""
+Unit Tests for the Form Metadata Endpoint
+
+Tests GET /api/custom-forms/{form_name}/metadata and the metadata-only
+query behind it. Database access is mocked.
+"""
+
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_form_code_metadata
+
+
+DIGEST = "a" * 64
+
+
+class TestGetFormCodeMetadata:
+    """Tests for get_form_code_metadata"""
+
+    @patch('database.get_db_connection')
+    def test_query_never_reads_code(self, mock_get_conn):
+        """Test the metadata query doesn't select the compiled code columns"""
+        # Arrange
+        mock_conn = MagicMock()
+        mock_cursor = MagicMock()
+        mock_conn.cursor.return_value = mock_cursor
+        mock_get_conn.return_value = mock_conn
+        mock_cursor.fetchone.return_value = (
+            "1.2.0", datetime(2026, 1, 1), 1234, 10, DIGEST, "sql", 1, "gzip-utf8", "MyProcess"
+        )
+
+        # Act
+        result = get_form_code_metadata("my-form")
+
+        # Assert
+        query = mock_cursor.execute.call_args.args[0]
+        assert "CompiledCode" not in query
+        assert result["process_name"] == "MyProcess"
+        assert result["version"] == "1.2.0"
+        assert result["has_source_map"] is True
+
+
+class TestFormMetadataEndpoint:
+    """Tests for GET /api/custom-forms/{form_name}/metadata"""
+
+    @patch('database.get_form_code_metadata')
+    async def test_returns_metadata(self, mock_metadata):
+        mock_metadata.return_value = {
+            'version': '1.2.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': 1234,
+            'version_id': 10,
+            'content_hash': DIGEST,
+            'storage_backend': 'sql',
+            'has_source_map': False,
+            'code_encoding': 'gzip-utf8',
+            'process_name': 'MyProcess'
+        }
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/metadata")
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "formName": "my-form",
+            "processName": "MyProcess",
+            "version": "1.2.0",
+            "contentHash": DIGEST,
+            "sizeBytes": 1234,
+            "publishedAt": "2026-01-01T00:00:00",
+            "hasSourceMap": False
+        }
+        mock_metadata.assert_called_once_with("my-form", None)
+
+    @patch('database.get_form_code_metadata')
+    async def test_unknown_form(self, mock_metadata):
+        mock_metadata.return_value = None
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/missing/metadata")
+
+        assert response.status_code == 404
+
+    async def test_invalid_version(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/metadata", params={"version": "1.0;DROP"})
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_form_metadata.py -v
@@ -0,0 +1,231 @@
+"""
+Unit Tests for Form Version Retention
+
+Tests the retention window, the batch loop, get_prune_candidates and
+prune_form_versions.
+Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from datetime import datetime
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import form_retention
+from form_retention import parse_window, in_window, prune_in_batches
+from database import get_prune_candidates, prune_form_versions
+
+
+def executed_sql(mock_cursor):
+    return [call.args[0] for call in mock_cursor.execute.call_args_list]
+
+
+class TestRetentionWindow:
+    """Tests for parse_window / in_window"""
+
+    def test_no_window(self):
+        assert parse_window("") is None
+        assert in_window(None, datetime(2026, 1, 1, 12))
+
+    def test_overnight_window(self):
+        window = parse_window("22-6")
+
+        assert in_window(window, datetime(2026, 1, 1, 23))
+        assert in_window(window, datetime(2026, 1, 1, 5))
+        assert not in_window(window, datetime(2026, 1, 1, 6))
+        assert not in_window(window, datetime(2026, 1, 1, 14))
+
+    def test_same_day_window(self):
+        window = parse_window("1-5")
+
+        assert in_window(window, datetime(2026, 1, 1, 1))
+        assert not in_window(window, datetime(2026, 1, 1, 5))
+
+    @pytest.mark.parametrize("value", ["22", "a-b", "22-25"])
+    def test_invalid_window(self, value):
+        with pytest.raises(ValueError):
+            parse_window(value)
+
+
+class TestPruneInBatches:
+    """Tests for prune_in_batches"""
+
+    @pytest.fixture(autouse=True)
+    def settings(self):
+        with patch.object(form_retention, "FORM_RETENTION_BATCH_SIZE", 2), \
+             patch.object(form_retention, "FORM_RETENTION_BATCH_DELAY_MS", 0), \
+             patch.object(form_retention, "FORM_RETENTION_MAX_BATCHES", 3), \
+             patch.object(form_retention, "retention_window", None):
+            yield
+
+    @staticmethod
+    def batch(deleted, forms=()):
+        return {"deleted": deleted, "materialized": 0, "bytes": deleted * 100, "forms": list(forms)}
+
+    async def test_candidates_selected_once_per_pass(self):
+        """Test the ranking query runs once and each batch gets its slice of the candidates"""
+        # Arrange
+        find_candidates = MagicMock(return_value=[1, 2, 3, 4, 5])
+        prune_batch = MagicMock(side_effect=[self.batch(2, ["form-a"]), self.batch(1, ["form-b"]), self.batch(1)])
+        on_batch = MagicMock()
+
+        # Act
+        totals = await prune_in_batches(find_candidates, prune_batch, on_batch)
+
+        # Assert
+        find_candidates.assert_called_once_with(6)
+        assert [call.args[0] for call in prune_batch.call_args_list] == [[1, 2], [3, 4], [5]]
+        assert totals == {"batches": 3, "deleted": 4, "materialized": 0, "bytes": 400}
+        assert on_batch.call_count == 3
+
+    async def test_no_candidates(self):
+        prune_batch = MagicMock()
+
+        totals = await prune_in_batches(MagicMock(return_value=[]), prune_batch)
+
+        prune_batch.assert_not_called()
+        assert totals["batches"] == 0
+
+    async def test_stops_when_batch_deletes_nothing(self):
+        """Test the pass ends when another worker holds the retention lock"""
+        prune_batch = MagicMock(return_value=self.batch(0))
+
+        totals = await prune_in_batches(MagicMock(return_value=[1, 2, 3, 4]), prune_batch)
+
+        assert prune_batch.call_count == 1
+        assert totals["deleted"] == 0
+
+    async def test_outside_window_does_nothing(self):
+        prune_batch = MagicMock(return_value=self.batch(2))
+
+        with patch.object(form_retention, "in_window", return_value=False):
+            totals = await prune_in_batches(MagicMock(return_value=[1, 2]), prune_batch)
+
+        prune_batch.assert_not_called()
+        assert totals["batches"] == 0
+
+
+class TestGetPruneCandidates:
+    """Tests for get_prune_candidates"""
+
+    def test_requires_a_rule(self):
+        with pytest.raises(ValueError):
+            get_prune_candidates(0, 0, 20, 100)
+
+    def test_ranking_query(self, db_connection):
+        """Test one ranking query selects the oldest candidates outside every rule"""
+        # Arrange
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [(10,), (11,)]
+
+        # Act
+        version_ids = get_prune_candidates(5, 30, 20, 100)
+
+        # Assert
+        assert version_ids == [10, 11]
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args.args
+        assert "ROW_NUMBER()" in query
+        assert "v.VersionRank > ?" in query
+        assert "DATEADD(DAY" in query
+        assert "v.IsCurrent = 0" in query
+        assert params == [100, 5, 30, 20]
+
+    def test_ledger_versions_kept(self, db_connection):
+        """Test versions a recent deployment can still promote or roll back to are not candidates"""
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = []
+
+        get_prune_candidates(5, 0, 20, 100)
+
+        query = mock_cursor.execute.call_args.args[0]
+        assert "CustomFormDeploymentForms" in query
+        assert "dfv.PreviousVersion = v.Version" in query
+        assert "DATEADD(DAY" not in query
+
+    def test_ledger_protection_disabled(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = []
+
+        get_prune_candidates(5, 0, 0, 100)
+
+        query, params = mock_cursor.execute.call_args.args
+        assert "CustomFormDeploymentForms" not in query
+        assert params == [100, 5]
+
+
+class TestPruneFormVersions:
+    """Tests for prune_form_versions"""
+
+    def test_requires_a_rule(self):
+        with pytest.raises(ValueError):
+            prune_form_versions([10], 0, 0, 20)
+
+    def test_empty_batch(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+
+        assert prune_form_versions([], 5, 0, 20)["deleted"] == 0
+        mock_cursor.execute.assert_not_called()
+
+    def test_deletes_batch_and_materializes_dependents(self, db_connection):
+        """Test a batch deletes old versions, keeping deltas that depend on them readable"""
+        # Arrange
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = (0,)  # sp_getapplock granted
+        mock_cursor.fetchall.side_effect = [
+            [(10, "form-a", "h1", None, 100), (11, "form-b", "h2", "filesystem", 200)],  # still outside the policy
+            [(12,)],  # delta dependents outside the batch
+            [(10,), (11,)]  # deleted
+        ]
+
+        # Act
+        with patch('database._materialize_version') as mock_materialize, \
+             patch('database._release_blobs', return_value=[]) as mock_release:
+            stats = prune_form_versions([10, 11, 13], 5, 30, 20)
+
+        # Assert
+        mock_materialize.assert_called_once_with(mock_cursor, 12)
+        mock_release.assert_called_once_with(mock_cursor, ["h2"])
+        mock_conn.commit.assert_called_once()
+        assert stats == {"deleted": 2, "materialized": 1, "bytes": 300, "forms": ["form-a", "form-b"]}
+
+    def test_batch_rechecks_policy_without_ranking_the_table(self, db_connection):
+        """Test each batch re-checks only its own versions, ranking them with a per-form seek"""
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = (0,)
+        mock_cursor.fetchall.return_value = []
+
+        stats = prune_form_versions([10, 11], 5, 30, 20)
+
+        recheck = next(call.args for call in mock_cursor.execute.call_args_list if "v.VersionId IN" in call.args[0])
+        query, params = recheck
+        assert "ROW_NUMBER()" not in query
+        assert "n.FormId = v.FormId" in query
+        assert "CustomFormDeploymentForms" in query
+        assert params == [10, 11, 5, 30, 20]
+        assert stats["deleted"] == 0
+
+    def test_yields_to_running_worker(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = (-1,)  # sp_getapplock timeout
+
+        stats = prune_form_versions([10, 11], 5, 0, 20)
+
+        assert stats["deleted"] == 0
+        assert not any("v.VersionId IN" in sql for sql in executed_sql(mock_cursor))
+        mock_conn.rollback.assert_called_once()
+
+    def test_batch_yields_on_conflict(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = (0,)
+        mock_cursor.fetchall.return_value = []
+
+        prune_form_versions([10], 5, 0, 20)
+
+        assert any("DEADLOCK_PRIORITY LOW" in sql and "LOCK_TIMEOUT" in sql for sql in executed_sql(mock_cursor))
+
+
+# Run with: pytest tests/test_form_retention.py -v
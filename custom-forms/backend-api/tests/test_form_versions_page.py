@@ -0,0 +1,107 @@
+"""
+Unit Tests for the Paginated Version History
+
+Tests keyset pagination and the release notes flag of
+GET /api/custom-forms/{form_name}/versions and get_form_versions_page.
+Database access is mocked.
+"""
+
+from unittest.mock import patch
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import get_form_versions_page, get_form_versions
+
+
+def version_row(version, published_at, version_id, release_notes=None):
+    return (version, published_at, 1000, 0, release_notes, None, None, None, version_id)
+
+
+class TestGetFormVersionsPage:
+    """Tests for get_form_versions_page"""
+
+    def test_keyset_page_without_release_notes(self, db_connection):
+        """Test the page continues after the cursor and doesn't read ReleaseNotes"""
+        # Arrange: limit 2 + 1 fila de más => hay página siguiente
+        mock_conn, mock_cursor = db_connection
+        before = (datetime(2026, 3, 1), 30)
+        mock_cursor.fetchall.return_value = [
+            version_row("1.2.0", datetime(2026, 2, 1), 20),
+            version_row("1.1.0", datetime(2026, 1, 15), 15),
+            version_row("1.0.0", datetime(2026, 1, 1), 10),
+        ]
+
+        # Act
+        versions, next_before = get_form_versions_page("my-form", before=before, limit=2)
+
+        # Assert
+        query, params = mock_cursor.execute.call_args.args
+        assert "ReleaseNotes" not in query
+        assert "ORDER BY cfv.PublishedAt DESC, cfv.VersionId DESC" in query
+        assert params == [3, "my-form", datetime(2026, 3, 1), datetime(2026, 3, 1), 30]
+        assert [v["version"] for v in versions] == ["1.2.0", "1.1.0"]
+        assert "releaseNotes" not in versions[0]
+        assert next_before == (datetime(2026, 1, 15), 15)
+
+    def test_full_history_keeps_release_notes(self, db_connection):
+        """Test get_form_versions still returns every version with its release notes"""
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchall.return_value = [version_row("1.0.0", datetime(2026, 1, 1), 10, "Primera versión")]
+
+        versions = get_form_versions("my-form")
+
+        assert "TOP" not in mock_cursor.execute.call_args.args[0]
+        assert versions[0]["releaseNotes"] == "Primera versión"
+
+
+class TestFormVersionsEndpoint:
+    """Tests for GET /api/custom-forms/{form_name}/versions"""
+
+    @patch('database.get_form_versions_page')
+    async def test_cursor_round_trip(self, mock_page):
+        # Arrange
+        mock_page.return_value = ([{"version": "1.2.0"}], (datetime(2026, 2, 1, 10, 30, 0, 123000), 20))
+        from main import app
+
+        # Act
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            first = await client.get("/api/custom-forms/my-form/versions", params={"limit": 1})
+            mock_page.return_value = ([{"version": "1.1.0"}], None)
+            second = await client.get("/api/custom-forms/my-form/versions", params={
+                "limit": 1, "cursor": first.json()["nextCursor"], "includeReleaseNotes": "true"
+            })
+
+        # Assert
+        assert first.json()["items"] == [{"version": "1.2.0"}]
+        assert mock_page.call_args_list[0].kwargs["include_release_notes"] is False
+        assert mock_page.call_args.kwargs["before"] == (datetime(2026, 2, 1, 10, 30, 0, 123000), 20)
+        assert mock_page.call_args.kwargs["include_release_notes"] is True
+        assert second.json()["nextCursor"] is None
+
+    @patch('database.get_form_versions_page')
+    async def test_unpaginated_response_unchanged(self, mock_page):
+        mock_page.return_value = ([{"version": "1.0.0", "releaseNotes": ""}], None)
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/versions")
+
+        assert response.json() == [{"version": "1.0.0", "releaseNotes": ""}]
+        assert mock_page.call_args.kwargs["include_release_notes"] is True
+
+    @patch('database.get_form_versions_page')
+    async def test_unknown_form(self, mock_page):
+        mock_page.return_value = ([], None)
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/missing/versions", params={"limit": 10})
+
+        assert response.status_code == 404
+
+
+# Run with: pytest tests/test_form_versions_page.py -v
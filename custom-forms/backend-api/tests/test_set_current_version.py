@@ -0,0 +1,75 @@
+"""
+Unit Tests for Version Promotion
+
+Tests set_current_form_version on top of sp_SetCurrentFormVersion
+(migration 013). Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import set_current_form_version
+from code_storage import CODE_ENCODING_DELTA
+
+
+DIGEST = "b" * 64
+MIGRATION = Path(__file__).parent.parent / "migrations" / "013_sp_set_current_form_version.sql"
+
+
+def sp_row(status, version="1.1.0", version_id=20):
+    return (status, 1, version_id, "1.0.0", version, DIGEST, datetime(2026, 1, 1), 1234)
+
+
+class TestSetCurrentFormVersion:
+    """Tests for set_current_form_version"""
+
+    def test_single_round_trip(self, db_connection):
+        """Test promotion is one procedure call that returns the new state"""
+        # Arrange
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = sp_row("ok")
+
+        # Act
+        result = set_current_form_version("my-form", "1.1.0")
+
+        # Assert
+        mock_cursor.execute.assert_called_once()
+        query, params = mock_cursor.execute.call_args.args
+        assert "sp_SetCurrentFormVersion" in query
+        assert params == ("my-form", "1.1.0")
+        mock_conn.commit.assert_called_once()
+        assert result["previous_version"] == "1.0.0"
+        assert result["version"] == "1.1.0"
+        assert result["content_hash"] == DIGEST
+
+    @patch('database._materialize_version')
+    def test_delta_version_materialized_first(self, mock_materialize, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [sp_row("delta"), sp_row("ok")]
+
+        set_current_form_version("my-form", "1.1.0")
+
+        mock_materialize.assert_called_once_with(mock_cursor, 20)
+        assert mock_cursor.execute.call_count == 2
+
+    def test_procedure_detects_delta_encoding(self):
+        """Test the procedure reports 'delta' for the encoding database.py writes for deltas"""
+        assert f"@CodeEncoding = '{CODE_ENCODING_DELTA}'" in MIGRATION.read_text(encoding="utf-8")
+
+    def test_unknown_version(self, db_connection):
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.return_value = sp_row("not_found", version=None, version_id=None)
+
+        with pytest.raises(ValueError):
+            set_current_form_version("my-form", "9.9.9")
+
+        mock_conn.rollback.assert_called_once()
+        mock_conn.commit.assert_not_called()
+
+
+# Run with: pytest tests/test_set_current_version.py -v
@@ -0,0 +1,166 @@
+"""
+Unit Tests for Shared Compiled Code Blobs
+
+Tests deduplication of identical bundles (migration 009): metadata-only
+version inserts for known content and release of unreferenced blobs when
+versions are deleted. Database access is mocked.
+"""
+
+from unittest.mock import patch
+from datetime import datetime
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from database import upsert_custom_form, delete_form_version
+from blob_storage import content_hash
+from code_storage import CODE_ENCODING_GZIP_UTF8
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación'; }"
+
+
+def upsert_sample():
+    return upsert_custom_form(
+        form_name="my-form",
+        process_name="MyProcess",
+        version="1.0.1",
+        description="Sample form",
+        author="admin",
+        compiled_code=SAMPLE_CODE,
+        size_bytes=len(SAMPLE_CODE),
+        package_version="1.0.1",
+        commit_hash="a" * 40,
+        build_date=datetime(2026, 1, 1)
+    )
+
+
+def executed_sql(mock_cursor):
+    return [call.args[0] for call in mock_cursor.execute.call_args_list]
+
+
+def sp_parameters(mock_cursor):
+    """Parámetros con los que se ejecutó sp_UpsertCustomForm"""
+    for call in mock_cursor.execute.call_args_list:
+        if "sp_UpsertCustomForm" in call.args[0]:
+            return call.args[1]
+    raise AssertionError("sp_UpsertCustomForm was not executed")
+
+
+@patch('database.FORM_CODE_STORAGE', 'sql')
+@patch('database.FORM_CODE_DEDUP', True)
+class TestUpsertDeduplication:
+    """Tests for upsert_custom_form with shared blobs"""
+
+    def test_known_content_is_metadata_only(self, db_connection):
+        """Test re-deploying unchanged code doesn't send the payload again"""
+        # Arrange: versión nueva, blob ya registrado
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [None, (0,), ("sql",), ("inserted", 1)]
+
+        # Act
+        result = upsert_sample()
+
+        # Assert
+        params = sp_parameters(mock_cursor)
+        assert result["action"] == "inserted"
+        assert params[5] is None  # @CompiledCode
+        assert params[11] is None  # @CompiledCodeBinary
+        assert params[12] == CODE_ENCODING_GZIP_UTF8
+        assert params[13] == content_hash(SAMPLE_CODE)
+        assert params[14] == "sql"
+        mock_conn.commit.assert_called_once()
+
+    def test_new_content_creates_shared_blob(self, db_connection):
+        """Test the first deployment of a bundle sends its compressed payload"""
+        import gzip
+
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [None, (0,), None, ("inserted", 1)]
+
+        upsert_sample()
+
+        params = sp_parameters(mock_cursor)
+        assert gzip.decompress(params[11]).decode("utf-8") == SAMPLE_CODE
+        assert params[14] == "sql"
+
+    def test_blob_locked_before_lookup(self, db_connection):
+        """Test the content hash stays locked from the lookup to the commit, so a concurrent release can't delete it"""
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [None, (0,), ("sql",), ("inserted", 1)]
+
+        upsert_sample()
+
+        sql = executed_sql(mock_cursor)
+        lock = next(i for i, query in enumerate(sql) if "sp_getapplock" in query)
+        lookup = next(i for i, query in enumerate(sql) if "FROM CustomFormBlobs" in query)
+        assert lock < lookup
+        assert mock_cursor.execute.call_args_list[lock].args[1] == (f"CustomFormBlob:{content_hash(SAMPLE_CODE)}",)
+
+
+class TestBlobRelease:
+    """Tests for releasing unreferenced blobs on delete"""
+
+    @patch('database.get_blob_store')
+    def test_delete_version_removes_unreferenced_external_blob(self, mock_get_store, db_connection):
+        """Test the last version using a blob deletes it from the blob store after commit"""
+        # Arrange
+        digest = content_hash(SAMPLE_CODE)
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [
+            (1, "2.0.0"),                    # form, current version
+            (10, digest, "filesystem"),      # versión a borrar
+            (0,),                            # sin deltas en el form
+            (0,),                            # lock del ContentHash
+            ("filesystem",),                 # blob borrado de CustomFormBlobs (RefCount 0)
+            (0,),                            # lock del ContentHash (borrado del archivo)
+            None,                            # no fue re-registrado antes de borrar el archivo
+        ]
+
+        # Act
+        result = delete_form_version("my-form", "1.0.0")
+
+        # Assert
+        assert result["success"] is True
+        mock_get_store.assert_called_once_with("filesystem")
+        mock_get_store.return_value.delete.assert_called_once_with(digest)
+
+    @patch('database.get_blob_store')
+    def test_delete_version_keeps_blob_still_referenced(self, mock_get_store, db_connection):
+        """Test a blob shared with other versions is kept"""
+        digest = content_hash(SAMPLE_CODE)
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [
+            (1, "2.0.0"),
+            (10, digest, "filesystem"),
+            (0,),
+            (0,),
+            None,                            # RefCount > 0: nada borrado
+        ]
+
+        delete_form_version("my-form", "1.0.0")
+
+        mock_get_store.return_value.delete.assert_not_called()
+
+    @patch('database.get_blob_store')
+    def test_blob_reregistered_by_concurrent_deploy_is_kept(self, mock_get_store, db_connection):
+        """Test a payload registered again by a deployment that held the hash lock isn't deleted"""
+        digest = content_hash(SAMPLE_CODE)
+        mock_conn, mock_cursor = db_connection
+        mock_cursor.fetchone.side_effect = [
+            (1, "2.0.0"),
+            (10, digest, "filesystem"),
+            (0,),
+            (0,),
+            ("filesystem",),                 # blob borrado de CustomFormBlobs
+            (0,),                            # lock obtenido después del commit del deployment
+            ("filesystem",),                 # el deployment lo volvió a registrar
+        ]
+
+        delete_form_version("my-form", "1.0.0")
+
+        mock_get_store.return_value.delete.assert_not_called()
+
+
+# Run with: pytest tests/test_shared_blobs.py -v
@@ -0,0 +1,175 @@
+"""
+Unit Tests for Form Source Maps
+
+Tests splitting source maps out of deployed bundles, storing them per
+version (migration 010) and serving them on demand through the SourceMap
+header of the code endpoint. Database access is mocked.
+"""
+
+import base64
+import gzip
+import json
+import pytest
+from unittest.mock import patch
+from datetime import datetime
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from source_maps import split_source_map, read_source_map_file, is_valid_source_map
+from code_storage import StoredCode, encode_compiled_code
+from models import DeploymentManifest, FormDeployment
+
+
+SAMPLE_CODE = "export default function Form() { return 'Aprobación'; }"
+SAMPLE_MAP = json.dumps({"version": 3, "sources": ["Form.tsx"], "mappings": "AAAA"})
+
+
+class TestSplitSourceMap:
+    """Unit tests for split_source_map"""
+
+    def test_external_map_strips_comment(self):
+        """Test the sourceMappingURL comment is removed when the map is stored"""
+        code = SAMPLE_CODE + "\n//# sourceMappingURL=form.js.map\n"
+
+        stripped, source_map = split_source_map(code, SAMPLE_MAP)
+
+        assert stripped == SAMPLE_CODE
+        assert source_map == SAMPLE_MAP
+
+    def test_inline_map_extracted(self):
+        """Test an inline data: URL source map is moved out of the bundle"""
+        encoded = base64.b64encode(SAMPLE_MAP.encode("utf-8")).decode("ascii")
+        code = f"{SAMPLE_CODE}\n//# sourceMappingURL=data:application/json;charset=utf-8;base64,{encoded}"
+
+        stripped, source_map = split_source_map(code)
+
+        assert stripped == SAMPLE_CODE
+        assert source_map == SAMPLE_MAP
+
+    def test_missing_map_keeps_comment(self):
+        """Test a reference to a map not included in the package is left untouched"""
+        code = SAMPLE_CODE + "\n//# sourceMappingURL=form.js.map"
+
+        assert split_source_map(code) == (code, None)
+
+    def test_is_valid_source_map(self):
+        assert is_valid_source_map(SAMPLE_MAP)
+        assert not is_valid_source_map("not json")
+        assert not is_valid_source_map(json.dumps(["version", 3]))
+
+
+class TestReadSourceMapFile:
+    """Unit tests for read_source_map_file"""
+
+    def test_default_map_next_to_bundle(self, tmp_path):
+        (tmp_path / "form.js.map").write_text(SAMPLE_MAP, encoding="utf-8")
+
+        assert read_source_map_file(tmp_path, "form.js") == SAMPLE_MAP
+
+    def test_no_map_in_package(self, tmp_path):
+        assert read_source_map_file(tmp_path, "form.js") is None
+
+    def test_path_outside_package_rejected(self, tmp_path):
+        """Test sourceMapPath can't read files outside the extracted package"""
+        with pytest.raises(ValueError):
+            read_source_map_file(tmp_path, "form.js", "../secrets.json")
+
+
+class TestProcessFormSourceMap:
+    """Tests for source map handling in process_form"""
+
+    @patch('deployment_service.save_form_source_map')
+    @patch('deployment_service.upsert_custom_form')
+    def test_map_stored_separately(self, mock_upsert, mock_save_map, tmp_path):
+        """Test the bundle is stored without the map and the map is saved for the version"""
+        from deployment_service import process_form
+
+        # Arrange
+        (tmp_path / "form.js").write_text(SAMPLE_CODE + "\n//# sourceMappingURL=form.js.map", encoding="utf-8")
+        (tmp_path / "form.js.map").write_text(SAMPLE_MAP, encoding="utf-8")
+        form_info = FormDeployment(
+            formName="my-form",
+            processName="MyProcess",
+            version="1.0.0",
+            author="admin",
+            description="Sample form",
+            sizeBytes=100,
+            path="form.js"
+        )
+        manifest = DeploymentManifest(
+            packageVersion="1.0.0",
+            buildDate=datetime(2026, 1, 1),
+            commitHash="a" * 40,
+            forms=[form_info]
+        )
+        mock_upsert.return_value = {"success": True, "action": "inserted"}
+
+        # Act
+        result = process_form(form_info, tmp_path, manifest)
+
+        # Assert
+        assert result.success is True
+        assert mock_upsert.call_args.kwargs["compiled_code"] == SAMPLE_CODE
+        mock_save_map.assert_called_once_with("my-form", "1.0.0", SAMPLE_MAP)
+
+
+class TestSourceMapEndpoints:
+    """Tests for the SourceMap header and GET /api/custom-forms/{form_name}/sourcemap"""
+
+    @patch('database.get_form_compiled_code')
+    async def test_code_response_references_source_map(self, mock_get_code):
+        """Test the code response points devtools to the version's source map"""
+        mock_get_code.return_value = {
+            'code': StoredCode(text=SAMPLE_CODE),
+            'version': '1.0.0',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': len(SAMPLE_CODE),
+            'version_id': 10,
+            'content_hash': None,
+            'storage_backend': None,
+            'has_source_map': True
+        }
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/code")
+
+        assert response.status_code == 200
+        assert response.headers["sourcemap"] == "/api/custom-forms/my-form/sourcemap?version=1.0.0"
+
+    @patch('database.get_form_source_map')
+    async def test_source_map_served_gzipped(self, mock_get_map):
+        """Test the stored gzip is sent as is to clients accepting gzip"""
+        data, _ = encode_compiled_code(SAMPLE_MAP)
+        mock_get_map.return_value = {'data': data, 'version': '1.0.0', 'size_bytes': len(SAMPLE_MAP)}
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get(
+                "/api/custom-forms/my-form/sourcemap",
+                params={"version": "1.0.0"},
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.json()["sources"] == ["Form.tsx"]
+        mock_get_map.assert_called_once_with("my-form", "1.0.0")
+
+    @patch('database.get_form_source_map')
+    async def test_source_maps_disabled(self, mock_get_map):
+        """Test FORM_SOURCE_MAPS_ENABLED=false hides stored source maps"""
+        from main import app
+
+        with patch('main.FORM_SOURCE_MAPS_ENABLED', False):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/my-form/sourcemap")
+
+        assert response.status_code == 404
+        mock_get_map.assert_not_called()
+
+
+# Run with: pytest tests/test_source_maps.py -v
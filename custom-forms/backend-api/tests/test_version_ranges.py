@@ -0,0 +1,149 @@
+"""
+Unit Tests for Semver Range Resolution
+
+Tests range parsing, resolution against the in-memory version index and
+?version= ranges on /code and /metadata. Database access is mocked.
+"""
+
+import pytest
+from unittest.mock import patch
+from httpx import AsyncClient
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from version_ranges import (
+    FormVersionIndex,
+    is_version_range,
+    max_satisfying,
+    parse_version,
+    parse_version_range
+)
+
+
+VERSIONS = ["0.2.1", "0.2.5", "1.0.0", "1.2.0", "1.2.7", "1.4.0", "1.4.3", "2.0.0", "2.1.0", "3.0.0"]
+
+
+def resolve(spec, current=None):
+    versions = sorted(parse_version(v) for v in VERSIONS)
+    resolved = max_satisfying(versions, parse_version_range(spec), parse_version(current) if current else None)
+    return "%d.%d.%d" % resolved if resolved else None
+
+
+class TestParseVersionRange:
+    """Tests for range parsing and matching"""
+
+    def test_caret_and_tilde(self):
+        assert resolve("^1.2") == "1.4.3"
+        assert resolve("^1.2.7") == "1.4.3"
+        assert resolve("~1.2.0") == "1.2.7"
+        assert resolve("~1") == "1.4.3"
+        assert resolve("^0.2.1") == "0.2.5"
+
+    def test_comparators(self):
+        assert resolve(">=2.0.0 <3") == "2.1.0"
+        assert resolve(">= 1.0.0 < 1.4") == "1.2.7"
+        assert resolve(">2") == "3.0.0"
+        assert resolve("<=1.2") == "1.2.7"
+        assert resolve("<1.0.0") == "0.2.5"
+
+    def test_x_ranges_and_alternatives(self):
+        assert resolve("1.x") == "1.4.3"
+        assert resolve("1.2") == "1.2.7"
+        assert resolve("*") == "3.0.0"
+        assert resolve("^0.2 || 1.4.x") == "1.4.3"
+        assert resolve("^4") is None
+
+    def test_current_version_preferred(self):
+        """Test a rolled back current version in the range wins over newer ones"""
+        assert resolve("^1.2", current="1.2.7") == "1.2.7"
+        assert resolve("^1.2", current="2.0.0") == "1.4.3"
+
+    def test_invalid_ranges(self):
+        for spec in ["1.2.3'; --", "^", "1..2", ">*", "a" * 200]:
+            with pytest.raises(ValueError):
+                parse_version_range(spec)
+
+    def test_exact_versions_are_not_ranges(self):
+        assert not is_version_range("1.2.3")
+        assert is_version_range("^1.2")
+
+
+class TestFormVersionIndex:
+    """Tests for FormVersionIndex"""
+
+    @patch('database.get_form_version_numbers')
+    def test_loads_form_once(self, mock_numbers):
+        """Test repeated resolutions don't query the database"""
+        # Arrange
+        index = FormVersionIndex(ttl_seconds=300)
+        mock_numbers.return_value = [(v, v == "1.2.7") for v in VERSIONS]
+
+        # Act
+        first = index.resolve("my-form", "^1")
+        second = index.resolve("my-form", "~1.4")
+
+        # Assert
+        assert first == "1.2.7"
+        assert second == "1.4.3"
+        mock_numbers.assert_called_once_with("my-form")
+
+    @patch('database.get_form_version_numbers')
+    def test_change_feed_invalidates_form(self, mock_numbers):
+        index = FormVersionIndex(ttl_seconds=300)
+        mock_numbers.return_value = [("1.0.0", True)]
+        assert index.resolve("my-form", "^1") == "1.0.0"
+
+        mock_numbers.return_value = [("1.0.0", False), ("1.1.0", True)]
+        index.on_changes([{"formName": "my-form"}])
+
+        assert index.resolve("my-form", "^1") == "1.1.0"
+        assert mock_numbers.call_count == 2
+
+
+class TestVersionRangeEndpoints:
+    """Tests for ?version= ranges on /metadata and /code"""
+
+    @patch('database.get_form_code_metadata')
+    async def test_metadata_resolves_range(self, mock_metadata):
+        mock_metadata.return_value = {
+            'version': '1.4.3',
+            'published_at': '2026-01-01T00:00:00',
+            'size_bytes': 100,
+            'version_id': 10,
+            'content_hash': None,
+            'storage_backend': None,
+            'has_source_map': False,
+            'code_encoding': None,
+            'process_name': 'MyProcess'
+        }
+        from main import app
+
+        with patch('main.form_version_index.resolve', return_value="1.4.3") as mock_resolve:
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/my-form/metadata", params={"version": "^1.2"})
+
+        assert response.status_code == 200
+        mock_resolve.assert_called_once_with("my-form", "^1.2")
+        mock_metadata.assert_called_once_with("my-form", "1.4.3")
+
+    async def test_code_range_without_match(self):
+        from main import app
+
+        with patch('main.form_version_index.resolve', return_value=None):
+            async with AsyncClient(app=app, base_url="http://test") as client:
+                response = await client.get("/api/custom-forms/my-form/code", params={"version": "^9"})
+
+        assert response.status_code == 404
+
+    async def test_invalid_range(self):
+        from main import app
+
+        async with AsyncClient(app=app, base_url="http://test") as client:
+            response = await client.get("/api/custom-forms/my-form/code", params={"version": "^1..2"})
+
+        assert response.status_code == 400
+
+
+# Run with: pytest tests/test_version_ranges.py -v
@@ -224,6 +224,87 @@ def validate_commit_hash(commit_hash: str) -> bool:
     return bool(re.match(r'^[a-fA-F0-9]{40}$', commit_hash))
 
 
+def validate_job_id(job_id: str) -> bool:
+    """
+    Valida formato de un deployment job ID (UUID4 en hexadecimal, sin guiones).
+
+    Los job IDs se usan como nombres de directorio en el job store,
+    por lo que esta validación también previene path traversal.
+
+    Args:
+        job_id: Job ID a validar (32 caracteres hex)
+
+    Returns:
+        True si es válido, False si no
+
+    Examples:
+        >>> validate_job_id("3f2b8c1d9e7a4b6c8d0e1f2a3b4c5d6e")
+        True
+        >>> validate_job_id("../../etc/passwd")
+        False
+    """
+    if not job_id or not isinstance(job_id, str):
+        return False
+
+    return bool(re.match(r'^[a-f0-9]{32}$', job_id))
+
+
+def validate_upload_id(upload_id: str) -> bool:
+    """
+    Valida formato de un chunked upload ID (UUID4 en hexadecimal, sin guiones).
+
+    Igual que los job IDs, se usa como nombre de directorio.
+
+    Args:
+        upload_id: Upload ID a validar (32 caracteres hex)
+
+    Returns:
+        True si es válido, False si no
+    """
+    if not upload_id or not isinstance(upload_id, str):
+        return False
+
+    return bool(re.match(r'^[a-f0-9]{32}$', upload_id))
+
+
+def validate_sha256(digest: str) -> bool:
+    """
+    Valida formato de un digest SHA-256 en hexadecimal (64 caracteres).
+
+    Examples:
+        >>> validate_sha256("a" * 64)
+        True
+        >>> validate_sha256("not-a-digest")
+        False
+    """
+    if not digest or not isinstance(digest, str):
+        return False
+
+    return bool(re.match(r'^[a-fA-F0-9]{64}$', digest))
+
+
+def validate_idempotency_key(key: str) -> bool:
+    """
+    Valida formato de un header Idempotency-Key.
+
+    Permite: alfanuméricos, puntos, guiones, underscores, dos puntos
+    Longitud: 1-255 caracteres
+
+    Examples:
+        >>> validate_idempotency_key("ci-run-1234:deploy")
+        True
+        >>> validate_idempotency_key("key with spaces")
+        False
+    """
+    if not key or not isinstance(key, str):
+        return False
+
+    if len(key) > 255:
+        return False
+
+    return bool(re.match(r'^[a-zA-Z0-9._:-]+$', key))
+
+
 def sanitize_for_logging(value: str, max_length: int = 50) -> str:
     """
     Sanitiza un valor para logging seguro.
@@ -0,0 +1,251 @@
+"""
+Version Ranges
+
+Resolución de rangos semver en ?version= de /code y /metadata
+(ej: ^1.2, ~1.4.0, >=2.0.0 <3, 1.x, ^1.2 || ^2):
+
+- Sintaxis (subconjunto de node-semver): ^, ~, comparadores (>=, >, <=, <, =),
+  versiones parciales y comodines (1, 1.2, 1.x, *), conjunción con espacios y
+  alternativas con ||. Las versiones son X.Y.Z (validate_version).
+- Si la versión current del form está en el rango se usa esa (respeta un
+  rollback); si no, la versión más alta del rango.
+- Los rangos se resuelven contra un índice en memoria con las versiones
+  ordenadas de cada form: nunca se consulta CustomFormVersions por request.
+  La entrada de un form se carga con un seek la primera vez, se descarta
+  cuando el feed de cambios (form_changes.py) informa un cambio del form o se
+  borra una versión, y vence a los FORM_VERSION_INDEX_TTL_SECONDS (versiones
+  borradas desde el backend .NET, que no cambian la current).
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from validators import validate_version, validate_form_name, sanitize_for_logging
+from form_changes import change_feed
+
+# Load environment variables from .env.local (if exists) or .env
+load_dotenv('.env.local', override=True)
+load_dotenv('.env')
+
+# Configuration
+FORM_VERSION_INDEX_TTL_SECONDS = int(os.getenv("FORM_VERSION_INDEX_TTL_SECONDS", "300"))
+
+MAX_RANGE_LENGTH = 100
+
+Version = Tuple[int, int, int]
+Comparator = Tuple[str, Version]
+
+_RANGE_CHARS = re.compile(r'^[0-9xX*.^~<>=| ]+$')
+_PARTIAL_VERSION = re.compile(r'^(\d+|[xX*])(?:\.(\d+|[xX*]))?(?:\.(\d+|[xX*]))?$')
+_COMPARATOR = re.compile(r'^(\^|~|>=|<=|>|<|=)?(.+)$')
+
+
+def parse_version(version: str) -> Version:
+    """Versión X.Y.Z como tupla comparable"""
+    major, minor, patch = version.split(".")
+    return int(major), int(minor), int(patch)
+
+
+def is_version_range(spec: str) -> bool:
+    """True si spec parece un rango (no una versión exacta); se valida al parsearlo"""
+    return bool(spec) and not validate_version(spec) and bool(_RANGE_CHARS.match(spec))
+
+
+def _parse_partial(text: str) -> List[Optional[int]]:
+    """[major, minor, patch] con None en los componentes faltantes o comodín"""
+    match = _PARTIAL_VERSION.match(text)
+    if not match:
+        raise ValueError(f"Invalid version range: {text}")
+    parts: List[Optional[int]] = []
+    for group in match.groups():
+        # Después de un comodín todo es comodín (1.x.3 = 1.x)
+        if group is None or group in ("x", "X", "*") or (parts and parts[-1] is None):
+            parts.append(None)
+        else:
+            parts.append(int(group))
+    return parts
+
+
+def _comparators(operator: str, parts: List[Optional[int]]) -> List[Comparator]:
+    """Comparadores equivalentes a un término del rango"""
+    major, minor, patch = parts
+    if major is None:
+        if operator in (">", "<"):
+            raise ValueError("Invalid version range: nothing matches")
+        return []  # Cualquier versión
+    lower = (major, minor or 0, patch or 0)
+
+    if operator == "^":
+        if minor is None or major > 0:
+            upper = (major + 1, 0, 0)
+        elif patch is None or minor > 0:
+            upper = (0, minor + 1, 0)
+        else:
+            upper = (0, 0, patch + 1)
+        return [(">=", lower), ("<", upper)]
+
+    if operator == "~":
+        upper = (major + 1, 0, 0) if minor is None else (major, minor + 1, 0)
+        return [(">=", lower), ("<", upper)]
+
+    # Siguiente versión fuera de un parcial: 1 -> 2.0.0, 1.2 -> 1.3.0
+    if minor is None:
+        after = (major + 1, 0, 0)
+    elif patch is None:
+        after = (major, minor + 1, 0)
+    else:
+        after = None
+
+    if operator == ">=" or (operator == ">" and after):
+        return [(">=", after if operator == ">" else lower)]
+    if operator == ">":
+        return [(">", lower)]
+    if operator == "<":
+        return [("<", lower)]
+    if operator == "<=":
+        return [("<", after)] if after else [("<=", lower)]
+    # Sin operador o "=": versión exacta o X-range
+    return [(">=", lower), ("<", after)] if after else [("=", lower)]
+
+
+def parse_version_range(spec: str) -> List[List[Comparator]]:
+    """
+    Parsea un rango semver
+
+    Returns:
+        Alternativas (||) de conjuntos de comparadores (AND)
+
+    Raises:
+        ValueError: Si el rango es inválido
+    """
+    if not spec or len(spec) > MAX_RANGE_LENGTH or not _RANGE_CHARS.match(spec):
+        raise ValueError(f"Invalid version range: {spec[:MAX_RANGE_LENGTH]}")
+
+    alternatives = []
+    for alternative in spec.split("||"):
+        # ">= 1.2.0" -> ">=1.2.0"
+        terms = re.sub(r'(>=|<=|>|<|=|\^|~)\s+', r'\1', alternative.strip()).split()
+        if not terms:
+            raise ValueError(f"Invalid version range: {spec}")
+        comparators = []
+        for term in terms:
+            operator, version = _COMPARATOR.match(term).groups()
+            comparators += _comparators(operator or "=", _parse_partial(version))
+        alternatives.append(comparators)
+    return alternatives
+
+
+def _satisfies(version: Version, comparators: List[Comparator]) -> bool:
+    for operator, bound in comparators:
+        if operator == ">=" and not version >= bound:
+            return False
+        if operator == ">" and not version > bound:
+            return False
+        if operator == "<" and not version < bound:
+            return False
+        if operator == "<=" and not version <= bound:
+            return False
+        if operator == "=" and version != bound:
+            return False
+    return True
+
+
+def version_in_range(version: Version, version_range: List[List[Comparator]]) -> bool:
+    return any(_satisfies(version, comparators) for comparators in version_range)
+
+
+def max_satisfying(
+    versions: List[Version],
+    version_range: List[List[Comparator]],
+    current: Optional[Version] = None
+) -> Optional[Version]:
+    """
+    Versión que resuelve el rango: la current si está en el rango, si no la más alta
+
+    Args:
+        versions: Versiones ordenadas de menor a mayor
+    """
+    if current is not None and version_in_range(current, version_range):
+        return current
+    for version in reversed(versions):
+        if version_in_range(version, version_range):
+            return version
+    return None
+
+
+class FormVersionIndex:
+    """Versiones ordenadas de cada form, para resolver rangos sin consultar la BD"""
+
+    def __init__(self, ttl_seconds: int):
+        self.ttl_seconds = ttl_seconds
+        # form_name -> (cargado (monotonic), versiones ordenadas, current)
+        self._forms: Dict[str, Tuple[float, List[Version], Optional[Version]]] = {}
+        self._lock = threading.Lock()
+        # Cambia con cada invalidación: una carga que empezó antes no se guarda
+        self._generation = 0
+
+    def _entry(self, form_name: str) -> Tuple[float, List[Version], Optional[Version]]:
+        from database import get_form_version_numbers
+
+        with self._lock:
+            entry = self._forms.get(form_name)
+            generation = self._generation
+        if entry and time.monotonic() - entry[0] < self.ttl_seconds:
+            return entry
+
+        versions = []
+        current = None
+        for version, is_current in get_form_version_numbers(form_name):
+            if not validate_version(version):
+                continue  # Versiones viejas fuera de formato: solo se piden exactas
+            parsed = parse_version(version)
+            versions.append(parsed)
+            if is_current:
+                current = parsed
+        entry = (time.monotonic(), sorted(versions), current)
+
+        with self._lock:
+            if generation == self._generation:
+                self._forms[form_name] = entry
+        return entry
+
+    def resolve(self, form_name: str, spec: str) -> Optional[str]:
+        """
+        Versión exacta que resuelve un rango para un form
+
+        Returns:
+            Versión X.Y.Z, o None si el form no existe o ninguna versión está en el rango
+
+        Raises:
+            ValueError: Si el form_name o el rango son inválidos
+        """
+        if not validate_form_name(form_name):
+            raise ValueError(f"Invalid form_name format: {sanitize_for_logging(form_name)}")
+        version_range = parse_version_range(spec)
+
+        _, versions, current = self._entry(form_name)
+        resolved = max_satisfying(versions, version_range, current)
+        return "%d.%d.%d" % resolved if resolved else None
+
+    def invalidate(self, *form_names: str) -> None:
+        with self._lock:
+            self._generation += 1
+            for form_name in form_names:
+                self._forms.pop(form_name, None)
+
+    def on_changes(self, changes: List[dict]) -> None:
+        """Listener del feed de cambios: descarta los forms que cambiaron"""
+        with self._lock:
+            self._generation += 1
+            for change in changes:
+                self._forms.pop(change["formName"], None)
+
+
+# Singleton usado por main.py
+form_version_index = FormVersionIndex(FORM_VERSION_INDEX_TTL_SECONDS)
+change_feed.add_listener(form_version_index.on_changes)
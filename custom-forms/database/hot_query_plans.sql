@@ -0,0 +1,267 @@
+-- =============================================
+-- Script: hot_query_plans.sql
+-- Description: Runs the hot CustomForms/CustomFormVersions queries of
+--              backend-api/database.py against a sample form and reports, per query,
+--              the logical reads and whether the plan uses the expected index (and no
+--              Key Lookup where the index should cover the query).
+--              Each query text is the one in database.py with its ? placeholders
+--              as named parameters; keep them identical when database.py changes.
+--
+-- Usage:
+--   sqlcmd -S <server> -d <database> -i hot_query_plans.sql
+--   or in SSMS with "Include Actual Execution Plan" to also see each plan.
+--   Set @FormName / @Version below to check a specific form; by default the form with
+--   the most versions and its oldest non-current version are used.
+--
+-- Run it before and after changing indexes (e.g. migration 015) and compare the
+-- summary. Rows with Status <> 'ok' are plan regressions; the per-statement
+-- STATISTICS IO messages (including LOB reads) and the XML plans are printed above it.
+--
+-- Read-only (SELECTs only). The summary reads sys.dm_exec_query_stats, which needs
+-- VIEW SERVER STATE; without it only the STATISTICS IO/XML output is available.
+-- =============================================
+
+SET NOCOUNT ON;
+SET QUOTED_IDENTIFIER ON;
+SET ANSI_NULLS ON;
+SET ANSI_PADDING ON;
+SET ANSI_WARNINGS ON;
+SET ARITHABORT ON;
+SET CONCAT_NULL_YIELDS_NULL ON;
+SET NUMERIC_ROUNDABORT OFF;
+
+DECLARE @FormName NVARCHAR(255) = NULL;
+DECLARE @Version NVARCHAR(50) = NULL;
+DECLARE @ReadLimit INT = 1048576;  -- FORM_CODE_STREAM_THRESHOLD_KB * 1024
+DECLARE @KnownHash CHAR(64) = NULL;  -- code_batch: ContentHash the client already has for @Version
+
+IF @FormName IS NULL
+    SELECT TOP (1) @FormName = cf.FormName
+    FROM CustomForms cf
+    INNER JOIN CustomFormVersions cfv ON cfv.FormId = cf.FormId
+    GROUP BY cf.FormName
+    ORDER BY COUNT(*) DESC;
+
+IF @Version IS NULL
+    SELECT TOP (1) @Version = cfv.Version
+    FROM CustomFormVersions cfv
+    INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+    WHERE cf.FormName = @FormName
+    ORDER BY cfv.IsCurrent, cfv.PublishedAt;
+
+IF @KnownHash IS NULL
+    SELECT @KnownHash = cfv.ContentHash
+    FROM CustomFormVersions cfv
+    INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+    WHERE cf.FormName = @FormName AND cfv.Version = @Version;
+
+IF @FormName IS NULL
+BEGIN
+    RAISERROR('No forms with versions found', 16, 1);
+    RETURN;
+END
+
+PRINT 'Sample form: ' + @FormName + ' (version ' + ISNULL(@Version, '-') + ')';
+
+-- Expected index per query (any of them is ok) and whether it must cover the query
+DECLARE @Expected TABLE (
+    QueryName SYSNAME NOT NULL,
+    ExpectedIndex SYSNAME NOT NULL,
+    ExpectCovered BIT NOT NULL
+);
+INSERT INTO @Expected (QueryName, ExpectedIndex, ExpectCovered) VALUES
+    ('current_code', 'UX_CustomFormVersions_Current', 0),
+    ('version_code', 'IX_CustomFormVersions_FormId_Version', 0),
+    ('version_code', 'UQ_CustomFormVersions_FormId_Version', 0),
+    ('code_batch', 'UX_CustomFormVersions_Current', 0),
+    ('code_batch', 'IX_CustomFormVersions_FormId_Version', 0),
+    ('current_metadata', 'UX_CustomFormVersions_Current', 1),
+    ('version_metadata', 'IX_CustomFormVersions_FormId_Version', 1),
+    ('version_numbers', 'IX_CustomFormVersions_FormId_Version', 1),
+    ('version_numbers', 'IX_CustomFormVersions_History', 1),
+    ('version_history_page', 'IX_CustomFormVersions_History', 1),
+    ('form_list_sizes', 'UX_CustomFormVersions_Current', 1);
+
+SET STATISTICS IO ON;
+SET STATISTICS XML ON;
+
+-- get_form_compiled_code (current version)
+EXEC sp_executesql N'/* hot-query:current_code */
+SELECT
+    CASE WHEN DATALENGTH(cfv.CompiledCode) <= @ReadLimit THEN cfv.CompiledCode END,
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    CASE WHEN DATALENGTH(ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary)) <= @ReadLimit
+         THEN ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+    cfv.CodeEncoding,
+    cfv.VersionId,
+    cfv.ContentHash,
+    cfv.StorageBackend,
+    CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = ''sql''
+WHERE cf.FormName = @FormName AND cfv.IsCurrent = 1',
+    N'@ReadLimit INT, @FormName NVARCHAR(255)', @ReadLimit, @FormName;
+
+-- get_form_compiled_code (?version=)
+EXEC sp_executesql N'/* hot-query:version_code */
+SELECT
+    CASE WHEN DATALENGTH(cfv.CompiledCode) <= @ReadLimit THEN cfv.CompiledCode END,
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    CASE WHEN DATALENGTH(ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary)) <= @ReadLimit
+         THEN ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+    cfv.CodeEncoding,
+    cfv.VersionId,
+    cfv.ContentHash,
+    cfv.StorageBackend,
+    CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = ''sql''
+WHERE cf.FormName = @FormName AND cfv.Version = @Version',
+    N'@ReadLimit INT, @FormName NVARCHAR(255), @Version NVARCHAR(50)', @ReadLimit, @FormName, @Version;
+
+-- get_forms_compiled_code (current version + specific version the client already has)
+EXEC sp_executesql N'/* hot-query:code_batch */
+SELECT
+    r.Idx,
+    CASE WHEN cfv.ContentHash = r.KnownHash THEN NULL ELSE cfv.CompiledCode END,
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    CASE WHEN cfv.ContentHash = r.KnownHash THEN NULL
+         ELSE ISNULL(cfv.CompiledCodeBinary, cfb.CompiledCodeBinary) END,
+    cfv.CodeEncoding,
+    cfv.VersionId,
+    cfv.ContentHash,
+    cfv.StorageBackend,
+    CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END,
+    CASE WHEN cfv.ContentHash = r.KnownHash THEN 1 ELSE 0 END
+FROM (VALUES (@Idx0, CAST(@FormName0 AS NVARCHAR(255)), CAST(@Version0 AS NVARCHAR(50)), CAST(@KnownHash0 AS CHAR(64))), (@Idx1, CAST(@FormName1 AS NVARCHAR(255)), CAST(@Version1 AS NVARCHAR(50)), CAST(@KnownHash1 AS CHAR(64)))) AS r(Idx, FormName, Version, KnownHash)
+INNER JOIN CustomForms cf ON cf.FormName = r.FormName
+INNER JOIN CustomFormVersions cfv ON cfv.FormId = cf.FormId
+    AND ((r.Version IS NULL AND cfv.IsCurrent = 1) OR cfv.Version = r.Version)
+LEFT JOIN CustomFormBlobs cfb ON cfb.ContentHash = cfv.ContentHash AND cfv.StorageBackend = ''sql''',
+    N'@Idx0 INT, @FormName0 NVARCHAR(255), @Version0 NVARCHAR(50), @KnownHash0 CHAR(64), @Idx1 INT, @FormName1 NVARCHAR(255), @Version1 NVARCHAR(50), @KnownHash1 CHAR(64)',
+    0, @FormName, NULL, NULL, 1, @FormName, @Version, @KnownHash;
+
+-- get_form_code_metadata (current version: ETag / 304 path)
+EXEC sp_executesql N'/* hot-query:current_metadata */
+SELECT
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    cfv.VersionId,
+    cfv.ContentHash,
+    cfv.StorageBackend,
+    CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END,
+    cfv.CodeEncoding,
+    cf.ProcessName
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+WHERE cf.FormName = @FormName AND cfv.IsCurrent = 1',
+    N'@FormName NVARCHAR(255)', @FormName;
+
+-- get_form_code_metadata (?version=)
+EXEC sp_executesql N'/* hot-query:version_metadata */
+SELECT
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    cfv.VersionId,
+    cfv.ContentHash,
+    cfv.StorageBackend,
+    CASE WHEN EXISTS (SELECT 1 FROM CustomFormSourceMaps sm WHERE sm.VersionId = cfv.VersionId) THEN 1 ELSE 0 END,
+    cfv.CodeEncoding,
+    cf.ProcessName
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+WHERE cf.FormName = @FormName AND cfv.Version = @Version',
+    N'@FormName NVARCHAR(255), @Version NVARCHAR(50)', @FormName, @Version;
+
+-- get_form_version_numbers (semver range index)
+EXEC sp_executesql N'/* hot-query:version_numbers */
+SELECT cfv.Version, cfv.IsCurrent
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+WHERE cf.FormName = @FormName',
+    N'@FormName NVARCHAR(255)', @FormName;
+
+-- get_form_versions_page (first page, without release notes)
+EXEC sp_executesql N'/* hot-query:version_history_page */
+SELECT TOP (@Limit)
+    cfv.Version,
+    cfv.PublishedAt,
+    cfv.SizeBytes,
+    cfv.IsCurrent,
+    NULL,
+    cfv.PackageVersion,
+    cfv.CommitHash,
+    cfv.BuildDate,
+    cfv.VersionId
+FROM CustomFormVersions cfv
+INNER JOIN CustomForms cf ON cfv.FormId = cf.FormId
+WHERE cf.FormName = @FormName
+ORDER BY cfv.PublishedAt DESC, cfv.VersionId DESC',
+    N'@Limit INT, @FormName NVARCHAR(255)', 21, @FormName;
+
+-- get_custom_forms_page (?fields=...,sizeBytes)
+EXEC sp_executesql N'/* hot-query:form_list_sizes */
+SELECT TOP (@Limit) cf.FormName, cf.CurrentVersion, cfv.SizeBytes
+FROM CustomForms cf
+LEFT JOIN CustomFormVersions cfv ON cf.FormId = cfv.FormId AND cfv.IsCurrent = 1
+WHERE cf.Status = ''active''
+ORDER BY cf.FormName',
+    N'@Limit INT', 101;
+
+SET STATISTICS XML OFF;
+SET STATISTICS IO OFF;
+
+-- ==============================================================================
+-- Summary (last execution of each query)
+-- ==============================================================================
+
+;WITH runs AS (
+    SELECT
+        tag.QueryName,
+        qs.last_logical_reads,
+        qs.last_elapsed_time,
+        qp.query_plan,
+        ROW_NUMBER() OVER (PARTITION BY tag.QueryName ORDER BY qs.last_execution_time DESC) AS Rn
+    FROM sys.dm_exec_query_stats qs
+    CROSS APPLY sys.dm_exec_sql_text(qs.sql_handle) st
+    CROSS APPLY sys.dm_exec_query_plan(qs.plan_handle) qp
+    -- sp_executesql statements start with their parameter list: "(@FormName ...)/* hot-query:name */"
+    CROSS APPLY (SELECT CHARINDEX(N'/* hot-query:', st.text) + 13 AS NameStart) pos
+    CROSS APPLY (
+        SELECT SUBSTRING(st.text, pos.NameStart, CHARINDEX(N' */', st.text, pos.NameStart) - pos.NameStart) AS QueryName
+    ) tag
+    WHERE st.text LIKE N'(%)/* hot-query:%'
+)
+SELECT
+    r.QueryName,
+    r.last_logical_reads AS LogicalReads,
+    r.last_elapsed_time / 1000.0 AS ElapsedMs,
+    idx.UsedIndex,
+    CASE
+        WHEN idx.UsedIndex IS NULL THEN 'REGRESSION: expected index not used'
+        WHEN r.query_plan.exist('//*:RelOp[@PhysicalOp="Clustered Index Scan" or @PhysicalOp="Table Scan"]/*/*:Object[@Table="[CustomFormVersions]"]') = 1
+            THEN 'REGRESSION: CustomFormVersions scan'
+        WHEN idx.ExpectCovered = 1 AND r.query_plan.exist('//*:IndexScan[@Lookup="1"]/*:Object[@Table="[CustomFormVersions]"]') = 1
+            THEN 'REGRESSION: key lookup'
+        ELSE 'ok'
+    END AS Status
+FROM runs r
+OUTER APPLY (
+    SELECT TOP (1) e.ExpectedIndex AS UsedIndex, e.ExpectCovered
+    FROM @Expected e
+    CROSS APPLY (SELECT QUOTENAME(e.ExpectedIndex) AS QuotedIndex) q
+    WHERE e.QueryName = r.QueryName
+      AND r.query_plan.exist('//*:Object[@Index=sql:column("q.QuotedIndex")]') = 1
+) idx
+WHERE r.Rn = 1
+ORDER BY r.QueryName;